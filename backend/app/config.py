@@ -31,6 +31,15 @@ class Settings(BaseSettings):
     # Google Gemini AI
     gemini_api_key: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
     gemini_model: str = Field(default="gemini-1.5-flash", env="GEMINI_MODEL")
+    # Refinery call scheduler: the key's quota (defaults: Flash free tier)
+    gemini_requests_per_minute: int = Field(default=10, env="GEMINI_REQUESTS_PER_MINUTE")
+    gemini_tokens_per_minute: int = Field(default=250000, env="GEMINI_TOKENS_PER_MINUTE")
+    gemini_max_concurrency: int = Field(default=4, env="GEMINI_MAX_CONCURRENCY")
+    gemini_max_attempts: int = Field(default=5, env="GEMINI_MAX_ATTEMPTS")
+    # Processes splitting the quota above evenly (worker_pool sets it for its children)
+    gemini_quota_shares: int = Field(default=1, env="GEMINI_QUOTA_SHARES")
+    # Target prompt size of one refinery batch (estimated tokens)
+    gemini_batch_tokens: int = Field(default=25000, env="GEMINI_BATCH_TOKENS")
     
     # Upstash Redis Configuration (HTTP-based serverless Redis)
     upstash_redis_rest_url: str = Field(default="", env="UPSTASH_REDIS_REST_URL")
@@ -49,6 +58,25 @@ class Settings(BaseSettings):
     # Caching
     scholarship_cache_ttl_hours: int = Field(default=24, env="SCHOLARSHIP_CACHE_TTL_HOURS")
     ai_enrichment_cache_ttl_hours: int = Field(default=168, env="AI_ENRICHMENT_CACHE_TTL_HOURS")
+    opportunity_catalog_refresh_seconds: int = Field(default=900, env="OPPORTUNITY_CATALOG_REFRESH_SECONDS")
+    expiry_sweep_interval_seconds: int = Field(default=3600, env="EXPIRY_SWEEP_INTERVAL_SECONDS")
+    
+    # WebSocket fan-out (per-connection bounded send queues)
+    ws_send_queue_size: int = Field(default=64, env="WS_SEND_QUEUE_SIZE")
+    ws_send_timeout_seconds: float = Field(default=10.0, env="WS_SEND_TIMEOUT_SECONDS")
+    
+    # Multi-node WebSocket tier (presence registry + per-node delivery consumers)
+    ws_cluster_mode: bool = Field(default=False, env="WS_CLUSTER_MODE")
+    ws_node_id: str = Field(default="", env="WS_NODE_ID")
+    ws_presence_ttl_seconds: int = Field(default=90, env="WS_PRESENCE_TTL_SECONDS")
+    
+    # ANN Index (opportunity embeddings & user DNA vectors)
+    ann_index_dir: str = Field(default=".cache/ann", env="ANN_INDEX_DIR")
+    ann_candidate_k: int = Field(default=200, env="ANN_CANDIDATE_K")
+    ann_nprobe: int = Field(default=8, env="ANN_NPROBE")
+    # Vectorize profiles into the user DNA index on connect/save; off while
+    # nothing reads that index (each profile costs one embedding call)
+    user_ann_index_enabled: bool = Field(default=False, env="USER_ANN_INDEX_ENABLED")
     
     
     # Cloudinary
@@ -63,6 +91,25 @@ class Settings(BaseSettings):
     kafka_raw_topic: str = Field(default="raw-opportunities-stream", env="KAFKA_RAW_TOPIC")
     kafka_enriched_topic: str = Field(default="enriched-opportunities-stream", env="KAFKA_ENRICHED_TOPIC")
     kafka_consumer_group_id: str = Field(default="scholarstream-websocket-consumer", env="KAFKA_CONSUMER_GROUP_ID")
+    kafka_consume_batch_size: int = Field(default=100, env="KAFKA_CONSUME_BATCH_SIZE")
+    kafka_consume_concurrency: int = Field(default=16, env="KAFKA_CONSUME_CONCURRENCY")
+    # json until every deployed consumer decodes by content-type (serialization.decode_message)
+    kafka_wire_format: str = Field(default="json", env="KAFKA_WIRE_FORMAT")
+    kafka_producer_max_inflight_bytes: int = Field(default=32 * 1024 * 1024, env="KAFKA_PRODUCER_MAX_INFLIGHT_BYTES")
+    kafka_default_partitions: int = Field(default=6, env="KAFKA_DEFAULT_PARTITIONS")
+    kafka_topic_partitions: str = Field(default="", env="KAFKA_TOPIC_PARTITIONS")
+    enrichment_worker_embedded: bool = Field(default=True, env="ENRICHMENT_WORKER_EMBEDDED")
+
+    # Hunter Drone crawling (Playwright)
+    crawler_max_concurrency: int = Field(default=6, env="CRAWLER_MAX_CONCURRENCY")
+    crawler_browsers: int = Field(default=1, env="CRAWLER_BROWSERS")
+    crawler_contexts: int = Field(default=2, env="CRAWLER_CONTEXTS")
+    crawler_browser_max_pages: int = Field(default=500, env="CRAWLER_BROWSER_MAX_PAGES")
+    crawler_browser_max_rss_mb: float = Field(default=1500.0, env="CRAWLER_BROWSER_MAX_RSS_MB")
+    crawler_domain_concurrency: int = Field(default=1, env="CRAWLER_DOMAIN_CONCURRENCY")
+    crawler_domain_delay_seconds: float = Field(default=2.0, env="CRAWLER_DOMAIN_DELAY_SECONDS")
+    crawler_readiness_path: str = Field(default=".cache/crawler/readiness.json", env="CRAWLER_READINESS_PATH")
+    crawler_store_path: str = Field(default=".cache/crawler/crawl_store.json", env="CRAWLER_STORE_PATH")
     
     # Flink Configuration
     flink_app_name: str = Field(default="scholarstream-cortex", env="FLINK_APP_NAME")
@@ -3,9 +3,9 @@ Firebase Firestore database layer
 Handles all database operations with proper error handling
 """
 import firebase_admin
-from firebase_admin import credentials, firestore
+from firebase_admin import credentials, firestore, firestore_async
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 import structlog
 
 from app.config import settings
@@ -14,6 +14,28 @@ from app.models import Scholarship, UserProfile
 logger = structlog.get_logger()
 
 
+def expiry_cutoff() -> int:
+    """
+    Unix timestamp of the start of today (UTC). Deadlines before it have
+    passed; deadlines later today still count as open (grace for today).
+    """
+    today = datetime.now(timezone.utc).date()
+    return int(datetime(today.year, today.month, today.day, tzinfo=timezone.utc).timestamp())
+
+
+def is_expired(deadline_timestamp: Optional[int], cutoff: Optional[int] = None) -> bool:
+    """True if deadline_timestamp has passed (opportunities without one never expire)"""
+    if deadline_timestamp is None:
+        return False
+    return deadline_timestamp < (cutoff if cutoff is not None else expiry_cutoff())
+
+
+def filter_expired(scholarships: List[Scholarship]) -> List[Scholarship]:
+    """Drop scholarships whose deadline_timestamp has passed"""
+    cutoff = expiry_cutoff()
+    return [s for s in scholarships if not is_expired(s.deadline_timestamp, cutoff)]
+
+
 class FirebaseDB:
     """Firebase Firestore database manager"""
     
@@ -29,14 +51,16 @@ class FirebaseDB:
             firebase_admin.initialize_app(cred)
             logger.info("Firebase initialized successfully")
         
-        self.db = firestore.client()
+        # Async client: Firestore round trips yield to the event loop instead
+        # of blocking every other request, WebSocket and Kafka consumer task.
+        self.db = firestore_async.client()
     
     # User Profile Operations
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Fetch user profile from Firestore"""
         try:
             doc_ref = self.db.collection('users').document(user_id)
-            doc = doc_ref.get()
+            doc = await doc_ref.get()
             
             if doc.exists:
                 return doc.to_dict()
@@ -49,7 +73,7 @@ class FirebaseDB:
         """Update user profile in Firestore"""
         try:
             doc_ref = self.db.collection('users').document(user_id)
-            doc_ref.update({
+            await doc_ref.update({
                 'profile': profile.model_dump(),
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
@@ -64,7 +88,7 @@ class FirebaseDB:
         """Save scholarship to Firestore"""
         try:
             doc_ref = self.db.collection('scholarships').document(scholarship.id)
-            doc_ref.set(scholarship.model_dump())
+            await doc_ref.set(scholarship.model_dump())
             logger.info("Scholarship saved", scholarship_id=scholarship.id)
             return True
         except Exception as e:
@@ -75,7 +99,7 @@ class FirebaseDB:
         """Fetch single scholarship by ID"""
         try:
             doc_ref = self.db.collection('scholarships').document(scholarship_id)
-            doc = doc_ref.get()
+            doc = await doc_ref.get()
             
             if doc.exists:
                 data = doc.to_dict()
@@ -91,7 +115,7 @@ class FirebaseDB:
             docs = self.db.collection('scholarships').stream()
             scholarships = []
             
-            for doc in docs:
+            async for doc in docs:
                 try:
                     scholarships.append(Scholarship(**doc.to_dict()))
                 except Exception as parse_error:
@@ -104,54 +128,144 @@ class FirebaseDB:
             logger.error("Failed to fetch all scholarships", error=str(e))
             raise
     
-    async def get_user_matched_scholarships(self, user_id: str) -> List[Scholarship]:
-        """Fetch scholarships matched to a specific user"""
+    async def get_active_scholarships(
+        self,
+        min_deadline: Optional[int] = None,
+        max_deadline: Optional[int] = None,
+        include_undated: bool = True
+    ) -> List[Scholarship]:
+        """
+        Fetch scholarships whose deadline_timestamp is in [min_deadline, max_deadline]
+        (min defaults to the expiry cutoff). Served by the single-field index on
+        deadline_timestamp, so expired documents are never read.
+
+        A range filter never matches a null deadline_timestamp, so undated
+        opportunities (which never expire) are fetched with a second equality
+        query and listed first, unless include_undated is False or max_deadline
+        is set. Documents missing the field entirely cannot be queried at all;
+        count_scholarships_missing_deadline() reports them for backfill.
+        """
         try:
-            # Get user's matched scholarship IDs
-            doc_ref = self.db.collection('user_matches').document(user_id)
-            doc = doc_ref.get()
+            query = self.db.collection('scholarships')\
+                .where('deadline_timestamp', '>=', min_deadline if min_deadline is not None else expiry_cutoff())
+            if max_deadline is not None:
+                query = query.where('deadline_timestamp', '<=', max_deadline)
             
-            if not doc.exists:
-                logger.info("No matched scholarships found", user_id=user_id)
-                return []
+            streams = []
+            if include_undated and max_deadline is None:
+                streams.append(self.db.collection('scholarships').where('deadline_timestamp', '==', None).stream())
+            streams.append(query.order_by('deadline_timestamp').stream())
             
-            matched_ids = doc.to_dict().get('scholarship_ids', [])
-            
-            if not matched_ids:
-                return []
+            scholarships = []
+            for stream in streams:
+                async for doc in stream:
+                    try:
+                        scholarships.append(Scholarship(**doc.to_dict()))
+                    except Exception as parse_error:
+                        logger.warning("Failed to parse scholarship", doc_id=doc.id, error=str(parse_error))
+                        continue
             
-            # Create references for batch fetch
-            refs = [self.db.collection('scholarships').document(sid) for sid in matched_ids]
+            logger.info("Fetched active scholarships", count=len(scholarships))
+            return scholarships
+        except Exception as e:
+            logger.error("Failed to fetch active scholarships", error=str(e))
+            raise
+    
+    async def count_scholarships_missing_deadline(self) -> int:
+        """
+        Count scholarships with no deadline_timestamp field at all (neither a
+        number nor null). Every deadline query skips them, so they must be
+        backfilled with scripts/backfill_deadline_timestamps.py.
+        """
+        collection = self.db.collection('scholarships')
+
+        async def count(query) -> int:
+            result = await query.count().get()
+            return int(result[0][0].value)
+
+        total = await count(collection)
+        dated = await count(collection.where('deadline_timestamp', '>=', -2 ** 63))
+        undated = await count(collection.where('deadline_timestamp', '==', None))
+        return max(0, total - dated - undated)
+    
+    async def archive_expired_scholarships(self, cutoff: Optional[int] = None, batch_size: int = 200) -> List[str]:
+        """
+        Move scholarships with deadline_timestamp before cutoff into
+        scholarships_archive, one write batch at a time. Returns archived IDs.
+        """
+        cutoff = cutoff if cutoff is not None else expiry_cutoff()
+        archived: List[str] = []
+        try:
+            while True:
+                query = self.db.collection('scholarships')\
+                    .where('deadline_timestamp', '<', cutoff)\
+                    .limit(batch_size)
+                
+                batch = self.db.batch()
+                batch_ids = []
+                async for doc in query.stream():
+                    data = doc.to_dict()
+                    data['archived_at'] = firestore.SERVER_TIMESTAMP
+                    batch.set(self.db.collection('scholarships_archive').document(doc.id), data)
+                    batch.delete(doc.reference)
+                    batch_ids.append(doc.id)
+                
+                if not batch_ids:
+                    break
+                await batch.commit()
+                archived.extend(batch_ids)
+                
+                if len(batch_ids) < batch_size:
+                    break
             
-            # Fetch all documents in parallel (optimized batch read)
+            if archived:
+                logger.info("Archived expired scholarships", count=len(archived))
+            return archived
+        except Exception as e:
+            logger.error("Failed to archive expired scholarships", archived=len(archived), error=str(e))
+            raise
+    
+    async def get_scholarships(self, scholarship_ids: List[str]) -> List[Scholarship]:
+        """Batch-fetch scholarships by ID in one round trip (missing IDs are skipped)"""
+        if not scholarship_ids:
+            return []
+        try:
+            refs = [self.db.collection('scholarships').document(sid) for sid in scholarship_ids]
             docs = self.db.get_all(refs)
             
             scholarships = []
-            now = datetime.now()
-            
-            for doc in docs:
+            async for doc in docs:
                 if doc.exists:
                     try:
                         data = doc.to_dict()
                         if 'id' not in data:
                             data['id'] = doc.id
-                        
-                        s = Scholarship(**data)
-                        
-                        # FILTER: Check if expired
-                        if s.deadline:
-                            try:
-                                deadline_dt = datetime.fromisoformat(s.deadline.replace('Z', '+00:00'))
-                                # Compare dates (ignoring time for simplicity/safety)
-                                if deadline_dt.date() < now.date():
-                                    continue # Skip expired
-                            except Exception:
-                                pass # Keep if date is weird
-                                
-                        scholarships.append(s)
+                        scholarships.append(Scholarship(**data))
                     except Exception as parse_error:
                         logger.warning("Failed to parse scholarship", doc_id=doc.id, error=str(parse_error))
                         continue
+            return scholarships
+        except Exception as e:
+            logger.error("Failed to batch fetch scholarships", count=len(scholarship_ids), error=str(e))
+            raise
+    
+    async def get_user_matched_scholarships(self, user_id: str) -> List[Scholarship]:
+        """Fetch scholarships matched to a specific user"""
+        try:
+            # Get user's matched scholarship IDs
+            doc_ref = self.db.collection('user_matches').document(user_id)
+            doc = await doc_ref.get()
+            
+            if not doc.exists:
+                logger.info("No matched scholarships found", user_id=user_id)
+                return []
+            
+            matched_ids = doc.to_dict().get('scholarship_ids', [])
+            
+            if not matched_ids:
+                return []
+            
+            scholarships = filter_expired(await self.get_scholarships(matched_ids))
             
             logger.info("Fetched user matched scholarships", user_id=user_id, count=len(scholarships))
             return scholarships
@@ -159,14 +273,56 @@ class FirebaseDB:
             logger.error("Failed to fetch user matched scholarships", user_id=user_id, error=str(e))
             raise
     
-    async def save_user_matches(self, user_id: str, scholarship_ids: List[str]) -> bool:
-        """Save matched scholarship IDs for a user"""
+    async def get_user_match_state(self, user_id: str) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Fetch the user_matches and users documents in one batched read.
+        Returns {'matches': ..., 'user': ...} with None for missing documents.
+        """
+        try:
+            matches_ref = self.db.collection('user_matches').document(user_id)
+            user_ref = self.db.collection('users').document(user_id)
+            
+            state: Dict[str, Optional[Dict[str, Any]]] = {'matches': None, 'user': None}
+            async for doc in self.db.get_all([matches_ref, user_ref]):
+                if doc.exists:
+                    key = 'matches' if doc.reference.path == matches_ref.path else 'user'
+                    state[key] = doc.to_dict()
+            return state
+        except Exception as e:
+            logger.error("Failed to fetch user match state", user_id=user_id, error=str(e))
+            raise
+    
+    async def save_user_matches(
+        self,
+        user_id: str,
+        scholarship_ids: List[str],
+        scores: Optional[Dict[str, Dict[str, Any]]] = None,
+        profile_version: Optional[str] = None,
+        algorithm_version: Optional[str] = None,
+        ranked: bool = False
+    ) -> bool:
+        """
+        Save matched scholarship IDs for a user, optionally with their scores.
+        scores maps scholarship_id -> {'score', 'opportunity_version', 'amount',
+        'deadline_timestamp'}; the versions record what the scores were computed against
+        so reads can skip re-scoring, and amount/deadline let a page be ranked
+        without fetching every scholarship body. ranked marks scholarship_ids
+        as already in best-first order, so pages can seek instead of sorting.
+        """
         try:
             doc_ref = self.db.collection('user_matches').document(user_id)
-            doc_ref.set({
+            data = {
                 'scholarship_ids': scholarship_ids,
                 'updated_at': firestore.SERVER_TIMESTAMP
-            })
+            }
+            if scores is not None:
+                data.update({
+                    'scores': scores,
+                    'profile_version': profile_version,
+                    'algorithm_version': algorithm_version,
+                    'ranked': ranked,
+                })
+            await doc_ref.set(data)
             logger.info("User matches saved", user_id=user_id, count=len(scholarship_ids))
             return True
         except Exception as e:
@@ -179,7 +335,7 @@ class FirebaseDB:
         try:
             doc_ref = self.db.collection('users').document(user_id)
             # Use set with merge to create document if it doesn't exist
-            doc_ref.set({
+            await doc_ref.set({
                 'saved_scholarships': firestore.ArrayUnion([scholarship_id]),
                 'updated_at': firestore.SERVER_TIMESTAMP
             }, merge=True)
@@ -194,7 +350,7 @@ class FirebaseDB:
         try:
             doc_ref = self.db.collection('users').document(user_id)
             # Use set with merge to ensure document exists
-            doc_ref.set({
+            await doc_ref.set({
                 'saved_scholarships': firestore.ArrayRemove([scholarship_id]),
                 'updated_at': firestore.SERVER_TIMESTAMP
             }, merge=True)
@@ -216,7 +372,7 @@ class FirebaseDB:
                 .limit(1)\
                 .stream()
             
-            for doc in existing:
+            async for doc in existing:
                 logger.info("Returning existing draft", application_id=doc.id)
                 return doc.id
             
@@ -224,7 +380,7 @@ class FirebaseDB:
             doc_ref = self.db.collection('applications').document()
             application_id = doc_ref.id
             
-            doc_ref.set({
+            await doc_ref.set({
                 'application_id': application_id,
                 'user_id': user_id,
                 'scholarship_id': scholarship_id,
@@ -273,7 +429,7 @@ class FirebaseDB:
             if 'additional_answers' in draft_data and draft_data['additional_answers'] is not None:
                 update_data['additional_answers'] = draft_data['additional_answers']
             
-            doc_ref.update(update_data)
+            await doc_ref.update(update_data)
             logger.info("Application draft saved", application_id=application_id)
             return True
         except Exception as e:
@@ -290,7 +446,7 @@ class FirebaseDB:
                 .limit(1)\
                 .stream()
             
-            for doc in docs:
+            async for doc in docs:
                 return doc.to_dict()
             
             return None
@@ -317,7 +473,7 @@ class FirebaseDB:
                 'updated_at': firestore.SERVER_TIMESTAMP
             }
             
-            doc_ref.set(submission_data)
+            await doc_ref.set(submission_data)
             logger.info("Application submitted", application_id=application_data['application_id'], confirmation=confirmation_number)
             
             return confirmation_number
@@ -334,7 +490,7 @@ class FirebaseDB:
                 .stream()
             
             applications = []
-            for doc in docs:
+            async for doc in docs:
                 applications.append(doc.to_dict())
             
             logger.info("Fetched user applications", user_id=user_id, count=len(applications))
@@ -347,7 +503,7 @@ class FirebaseDB:
         """Get specific application by ID"""
         try:
             doc_ref = self.db.collection('applications').document(application_id)
-            doc = doc_ref.get()
+            doc = await doc_ref.get()
             
             if doc.exists:
                 return doc.to_dict()
@@ -356,6 +512,16 @@ class FirebaseDB:
             logger.error("Failed to fetch application", application_id=application_id, error=str(e))
             raise
     
+    async def delete_application(self, application_id: str) -> bool:
+        """Delete an application document"""
+        try:
+            await self.db.collection('applications').document(application_id).delete()
+            logger.info("Application deleted", application_id=application_id)
+            return True
+        except Exception as e:
+            logger.error("Failed to delete application", application_id=application_id, error=str(e))
+            raise
+    
     async def update_application_status(self, application_id: str, status: str, **kwargs) -> bool:
         """Update application status (for admin or automated updates)"""
         try:
@@ -374,7 +540,7 @@ class FirebaseDB:
             if 'notes' in kwargs:
                 update_data['notes'] = kwargs['notes']
             
-            doc_ref.update(update_data)
+            await doc_ref.update(update_data)
             logger.info("Application status updated", application_id=application_id, status=status)
             return True
         except Exception as e:
@@ -386,7 +552,7 @@ class FirebaseDB:
         """Create a discovery job record"""
         try:
             doc_ref = self.db.collection('discovery_jobs').document(job_id)
-            doc_ref.set({
+            await doc_ref.set({
                 'user_id': user_id,
                 'status': 'processing',
                 'progress': 0,
@@ -404,7 +570,7 @@ class FirebaseDB:
         """Update discovery job progress"""
         try:
             doc_ref = self.db.collection('discovery_jobs').document(job_id)
-            doc_ref.update({
+            await doc_ref.update({
                 'status': status,
                 'progress': progress,
                 'scholarships_found': scholarships_found,
@@ -419,7 +585,7 @@ class FirebaseDB:
         """Get discovery job status"""
         try:
             doc_ref = self.db.collection('discovery_jobs').document(job_id)
-            doc = doc_ref.get()
+            doc = await doc_ref.get()
             
             if doc.exists:
                 return doc.to_dict()
@@ -433,7 +599,7 @@ class FirebaseDB:
         """Save a chat message to conversation history"""
         try:
             doc_ref = self.db.collection('chat_history').document(user_id).collection('messages').document()
-            doc_ref.set({
+            await doc_ref.set({
                 'role': role,
                 'content': content,
                 'timestamp': firestore.SERVER_TIMESTAMP
@@ -454,7 +620,7 @@ class FirebaseDB:
                 .stream()
             
             history = []
-            for msg in messages:
+            async for msg in messages:
                 history.append(msg.to_dict())
             
             # Reverse to get chronological order
@@ -473,18 +639,18 @@ class FirebaseDB:
             
             batch = self.db.batch()
             count = 0
-            for msg in messages:
+            async for msg in messages:
                 batch.delete(msg.reference)
                 count += 1
                 
                 # Firestore batch limit is 500
                 if count >= 500:
-                    batch.commit()
+                    await batch.commit()
                     batch = self.db.batch()
                     count = 0
             
             if count > 0:
-                batch.commit()
+                await batch.commit()
             
             logger.info("Chat history cleared", user_id=user_id)
             return True
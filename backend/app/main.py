@@ -121,10 +121,33 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
+    from app.services.opportunity_catalog import opportunity_catalog
+    from app.routes.websocket import manager
+    from app.services.kafka_config import kafka_producer_manager
+    from app.services.crawler_service import crawler_service
+    from app.services.gemini_scheduler import gemini_scheduler
+    from app.services.expiry_sweeper import expiry_sweeper
+
+    status = "healthy"
+    try:
+        websocket_nodes = await manager.presence.nodes()
+    except Exception as e:
+        # Presence lives in Redis; an outage degrades cluster routing, not this node
+        logger.warning("Presence lookup failed in health check", error=str(e))
+        websocket_nodes = {"error": str(e)}
+        status = "degraded"
+
     return {
-        "status": "healthy",
+        "status": status,
         "environment": settings.environment,
-        "version": "1.0.0"
+        "version": "1.0.0",
+        "opportunity_catalog": opportunity_catalog.stats(),
+        "expiry_sweeper": expiry_sweeper.stats(),
+        "websocket": manager.stats(),
+        "websocket_nodes": websocket_nodes,
+        "kafka_producer": kafka_producer_manager.stats(),
+        "crawler_browsers": crawler_service.pool.stats(),
+        "gemini_scheduler": gemini_scheduler.stats()
     }
 
 
@@ -174,15 +197,22 @@ async def startup_event():
     # await crawler_scheduler.start()
     # logger.info("Universal Crawler Scheduler initialized")
 
-    # Start AI REFINERY WORKER (Phase 4)
-    from app.services.enrichment_worker import enrichment_worker
-    asyncio.create_task(enrichment_worker.start())
-    logger.info("AI Refinery Worker initialized")
+    # Start AI REFINERY WORKER (Phase 4), unless it runs as its own worker pool
+    if settings.enrichment_worker_embedded:
+        from app.services.enrichment_worker import enrichment_worker
+        asyncio.create_task(enrichment_worker.start())
+        logger.info("AI Refinery Worker initialized")
+
+    # Archive expired opportunities so hot queries never read them
+    from app.services.expiry_sweeper import expiry_sweeper
+    asyncio.create_task(expiry_sweeper.start())
+    logger.info("Expiry sweeper initialized", interval_seconds=expiry_sweeper.interval_seconds)
 
     # Start Kafka consumer for real-time streaming (Non-Blocking)
     try:
-        from app.routes.websocket import start_kafka_consumer_task
+        from app.routes.websocket import start_kafka_consumer_task, run_presence_heartbeat
         asyncio.create_task(start_kafka_consumer_task())
+        asyncio.create_task(run_presence_heartbeat())
         logger.info("Kafka consumer task scheduled (non-blocking)")
     except Exception as e:
         logger.warning("Kafka consumer failed to start, continuing without real-time updates", error=str(e))
@@ -231,6 +261,24 @@ async def shutdown_event():
 
     from app.services.enrichment_worker import enrichment_worker
     enrichment_worker.stop()
+
+    from app.services.expiry_sweeper import expiry_sweeper
+    expiry_sweeper.stop()
+
+    # Deliver whatever is still queued before the process exits
+    from app.services.kafka_config import kafka_producer_manager
+    kafka_producer_manager.close()
+
+    # Drop this node from presence so its users read as offline immediately
+    from app.routes.websocket import manager
+    try:
+        await manager.presence.remove_node(manager.node_id)
+    except Exception as e:
+        logger.warning("Presence cleanup failed", error=str(e))
+
+    # Persist ANN indexes so the next boot starts warm
+    from app.services.matching_engine import matching_engine
+    matching_engine.save_indexes()
     
     # from app.services.background_jobs import stop_scheduler
     # stop_scheduler()
@@ -239,6 +287,10 @@ async def shutdown_event():
     from app.services.scraper_service import scraper_service
     await scraper_service.close()
 
+    # Close the Hunter Drone browser pool
+    from app.services.crawler_service import crawler_service
+    await crawler_service.close()
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -188,6 +188,37 @@ class MatchedScholarshipsResponse(BaseModel):
     last_updated: str  # ISO format datetime string
 
 
+class ScholarshipSummary(BaseModel):
+    """Card-sized projection of a Scholarship: no embedding, eligibility blocks or long text"""
+    id: str
+    title: Optional[str] = None
+    name: str
+    organization: Optional[str] = None
+    amount: float = 0.0
+    amount_display: Optional[str] = None
+    deadline: Optional[str] = None
+    deadline_timestamp: Optional[int] = None
+    geo_tags: List[str] = Field(default_factory=list)
+    type_tags: List[str] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+    source_url: str
+    description: Optional[str] = None  # Truncated preview
+    match_score: float = 0.0
+    match_tier: Optional[MatchTier] = None
+    priority_level: Optional[PriorityLevel] = None
+    competition_level: Optional[CompetitionLevel] = None
+    last_verified: Optional[str] = None
+
+
+class MatchedScholarshipsPage(BaseModel):
+    """One cursor page of matched scholarships, best match first"""
+    scholarships: List[ScholarshipSummary]
+    total_count: int
+    total_value: float
+    next_cursor: Optional[str] = None  # Opaque; absent on the last page
+    last_updated: str
+
+
 class SaveScholarshipRequest(BaseModel):
     """Request to save/unsave a scholarship"""
     user_id: str = Field(..., min_length=1)
@@ -389,9 +389,7 @@ async def delete_application(application_id: str):
             raise HTTPException(status_code=400, detail="Can only delete draft applications")
         
         # Delete from Firebase
-        db.db.collection('applications').document(application_id).delete()
-        
-        logger.info("Application deleted", application_id=application_id)
+        await db.delete_application(application_id)
         
         return {
             "success": True,
@@ -82,12 +82,11 @@ class SentinelManager:
                     "source": self._extract_domain(url),
                     "method": "extension_sentinel"
                 }
-                kafka_producer_manager.publish_to_stream(
-                    topic=KafkaConfig.RAW_HTML_TOPIC,
+                await kafka_producer_manager.publish(
+                    topic=KafkaConfig.TOPIC_RAW_HTML,
                     key=url,
                     value=payload
                 )
-                kafka_producer_manager.flush()
         else:
             logger.warning("Crawler Job Failed", job_id=job_id, status=status, url=url)
 
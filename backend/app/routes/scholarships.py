@@ -2,21 +2,30 @@
 Scholarship API Routes
 All endpoints for scholarship discovery, matching, and management
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query
+from typing import List, Optional, Union, Tuple
+import base64
+import bisect
+import json
+import math
 import structlog
 
 from app.models import (
     DiscoverRequest,
     DiscoveryJobResponse,
     MatchedScholarshipsResponse,
+    MatchedScholarshipsPage,
+    ScholarshipSummary,
+    UserProfile,
     Scholarship,
     SaveScholarshipRequest,
     StartApplicationRequest,
     ErrorResponse
 )
 from app.services.matching_service import matching_service
-from app.database import db
+from app.services.matching_engine import matching_engine
+from app.services.opportunity_catalog import opportunity_catalog
+from app.database import db, expiry_cutoff, is_expired
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/api/scholarships", tags=["scholarships"])
@@ -40,6 +49,9 @@ async def discover_scholarships(
             request.profile
         )
         
+        # Onboarding profile: (re)build the user's DNA vector for the ANN index
+        background_tasks.add_task(matching_engine.index_user, request.user_id, request.profile)
+        
         # If processing, schedule background task
         if response.status == "processing" and response.job_id:
             background_tasks.add_task(
@@ -88,55 +100,130 @@ async def get_discovery_progress(job_id: str):
         )
 
 
-@router.get("/matched", response_model=MatchedScholarshipsResponse)
-async def get_matched_scholarships(user_id: str):
+SUMMARY_DESCRIPTION_CHARS = 280
+MAX_CURSOR_CHARS = 512
+
+
+def _encode_cursor(score: float, scholarship_id: str) -> str:
+    """Opaque cursor pointing just after (score, id) in best-first order"""
+    raw = json.dumps([score, scholarship_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        if len(cursor) > MAX_CURSOR_CHARS:
+            raise ValueError("cursor too long")
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, scholarship_id = json.loads(raw)
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not math.isfinite(score):
+            raise ValueError("bad score")
+        if not isinstance(scholarship_id, str):
+            raise ValueError("bad id")
+        return float(score), scholarship_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _summarize(scholarship: Scholarship) -> ScholarshipSummary:
+    """Project a Scholarship down to what a results card needs"""
+    description = scholarship.description
+    if description and len(description) > SUMMARY_DESCRIPTION_CHARS:
+        description = description[:SUMMARY_DESCRIPTION_CHARS].rstrip() + '...'
+    return ScholarshipSummary(
+        **scholarship.model_dump(include=set(ScholarshipSummary.model_fields) - {'description'}),
+        description=description
+    )
+
+
+async def _self_heal_matches(user_id: str, profile: UserProfile) -> List[Scholarship]:
+    """Compute and persist matches against the catalog for a user with none stored"""
+    logger.info("No matches found in DB, triggering self-healing match", user_id=user_id)
+    all_opps = await opportunity_catalog.get_all()
+    if not all_opps:
+        return []
+    
+    matched = matching_service._filter_and_rank(all_opps, profile)
+    if matched:
+        # Save matches (with scores) for next time
+        await matching_service.save_scored_matches(user_id, matched, profile)
+        logger.info("Self-healing match complete", confirmed_matches=len(matched))
+    return matched
+
+
+async def _persist_scores(user_id: str, match_state: dict, profile: UserProfile, scores: dict) -> dict:
+    """
+    Write re-scored entries back, IDs in rank order, and return the updated
+    match state. IDs without a score entry (expired, archived or deleted since
+    they matched) are dropped, so scores_current can hold again afterwards.
+    """
+    profile_version = matching_service.profile_version(profile)
+    live_ids = [sid for sid in match_state.get('scholarship_ids', []) if sid in scores]
+    scholarship_ids = matching_service.rank_ids(live_ids, scores)
+    await db.save_user_matches(
+        user_id,
+        scholarship_ids,
+        scores=scores,
+        profile_version=profile_version,
+        algorithm_version=matching_service.algorithm_version,
+        ranked=True
+    )
+    return {
+        **match_state,
+        'scholarship_ids': scholarship_ids,
+        'scores': scores,
+        'profile_version': profile_version,
+        'algorithm_version': matching_service.algorithm_version,
+        'ranked': True,
+    }
+
+
+@router.get("/matched", response_model=Union[MatchedScholarshipsPage, MatchedScholarshipsResponse])
+async def get_matched_scholarships(
+    user_id: str,
+    limit: Optional[int] = Query(None, ge=1, le=100, description="Page size; omit for the full list"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
     """
     Get all scholarships matched to a user
-    Returns full list with match scores
+    Returns full list with match scores, or a cursor page of summaries when limit is set
     """
     try:
-        logger.info("Fetching matched scholarships", user_id=user_id)
+        logger.info("Fetching matched scholarships", user_id=user_id, limit=limit)
+        
+        # Hot path: one batched read for the match list (with persisted scores)
+        # and the profile; scholarship bodies come from the in-process catalog
+        state = await db.get_user_match_state(user_id)
+        match_state = state['matches'] or {}
+        user_profile_data = state['user']
+        
+        profile = None
+        if user_profile_data and 'profile' in user_profile_data:
+            try:
+                profile = UserProfile(**user_profile_data['profile'])
+            except Exception as e:
+                logger.warning("Stored profile failed validation, serving stored scores", user_id=user_id, error=str(e))
+        
+        if limit is not None:
+            return await _get_matched_page(user_id, match_state, profile, limit, cursor)
         
-        scholarships = await db.get_user_matched_scholarships(user_id)
+        matched_ids = match_state.get('scholarship_ids', [])
+        scholarships = await opportunity_catalog.get_many(matched_ids)
         
         # SELF-HEALING: If no matches found, trigger fresh match against cache
         if not scholarships:
-            logger.info("No matches found in DB, triggering self-healing match", user_id=user_id)
-            all_opps = await db.get_all_scholarships()
-            if all_opps:
-                # Get user profile for matching
-                user_profile_data = await db.get_user_profile(user_id)
-                if user_profile_data and 'profile' in user_profile_data:
-                    from app.models import UserProfile
-                    # Reconstruct profile object
-                    profile = UserProfile(**user_profile_data['profile'])
-                    
-                    # Compute matches
-                    matched = matching_service._filter_and_rank(all_opps, profile)
-                    
-                    if matched:
-                        # Save matches for next time
-                        await db.save_user_matches(user_id, [s.id for s in matched])
-                        scholarships = matched
-                        logger.info("Self-healing match complete", confirmed_matches=len(scholarships))
-
-        # ALWAYS Re-Score matches to ensure personalization is fresh
-        # (Stored matches might have 0 score or old algorithm score)
-        if scholarships:
+            if profile:
+                scholarships = await _self_heal_matches(user_id, profile)
+        
+        # Reuse persisted scores; re-score only what the profile, opportunity
+        # or algorithm version says is stale
+        elif profile:
             try:
-                user_profile_data = await db.get_user_profile(user_id)
-                if user_profile_data and 'profile' in user_profile_data:
-                    from app.models import UserProfile
-                    profile = UserProfile(**user_profile_data['profile'])
-                    
-                    # Re-calculate scores
-                    for scholarship in scholarships:
-                        score = matching_service.calculate_match_score(scholarship, profile)
-                        scholarship.match_score = score
-                        scholarship.match_tier = matching_service.get_match_tier(score)
-                    
-                    # Re-sort by score descending
-                    scholarships.sort(key=lambda x: x.match_score, reverse=True)
+                scholarships, updated_scores = matching_service.apply_stored_scores(
+                    scholarships, match_state, profile
+                )
+                if updated_scores is not None:
+                    await _persist_scores(user_id, match_state, profile, updated_scores)
             except Exception as e:
                 logger.warning("Failed to re-calculate scores on read", error=str(e))
 
@@ -148,6 +235,8 @@ async def get_matched_scholarships(user_id: str):
             last_updated=(scholarships[0].last_verified or "") if scholarships else ""
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Failed to fetch matched scholarships", error=str(e), user_id=user_id)
         raise HTTPException(
@@ -156,6 +245,102 @@ async def get_matched_scholarships(user_id: str):
         )
 
 
+async def _get_matched_page(
+    user_id: str,
+    match_state: dict,
+    profile: Optional[UserProfile],
+    limit: int,
+    cursor: Optional[str]
+) -> MatchedScholarshipsPage:
+    """
+    One page of matches ordered by (match_score desc, id).
+    
+    When the stored scores are current for this profile and algorithm,
+    scholarship_ids are already stored in that order: the cursor is found by
+    binary search and only the page's bodies are loaded, so latency does not
+    grow with the total match count. Otherwise every match is loaded and
+    re-scored once, then persisted in rank order.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    matched_ids = match_state.get('scholarship_ids', [])
+    
+    if not matched_ids and profile and after is None:
+        healed = await _self_heal_matches(user_id, profile)
+        match_state = matching_service.build_match_state(healed, profile)
+    
+    cutoff = expiry_cutoff()
+    loaded = None
+    if not (profile and matching_service.scores_current(match_state, profile)):
+        # Slow path: legacy entries or a changed profile/algorithm
+        scholarships = await opportunity_catalog.get_many(match_state.get('scholarship_ids', []))
+        if profile:
+            # Persisting prunes matches the catalog no longer has, so the next read is fast
+            scholarships, updated_scores = matching_service.apply_stored_scores(scholarships, match_state, profile)
+            if updated_scores is not None:
+                match_state = await _persist_scores(user_id, match_state, profile, updated_scores)
+        loaded = {s.id: s for s in scholarships}
+        ranked_ids = sorted(loaded, key=lambda sid: matching_service.rank_key(loaded[sid].match_score, sid))
+        score_of = lambda sid: loaded[sid].match_score
+        total_count = len(ranked_ids)
+        total_value = sum(s.amount for s in scholarships)
+        position = 0
+        if after is not None:
+            position = bisect.bisect_right(
+                ranked_ids,
+                matching_service.rank_key(*after),
+                key=lambda sid: matching_service.rank_key(score_of(sid), sid)
+            )
+    else:
+        if not match_state.get('ranked'):
+            # Stored before IDs were kept in rank order: sort and persist once
+            match_state = await _persist_scores(user_id, match_state, profile, match_state['scores'])
+        ranked_ids = match_state['scholarship_ids']
+        stored_scores = match_state['scores']
+        score_of = lambda sid: stored_scores[sid]['score']
+        position = matching_service.seek_stored_matches(match_state, after)
+        total_count, total_value = 0, 0.0
+        for sid in ranked_ids:
+            entry = stored_scores[sid]
+            if not is_expired(entry.get('deadline_timestamp'), cutoff):
+                total_count += 1
+                total_value += entry.get('amount') or 0.0
+    
+    # Walk forward in rank order, skipping expired entries and topping up
+    # if bodies turn out missing
+    page: List[Scholarship] = []
+    while len(page) < limit and position < len(ranked_ids):
+        window: List[str] = []
+        while len(window) < limit - len(page) and position < len(ranked_ids):
+            sid = ranked_ids[position]
+            position += 1
+            if loaded is None and is_expired(stored_scores[sid].get('deadline_timestamp'), cutoff):
+                continue
+            window.append(sid)
+        if loaded is not None:
+            page.extend(loaded[sid] for sid in window)
+        elif window:
+            page.extend(await opportunity_catalog.get_many(window))
+    
+    if loaded is None and profile and page:
+        # Catch opportunities edited since their score was stored
+        page, updated_scores = matching_service.apply_stored_scores(page, match_state, profile)
+        if updated_scores is not None:
+            await _persist_scores(user_id, match_state, profile, updated_scores)
+    
+    next_cursor = None
+    if position < len(ranked_ids):
+        last_sid = ranked_ids[position - 1]
+        next_cursor = _encode_cursor(score_of(last_sid), last_sid)
+    
+    return MatchedScholarshipsPage(
+        scholarships=[_summarize(s) for s in page],
+        total_count=total_count,
+        total_value=total_value,
+        next_cursor=next_cursor,
+        last_updated=(page[0].last_verified or "") if page else ""
+    )
+
+
 @router.get("/{scholarship_id}", response_model=Scholarship)
 async def get_scholarship_by_id(scholarship_id: str):
     """
@@ -163,7 +348,7 @@ async def get_scholarship_by_id(scholarship_id: str):
     Used for the opportunity detail page
     """
     try:
-        scholarship = await db.get_scholarship(scholarship_id)
+        scholarship = await opportunity_catalog.get(scholarship_id)
         
         if not scholarship:
             raise HTTPException(
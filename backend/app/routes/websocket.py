@@ -7,13 +7,21 @@ from typing import Dict, List, Optional, Any
 import json
 import asyncio
 import structlog
-from confluent_kafka import Consumer, KafkaError, KafkaException
+from confluent_kafka import Consumer, KafkaException
 from firebase_admin import auth
 from datetime import datetime
 
 from app.database import get_user_profile, FirebaseDB
 from app.services.personalization_engine import PersonalizationEngine
-from app.services.kafka_config import KafkaConfig
+from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services.fanout import ConnectionSender
+from app.services.kafka_batch import BatchConsumer, log_commit_result
+from app.services import serialization
+from app.services.profile_index import ProfileIndex
+from app.services.presence import PresenceRegistry, create_presence_registry, default_node_id
+from app.config import settings
+from app.services.opportunity_catalog import opportunity_catalog
+from app.services.matching_engine import matching_engine
 from app.models import (
     Scholarship, ScholarshipEligibility, ScholarshipRequirements
 )
@@ -23,30 +31,86 @@ logger = structlog.get_logger()
 
 
 class ConnectionManager:
-    """Manages WebSocket connections and routes messages to appropriate users"""
+    """
+    Manages WebSocket connections and routes messages to appropriate users.
+    Every outbound message goes through the connection's ConnectionSender, so
+    senders never await a client and a slow client only delays itself.
+
+    Connections are local to this node (process); the presence registry
+    records which node holds each user so several nodes can share the load.
+    """
 
-    def __init__(self):
+    def __init__(
+        self,
+        profile_index: ProfileIndex,
+        presence: PresenceRegistry,
+        node_id: str,
+        max_queue: int = 64,
+        send_timeout: float = 10.0
+    ):
         self.active_connections: Dict[str, WebSocket] = {}
         self.user_profiles: Dict[str, Dict] = {}
+        # Feature -> user postings, so routing only scores relevant users
+        self.profile_index = profile_index
+        self.presence = presence
+        self.node_id = node_id
+        self.senders: Dict[str, ConnectionSender] = {}
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        # Counters from connections that have since closed
+        self._closed_totals = {'sent': 0, 'dropped': 0, 'coalesced': 0}
 
     async def connect(self, user_id: str, websocket: WebSocket, user_profile: Dict):
         """Register new WebSocket connection"""
         await websocket.accept()
+
+        # A reconnect replaces the previous socket for this user
+        if user_id in self.senders:
+            self._close_sender(user_id)
+
+        sender = ConnectionSender(
+            websocket,
+            max_queue=self.max_queue,
+            send_timeout=self.send_timeout,
+            on_failure=lambda failed, uid=user_id: self.disconnect(uid, failed.websocket),
+            name=user_id
+        )
+        sender.start()
+
         self.active_connections[user_id] = websocket
-        self.user_profiles[user_id] = user_profile
+        self.senders[user_id] = sender
+        self.update_profile(user_id, user_profile)
+
+        try:
+            # Carry the new count so cluster-wide totals see this user before the next heartbeat
+            await self.presence.register(user_id, self.node_id, len(self.active_connections))
+        except Exception as e:
+            logger.warning("Presence register failed", user_id=user_id, error=str(e))
 
         logger.info(
             "WebSocket connected",
             user_id=user_id,
+            node_id=self.node_id,
             total_connections=len(self.active_connections)
         )
 
-    def disconnect(self, user_id: str):
-        """Remove WebSocket connection"""
+    def disconnect(self, user_id: str, websocket: Optional[WebSocket] = None):
+        """Remove WebSocket connection (only if it is still the given socket)"""
+        if websocket is not None and self.active_connections.get(user_id) is not websocket:
+            return
         if user_id in self.active_connections:
             del self.active_connections[user_id]
         if user_id in self.user_profiles:
             del self.user_profiles[user_id]
+        self.profile_index.remove(user_id)
+        self._close_sender(user_id)
+
+        # disconnect() is also called from send-failure callbacks, so the
+        # registry update runs as its own task
+        try:
+            asyncio.get_running_loop().create_task(self._unregister_presence(user_id))
+        except RuntimeError:
+            pass
 
         logger.info(
             "WebSocket disconnected",
@@ -54,48 +118,78 @@ class ConnectionManager:
             remaining_connections=len(self.active_connections)
         )
 
+    def update_profile(self, user_id: str, user_profile: Dict):
+        """Cache a connected user's profile and re-index its features"""
+        self.user_profiles[user_id] = user_profile
+        if isinstance(user_profile, dict):
+            self.profile_index.add(user_id, user_profile)
+        else:
+            self.profile_index.remove(user_id)
+
+    async def _unregister_presence(self, user_id: str):
+        try:
+            await self.presence.unregister(user_id, self.node_id)
+        except Exception as e:
+            logger.warning("Presence unregister failed", user_id=user_id, error=str(e))
+
+    async def heartbeat_presence(self):
+        """Keep this node alive in the registry and re-assert its users"""
+        await self.presence.heartbeat(self.node_id, list(self.active_connections))
+
+    def _close_sender(self, user_id: str):
+        sender = self.senders.pop(user_id, None)
+        if sender:
+            for key in self._closed_totals:
+                self._closed_totals[key] += getattr(sender, key)
+            sender.close()
+
+    def enqueue(self, user_id: str, message: Dict, coalesce_key: Optional[Any] = None) -> bool:
+        """Queue a message for one user without waiting on the socket"""
+        sender = self.senders.get(user_id)
+        if sender is None:
+            return False
+        return sender.enqueue(message, coalesce_key)
+
     async def send_personal_message(self, user_id: str, message: Dict):
         """Send message to specific user"""
-        if user_id in self.active_connections:
-            try:
-                await self.active_connections[user_id].send_json(message)
-                logger.debug("Message sent to user", user_id=user_id)
-            except Exception as e:
-                logger.error(
-                    "Failed to send message",
-                    user_id=user_id,
-                    error=str(e)
-                )
-                self.disconnect(user_id)
+        if self.enqueue(user_id, message):
+            logger.debug("Message queued for user", user_id=user_id)
 
     async def broadcast(self, message: Dict, exclude_user: Optional[str] = None):
         """Broadcast message to all connected clients"""
-        disconnected_users = []
-
-        for user_id, connection in self.active_connections.items():
-            if user_id == exclude_user:
-                continue
-
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(
-                    "Failed to broadcast to user",
-                    user_id=user_id,
-                    error=str(e)
-                )
-                disconnected_users.append(user_id)
-
-        for user_id in disconnected_users:
-            self.disconnect(user_id)
+        for user_id in list(self.senders):
+            if user_id != exclude_user:
+                self.enqueue(user_id, message)
 
     def get_all_user_ids(self) -> List[str]:
         """Get list of all connected user IDs"""
         return list(self.active_connections.keys())
 
+    def stats(self) -> Dict[str, int]:
+        """Connection and send-queue counters for health reporting"""
+        totals = dict(self._closed_totals)
+        queued = 0
+        for sender in self.senders.values():
+            queued += sender.queued
+            for key in totals:
+                totals[key] += getattr(sender, key)
+        return {
+            'node_id': self.node_id,
+            'connections': len(self.active_connections),
+            'queued': queued,
+            **totals,
+            'profile_index': self.profile_index.stats()
+        }
+
 
-manager = ConnectionManager()
 personalization_engine = PersonalizationEngine()
+manager = ConnectionManager(
+    ProfileIndex(personalization_engine),
+    create_presence_registry(),
+    default_node_id(),
+    max_queue=settings.ws_send_queue_size,
+    send_timeout=settings.ws_send_timeout_seconds
+)
 firebase_db = FirebaseDB()  # For persisting opportunities to Firestore
 
 
@@ -114,6 +208,13 @@ async def consume_kafka_stream():
     """
     Background task that consumes enriched opportunities from Kafka
     and pushes matching opportunities to connected users
+
+    All nodes share one consumer group, so each opportunity is persisted by
+    exactly one of them; in cluster mode that node then republishes it on the
+    delivery topic for every node to route locally.
+
+    Messages are read in batches, processed concurrently (one opportunity ID
+    at a time), and committed with one asynchronous commit per batch.
     """
     kafka_config = KafkaConfig()
 
@@ -122,6 +223,7 @@ async def consume_kafka_stream():
         return
 
     consumer_config = kafka_config.get_consumer_config(group_id='scholarstream-websocket-consumers-v1')
+    consumer_config['on_commit'] = log_commit_result
     consumer = Consumer(consumer_config)
 
     # Subscribing to the new Refinery Output
@@ -129,91 +231,87 @@ async def consume_kafka_stream():
 
     logger.info("Kafka Lifeline Consumer Started", topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED)
 
+    batch_consumer = BatchConsumer(
+        consumer,
+        decode=decode_enriched_message,
+        handler=handle_enriched_opportunity,
+        key=lambda opportunity: opportunity.get('id'),
+        batch_size=settings.kafka_consume_batch_size,
+        concurrency=settings.kafka_consume_concurrency,
+        name='opportunity-router'
+    )
+
     try:
-        while True:
-            # Run blocking poll in thread to avoid freezing event loop
-            msg = await asyncio.to_thread(consumer.poll, 1.0)
+        await batch_consumer.run()
+    except KafkaException as e:
+        logger.error("Kafka consumer error", error=str(e))
+    finally:
+        consumer.close()
+        logger.info("Kafka consumer closed", **batch_consumer.stats())
 
-            if msg is None:
-                continue
 
-            if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
-                    logger.debug("Reached end of partition")
-                else:
-                    # Exponential Backoff for Connection Errors
-                    logger.error("Kafka error", error=str(msg.error()))
-                    await asyncio.sleep(5.0) # Sleep to prevent log spam
-                continue
+def decode_enriched_message(raw: bytes, headers: Any = None) -> Optional[Dict]:
+    """
+    Decode one enriched-topic message into an opportunity dict.
+    Returns None for messages that should be skipped (poison pills).
 
+    Canonical envelopes decode in one pass; older messages still go through
+    the unwrap below.
+    """
+    # Try to parse the initial message
+    try:
+        raw_message = serialization.decode_message(raw, headers)
+    except serialization.DecodeError:
+        logger.error("Skipping non-JSON Kafka message", raw=raw[:100].decode('utf-8', 'replace'))
+        return None
+
+    final_data = serialization.read_envelope(raw_message)
+    if final_data is not None:
+        return normalize_opportunity(final_data)
+
+    # FIX: Recursive Unwrapping (The "Matryoshka" Unwrap)
+    # Sometimes data is double-encoded JSON strings inside JSON
+    final_data = raw_message
+
+    # If wrapped in 'enriched_data' envelope from Refinery
+    if isinstance(final_data, dict) and 'enriched_data' in final_data:
+        final_data = final_data['enriched_data']
+        # Use source metadata if available
+        if isinstance(raw_message.get('source'), dict) and isinstance(final_data, dict):
+             final_data.setdefault('source_metadata', raw_message['source'])
+
+    # Unwrap string layers if necessary
+    max_depth = 4
+    for _ in range(max_depth):
+        if isinstance(final_data, str):
             try:
-                raw_value = msg.value().decode('utf-8')
-                # Try to parse the initial message
-                try:
-                    raw_message = json.loads(raw_value)
-                except json.JSONDecodeError:
-                    logger.error("Skipping non-JSON Kafka message", raw=raw_value[:100])
-                    consumer.commit(asynchronous=False) # Skip poison pill
-                    continue
-
-                # FIX: Recursive Unwrapping (The "Matryoshka" Unwrap)
-                # Sometimes data is double-encoded JSON strings inside JSON
-                final_data = raw_message
-                
-                # If wrapped in 'enriched_data' envelope from Refinery
-                if isinstance(final_data, dict) and 'enriched_data' in final_data:
-                    final_data = final_data['enriched_data']
-                    # Use source metadata if available
-                    if isinstance(raw_message.get('source'), dict) and isinstance(final_data, dict):
-                         final_data.setdefault('source_metadata', raw_message['source'])
-
-                # Unwrap string layers if necessary
-                max_depth = 4
-                for _ in range(max_depth):
-                    if isinstance(final_data, str):
-                        try:
-                            final_data = json.loads(final_data)
-                        except json.JSONDecodeError:
-                            break # It's just a string, stop unwrapping
-                    else:
-                        break
-                
-                # Normalization Layer: Heal Schema Mismatches
-                final_data = normalize_opportunity(final_data)
-
-                # CRITICAL: Validate that enriched_opportunity is actually a dictionary
-                if not isinstance(final_data, dict):
-                    logger.warning(
-                        "Skipping malformed opportunity",
-                        reason="Not a dictionary after normalization",
-                        type=type(final_data).__name__,
-                        preview=str(final_data)[:100]
-                    )
-                    consumer.commit(asynchronous=False) # Skip poison pill
-                    continue
-
-                logger.info(
-                    "Received enriched opportunity",
-                    opportunity_name=final_data.get('name', final_data.get('title', 'Unknown')),
-                    source=final_data.get('source', 'unknown')
-                )
-
-                # Process
-                await process_and_route_opportunity(final_data)
-
-                # Commit ONLY after successful processing (or explicit skip above)
-                consumer.commit(asynchronous=False)
-
-            except Exception as e:
-                # Catch-all for processing errors
-                logger.error("Error processing opportunity", error=str(e), traceback=True)
-                consumer.commit(asynchronous=False)
+                final_data = serialization.loads(final_data)
+            except serialization.DecodeError:
+                break # It's just a string, stop unwrapping
+        else:
+            break
+
+    # CRITICAL: Validate that enriched_opportunity is actually a dictionary
+    if not isinstance(final_data, dict):
+        logger.warning(
+            "Skipping malformed opportunity",
+            reason="Not a dictionary after unwrapping",
+            type=type(final_data).__name__,
+            preview=str(final_data)[:100]
+        )
+        return None
 
-    except KafkaException as e:
-        logger.error("Kafka consumer error", error=str(e))
-    finally:
-        consumer.close()
-        logger.info("Kafka consumer closed")
+    # Normalization Layer: Heal Schema Mismatches
+    return normalize_opportunity(final_data)
+
+
+async def handle_enriched_opportunity(opportunity: Dict):
+    logger.info(
+        "Received enriched opportunity",
+        opportunity_name=opportunity.get('name', opportunity.get('title', 'Unknown')),
+        source=opportunity.get('source', 'unknown')
+    )
+    await process_and_route_opportunity(opportunity)
 
 
 def normalize_opportunity(data: Any) -> Dict:
@@ -380,7 +478,7 @@ def convert_to_scholarship(enriched_data: Dict) -> Optional[Scholarship]:
 async def process_and_route_opportunity(enriched_opportunity: Dict):
     """
     1. Persist enriched opportunity to Firestore
-    2. Match against all connected users
+    2. Match against all connected users (every node's, in cluster mode)
     3. Send to users with match score > 60
     """
     # STEP 1: Persist to Firestore (critical for /api/scholarships/matched)
@@ -388,6 +486,8 @@ async def process_and_route_opportunity(enriched_opportunity: Dict):
         scholarship = convert_to_scholarship(enriched_opportunity)
         if scholarship:
             await firebase_db.save_scholarship(scholarship)
+            opportunity_catalog.upsert(scholarship)
+            matching_engine.index_opportunity(scholarship)
             logger.info(
                 "Opportunity persisted to Firestore",
                 scholarship_id=scholarship.id,
@@ -396,8 +496,39 @@ async def process_and_route_opportunity(enriched_opportunity: Dict):
     except Exception as e:
         logger.error("Failed to persist opportunity to Firestore", error=str(e))
         # Continue with routing even if persistence fails
-    
+
     # STEP 2: Route to connected users
+    if settings.ws_cluster_mode and await publish_for_delivery(enriched_opportunity):
+        return
+    await route_to_connected_users(enriched_opportunity)
+
+
+async def publish_for_delivery(enriched_opportunity: Dict) -> bool:
+    """
+    Hand the opportunity to every node's delivery consumer, which routes it
+    to that node's own connections. Returns False if it was not published.
+    """
+    try:
+        if (
+            manager.presence.shared
+            and not manager.active_connections
+            and await manager.presence.total_connections() == 0
+        ):
+            logger.debug("No connected users on any node - skipping delivery")
+            return True
+    except Exception as e:
+        logger.warning("Presence lookup failed, publishing anyway", error=str(e))
+
+    delivery = await kafka_producer_manager.publish(
+        KafkaConfig.TOPIC_WS_DELIVERY,
+        key=str(enriched_opportunity.get('id')),
+        value={'origin_node': manager.node_id, 'opportunity': enriched_opportunity}
+    )
+    return delivery is not None
+
+
+async def route_to_connected_users(enriched_opportunity: Dict):
+    """Score this node's connections against the opportunity and queue the matches"""
     connected_users = manager.get_all_user_ids()
 
     if not connected_users:
@@ -410,50 +541,55 @@ async def process_and_route_opportunity(enriched_opportunity: Dict):
         connected_users=len(connected_users)
     )
 
-    for user_id in connected_users:
-        user_profile = manager.user_profiles.get(user_id)
+    # Score only users sharing a feature with the opportunity, in one
+    # batched call (features built once)
+    try:
+        candidates = manager.profile_index.candidates(enriched_opportunity)
+        profiles = {
+            user_id: manager.user_profiles[user_id]
+            for user_id in candidates
+            if manager.user_profiles.get(user_id)
+        }
+        scores = personalization_engine.score_profiles(enriched_opportunity, profiles)
+    except Exception as e:
+        logger.error("Batch match scoring failed", error=str(e))
+        return
 
-        if not user_profile or not isinstance(user_profile, dict):
-            logger.warning("Invalid or missing user profile in cache", user_id=user_id)
+    # Enqueue only: each connection's own task does the sending, so neither
+    # a slow client nor the number of clients holds up the Kafka consumer
+    opportunity_key = ('new_opportunity', enriched_opportunity.get('id'))
+    timestamp = datetime.utcnow().isoformat()
+    pushed = 0
+    for user_id, match_score in scores.items():
+        if match_score < 60:
             continue
 
-        try:
-            match_score = calculate_match_score(enriched_opportunity, user_profile)
-
-            if match_score >= 60:
-                enriched_opportunity_with_score = enriched_opportunity.copy()
-                enriched_opportunity_with_score['match_score'] = match_score
-                enriched_opportunity_with_score['match_tier'] = get_match_tier(match_score)
-                enriched_opportunity_with_score['priority_level'] = get_priority_level(
-                    enriched_opportunity,
-                    match_score
-                )
-
-                await manager.send_personal_message(
-                    user_id=user_id,
-                    message={
-                        'type': 'new_opportunity',
-                        'opportunity': enriched_opportunity_with_score,
-                        'timestamp': datetime.utcnow().isoformat()
-                    }
-                )
-
-                logger.info(
-                    "Opportunity pushed to user",
-                    user_id=user_id,
-                    opportunity_name=enriched_opportunity.get('name'),
-                    match_score=match_score
-                )
-        except Exception as e:
-            logger.error(
-                "CRITICAL: Match calculation failed", 
-                user_id=user_id, 
-                profile_type=type(user_profile).__name__,
-                profile_preview=str(user_profile)[:100],
-                error=str(e),
-                traceback=True
-            )
-            continue
+        enriched_opportunity_with_score = enriched_opportunity.copy()
+        enriched_opportunity_with_score['match_score'] = match_score
+        enriched_opportunity_with_score['match_tier'] = get_match_tier(match_score)
+        enriched_opportunity_with_score['priority_level'] = get_priority_level(
+            enriched_opportunity,
+            match_score
+        )
+
+        if manager.enqueue(
+            user_id,
+            {
+                'type': 'new_opportunity',
+                'opportunity': enriched_opportunity_with_score,
+                'timestamp': timestamp
+            },
+            coalesce_key=opportunity_key
+        ):
+            pushed += 1
+
+    logger.info(
+        "Opportunity routed",
+        opportunity_name=enriched_opportunity.get('name'),
+        connected=len(connected_users),
+        scored=len(scores),
+        pushed=pushed
+    )
 
 
 def calculate_match_score(opportunity: Dict, user_profile: Dict) -> float:
@@ -519,8 +655,9 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
         return
 
     await manager.connect(user_id, websocket, user_profile)
+    index_user_in_background(user_id, user_profile)
 
-    await websocket.send_json({
+    manager.enqueue(user_id, {
         'type': 'connection_established',
         'message': 'Connected to real-time opportunity stream',
         'user_id': user_id,
@@ -536,35 +673,127 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
                 message_type = message.get('type')
 
                 if message_type == 'ping':
-                    await websocket.send_json({
+                    manager.enqueue(user_id, {
                         'type': 'pong',
                         'timestamp': datetime.utcnow().isoformat()
-                    })
+                    }, coalesce_key='pong')
 
                 elif message_type == 'update_profile':
                     updated_profile = message.get('profile', {})
                     if isinstance(updated_profile, dict):
-                        manager.user_profiles[user_id] = updated_profile
+                        manager.update_profile(user_id, updated_profile)
+                        index_user_in_background(user_id, updated_profile)
                         logger.info("User profile updated in WebSocket", user_id=user_id)
                     else:
                         logger.warning("Invalid profile update format", user_id=user_id, received_type=type(updated_profile).__name__)
 
             except asyncio.TimeoutError:
-                await websocket.send_json({
+                if not manager.enqueue(user_id, {
                     'type': 'heartbeat',
                     'timestamp': datetime.utcnow().isoformat()
-                })
+                }, coalesce_key='heartbeat'):
+                    # Send queue closed after a failed/timed-out send
+                    await websocket.close(code=1011, reason="Send queue closed")
+                    break
 
     except WebSocketDisconnect:
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
         logger.info("Client disconnected", user_id=user_id)
 
     except Exception as e:
         logger.error("WebSocket error", user_id=user_id, error=str(e))
-        manager.disconnect(user_id)
+        manager.disconnect(user_id, websocket)
+
+
+def index_user_in_background(user_id: str, user_profile: Dict):
+    """
+    Refresh the user's DNA vector in the ANN index without delaying the socket.
+    Skipped unless USER_ANN_INDEX_ENABLED; unchanged profiles are not re-vectorized.
+    """
+    if not settings.user_ann_index_enabled:
+        return
+
+    async def index():
+        try:
+            await matching_engine.index_user(user_id, user_profile)
+        except Exception as e:
+            logger.warning("User DNA indexing failed", user_id=user_id, error=str(e))
+
+    asyncio.create_task(index())
+
+
+async def consume_delivery_stream():
+    """
+    Multi-node mode: every node reads the delivery topic in its own consumer
+    group (so each sees every opportunity) and routes to its own connections.
+    Offsets are never committed - a node only cares about live traffic.
+    """
+    kafka_config = KafkaConfig()
+
+    if not kafka_config.enabled:
+        return
+
+    group_id = f'scholarstream-ws-node-{manager.node_id}'
+    consumer = Consumer(kafka_config.get_consumer_config(group_id=group_id, auto_offset_reset='latest'))
+    consumer.subscribe([KafkaConfig.TOPIC_WS_DELIVERY])
+
+    logger.info("WebSocket delivery consumer started", topic=KafkaConfig.TOPIC_WS_DELIVERY, node_id=manager.node_id)
+
+    batch_consumer = BatchConsumer(
+        consumer,
+        decode=decode_delivery_message,
+        handler=handle_delivery,
+        key=lambda envelope: envelope['opportunity'].get('id'),
+        batch_size=settings.kafka_consume_batch_size,
+        concurrency=settings.kafka_consume_concurrency,
+        commit=False,
+        name='ws-delivery'
+    )
+
+    try:
+        await batch_consumer.run()
+    except KafkaException as e:
+        logger.error("Kafka delivery consumer error", error=str(e))
+    finally:
+        consumer.close()
+        logger.info("Kafka delivery consumer closed", **batch_consumer.stats())
+
+
+def decode_delivery_message(raw: bytes, headers: Any = None) -> Optional[Dict]:
+    envelope = serialization.decode_message(raw, headers)
+    if not isinstance(envelope, dict) or not isinstance(envelope.get('opportunity'), dict):
+        return None
+    return envelope
+
+
+async def handle_delivery(envelope: Dict):
+    opportunity = envelope['opportunity']
+
+    # The origin node already has it; everyone else refreshes
+    # their catalog so /matched is current on every node
+    if envelope.get('origin_node') != manager.node_id:
+        scholarship = convert_to_scholarship(opportunity)
+        if scholarship:
+            opportunity_catalog.upsert(scholarship)
+            matching_engine.index_opportunity(scholarship)
+
+    await route_to_connected_users(opportunity)
+
+
+async def run_presence_heartbeat():
+    """Refresh this node's presence well inside the registry TTL"""
+    interval = max(1, manager.presence.ttl_seconds // 3)
+    while True:
+        try:
+            await manager.heartbeat_presence()
+        except Exception as e:
+            logger.warning("Presence heartbeat failed", node_id=manager.node_id, error=str(e))
+        await asyncio.sleep(interval)
 
 
 async def start_kafka_consumer_task():
-    """Start background Kafka consumer task"""
+    """Start background Kafka consumer task (plus the delivery consumer in cluster mode)"""
     asyncio.create_task(consume_kafka_stream())
-    logger.info("Kafka consumer background task started")
+    if settings.ws_cluster_mode:
+        asyncio.create_task(consume_delivery_stream())
+    logger.info("Kafka consumer background task started", cluster_mode=settings.ws_cluster_mode, node_id=manager.node_id)
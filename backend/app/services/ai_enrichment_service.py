@@ -3,19 +3,24 @@ AI Enrichment Service
 Batch enrichment of opportunities using Gemini
 """
 import google.generativeai as genai
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import json
 import asyncio
 import structlog
 from datetime import datetime
 
 from app.config import settings
+from app.services.gemini_scheduler import estimate_tokens, gemini_scheduler
+from app.services.listing_splitter import Card, known_listing_urls, split_listing
 
 logger = structlog.get_logger()
 
 
 from bs4 import BeautifulSoup
 
+# One page (or listing card) in a prompt: ~12k tokens
+UNIT_CHARS = 50000
+
 # Global instance
 ai_enrichment_service = None
 
@@ -30,10 +35,11 @@ class AIEnrichmentService:
         self.model = genai.GenerativeModel(settings.gemini_model)
         self.batch_size = 10  # Process 10 opportunities at once
     
-    def clean_html(self, html_content: str) -> str:
+    def clean_html(self, html_content: str, max_chars: Optional[int] = UNIT_CHARS) -> str:
         """
         Aggressively clean HTML to reduce token usage by 60-80%
         Removes scripts, styles, svgs, comments, and non-content tags.
+        max_chars=None keeps the whole body (for splitting into cards first).
         """
         if not html_content:
             return ""
@@ -57,36 +63,84 @@ class AIEnrichmentService:
             
             body = soup.body
             if body:
-                return str(body)[:50000] # Hard cap at ~12k tokens per page
+                return str(body)[:max_chars] # Hard cap at ~12k tokens per page
             else:
-                 return str(soup)[:50000]
+                 return str(soup)[:max_chars]
                  
         except Exception as e:
             logger.warning("HTML Clean failed, returning raw truncated", error=str(e))
-            return html_content[:50000]
+            return html_content[:max_chars]
 
-    async def extract_opportunities_from_html_batch(self, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    async def extract_opportunities_from_html_batch(
+        self,
+        items: List[Dict[str, str]],
+        sent_cards: Optional[List[Card]] = None
+    ) -> List[Dict[str, Any]]:
         """
         Batch process multiple HTML pages in ONE prompt to save Quota (RPM)
         items: List of dicts with {'url': str, 'html': str}
+        Listing pages are split into their cards and only new or changed cards
+        are sent, so no item is lost to truncation. Cards from successful calls
+        are appended to sent_cards; once the results are delivered the caller
+        passes them to known_listing_urls.record().
         """
         if not items:
             return []
             
-        # 1. Clean all HTMLs
-        cleaned_items = []
+        # 1. Clean all HTMLs (uncapped: listing pages are split, not truncated)
+        units = []
         for item in items:
-            clean = self.clean_html(item.get('html', ''))
-            if len(clean) > 500: # Skip empty/junk pages
-                cleaned_items.append({
-                    'url': item.get('url'),
-                    'content': clean
-                })
+            # Crawler payloads arrive already stripped (html_preprocessor)
+            clean = item.get('html', '') if item.get('preprocessed') else self.clean_html(item.get('html', ''), max_chars=None)
+            # Skip empty/junk pages; a change delta is small by design
+            if len(clean) > 500 or (item.get('change') and clean):
+                units.extend(await self._extraction_units(item.get('url'), clean))
         
-        if not cleaned_items:
+        if not units:
             return []
 
-        # 2. Construct HUGE Prompt (Gemini 1.5 Flash supports 1M+ tokens)
+        # 2. Pack units into prompts of ~gemini_batch_tokens, run concurrently under the quota
+        groups = self._prompt_groups(units, settings.gemini_batch_tokens)
+        results = await asyncio.gather(*(self._extract_units(group) for group in groups))
+
+        opportunities = []
+        for group, extracted in zip(groups, results):
+            if extracted is None:
+                continue
+            if sent_cards is not None:
+                sent_cards.extend(card for unit in group for card in unit['cards'])
+            opportunities.extend(extracted)
+        return opportunities
+
+    async def _extraction_units(self, url: str, clean: str) -> List[Dict[str, Any]]:
+        """A listing page's new cards, one unit each; any other page as one capped unit"""
+        cards = await asyncio.to_thread(split_listing, clean, url)
+        if not cards:
+            return [{'url': url, 'content': clean[:UNIT_CHARS], 'cards': []}]
+
+        fresh = await known_listing_urls.filter_new(cards)
+        logger.info("Listing page split", url=url, cards=len(cards), new=len(fresh))
+        return [
+            {'url': url, 'content': card.html[:UNIT_CHARS], 'cards': [card]}
+            for card in fresh
+        ]
+
+    @staticmethod
+    def _prompt_groups(units: List[Dict[str, Any]], max_tokens: int) -> List[List[Dict[str, Any]]]:
+        groups, size = [], 0
+        for unit in units:
+            tokens = estimate_tokens(unit['content'])
+            if groups and size + tokens <= max_tokens:
+                groups[-1].append(unit)
+                size += tokens
+            else:
+                groups.append([unit])
+                size = tokens
+        return groups
+
+    async def _extract_units(self, cleaned_items: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """One Gemini call over cleaned_items; None if it failed"""
+        # Construct HUGE Prompt (Gemini 1.5 Flash supports 1M+ tokens)
         # We separate pages clearly
         
         context_str = ""
@@ -97,7 +151,7 @@ class AIEnrichmentService:
 
         prompt = f"""
 You are an expert financial opportunity extractor.
-I have concatenated {len(cleaned_items)} different webpages below.
+I have concatenated {len(cleaned_items)} different webpages (or single listing cards cut from one) below.
 Extract ALL financial opportunities (Scholarships, Grants, Hackathons, Bounties) from ALL pages.
 
 INSTRUCTIONS:
@@ -111,84 +165,67 @@ DATA:
 
 RETURN JSON ARRAY ONLY.
 """
-        max_retries = 3
-        base_delay = 10 # Higher delay for batch
+        # The scheduler holds the call until the RPM/TPM budget allows it
+        # and reschedules it on 429s without stalling other batches
+        try:
+            response = await gemini_scheduler.run(
+                lambda: self.model.generate_content_async(prompt),
+                tokens=estimate_tokens(prompt)
+            )
+            text = response.text.strip()
+            
+            if text.startswith("```json"):
+                text = text.split("```json")[1].split("```")[0].strip()
+            elif text.startswith("```"):
+                text = text.split("```")[1].split("```")[0].strip()
+                
+            extracted = json.loads(text)
+        except Exception as e:
+            # Log the actual error for debugging
+            logger.error(
+                "Batch Extraction failed", 
+                items=len(cleaned_items),
+                error_type=type(e).__name__,
+                error=str(e)[:500]  # Truncate long errors
+            )
+            return None
+
+        if not isinstance(extracted, list):
+            if isinstance(extracted, dict):
+                extracted = [extracted]
+            else:
+                return None
         
-        for attempt in range(max_retries):
+        # VALIDATION: Principal Engineer Level Quality Gate
+        valid_opportunities = []
+        for item in extracted:
             try:
-                response = await self.model.generate_content_async(prompt)
-                text = response.text.strip()
+                # 1. Critical Field Check
+                if not item.get('title') or not item.get('url'):
+                    continue # Skip items without title or URL
                 
-                if text.startswith("```json"):
-                    text = text.split("```json")[1].split("```")[0].strip()
-                elif text.startswith("```"):
-                    text = text.split("```")[1].split("```")[0].strip()
-                    
-                extracted = json.loads(text)
-                if not isinstance(extracted, list):
-                    if isinstance(extracted, dict):
-                        extracted = [extracted]
-                    else:
-                        return []
+                # 2. Data Cleaning
+                if item.get('amount_value') is None:
+                    item['amount_value'] = 0
                 
-                # VALIDATION: Principal Engineer Level Quality Gate
-                valid_opportunities = []
-                for item in extracted:
-                    try:
-                        # 1. Critical Field Check
-                        if not item.get('title') or not item.get('url'):
-                            continue # Skip items without title or URL
-                        
-                        # 2. Data Cleaning
-                        if item.get('amount_value') is None:
-                            item['amount_value'] = 0
-                        
-                        # 3. NoneType Safety (The "Crash Fix")
-                        if item.get('eligibility') is None:
-                            item['eligibility'] = "Open to all users."
-                        
-                        if item.get('deadline') == "Unknown" or not item.get('deadline'):
-                             item['deadline'] = None # Better than "Unknown" string
-
-                        # 4. Standardize
-                        # Ensure we don't have "Lorem Ipsum" or "Test"
-                        if "lorem" in (item.get('description') or '').lower():
-                            continue
+                # 3. NoneType Safety (The "Crash Fix")
+                if item.get('eligibility') is None:
+                    item['eligibility'] = "Open to all users."
+                
+                if item.get('deadline') == "Unknown" or not item.get('deadline'):
+                     item['deadline'] = None # Better than "Unknown" string
 
-                        valid_opportunities.append(item)
-                    except Exception as val_err:
-                        logger.warning("Dropping invalid opportunity data", error=str(val_err))
-                        continue
+                # 4. Standardize
+                # Ensure we don't have "Lorem Ipsum" or "Test"
+                if "lorem" in (item.get('description') or '').lower():
+                    continue
 
-                return valid_opportunities
+                valid_opportunities.append(item)
+            except Exception as val_err:
+                logger.warning("Dropping invalid opportunity data", error=str(val_err))
+                continue
 
-            except Exception as e:
-                error_str = str(e)
-                error_type = type(e).__name__
-                
-                # Check for actual rate limit errors
-                is_rate_limit = "429" in error_str or "Resource has been exhausted" in error_str or "RESOURCE_EXHAUSTED" in error_str
-                
-                if is_rate_limit:
-                    wait_time = base_delay * (2 ** attempt) + 30
-                    logger.warning(
-                        "Gemini Rate Limit Hit (Batch)", 
-                        items=len(cleaned_items),
-                        retry_in=f"{wait_time}s", 
-                        attempt=f"{attempt+1}/{max_retries}"
-                    )
-                    await asyncio.sleep(wait_time)
-                    continue
-                else:
-                    # Log the actual error for debugging
-                    logger.error(
-                        "Batch Extraction failed", 
-                        error_type=error_type,
-                        error=error_str[:500]  # Truncate long errors
-                    )
-                    return []
-        
-        return []
+        return valid_opportunities
 
     async def enrich_opportunities_batch(
         self,
@@ -297,13 +334,13 @@ Today's date: {datetime.now().strftime('%Y-%m-%d')}
         logger.error("Max retries exceeded for AI extraction", url="BATCH_OPP")
         return []
 
-    async def extract_opportunities_from_html(self, html_content: str, url: str) -> List[Dict[str, Any]]:
+    async def extract_opportunities_from_html(self, html_content: str, url: str, preprocessed: bool = False) -> List[Dict[str, Any]]:
         """
         Extract structured opportunities from raw HTML using Gemini
         Works for lists, tables, and detail pages.
         """
-        # CLEAN FIRST to save tokens
-        clean_html_content = self.clean_html(html_content)
+        # CLEAN FIRST to save tokens (crawler payloads are already clean)
+        clean_html_content = html_content[:50000] if preprocessed else self.clean_html(html_content)
 
         prompt = f"""
 You are an expert web scraper and data extractor. 
@@ -10,6 +10,7 @@ from app.services.scraper_service import scraper_service
 from app.services.ai_service import ai_service
 from app.services.opportunity_converter import convert_to_scholarship
 from app.database import db
+from app.services.opportunity_catalog import opportunity_catalog
 from app.models import UserProfile
 
 logger = structlog.get_logger()
@@ -61,6 +62,7 @@ async def refresh_opportunities_job():
         for opp in converted_opportunities:
             try:
                 await db.save_scholarship(opp)
+                opportunity_catalog.upsert(opp)
             except Exception as e:
                 logger.error("Failed to cache opportunity", scholarship_id=opp.id, error=str(e))
         
@@ -0,0 +1,284 @@
+"""
+Browser Pool
+Long-lived Chromium processes for the Hunter Drones, each with a few warm
+stealth contexts that are reused across crawls instead of being rebuilt
+(and re-scripted) on every crawl_and_stream call.
+
+A browser is recycled - drained, closed and relaunched - after it has served
+max_pages pages or once its process tree's RSS passes max_rss_mb, so slow
+Chromium leaks cannot grow unnoticed. A browser that disconnects (crash, OOM
+kill) is detected through Playwright's "disconnected" event and relaunched on
+the next lease. RSS is read from /proc; elsewhere memory recycling is off.
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+import structlog
+
+logger = structlog.get_logger()
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _process_table() -> Dict[int, tuple]:
+    """pid -> (ppid, name) for every process visible in /proc"""
+    table = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return table
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # comm may contain spaces; it sits between the first '(' and last ')'
+        name = stat[stat.find("(") + 1:stat.rfind(")")]
+        fields = stat[stat.rfind(")") + 2:].split()
+        table[int(entry)] = (int(fields[1]), name)
+    return table
+
+
+def _descendants(pid: int, table: Dict[int, tuple]) -> Set[int]:
+    found = {pid}
+    frontier = [pid]
+    while frontier:
+        parent = frontier.pop()
+        for child, (ppid, _) in table.items():
+            if ppid == parent and child not in found:
+                found.add(child)
+                frontier.append(child)
+    return found
+
+
+def process_tree_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Resident memory of pid and all its descendants, or None if unknown"""
+    if pid is None:
+        return None
+    table = _process_table()
+    if pid not in table:
+        return None
+    total = 0
+    for member in _descendants(pid, table):
+        try:
+            with open(f"/proc/{member}/statm") as f:
+                total += int(f.read().split()[1]) * _PAGE_SIZE
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / (1024 * 1024)
+
+
+def _browser_processes() -> Set[int]:
+    return {
+        pid for pid, (_, name) in _process_table().items()
+        if "chrom" in name.lower() or "headless_shell" in name.lower()
+    }
+
+
+class BrowserSlot:
+    """One Chromium process, its warm contexts and its counters"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser: Any = None
+        self.contexts: List[Any] = []
+        self.pid: Optional[int] = None
+        self.launched_at = 0.0
+        self.pages = 0
+        self.in_use = 0
+        self.next_context = 0
+        self.crashed = False
+        self.draining = False
+        self.rss_mb: Optional[float] = None
+        self.rss_checked_at = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return self.browser is not None and not self.crashed and self.browser.is_connected()
+
+
+class BrowserPool:
+    """
+    Leases warm browser contexts; recycles browsers by page count or RSS and
+    relaunches crashed ones.
+
+    launch() returns a new Playwright Browser; prepare_context(browser)
+    returns a new context with its init scripts installed.
+    """
+
+    def __init__(
+        self,
+        launch: Callable[[], Awaitable[Any]],
+        prepare_context: Callable[[Any], Awaitable[Any]],
+        browsers: int = 1,
+        contexts_per_browser: int = 2,
+        max_pages: int = 500,
+        max_rss_mb: float = 1500.0,
+        rss_check_interval: float = 10.0
+    ):
+        self._launch = launch
+        self._prepare_context = prepare_context
+        self.contexts_per_browser = max(1, contexts_per_browser)
+        self.max_pages = max_pages
+        self.max_rss_mb = max_rss_mb
+        self.rss_check_interval = rss_check_interval
+        self.slots = [BrowserSlot(i) for i in range(max(1, browsers))]
+        self._condition = asyncio.Condition()
+        self._next_slot = 0
+
+        self.launches = 0
+        self.recycles = 0
+        self.crashes = 0
+        self.pages_total = 0
+
+    @asynccontextmanager
+    async def lease(self):
+        """A warm context to open one page in; counts the page on release"""
+        slot, context = await self._checkout()
+        try:
+            yield context
+        finally:
+            await self._checkin(slot)
+
+    async def _checkout(self):
+        async with self._condition:
+            while True:
+                for _ in range(len(self.slots)):
+                    slot = self.slots[self._next_slot]
+                    self._next_slot = (self._next_slot + 1) % len(self.slots)
+                    if slot.draining:
+                        continue
+                    if not slot.healthy:
+                        if slot.in_use:
+                            # Crashed under open pages; relaunch once they fail out
+                            slot.draining = True
+                            continue
+                        await self._relaunch(slot)
+                    context = slot.contexts[slot.next_context % len(slot.contexts)]
+                    slot.next_context += 1
+                    slot.in_use += 1
+                    return slot, context
+                # Every browser is draining toward a recycle
+                await self._condition.wait()
+
+    async def _checkin(self, slot: BrowserSlot):
+        async with self._condition:
+            slot.in_use -= 1
+            slot.pages += 1
+            self.pages_total += 1
+            if not slot.draining and self._needs_recycle(slot):
+                slot.draining = True
+            if slot.draining and slot.in_use == 0:
+                await self._relaunch(slot)
+                self._condition.notify_all()
+
+    def _needs_recycle(self, slot: BrowserSlot, force_rss: bool = False) -> bool:
+        if not slot.healthy:
+            return True
+        if self.max_pages and slot.pages >= self.max_pages:
+            logger.info("Recycling browser after page budget", browser=slot.index, pages=slot.pages)
+            return True
+        now = time.monotonic()
+        if force_rss or now - slot.rss_checked_at >= self.rss_check_interval:
+            # Walking /proc costs a few ms; not worth doing on every page
+            slot.rss_mb = process_tree_rss_mb(slot.pid)
+            slot.rss_checked_at = now
+        if self.max_rss_mb and slot.rss_mb is not None and slot.rss_mb > self.max_rss_mb:
+            logger.warning("Recycling browser over memory limit", browser=slot.index, rss_mb=round(slot.rss_mb))
+            return True
+        return False
+
+    async def _relaunch(self, slot: BrowserSlot):
+        """Close slot's browser (if any) and start a fresh one with warm contexts"""
+        if slot.browser is not None:
+            if slot.crashed or not slot.browser.is_connected():
+                self.crashes += 1
+                logger.warning("Browser crashed, relaunching", browser=slot.index, pages=slot.pages)
+            else:
+                self.recycles += 1
+            await self._close_slot(slot)
+
+        before = _browser_processes()
+        browser = await self._launch()
+        new_pids = _browser_processes() - before
+        table = _process_table()
+        # The browser process is the new chromium whose parent is not itself chromium
+        roots = [pid for pid in new_pids if table.get(pid, (None,))[0] not in new_pids]
+
+        slot.browser = browser
+        slot.pid = roots[0] if len(roots) == 1 else None
+        slot.crashed = False
+        slot.draining = False
+        slot.pages = 0
+        slot.next_context = 0
+        slot.launched_at = time.monotonic()
+        browser.on("disconnected", lambda _: self._mark_crashed(slot, browser))
+        slot.contexts = [await self._prepare_context(browser) for _ in range(self.contexts_per_browser)]
+        slot.rss_mb = process_tree_rss_mb(slot.pid)
+        slot.rss_checked_at = slot.launched_at
+        self.launches += 1
+        logger.info("Browser launched", browser=slot.index, pid=slot.pid, contexts=len(slot.contexts))
+
+    def _mark_crashed(self, slot: BrowserSlot, browser: Any):
+        # _close_slot detaches a browser before closing it, so planned closes are ignored
+        if slot.browser is browser:
+            slot.crashed = True
+
+    async def _close_slot(self, slot: BrowserSlot):
+        browser, slot.browser = slot.browser, None
+        contexts, slot.contexts = slot.contexts, []
+        for context in contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug("Browser close failed", browser=slot.index, error=str(e))
+
+    async def health_check(self):
+        """Refresh memory readings; recycle idle browsers that crashed or grew too large"""
+        async with self._condition:
+            for slot in self.slots:
+                if slot.browser is None:
+                    continue
+                if not slot.draining and self._needs_recycle(slot, force_rss=True):
+                    slot.draining = True
+                if slot.draining and slot.in_use == 0:
+                    await self._relaunch(slot)
+            self._condition.notify_all()
+
+    async def close(self):
+        async with self._condition:
+            for slot in self.slots:
+                if slot.browser is not None:
+                    await self._close_slot(slot)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        browsers = []
+        for slot in self.slots:
+            uptime = now - slot.launched_at if slot.browser is not None else 0.0
+            browsers.append({
+                "index": slot.index,
+                "running": slot.healthy,
+                "pid": slot.pid,
+                "pages": slot.pages,
+                "open_pages": slot.in_use,
+                "pages_per_sec": round(slot.pages / uptime, 3) if uptime > 0 else 0.0,
+                "rss_mb": round(slot.rss_mb, 1) if slot.rss_mb is not None else None,
+                "uptime_seconds": round(uptime),
+            })
+        return {
+            "browsers": browsers,
+            "launches": self.launches,
+            "recycles": self.recycles,
+            "crashes": self.crashes,
+            "pages_total": self.pages_total,
+        }
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 
 from app.models import UserProfile
 from app.database import db
+from app.services.opportunity_catalog import opportunity_catalog
 from app.config import settings
 
 logger = structlog.get_logger()
@@ -18,6 +19,9 @@ logger = structlog.get_logger()
 class ChatService:
     """AI Chat Assistant powered by Gemini"""
     
+    # Urgency -> max whole days until the deadline
+    URGENCY_WINDOW_DAYS = {'immediate': 2, 'this_week': 7, 'this_month': 30}
+    
     def __init__(self):
         """Initialize Gemini using settings"""
         if not settings.gemini_api_key:
@@ -252,29 +256,30 @@ If NO SEARCH RESULTS are found:
         }
         
         try:
-            # Get all opportunities from database
-            all_opps = await db.get_all_scholarships()
+            # 1. EXPIRY + URGENCY: answered by the catalog's deadline index, so
+            # expired opportunities (and ones outside the urgency window) are
+            # never loaded here
+            urgency = criteria.get('urgency', 'any')
+            window_days = self.URGENCY_WINDOW_DAYS.get(urgency)
+            if window_days is not None:
+                now_ts = int(datetime.now().timestamp())
+                # "N whole days left" means the deadline is under N+1 days away;
+                # opportunities with no deadline stay in, as they always have
+                all_opps = await opportunity_catalog.get_due_by(
+                    now_ts + (window_days + 1) * 86400 - 1, include_undated=True
+                )
+                stats['urgency_filtered'] = opportunity_catalog.active_count() - len(all_opps)
+            else:
+                all_opps = await opportunity_catalog.get_all()
+            stats['expired'] = opportunity_catalog.expired_count()
             stats['total_scanned'] = len(all_opps)
             
             filtered_opps = []
-            now = datetime.now()
             
             user_country = (profile.get('country') or 'United States').lower()
             user_state = (profile.get('state') or '').lower()
             
             for opp in all_opps:
-                # 1. STRICT EXPIRATION CHECK (with grace period for today)
-                if opp.deadline:
-                    try:
-                        deadline_date = datetime.fromisoformat(opp.deadline.replace('Z', '+00:00'))
-                        # Filter if deadline was yesterday or earlier
-                        if deadline_date.date() < now.date():
-                            stats['expired'] += 1
-                            continue
-                    except ValueError:
-                        stats['expired'] += 1
-                        continue
-                
                 # 2. TYPE FILTER
                 opp_type = self._infer_type(opp)
                 if criteria.get('types') and opp_type not in criteria['types']:
@@ -301,25 +306,6 @@ If NO SEARCH RESULTS are found:
                         stats['location_filtered'] += 1
                         continue
                 
-                # 4. URGENCY FILTER
-                urgency = criteria.get('urgency', 'any')
-                if urgency != 'any' and opp.deadline:
-                    try:
-                        deadline_date = datetime.fromisoformat(opp.deadline.replace('Z', '+00:00'))
-                        days_until = (deadline_date - now).days
-                        
-                        if urgency == 'immediate' and days_until > 2:
-                            stats['urgency_filtered'] += 1
-                            continue
-                        if urgency == 'this_week' and days_until > 7:
-                            stats['urgency_filtered'] += 1
-                            continue
-                        if urgency == 'this_month' and days_until > 30:
-                            stats['urgency_filtered'] += 1
-                            continue
-                    except:
-                        continue
-                
                 filtered_opps.append(opp)
             
             # Convert to dict format
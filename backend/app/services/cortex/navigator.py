@@ -54,6 +54,8 @@ class Sentinel:
         try:
             # Delegate to the robust Universal Crawler (Playwright)
             await crawler_service.crawl_and_stream(self.TARGETS, intent="patrol")
+            # Browsers idle until the next patrol; recycle any that crashed or bloated
+            await crawler_service.pool.health_check()
         except Exception as e:
             logger.error("Sentinel patrol mission failed", error=str(e))
 
@@ -1,9 +1,10 @@
 
+import asyncio
 import structlog
-import json
 from datetime import datetime
 from typing import Optional, List
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services import serialization, site_extractors
 from app.services.cortex.reader_llm import reader_llm
 from app.models import OpportunitySchema
 from app.config import settings
@@ -30,17 +31,35 @@ class RefineryService:
         # 1. Deduplication (Check Firestore Cache - Mocked for speed here, actual impl should query DB)
         # if await self.is_duplicate(url): return
 
-        # 2. Extract Data (Use Reader LLM)
+        # 2. Extract Data (site extractor for known sites, else Reader LLM)
         if not raw_html:
             logger.warning("Empty HTML in raw event", url=url)
             return
 
+        extracted = await self._site_extracted(value)
+        if extracted is not None:
+            for opportunity in extracted:
+                await self._refine(opportunity)
+            return
+
         opportunity: Optional[OpportunitySchema] = await reader_llm.parse_opportunity(raw_html, url)
         
         if not opportunity:
             logger.warning("Failed to parse opportunity", url=url)
             return
 
+        await self._refine(opportunity)
+
+    async def _site_extracted(self, value: dict) -> Optional[List[OpportunitySchema]]:
+        """Opportunities a site extractor took from the page (crawler-side or here), else None"""
+        if value.get("extracted") is not None:
+            return [OpportunitySchema(**opp) for opp in value["extracted"]]
+        if value.get("preprocessed") or not value.get("url"):
+            return None
+        extraction = await asyncio.to_thread(site_extractors.extract, value["html"], value["url"])
+        return extraction.opportunities if extraction else None
+
+    async def _refine(self, opportunity: OpportunitySchema):
         # 3. Intelligence Refining
         
         # 3.1 Strict Expiration Gate
@@ -59,7 +78,7 @@ class RefineryService:
         opportunity.embedding = await vectorization_service.vectorize_opportunity(opportunity)
 
         # 4. publish to Verified Stream
-        self._publish_verified(opportunity)
+        await self._publish_verified(opportunity)
 
     def _is_expired(self, deadline_ts: int) -> bool:
         """Strict Expiration Logic"""
@@ -97,11 +116,11 @@ class RefineryService:
         
         return list(tags)
 
-    def _publish_verified(self, opp: OpportunitySchema):
-        kafka_producer_manager.publish_to_stream(
+    async def _publish_verified(self, opp: OpportunitySchema):
+        await kafka_producer_manager.publish(
             topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
             key=opp.id, # Hash ID
-            value=opp.dict()
+            value=serialization.build_envelope(opp.dict(), source="cortex-refinery")
         )
         logger.info("✅ Verified Opportunity Published", title=opp.title, tags=opp.geo_tags)
 
@@ -0,0 +1,53 @@
+"""
+Crawl Politeness
+Per-domain limits for the Hunter Drones: how many pages of one domain may be
+open at once, and the minimum spacing between request starts on a domain.
+Replaces global sleeps, so pages on different domains never wait for each
+other while any single site still sees a slow, jittered crawl.
+"""
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Dict
+from urllib.parse import urlparse
+
+
+def domain_of(url: str) -> str:
+    """Politeness key for a URL: its host, without port or leading www."""
+    host = (urlparse(url).hostname or url).lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+class DomainLimiter:
+    """Per-domain concurrency cap plus minimum interval (with jitter) between starts"""
+
+    def __init__(self, concurrency: int = 1, min_interval: float = 2.0, jitter: float = 1.0):
+        self.concurrency = max(1, concurrency)
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._next_start: Dict[str, float] = {}
+        self.waited_seconds = 0.0
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        """Hold one of the domain's slots, starting no earlier than its spacing allows"""
+        domain = domain_of(url)
+        semaphore = self._semaphores.setdefault(domain, asyncio.Semaphore(self.concurrency))
+        async with semaphore:
+            # Reserve the start time before sleeping: no await between read and write
+            now = asyncio.get_running_loop().time()
+            start = max(now, self._next_start.get(domain, now))
+            self._next_start[domain] = start + self.min_interval + random.uniform(0, self.jitter)
+            if start > now:
+                self.waited_seconds += start - now
+                await asyncio.sleep(start - now)
+            yield domain
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "domains": len(self._semaphores),
+            "domain_concurrency": self.concurrency,
+            "min_interval_seconds": self.min_interval,
+            "waited_seconds": round(self.waited_seconds, 1),
+        }
@@ -0,0 +1,251 @@
+"""
+Crawl Store
+What each patrolled URL looked like last time, so unchanged pages are not
+republished to cortex.raw.html.v1 (and re-extracted by Gemini) every patrol.
+
+Per URL it keeps the HTTP validators (ETag / Last-Modified) for a cheap
+conditional request before the browser is launched, a hash of the page's
+normalized content (visible text and links; scripts, styles, comments and
+attributes ignored), and a hash per listing item. A changed page publishes
+only its new listing items. Items are the elements matching the domain's
+learned readiness selector or, failing that, the page's most repeated
+article / li / tr. Pages without recognisable items are republished whole.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Mapping, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+_INVISIBLE = re.compile(r"<(script|style|noscript|template|svg)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+_HREF = re.compile(r"""\bhref\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>")
+_SPACE = re.compile(r"\s+")
+
+_VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+_ITEM_TAGS = ("article", "li", "tr")
+MIN_ITEMS = 3
+
+
+def normalize_html(html: str) -> str:
+    """Visible text plus link targets, whitespace collapsed: what extraction actually sees"""
+    html = _COMMENT.sub(" ", _INVISIBLE.sub(" ", html))
+    links = " ".join(_HREF.findall(html))
+    text = _TAG.sub(" ", html)
+    return _SPACE.sub(" ", f"{text} {links}").strip()
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(normalize_html(html).encode("utf-8")).hexdigest()
+
+
+class _ElementCollector(HTMLParser):
+    """Outer-HTML spans of every outermost element matching tag (and class)"""
+
+    def __init__(self, html: str, tag: Optional[str], css_class: Optional[str]):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.tag = tag
+        self.css_class = css_class
+        self.line_offsets = [0]
+        for line in html.splitlines(keepends=True):
+            self.line_offsets.append(self.line_offsets[-1] + len(line))
+        self.spans: List[tuple] = []
+        self.tag_counts: Counter = Counter()
+        self._start: Optional[int] = None
+        self._depth = 0
+
+    def _offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_offsets[line - 1] + column
+
+    def _matches(self, tag: str, attrs) -> bool:
+        if tag != self.tag:
+            return False
+        if not self.css_class:
+            return True
+        classes = (dict(attrs).get("class") or "").split()
+        return self.css_class in classes
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _ITEM_TAGS:
+            self.tag_counts[tag] += 1
+        if tag in _VOID_TAGS:
+            return
+        if self._start is not None:
+            if tag == self.tag:
+                self._depth += 1
+        elif self._matches(tag, attrs):
+            self._start = self._offset()
+            self._depth = 1
+
+    def handle_endtag(self, tag):
+        if self._start is None or tag != self.tag:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            end = self.html.find(">", self._offset()) + 1
+            self.spans.append((self._start, end))
+            self._start = None
+
+
+def _collect(html: str, tag: Optional[str], css_class: Optional[str] = None) -> _ElementCollector:
+    collector = _ElementCollector(html, tag, css_class)
+    try:
+        collector.feed(html)
+        collector.close()
+    except Exception as e:
+        logger.debug("Listing item parse failed", error=str(e))
+    return collector
+
+
+def split_items(html: str, selector: Optional[str] = None) -> Optional[List[str]]:
+    """Outer HTML of the page's listing items, or None if it has no recognisable items"""
+    html = _COMMENT.sub(" ", _INVISIBLE.sub(" ", html))
+    if selector and re.fullmatch(r"[a-z][a-z0-9-]*\.[\w-]+", selector):
+        tag, css_class = selector.split(".", 1)
+        collector = _collect(html, tag, css_class)
+        if len(collector.spans) >= MIN_ITEMS:
+            return [html[start:end] for start, end in collector.spans]
+
+    # No usable selector: fall back to the most repeated list-like element
+    counts = _collect(html, None).tag_counts
+    for tag, count in counts.most_common():
+        if count < MIN_ITEMS:
+            break
+        spans = _collect(html, tag).spans
+        if len(spans) >= MIN_ITEMS:
+            return [html[start:end] for start, end in spans]
+    return None
+
+
+def _item_hash(item_html: str) -> str:
+    return hashlib.sha256(normalize_html(item_html).encode("utf-8")).hexdigest()[:16]
+
+
+@dataclass
+class CrawlRecord:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+    item_hashes: List[str] = field(default_factory=list)
+    checked_at: float = 0.0
+    changed_at: float = 0.0
+    unchanged_checks: int = 0
+
+
+@dataclass
+class CrawlDelta:
+    """How a freshly crawled page differs from its stored record"""
+    kind: str                 # new | changed | items | unchanged | no_new_items
+    html: Optional[str]
+    record: CrawlRecord
+    new_items: int = 0
+    removed_items: int = 0
+    total_items: int = 0
+
+    @property
+    def publish(self) -> bool:
+        return self.html is not None
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "kind": self.kind,
+            "new_items": self.new_items,
+            "removed_items": self.removed_items,
+            "total_items": self.total_items,
+        }
+
+
+class CrawlStore:
+    """Per-URL validators, content hash and item hashes, persisted as JSON"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.records: Dict[str, CrawlRecord] = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    raw = json.load(f)
+                self.records = {url: CrawlRecord(**entry) for url, entry in raw.items()}
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning("Crawl store unreadable, starting fresh", path=path, error=str(e))
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for url, empty if nothing is stored"""
+        record = self.records.get(url)
+        headers = {}
+        if record and record.etag:
+            headers["If-None-Match"] = record.etag
+        if record and record.last_modified:
+            headers["If-Modified-Since"] = record.last_modified
+        return headers
+
+    def mark_not_modified(self, url: str):
+        record = self.records[url]
+        record.checked_at = time.time()
+        record.unchanged_checks += 1
+        self._dirty = True
+
+    def observe(self, url: str, html: str, headers: Optional[Mapping[str, str]] = None, selector: Optional[str] = None) -> CrawlDelta:
+        """
+        Compare a crawled page with its record. Nothing is stored until
+        commit(), so a page whose publish fails is diffed against the same
+        record again next time.
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        previous = self.records.get(url)
+        now = time.time()
+        record = CrawlRecord(
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            content_hash=content_hash(html),
+            checked_at=now,
+            changed_at=now,
+        )
+        items = split_items(html, selector)
+        hashed = {_item_hash(item): item for item in items} if items else {}
+        record.item_hashes = sorted(hashed)
+
+        if previous is None:
+            return CrawlDelta("new", html, record, new_items=len(hashed), total_items=len(hashed))
+
+        if previous.content_hash == record.content_hash:
+            record.changed_at = previous.changed_at
+            record.unchanged_checks = previous.unchanged_checks + 1
+            return CrawlDelta("unchanged", None, record, total_items=len(hashed))
+
+        if not hashed or not previous.item_hashes:
+            return CrawlDelta("changed", html, record, total_items=len(hashed))
+
+        known = set(previous.item_hashes)
+        fresh = [item for digest, item in hashed.items() if digest not in known]
+        removed = len(known - hashed.keys())
+        if not fresh:
+            return CrawlDelta("no_new_items", None, record, removed_items=removed, total_items=len(hashed))
+
+        fragment = '<div data-crawl-delta="items">\n' + "\n".join(fresh) + "\n</div>"
+        return CrawlDelta("items", fragment, record, new_items=len(fresh), removed_items=removed, total_items=len(hashed))
+
+    def commit(self, url: str, delta: CrawlDelta):
+        self.records[url] = delta.record
+        self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({url: asdict(r) for url, r in self.records.items()}, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
@@ -2,57 +2,90 @@
 import httpx
 import asyncio
 import structlog
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import time
 
+from app.config import settings
+from app.services.browser_pool import BrowserPool
+from app.services.crawl_politeness import DomainLimiter
+from app.services.crawl_store import CrawlDelta, CrawlStore
+from app.services.html_preprocessor import payload_fields, preprocess_html
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services.page_readiness import MUTATION_OBSERVER_SCRIPT, PageReadiness, ReadinessStore
+from app.services import site_extractors
 
 logger = structlog.get_logger()
 
 
-from playwright.async_api import async_playwright, BrowserContext, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 import random
 
 class UniversalCrawlerService:
     """
     Universal Crawler Service (Hunter Drones)
     Powered by Playwright for stealth, JS-execution, and dynamic interactions.
+
+    Pages are crawled concurrently: up to max_concurrency at once, in warm
+    stealth contexts leased from a recycling BrowserPool, with per-domain
+    politeness limits (DomainLimiter) instead of fixed sleeps between pages.
+    Each page is read as soon as PageReadiness judges it rendered.
+
+    Patrols are incremental: the CrawlStore skips pages that answer a
+    conditional request with 304 or whose content has not changed, and a
+    changed listing page transmits only its new items.
     """
+
+    # Intents whose pages are diffed against the crawl store before publishing
+    INCREMENTAL_INTENTS = {"patrol"}
+
+    # Rotate user agents for anti-detection
+    USER_AGENTS = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ]
     
     def __init__(self):
         self.kafka_initialized = kafka_producer_manager.initialize()
-        self.browser = None
         self.playwright = None
+        self.max_concurrency = settings.crawler_max_concurrency
+        self.pool = BrowserPool(
+            launch=self._launch_browser,
+            prepare_context=self._create_stealth_context,
+            browsers=settings.crawler_browsers,
+            contexts_per_browser=settings.crawler_contexts,
+            max_pages=settings.crawler_browser_max_pages,
+            max_rss_mb=settings.crawler_browser_max_rss_mb
+        )
+        # Shared across crawls, so a patrol and a scout mission stay polite together
+        self.politeness = DomainLimiter(
+            concurrency=settings.crawler_domain_concurrency,
+            min_interval=settings.crawler_domain_delay_seconds
+        )
+        self.readiness = PageReadiness(ReadinessStore(settings.crawler_readiness_path))
+        self.crawl_store = CrawlStore(settings.crawler_store_path)
+        self.http = httpx.AsyncClient(timeout=10.0, follow_redirects=True)
         
-    async def _init_browser(self):
-        """Initialize Playwright Engine if not running"""
+    async def _launch_browser(self) -> Browser:
+        """Start the Playwright Engine if not running and launch a Chromium (called by the pool)"""
         if not self.playwright:
             self.playwright = await async_playwright().start()
-            # Launch in Headless mode (but defined as non-headless to anti-bots)
-            self.browser = await self.playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--no-sandbox',
-                    '--disable-setuid-sandbox',
-                    '--disable-blink-features=AutomationControlled',
-                    '--disable-infobars',
-                    '--window-size=1920,1080',
-                ]
-            )
+        # Launch in Headless mode (but defined as non-headless to anti-bots)
+        return await self.playwright.chromium.launch(
+            headless=True,
+            args=[
+                '--no-sandbox',
+                '--disable-setuid-sandbox',
+                '--disable-blink-features=AutomationControlled',
+                '--disable-infobars',
+                '--window-size=1920,1080',
+            ]
+        )
             
-    async def _create_stealth_context(self) -> BrowserContext:
+    async def _create_stealth_context(self, browser: Browser) -> BrowserContext:
         """Create a new incognito context with advanced stealth overrides"""
-        await self._init_browser()
-        
-        # Rotate user agents for anti-detection
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.2 Safari/605.1.15",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-        ]
-        
         # Randomize viewport slightly for fingerprint variance
         viewports = [
             {'width': 1920, 'height': 1080},
@@ -61,8 +94,8 @@ class UniversalCrawlerService:
             {'width': 1366, 'height': 768},
         ]
         
-        context = await self.browser.new_context(
-            user_agent=random.choice(user_agents),
+        context = await browser.new_context(
+            user_agent=random.choice(self.USER_AGENTS),
             viewport=random.choice(viewports),
             locale='en-US',
             timezone_id=random.choice(['America/New_York', 'America/Los_Angeles', 'Europe/London']),
@@ -115,96 +148,191 @@ class UniversalCrawlerService:
                     originalQuery(parameters)
             );
         """)
+
+        # DOM mutation timestamps for readiness detection
+        await context.add_init_script(MUTATION_OBSERVER_SCRIPT)
         
         return context
 
-    async def crawl_and_stream(self, urls: List[str], intent: str = "general"):
+    async def crawl_and_stream(self, urls: List[str], intent: str = "general", max_concurrency: Optional[int] = None) -> int:
         """
         Deploy Hunter Drones to target URLs.
         Executes JS, waits for hydration, and extracts full DOM.
+        Returns the number of pages transmitted.
         """
-        logger.info("Deploying Hunter Drones", target_count=len(urls), intent=intent)
-        
-        context = await self._create_stealth_context()
-        
-        try:
-            for url in urls:
-                page = await context.new_page()
-                try:
-                    # BLOCK RESOURCES to speed up
-                    await page.route("**/*", lambda route: route.abort() 
-                        if route.request.resource_type in ["image", "media", "font"] 
-                        else route.continue_())
-
-                    logger.info("Drone approaching target", url=url)
-                    
-                    # SMART NAVIGATION
-                    await page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                    
-                    # SMART WAIT (Hydration Check)
+        if not urls:
+            return 0
+
+        concurrency = max(1, min(max_concurrency or self.max_concurrency, len(urls)))
+        logger.info("Deploying Hunter Drones", target_count=len(urls), intent=intent, concurrency=concurrency)
+        started = time.monotonic()
+
+        open_pages = asyncio.Semaphore(concurrency)
+        incremental = intent in self.INCREMENTAL_INTENTS
+        not_modified = 0
+
+        async def visit(url: str) -> bool:
+            nonlocal not_modified
+            # Domain slot first: a page waiting out a domain's spacing holds no global slot
+            async with self.politeness.slot(url):
+                if incremental and await self._not_modified(url):
+                    not_modified += 1
+                    return False
+                async with open_pages:
                     try:
-                        # Wait for network idle or a specific selector if known
-                        await page.wait_for_load_state("networkidle", timeout=10000)
-                    except Exception:
-                        pass # Continue even if network keeps polling
-                    
-                    # Scroll to trigger lazy loads
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(2) # Human pause
-                    
-                    # EXTRACT
-                    content = await page.content()
-                    title = await page.title()
-                    
-                    await self._process_success(url, content, title, intent)
-                    
-                except Exception as e:
-                    logger.error("Drone failed mission", url=url, error=str(e))
-                finally:
-                    await page.close()
-                    await asyncio.sleep(random.uniform(1.0, 3.0)) # Stagger
-                    
+                        async with self.pool.lease() as context:
+                            return await self._crawl_page(context, url, intent, incremental)
+                    except Exception as e:
+                        logger.error("Drone could not launch", url=url, error=str(e))
+                        return False
+
+        results = await asyncio.gather(*(visit(url) for url in urls))
+        self.readiness.store.save()
+        self.crawl_store.save()
+
+        transmitted = sum(results)
+        logger.info(
+            "Hunter Drones returned",
+            intent=intent,
+            target_count=len(urls),
+            transmitted=transmitted,
+            not_modified=not_modified,
+            elapsed_seconds=round(time.monotonic() - started, 1),
+            browser_recycles=self.pool.recycles,
+            browser_crashes=self.pool.crashes
+        )
+        return transmitted
+
+    async def _not_modified(self, url: str) -> bool:
+        """Conditional GET with the stored validators; True on 304. Never reads the body."""
+        headers = self.crawl_store.conditional_headers(url)
+        if not headers:
+            return False
+        headers["User-Agent"] = self.USER_AGENTS[0]
+        try:
+            async with self.http.stream("GET", url, headers=headers) as response:
+                if response.status_code != 304:
+                    return False
+        except httpx.HTTPError as e:
+            logger.debug("Conditional check failed, crawling", url=url, error=str(e))
+            return False
+        self.crawl_store.mark_not_modified(url)
+        logger.info("Drone target not modified (304)", url=url)
+        return True
+
+    async def _crawl_page(self, context: BrowserContext, url: str, intent: str, incremental: bool = False) -> bool:
+        """Visit one URL in its own page; True if the payload was transmitted"""
+        page = await context.new_page()
+        try:
+            # BLOCK RESOURCES to speed up
+            await page.route("**/*", lambda route: route.abort() 
+                if route.request.resource_type in ["image", "media", "font"] 
+                else route.continue_())
+
+            logger.info("Drone approaching target", url=url)
+            
+            # SMART NAVIGATION
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+            
+            # SMART WAIT: known selector, DOM quiescence, scroll until exhausted
+            ready = await self.readiness.wait_until_ready(page, url)
+            logger.debug(
+                "Drone target rendered",
+                url=url,
+                strategy=ready.strategy,
+                ready_ms=ready.elapsed_ms,
+                scrolls=ready.scrolls,
+                items=ready.items
+            )
+            
+            # EXTRACT
+            content = await page.content()
+            title = await page.title()
+
+            if not incremental:
+                return await self._process_success(url, content, title, intent)
+
+            # CHANGE DETECTION: skip unchanged pages, send only new listing items
+            delta = self.crawl_store.observe(url, content, response.headers if response else None, ready.selector)
+            if not delta.publish:
+                self.crawl_store.commit(url, delta)
+                logger.info("Drone target unchanged, not transmitted", url=url, change=delta.kind, items=delta.total_items)
+                return False
+            transmitted = await self._process_success(url, delta.html, title, intent, delta, page_html=content)
+            if transmitted:
+                self.crawl_store.commit(url, delta)
+            return transmitted
+            
+        except Exception as e:
+            logger.error("Drone failed mission", url=url, error=str(e))
+            return False
         finally:
-            await context.close()
+            await page.close()
             
-    async def _process_success(self, url: str, html_content: str, title: str, intent: str):
-        """Process successful extraction"""
+    async def _process_success(
+        self, url: str, html_content: str, title: str, intent: str,
+        delta: Optional[CrawlDelta] = None, page_html: Optional[str] = None
+    ) -> bool:
+        """Process successful extraction (page_html: the whole page, when html_content is a delta)"""
+        
+        # 1. Known sites are extracted right here, from the raw page, without Gemini
+        extraction = await asyncio.to_thread(site_extractors.extract, page_html or html_content, url)
+        if extraction and delta is not None and delta.kind == "items":
+            extraction.keep_mentioned_in(html_content)
+        if extraction:
+            logger.info(
+                "Drone target parsed by site extractor",
+                url=url,
+                extractor=extraction.extractor,
+                opportunities=len(extraction.opportunities),
+                ms=round(extraction.elapsed_ms, 1)
+            )
         
-        # 1. Clean / Minify HTML (basic) to save bandwidth
-        # remove scripts/styles for raw storage if desired, but we keep raw for now
+        # 2. Strip boilerplate: consumers and Gemini only ever need the content
+        page = await asyncio.to_thread(preprocess_html, html_content, url)
         
         payload = {
             "url": url,
-            "title": title,
-            "html": html_content[:200000],  # 200KB limit
+            "title": title or page.title,
+            **payload_fields(page),  # html (cleaned, 200KB cap), links, preprocessed, raw_chars
             "crawled_at": time.time(),
             "source": self._extract_domain(url),
             "intent": intent,
-            "agent_type": "HunterDrone-V1"
+            "agent_type": "HunterDrone-V1",
+            # None for a full page; otherwise html holds only the new listing items
+            "change": delta.summary() if delta else None,
+            # Set when a site extractor parsed the page: consumers skip Gemini
+            **site_extractors.payload_fields(extraction)
         }
         
         if self.kafka_initialized:
-            success = kafka_producer_manager.publish_to_stream(
+            delivery = await kafka_producer_manager.publish(
                 topic=KafkaConfig.TOPIC_RAW_HTML,
                 key=url,
                 value=payload
             )
+            # Wait for the broker: the crawl store only records pages that arrived
+            success = delivery is not None and await kafka_producer_manager.wait_delivered([delivery]) == 0
             if success:
-                logger.info("✅ Drone transmitted payload", url=url, size=len(html_content))
+                logger.info("✅ Drone transmitted payload", url=url, size=page.chars, raw_size=page.raw_chars, links=len(page.links))
             else:
                 logger.error("❌ Transmission jammed (Kafka fail)", url=url)
+            return success
         else:
              logger.warning("Kafka offline, payload dropped", url=url)
+             return False
 
     def _extract_domain(self, url: str) -> str:
         from urllib.parse import urlparse
         return urlparse(url).netloc
     
     async def close(self):
-        if self.browser:
-            await self.browser.close()
+        self.crawl_store.save()
+        await self.http.aclose()
+        await self.pool.close()
         if self.playwright:
             await self.playwright.stop()
+            self.playwright = None
 
 # Global instance
 crawler_service = UniversalCrawlerService()
@@ -0,0 +1,459 @@
+"""
+Embedding Index
+Contiguous float32 store of L2-normalized embeddings (EmbeddingMatrix) and an
+IVF approximate nearest-neighbour index on top of it (IVFIndex).
+Scoring one query against the whole catalog is a single matrix-vector product.
+"""
+import math
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class EmbeddingMatrix:
+    """
+    Row-per-opportunity embedding store.
+
+    Rows are pre-normalized, so `matrix @ (q / |q|)` yields cosine similarity
+    for every row at once. Deleted rows are zeroed and recycled.
+    """
+
+    def __init__(self, dim: Optional[int] = None, initial_capacity: int = 1024):
+        self.dim = dim
+        self._initial_capacity = initial_capacity
+        self._matrix: Optional[np.ndarray] = None
+        self._ids: List[Optional[str]] = []
+        self._rows: Dict[str, int] = {}
+        self._sources: Dict[str, Any] = {}
+        self._free: List[int] = []
+        self._high_water = 0
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._rows
+
+    def row_of(self, item_id: str) -> Optional[int]:
+        return self._rows.get(item_id)
+
+    def is_current(self, item_id: str, vector: Optional[Sequence[float]]) -> bool:
+        """True if the row for item_id was built from this exact vector object"""
+        return vector is not None and self._sources.get(item_id) is vector
+
+    def ids(self) -> List[str]:
+        return list(self._rows.keys())
+
+    def live_rows(self) -> np.ndarray:
+        """Row numbers currently holding a vector"""
+        return np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+
+    @property
+    def free_rows(self) -> int:
+        """Recycled rows that still sit (zeroed) inside the live view"""
+        return len(self._free)
+
+    def id_at(self, row: int) -> Optional[str]:
+        return self._ids[row] if 0 <= row < self._high_water else None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Live (rows x dim) view; unused rows are all zeros"""
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._high_water]
+
+    def upsert(self, item_id: str, vector: Sequence[float]) -> bool:
+        """
+        Store (or replace) a vector. Returns False when the vector cannot be
+        indexed (empty or wrong dimension) so callers can fall back.
+        """
+        arr = np.asarray(vector, dtype=np.float32)
+        if arr.ndim != 1 or arr.size == 0:
+            return False
+        if self.dim is None:
+            self.dim = int(arr.size)
+        if arr.size != self.dim:
+            return False
+
+        norm = float(np.linalg.norm(arr))
+        if norm > 0:
+            arr = arr / norm
+
+        row = self._rows.get(item_id)
+        if row is None:
+            row = self._allocate_row()
+            self._rows[item_id] = row
+            self._ids[row] = item_id
+
+        self._matrix[row] = arr
+        self._sources[item_id] = vector
+        return True
+
+    def remove(self, item_id: str):
+        row = self._rows.pop(item_id, None)
+        if row is None:
+            return
+        self._sources.pop(item_id, None)
+        self._matrix[row] = 0.0
+        self._ids[row] = None
+        self._free.append(row)
+
+    def sync(self, items: Iterable[Tuple[str, Optional[Sequence[float]]]]):
+        """
+        Bring rows in line with (id, embedding) pairs. Unchanged embeddings
+        (same list object as last upsert) are skipped without conversion.
+        """
+        for item_id, vector in items:
+            if vector is None or len(vector) == 0:
+                if item_id in self._rows:
+                    self.remove(item_id)
+                continue
+            if self.is_current(item_id, vector):
+                continue
+            if not self.upsert(item_id, vector):
+                self.remove(item_id)
+
+    def similarities(self, query: Sequence[float]) -> Optional[np.ndarray]:
+        """
+        Cosine similarity of `query` against every row (indexed by row number).
+        Returns None if the query dimension does not match the matrix.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        if self.dim is None or q.ndim != 1 or q.size != self.dim:
+            return None
+
+        norm = float(np.linalg.norm(q))
+        if norm == 0:
+            return np.zeros(self._high_water, dtype=np.float32)
+        return self.matrix @ (q / norm)
+
+    def _allocate_row(self) -> int:
+        if self._free:
+            return self._free.pop()
+
+        if self._matrix is None:
+            self._matrix = np.zeros((self._initial_capacity, self.dim), dtype=np.float32)
+        elif self._high_water == self._matrix.shape[0]:
+            grown = np.zeros((self._matrix.shape[0] * 2, self.dim), dtype=np.float32)
+            grown[:self._high_water] = self._matrix[:self._high_water]
+            self._matrix = grown
+
+        row = self._high_water
+        self._high_water += 1
+        self._ids.append(None)
+        return row
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index (spherical k-means coarse quantizer).
+
+    Vectors live in an EmbeddingMatrix; each row is filed under its nearest
+    centroid. A query scans only the `nprobe` closest lists. Below
+    `min_train_size` vectors the index answers by exact brute force.
+    New vectors are assigned incrementally; the quantizer is retrained when
+    the index grows by `retrain_growth` since the last training. With
+    auto_train=False upserts only flag `needs_training`, and the owner runs
+    snapshot() / fit() / install() itself, e.g. with fit() in a worker thread.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        nprobe: int = 8,
+        min_train_size: int = 1024,
+        retrain_growth: float = 2.0,
+        kmeans_iterations: int = 8,
+        seed: int = 0,
+        auto_train: bool = True,
+    ):
+        self.path = path
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_growth = retrain_growth
+        self.kmeans_iterations = kmeans_iterations
+        self.seed = seed
+        self.auto_train = auto_train
+
+        self.vectors = EmbeddingMatrix()
+        self.centroids: Optional[np.ndarray] = None
+        self._lists: List[set] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._list_of_row: Dict[int, int] = {}
+        self._trained_size = 0
+        # Rows upserted/removed since the last snapshot(), while a fit is running
+        self._changed_rows: Optional[set] = None
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self.vectors
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def is_current(self, item_id: str, vector: Optional[Sequence[float]]) -> bool:
+        return self.vectors.is_current(item_id, vector)
+
+    @property
+    def needs_training(self) -> bool:
+        """Large enough to (re)train, and no fit is in progress"""
+        n = len(self.vectors)
+        if self._changed_rows is not None or n < self.min_train_size:
+            return False
+        return not self.is_trained or n >= self._trained_size * self.retrain_growth
+
+    def upsert(self, item_id: str, vector: Sequence[float]) -> bool:
+        if not self.vectors.upsert(item_id, vector):
+            return False
+        row = self.vectors.row_of(item_id)
+        if self._changed_rows is not None:
+            self._changed_rows.add(row)
+        if self.is_trained:
+            self._assign_rows(np.array([row], dtype=np.int64))
+        if self.auto_train and self.needs_training:
+            self.train()
+        return True
+
+    def remove(self, item_id: str):
+        row = self.vectors.row_of(item_id)
+        if row is None:
+            return
+        if self._changed_rows is not None:
+            self._changed_rows.add(row)
+        self._unassign_row(row)
+        self.vectors.remove(item_id)
+
+    def sync(self, items: Iterable[Tuple[str, Optional[Sequence[float]]]]):
+        """Incremental equivalent of EmbeddingMatrix.sync"""
+        for item_id, vector in items:
+            if vector is None or len(vector) == 0:
+                self.remove(item_id)
+                continue
+            if self.is_current(item_id, vector):
+                continue
+            if not self.upsert(item_id, vector):
+                self.remove(item_id)
+
+    def search(self, query: Sequence[float], k: int, ids: Optional[Iterable[str]] = None) -> List[Tuple[str, float]]:
+        """
+        Approximate top-k by cosine similarity, best first. With ids, only
+        those items are candidates; when they are fewer than the probed
+        lists hold, they are simply scored exactly.
+        """
+        within = None if ids is None else self._rows_of(ids)
+        if not self.is_trained:
+            return self.search_exact(query, k, within=within)
+
+        q = self._normalize_query(query)
+        if q is None or k <= 0:
+            return []
+
+        centroid_scores = self.centroids @ q
+        nprobe = min(self.nprobe, len(centroid_scores))
+        probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        candidate_lists = [self._list_array(int(c)) for c in probe]
+        rows = np.concatenate(candidate_lists) if candidate_lists else np.empty(0, dtype=np.int64)
+        if within is not None:
+            if within.size <= rows.size:
+                return self.search_exact(query, k, within=within)
+            rows = rows[np.isin(rows, within, assume_unique=True)]
+        if rows.size == 0:
+            return []
+
+        scores = self.vectors.matrix[rows] @ q
+        return self._top_k(rows, scores, k)
+
+    def search_exact(self, query: Sequence[float], k: int, within: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Brute-force top-k over every stored vector, or just the rows in within"""
+        q = self._normalize_query(query)
+        if q is None or k <= 0 or len(self.vectors) == 0:
+            return []
+
+        if within is None:
+            scores = self.vectors.matrix @ q
+            rows = np.arange(scores.shape[0], dtype=np.int64)
+        else:
+            rows = within
+            scores = self.vectors.matrix[rows] @ q
+        return self._top_k(rows, scores, k)
+
+    def train(self):
+        """(Re)build the coarse quantizer with spherical k-means, in the calling thread"""
+        snapshot = self.snapshot()
+        if snapshot is None:
+            return
+        rows, vectors = snapshot
+        centroids, assignment = self.fit(vectors)
+        self.install(rows, centroids, assignment)
+
+        if self.path:
+            self.save()
+
+    def snapshot(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Copy of the live (rows, vectors) to fit() on, or None if empty. Rows
+        changed from here until install() are re-assigned by install().
+        """
+        live_rows = self.vectors.live_rows()
+        if live_rows.size == 0:
+            return None
+        self._changed_rows = set()
+        return live_rows, self.vectors.matrix[live_rows]
+
+    def fit(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Spherical k-means over a snapshot: (centroids, nearest centroid per
+        vector). Reads only its arguments, so it is safe in a worker thread.
+        """
+        n = vectors.shape[0]
+        nlist = max(1, int(math.sqrt(n)))
+        rng = np.random.default_rng(self.seed)
+
+        # k-means on a bounded sample keeps retraining cost flat as the index grows
+        sample_size = min(n, 40 * nlist)
+        sample = vectors[rng.choice(n, sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1)
+            empty = norms == 0
+            if empty.any():
+                # Re-seed empty clusters from random sample points
+                sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+                norms[empty] = np.linalg.norm(sums[empty], axis=1)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms[:, None]).astype(np.float32)
+
+        centroids = np.ascontiguousarray(centroids)
+        return centroids, np.argmax(vectors @ centroids.T, axis=1)
+
+    def install(self, rows: np.ndarray, centroids: np.ndarray, assignment: np.ndarray):
+        """Swap in a fitted quantizer; rows changed since snapshot() are re-assigned"""
+        changed = self._changed_rows or set()
+        self._changed_rows = None
+
+        self.centroids = centroids
+        self._lists = [set() for _ in range(centroids.shape[0])]
+        self._list_arrays = {}
+        self._list_of_row = {}
+        for row, list_id in zip(rows.tolist(), assignment.tolist()):
+            if row not in changed:
+                self._lists[list_id].add(row)
+                self._list_of_row[row] = list_id
+
+        live = [row for row in changed if self.vectors.id_at(row) is not None]
+        self._assign_rows(np.array(live, dtype=np.int64))
+        self._trained_size = rows.size
+
+    def abandon_fit(self):
+        """Forget a snapshot() whose fit() failed"""
+        self._changed_rows = None
+
+    def save(self, path: Optional[str] = None):
+        """Persist vectors and quantizer to a single .npz file"""
+        self.write(self.export(), path)
+
+    def export(self) -> Dict[str, np.ndarray]:
+        """Copies of everything save() writes (cheap; write() can then run off-thread)"""
+        ids = self.vectors.ids()
+        rows = np.array([self.vectors.row_of(i) for i in ids], dtype=np.int64)
+        dim = self.vectors.dim or 0
+        return {
+            'ids': np.array(ids, dtype=str),
+            'vectors': self.vectors.matrix[rows] if rows.size else np.zeros((0, dim), dtype=np.float32),
+            'centroids': self.centroids.copy() if self.centroids is not None else np.zeros((0, dim), dtype=np.float32),
+        }
+
+    def write(self, arrays: Dict[str, np.ndarray], path: Optional[str] = None):
+        """Atomically write export() output to a .npz file"""
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+    def load(self, path: Optional[str] = None):
+        """Restore vectors and quantizer written by save()"""
+        path = path or self.path
+        with np.load(path) as data:
+            ids = data["ids"].tolist()
+            vectors = data["vectors"]
+            centroids = data["centroids"]
+
+        self.vectors = EmbeddingMatrix(initial_capacity=max(1024, len(ids)))
+        for item_id, vector in zip(ids, vectors):
+            self.vectors.upsert(item_id, vector)
+
+        if centroids.shape[0]:
+            self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+            self._lists = [set() for _ in range(centroids.shape[0])]
+            self._list_arrays = {}
+            self._list_of_row = {}
+            live_rows = self.vectors.live_rows()
+            self._assign_rows(live_rows)
+            self._trained_size = len(ids)
+
+    def _rows_of(self, ids: Iterable[str]) -> np.ndarray:
+        rows = {self.vectors.row_of(item_id) for item_id in ids}
+        rows.discard(None)
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+    def _assign_rows(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        nearest = np.argmax(self.vectors.matrix[rows] @ self.centroids.T, axis=1)
+        for row, list_id in zip(rows.tolist(), nearest.tolist()):
+            self._unassign_row(row)
+            self._lists[list_id].add(row)
+            self._list_of_row[row] = list_id
+            self._list_arrays.pop(list_id, None)
+
+    def _unassign_row(self, row: int):
+        list_id = self._list_of_row.pop(row, None)
+        if list_id is not None:
+            self._lists[list_id].discard(row)
+            self._list_arrays.pop(list_id, None)
+
+    def _list_array(self, list_id: int) -> np.ndarray:
+        cached = self._list_arrays.get(list_id)
+        if cached is None:
+            members = self._lists[list_id]
+            cached = np.fromiter(members, dtype=np.int64, count=len(members))
+            self._list_arrays[list_id] = cached
+        return cached
+
+    def _normalize_query(self, query: Sequence[float]) -> Optional[np.ndarray]:
+        q = np.asarray(query, dtype=np.float32)
+        if self.vectors.dim is None or q.ndim != 1 or q.size != self.vectors.dim:
+            return None
+        norm = float(np.linalg.norm(q))
+        return q / norm if norm > 0 else q
+
+    def _top_k(self, rows: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        # Over-fetch by the number of recycled rows, which may still be present
+        # in brute-force scans with a zero vector
+        take = min(scores.shape[0], k + self.vectors.free_rows)
+        if take == 0:
+            return []
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results: List[Tuple[str, float]] = []
+        for idx in top.tolist():
+            item_id = self.vectors.id_at(int(rows[idx]))
+            if item_id is None:
+                continue
+            results.append((item_id, float(scores[idx])))
+            if len(results) == k:
+                break
+        return results
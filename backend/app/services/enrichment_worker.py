@@ -1,14 +1,17 @@
 
 import asyncio
-import json
 import time
-from typing import List, Dict, Any
-from confluent_kafka import Consumer, KafkaError, Message
+from typing import List, Dict, Any, Optional, Set, Tuple
+from confluent_kafka import OFFSET_BEGINNING, Consumer, KafkaError, KafkaException, Message
 import structlog
 
 from app.config import settings
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services import serialization, site_extractors
 from app.services.ai_enrichment_service import ai_enrichment_service
+from app.services.gemini_scheduler import estimate_tokens
+from app.services.kafka_batch import OffsetTracker
+from app.services.listing_splitter import Card, known_listing_urls
 
 logger = structlog.get_logger()
 
@@ -18,12 +21,32 @@ class EnrichmentWorker:
     Consumes RAW HTML from 'raw-html-stream'.
     Extracts structured opportunities using Gemini.
     Publishes to 'enriched-opportunities-stream'.
+    Pages of known sites arrive already parsed by a site extractor and
+    skip Gemini.
+
+    Pages are batched by estimated prompt tokens (gemini_batch_tokens, or
+    whatever arrived within linger_seconds) and batches run concurrently;
+    the GeminiScheduler keeps their calls within the RPM/TPM quota and
+    retries rate-limited ones without holding up the rest. Offsets are
+    committed only past pages whose results were delivered (OffsetTracker).
+
+    Any number of instances can share the consumer group, in one process
+    each (see app.services.worker_pool); partitions are split between them.
     """
     
     def __init__(self):
         self.config = KafkaConfig()
         self.consumer_config = self.config.get_consumer_config(group_id="ai-refinery-v1")
         self.running = False
+        self.batch_tokens = settings.gemini_batch_tokens
+        self.linger_seconds = 2.0
+        # Batches dispatched but unfinished: enough to keep every scheduler slot busy
+        self.max_batches_in_flight = 2 * settings.gemini_max_concurrency
+        self.offsets = OffsetTracker()
+        self._rewind_requested = False
+        # Embedded in the API the producer is shared (the API closes it on
+        # shutdown); standalone or in a worker_pool child it is the worker's own
+        self.owns_producer = False
         
     async def start(self):
         """Start the AI processing loop"""
@@ -45,77 +68,68 @@ class EnrichmentWorker:
         self.running = True
         logger.info(f"Subscribed to {KafkaConfig.TOPIC_RAW_HTML}")
         logger.info("AI Refinery: READY. Waiting for HTML...")
+
+        in_flight: Set[asyncio.Task] = set()
+        batch: List[Dict[str, Any]] = []
+        positions: List[Tuple[str, int, int]] = []
+        batch_tokens = 0
+        batch_started = 0.0
+
+        def dispatch(messages: List[Dict[str, Any]], message_positions: List[Tuple[str, int, int]]):
+            task = asyncio.create_task(self._process_batch(messages, message_positions))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
         
         try:
             while self.running:
-                # BATCH COLLECTION
-                batch_messages = []
-                start_collect = time.time()
-                
-                # Try to collect 2 messages or wait 2 seconds
-                while len(batch_messages) < 2 and (time.time() - start_collect) < 2.0:
-                    # CRITICAL: Use asyncio.to_thread to prevent blocking the event loop
-                    msg = await asyncio.to_thread(consumer.poll, 0.5)
-                    if msg is None:
-                        # Yield to event loop
-                        await asyncio.sleep(0)
-                        continue
+                # BACKPRESSURE: read no further ahead than the Gemini quota works off
+                if len(in_flight) >= self.max_batches_in_flight:
+                    await asyncio.wait(set(in_flight), return_when=asyncio.FIRST_COMPLETED)
+                    self._commit(consumer)
+                    continue
+
+                # CRITICAL: Use asyncio.to_thread to prevent blocking the event loop
+                msg = await asyncio.to_thread(consumer.poll, 0.5)
+                if msg is not None:
                     if msg.error():
                         if msg.error().code() != KafkaError._PARTITION_EOF:
                             logger.error(f"Consumer error: {msg.error()}")
-                        continue
-                        
-                    try:
-                        payload = json.loads(msg.value().decode('utf-8'))
-                        if payload.get("html") and payload.get("url"):
-                            batch_messages.append(payload)
-                    except Exception as e:
-                        logger.error("Failed to decode message", error=str(e))
-
-                if not batch_messages:
-                    # Yield to event loop when idle
-                    await asyncio.sleep(0.1)
-                    continue
+                    else:
+                        position = (msg.topic(), msg.partition(), msg.offset())
+                        self.offsets.track(*position)
+                        payload = None
+                        try:
+                            payload = serialization.decode_message(msg.value(), msg.headers())
+                        except Exception as e:
+                            logger.error("Failed to decode message", error=str(e))
+
+                        if not isinstance(payload, dict) or not payload.get("html") or not payload.get("url"):
+                            self.offsets.done(*position)
+                        elif payload.get("extracted") is not None:
+                            # Parsed by a site extractor: nothing to wait for
+                            dispatch([payload], [position])
+                        else:
+                            if not batch:
+                                batch_started = time.monotonic()
+                            batch.append(payload)
+                            positions.append(position)
+                            batch_tokens += estimate_tokens(payload["html"])
 
-                # PROCESS BATCH
-                urls = [m.get("url") for m in batch_messages]
-                logger.info(f"🤖 Processing Batch of {len(batch_messages)} pages", urls=urls)
-                
-                start_time = time.time()
-                
-                # Extract from batch
-                opportunities = await ai_enrichment_service.extract_opportunities_from_html_batch(batch_messages)
-                
-                duration = time.time() - start_time
-                
-                if not opportunities:
-                    logger.warning(f"⚠️  No opportunities extracted from batch", duration=f"{duration:.2f}s")
+                # BATCH BY SIZE: send once the prompt is full or the oldest page has waited long enough
+                if batch and (batch_tokens >= self.batch_tokens or time.monotonic() - batch_started >= self.linger_seconds):
+                    dispatch(batch, positions)
+                    batch, positions, batch_tokens = [], [], 0
+
+                if self._rewind_requested:
+                    # Re-read everything after the last commit, the undelivered batch included
+                    self._rewind_requested = False
+                    batch, positions, batch_tokens = [], [], 0
+                    resume = self.offsets.resume_positions()
+                    self.offsets.reset()
+                    await asyncio.to_thread(self._rewind, consumer, resume)
                     continue
-                    
-                logger.info(f"✅ AI Extracted {len(opportunities)} opportunities from batch", duration=f"{duration:.2f}s")
 
-                # PUBLISH RESULTS
-                for opp in opportunities:
-                    # Resolve source from URL if possible, or use first source
-                    # (In batch, we might lose 1-to-1 mapping of which source came from where if not careful,
-                    # but opp['url'] should help identify)
-                    
-                    enriched_message = {
-                        'source': "multi-batch", # or find match
-                        'enriched_data': opp,
-                        'raw_data': {}, 
-                        'enriched_at': time.time(),
-                        'ai_model': settings.gemini_model,
-                        'origin_url': opp.get('url')
-                    }
-                    
-                    kafka_producer_manager.publish_to_stream(
-                        topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
-                        key="ai-refinery",
-                        value=enriched_message
-                    )
-                
-                kafka_producer_manager.flush()
+                self._commit(consumer)
                         
         except Exception as e:
             logger.error("Worker connect loop failed", error=str(e))
@@ -123,8 +137,129 @@ class EnrichmentWorker:
         except KeyboardInterrupt:
             logger.info("Stopping worker...")
         finally:
+            # Let dispatched batches deliver and commit before leaving the group
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+            self._commit(consumer)
+            # Leave the group now so a pool rebalance does not wait out the session timeout
+            consumer.close()
             self.close()
 
+    async def _process_batch(self, batch_messages: List[Dict[str, Any]], positions: List[Tuple[str, int, int]]):
+        """Extract, publish and, once delivered, mark one batch's offsets done"""
+        try:
+            delivered = await self._extract_and_publish(batch_messages)
+        except Exception as e:
+            logger.error("Batch processing failed", error=str(e), pages=len(batch_messages))
+            delivered = True  # As before: a failing batch is committed past, not retried forever
+
+        if not delivered:
+            logger.error("Enriched results not delivered, batch will be re-processed", pages=len(batch_messages))
+            self._rewind_requested = True
+            return
+        for position in positions:
+            self.offsets.done(*position)
+
+    async def _extract_and_publish(self, batch_messages: List[Dict[str, Any]]) -> bool:
+        """False if some results were not delivered to Kafka"""
+        urls = [m.get("url") for m in batch_messages]
+        logger.info(f"🤖 Processing Batch of {len(batch_messages)} pages", urls=urls)
+        
+        start_time = time.time()
+        
+        # Known sites are already extracted; only the rest goes to Gemini
+        opportunities = []
+        llm_messages = []
+        for message in batch_messages:
+            handled = await self._site_extracted(message)
+            if handled is None:
+                llm_messages.append(message)
+            else:
+                extractor, extracted = handled
+                opportunities.extend((opp, f"site-extractor:{extractor}") for opp in extracted)
+
+        sent_cards: List[Card] = []
+        if llm_messages:
+            extracted = await ai_enrichment_service.extract_opportunities_from_html_batch(llm_messages, sent_cards)
+            opportunities.extend((opp, settings.gemini_model) for opp in extracted)
+        
+        duration = time.time() - start_time
+        
+        if not opportunities:
+            logger.warning(f"⚠️  No opportunities extracted from batch", duration=f"{duration:.2f}s")
+            return True
+            
+        logger.info(
+            f"✅ AI Extracted {len(opportunities)} opportunities from batch",
+            duration=f"{duration:.2f}s",
+            llm_pages=len(llm_messages)
+        )
+
+        # PUBLISH RESULTS
+        deliveries = []
+        for opp, model in opportunities:
+            # Resolve source from URL if possible, or use first source
+            # (In batch, we might lose 1-to-1 mapping of which source came from where if not careful,
+            # but opp['url'] should help identify)
+            
+            enriched_message = serialization.build_envelope(
+                opp,
+                source="multi-batch", # or find match
+                raw_data={},
+                enriched_at=time.time(),
+                ai_model=model,
+                origin_url=(opp.get('url') or opp.get('source_url')) if isinstance(opp, dict) else None
+            )
+            
+            deliveries.append(await kafka_producer_manager.publish(
+                topic=KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED,
+                # Content key: one opportunity always maps to one partition
+                key=KafkaConfig.opportunity_key(opp) if isinstance(opp, dict) else "ai-refinery",
+                value=enriched_message
+            ))
+
+        # Offsets are committed only once the batch's results are delivered, so
+        # a rebalance or crash re-processes it instead of dropping it
+        failed = await kafka_producer_manager.wait_delivered(deliveries)
+        if failed:
+            return False
+        # Only now are the sent cards' results safe: a rewind re-sends them otherwise
+        known_listing_urls.record(sent_cards, [opp for opp, _ in opportunities])
+        return True
+
+    def _commit(self, consumer: Consumer):
+        offsets = self.offsets.ready()
+        if not offsets:
+            return
+        try:
+            consumer.commit(offsets=offsets, asynchronous=True)
+        except KafkaException as e:
+            logger.error("Kafka commit request failed", error=str(e))
+
+    async def _site_extracted(self, payload: Dict[str, Any]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        """(extractor, opportunities) if a site extractor handled the page, else None"""
+        if payload.get("extracted") is not None:
+            return payload.get("extractor") or "site", payload["extracted"]
+        if payload.get("preprocessed"):
+            # The crawler already tried, on the raw page; the rules need its markup
+            return None
+        extraction = await asyncio.to_thread(site_extractors.extract, payload["html"], payload["url"])
+        if extraction is None:
+            return None
+        return extraction.extractor, site_extractors.payload_fields(extraction)["extracted"]
+
+    def _rewind(self, consumer: Consumer, resume: Dict[Tuple[str, int], int]):
+        """
+        Seek every assigned partition back to its committed offset. A partition
+        with no commit yet goes back to the oldest offset this worker had not
+        finished (resume), or to the beginning if it read nothing from it.
+        """
+        committed = consumer.committed(consumer.assignment(), timeout=10)
+        for partition in committed:
+            if partition.offset < 0:
+                partition.offset = resume.get((partition.topic, partition.partition), OFFSET_BEGINNING)
+            consumer.seek(partition)
+
     def stop(self):
         """Stop the worker gracefully"""
         self.running = False
@@ -137,10 +272,12 @@ class EnrichmentWorker:
              # actual consumer close is inside the run loop finally block usually
              # but here we just signal stop
              pass
-        kafka_producer_manager.close()
+        if self.owns_producer:
+            kafka_producer_manager.close()
 
 # Global instance
 enrichment_worker = EnrichmentWorker()
 
 if __name__ == "__main__":
+    enrichment_worker.owns_producer = True
     asyncio.run(enrichment_worker.start())
@@ -0,0 +1,87 @@
+"""
+Expiry Sweeper
+Periodically moves opportunities whose deadline_timestamp has passed into
+scholarships_archive, so the live collection - and every query and cache
+built on it - only ever holds open opportunities.
+"""
+import asyncio
+import time
+from typing import Optional
+import structlog
+
+from app.config import settings
+from app.database import db
+from app.services.opportunity_catalog import opportunity_catalog
+
+logger = structlog.get_logger()
+
+
+class ExpirySweeper:
+    """Background archiver for expired opportunities"""
+
+    def __init__(self, interval_seconds: int = 3600):
+        self.interval_seconds = interval_seconds
+        self.running = False
+        self.last_run_at: Optional[float] = None
+        self.archived_total = 0
+        self.missing_deadline_count: Optional[int] = None
+
+    async def check_deadline_backfill(self) -> int:
+        """
+        Startup check: documents without a deadline_timestamp field are invisible
+        to every deadline query (catalog loads and this sweeper alike), so they
+        are reported until scripts/backfill_deadline_timestamps.py has been run.
+        """
+        self.missing_deadline_count = await db.count_scholarships_missing_deadline()
+        if self.missing_deadline_count:
+            logger.error(
+                "Scholarships missing deadline_timestamp are hidden from every deadline query; "
+                "run scripts/backfill_deadline_timestamps.py",
+                count=self.missing_deadline_count
+            )
+        return self.missing_deadline_count
+
+    async def sweep(self) -> int:
+        """Archive everything past the cutoff and evict it from the catalog"""
+        archived = await db.archive_expired_scholarships()
+        for scholarship_id in archived:
+            opportunity_catalog.remove(scholarship_id)
+
+        # Catalog items that crossed the cutoff since they were loaded,
+        # including ones another instance already archived
+        pruned = opportunity_catalog.prune_expired()
+
+        self.archived_total += len(archived)
+        self.last_run_at = time.time()
+        logger.info("Expiry sweep complete", archived=len(archived), pruned_from_catalog=len(pruned))
+        return len(archived)
+
+    async def start(self):
+        """Sweep on an interval until stop() is called"""
+        self.running = True
+        try:
+            await self.check_deadline_backfill()
+        except Exception as e:
+            logger.warning("Deadline backfill check failed", error=str(e))
+        while self.running:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error("Expiry sweep failed", error=str(e))
+            await asyncio.sleep(self.interval_seconds)
+
+    def stop(self):
+        self.running = False
+
+    def stats(self) -> dict:
+        """Sweep progress and backfill status for health reporting"""
+        return {
+            'running': self.running,
+            'last_run_age_seconds': round(time.time() - self.last_run_at, 1) if self.last_run_at else None,
+            'archived_total': self.archived_total,
+            'missing_deadline_timestamp': self.missing_deadline_count,
+        }
+
+
+# Global sweeper instance
+expiry_sweeper = ExpirySweeper(interval_seconds=settings.expiry_sweep_interval_seconds)
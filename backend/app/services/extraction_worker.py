@@ -1,11 +1,11 @@
 
 import asyncio
-import json
 import structlog
 from typing import Dict, Any, List
 from confluent_kafka import Consumer, KafkaException
 
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
+from app.services import serialization
 from app.services.ai_enrichment_service import ai_enrichment_service
 
 logger = structlog.get_logger()
@@ -47,7 +47,7 @@ class ExtractionWorker:
 
                 try:
                     # Parse message
-                    payload = json.loads(msg.value().decode('utf-8'))
+                    payload = serialization.decode_message(msg.value(), msg.headers())
                     url = payload.get('url')
                     html = payload.get('html')
                     
@@ -58,7 +58,9 @@ class ExtractionWorker:
                     logger.info(f"Processing HTML from {url}", size=len(html))
 
                     # 1. Extract Opportunities using Gemini
-                    extracted_opps = await ai_enrichment_service.extract_opportunities_from_html(html, url)
+                    extracted_opps = await ai_enrichment_service.extract_opportunities_from_html(
+                        html, url, preprocessed=bool(payload.get('preprocessed'))
+                    )
                     
                     if not extracted_opps:
                         logger.warning(f"No opportunities extracted from {url}")
@@ -75,6 +77,7 @@ class ExtractionWorker:
                     
                     kafka_producer_manager.initialize() # Ensure initialized
                     
+                    deliveries = []
                     for opp in extracted_opps:
                         # Add metadata
                         opp['params'] = {
@@ -82,13 +85,13 @@ class ExtractionWorker:
                             'extracted_at': payload.get('crawled_at')
                         }
                         
-                        kafka_producer_manager.publish_to_stream(
+                        deliveries.append(await kafka_producer_manager.publish(
                             topic=KafkaConfig.RAW_OPPORTUNITIES_TOPIC,
                             key=opp.get('url', url), # Use opp URL as key for partitioning
                             value=opp
-                        )
+                        ))
                         
-                    kafka_producer_manager.flush()
+                    await kafka_producer_manager.wait_delivered(deliveries)
                     logger.info(f"Published {len(extracted_opps)} opportunities to stream")
 
                 except Exception as e:
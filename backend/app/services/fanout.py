@@ -0,0 +1,110 @@
+"""
+WebSocket Fan-out
+Per-connection bounded send queues, each drained by its own task, so routing
+an opportunity to thousands of sockets never waits on any one of them.
+"""
+import asyncio
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Set, Tuple
+import structlog
+
+logger = structlog.get_logger()
+
+
+class ConnectionSender:
+    """
+    Outbound queue for one WebSocket.
+
+    enqueue() never blocks: a message carrying a coalesce_key replaces any
+    queued message with the same key (e.g. a newer version of the same
+    opportunity, or a second heartbeat), and when the queue is full the oldest
+    message is dropped so a slow client only ever receives its freshest
+    backlog. A send that fails or exceeds send_timeout closes the sender and
+    fires on_failure.
+    """
+
+    def __init__(
+        self,
+        websocket: Any,
+        max_queue: int = 64,
+        send_timeout: float = 10.0,
+        on_failure: Optional[Callable[["ConnectionSender"], None]] = None,
+        name: str = ''
+    ):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.on_failure = on_failure
+        self.name = name
+
+        self._queue: Deque[Tuple[Optional[Hashable], Dict]] = deque()
+        self._queued_keys: Set[Hashable] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def start(self):
+        self._task = asyncio.create_task(self._drain())
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, message: Dict, coalesce_key: Optional[Hashable] = None) -> bool:
+        """Queue a message for delivery; returns False if the connection is closed"""
+        if self.closed:
+            return False
+
+        if coalesce_key is not None and coalesce_key in self._queued_keys:
+            for i, (key, _) in enumerate(self._queue):
+                if key == coalesce_key:
+                    self._queue[i] = (key, message)
+                    break
+            self.coalesced += 1
+            return True
+
+        if len(self._queue) >= self.max_queue:
+            dropped_key, _ = self._queue.popleft()
+            self._queued_keys.discard(dropped_key)
+            self.dropped += 1
+
+        self._queue.append((coalesce_key, message))
+        if coalesce_key is not None:
+            self._queued_keys.add(coalesce_key)
+        self._wakeup.set()
+        return True
+
+    async def _drain(self):
+        while not self.closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            key, message = self._queue.popleft()
+            self._queued_keys.discard(key)
+            try:
+                await asyncio.wait_for(self.websocket.send_json(message), timeout=self.send_timeout)
+                self.sent += 1
+            except Exception as e:
+                logger.warning("WebSocket send failed, closing connection queue", connection=self.name, error=str(e) or type(e).__name__)
+                self.closed = True
+                if self.on_failure:
+                    self.on_failure(self)
+                return
+
+    def close(self):
+        """Stop draining and discard anything still queued"""
+        self.closed = True
+        self._queue.clear()
+        self._queued_keys.clear()
+        self._wakeup.set()
+        if self._task and self._task is not asyncio.current_task() and not self._task.done():
+            self._task.cancel()
+
+    def stats(self) -> Dict[str, int]:
+        return {'queued': self.queued, 'sent': self.sent, 'dropped': self.dropped, 'coalesced': self.coalesced}
@@ -0,0 +1,177 @@
+"""
+Gemini Scheduler
+Keeps as many Gemini calls in flight as the quota allows, instead of one
+batch at a time with inline rate-limit sleeps.
+
+Two token buckets hold the budgets: requests per minute and tokens per
+minute (estimated from the prompt, corrected from the response's
+usage_metadata). A call is admitted, in arrival order, once both buckets
+cover it, then takes one of max_in_flight slots. A call rejected with
+429 / RESOURCE_EXHAUSTED gives its slot back and is rescheduled after an
+exponential, jittered backoff, so other calls keep going; the buckets are
+emptied at the same time, which slows every caller down to what the quota
+actually allows.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+
+def is_rate_limited(error: Exception) -> bool:
+    text = str(error)
+    return "429" in text or "Resource has been exhausted" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def estimate_tokens(text: str) -> int:
+    """Prompt tokens at ~4 characters per token"""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """per_minute units per minute, refilled continuously, bursting up to one minute's worth"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self):
+        now = self._clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount is available; requests above capacity wait for a full bucket"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def credit(self, amount: float):
+        """Give back (or, negative, charge) units once the real cost is known"""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def drain(self):
+        self._refill()
+        self.level = min(self.level, 0.0)
+
+
+class GeminiScheduler:
+    """RPM/TPM-governed, concurrent runner for Gemini calls with non-blocking 429 retries"""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_in_flight: int = 4,
+        max_attempts: int = 5,
+        backoff_seconds: float = 5.0,
+        max_backoff_seconds: float = 120.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock)
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self._admission = asyncio.Lock()
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rate_limited = 0
+        self.failed = 0
+        self.tokens_used = 0
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """
+        Result of call() once the quota admits a request of ~tokens tokens.
+        Rate-limit errors are retried up to max_attempts; anything else (and
+        the last rate-limit error) is raised to the caller.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            await self._admit(tokens)
+            async with self._slots:
+                self.in_flight += 1
+                try:
+                    response = await call()
+                except Exception as e:
+                    if not is_rate_limited(e) or attempt == self.max_attempts:
+                        self.failed += 1
+                        raise
+                    self.rate_limited += 1
+                    self.requests.drain()
+                    self.tokens.drain()
+                else:
+                    self._settle(tokens, response)
+                    self.completed += 1
+                    return response
+                finally:
+                    self.in_flight -= 1
+
+            # Out of the slot and the admission queue: other calls proceed meanwhile
+            delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning("Gemini rate limited, call rescheduled", retry_in=f"{delay:.1f}s", attempt=f"{attempt}/{self.max_attempts}")
+            await asyncio.sleep(delay)
+
+    async def _admit(self, tokens: int):
+        self.waiting += 1
+        try:
+            # One caller at a time, in arrival order, so a big prompt is not starved by small ones
+            async with self._admission:
+                while True:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                self.requests.take(1)
+                self.tokens.take(tokens)
+        finally:
+            self.waiting -= 1
+
+    def _settle(self, estimated: int, response: Any):
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if isinstance(actual, int) and actual > 0:
+            self.tokens.credit(estimated - actual)
+            self.tokens_used += actual
+        else:
+            self.tokens_used += estimated
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+            "tokens_used": self.tokens_used,
+            "request_budget": round(self.requests.level, 1),
+            "token_budget": round(self.tokens.level),
+        }
+
+
+# Global instance: every refinery call in this process shares its part of the
+# key's quota; a worker pool splits the quota between its processes
+_quota_shares = max(1, settings.gemini_quota_shares)
+gemini_scheduler = GeminiScheduler(
+    requests_per_minute=settings.gemini_requests_per_minute / _quota_shares,
+    tokens_per_minute=settings.gemini_tokens_per_minute / _quota_shares,
+    max_in_flight=settings.gemini_max_concurrency,
+    max_attempts=settings.gemini_max_attempts
+)
@@ -0,0 +1,140 @@
+"""
+HTML Preprocessor
+Runs in the crawler before a page is published to cortex.raw.html.v1, so
+Kafka carries, and Gemini reads, only the content.
+
+One lxml pass removes what extraction never uses (scripts, styles, svg,
+iframes, form controls, navigation and footers, hidden and ARIA-chrome elements,
+comments, and every attribute except link targets), picks the main-content
+root (<main> / role=main, unless it holds too little of the page's text),
+drops empty wrappers, makes links absolute and collapses whitespace. The
+result is compact HTML that keeps the list/table structure the extraction
+prompt relies on, plus the page's outbound links.
+
+Consumers see 'preprocessed': True on the payload and skip their own
+BeautifulSoup cleaning pass.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import lxml.html
+from lxml import etree
+
+# Elements removed with their content (tails are kept)
+DROP_TAGS = (
+    "script", "style", "svg", "noscript", "template", "iframe", "object", "embed",
+    "canvas", "link", "meta", "nav", "footer", "button", "select", "input", "textarea",
+    "dialog",
+)
+
+# Inline wrappers that carry no structure once attributes are gone
+UNWRAP_TAGS = ("span", "font", "small", "b", "i", "u", "em", "strong", "abbr", "picture", "label")
+
+# Elements kept even when empty
+KEEP_EMPTY = {"br", "hr", "img", "td", "th"}
+
+KEEP_ATTRIBUTES = {"a": ("href",), "time": ("datetime",)}
+
+_CHROME_XPATH = (
+    "//*[@hidden or @aria-hidden='true' or @role='navigation' or @role='banner' "
+    "or @role='contentinfo' or @role='dialog' or @role='search']"
+)
+_SPACE = re.compile(r"\s+")
+
+# <main> must hold at least this share of the page's text to be used alone
+MAIN_CONTENT_SHARE = 0.3
+MAX_LINKS = 300
+
+
+@dataclass
+class PreprocessedPage:
+    html: str
+    title: str = ""
+    links: List[Dict[str, str]] = field(default_factory=list)
+    raw_chars: int = 0
+
+    @property
+    def chars(self) -> int:
+        return len(self.html)
+
+
+def _text_length(element) -> int:
+    return len(_SPACE.sub("", element.text_content() or ""))
+
+
+def _main_content(body):
+    for candidate in body.xpath("//main | //*[@role='main']"):
+        if _text_length(candidate) >= MAIN_CONTENT_SHARE * max(1, _text_length(body)):
+            return candidate
+    return body
+
+
+def _prune_empty(root):
+    # Deepest first, so a wrapper emptied by its children's removal goes too
+    for element in reversed(list(root.iter())):
+        if element is root or not isinstance(element.tag, str) or element.tag in KEEP_EMPTY:
+            continue
+        if len(element) == 0 and not (element.text or "").strip() and not element.get("href"):
+            element.drop_tree()
+
+
+def preprocess_html(html: str, url: Optional[str] = None, max_chars: int = 200000) -> PreprocessedPage:
+    """Boilerplate-free main content of a page (or fragment) as compact HTML, plus its links"""
+    if not html or not html.strip():
+        return PreprocessedPage(html="", raw_chars=len(html or ""))
+
+    try:
+        document = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return PreprocessedPage(html=html[:max_chars], raw_chars=len(html))
+
+    title = _SPACE.sub(" ", document.findtext(".//title") or "").strip()
+
+    etree.strip_elements(document, etree.Comment, etree.ProcessingInstruction, *DROP_TAGS, with_tail=False)
+    for element in document.xpath(_CHROME_XPATH):
+        element.drop_tree()
+    if url:
+        try:
+            document.make_links_absolute(url, resolve_base_href=True, handle_failures="discard")
+        except ValueError:
+            pass
+
+    body = document.body if document.find("body") is not None else document
+    root = _main_content(body)
+
+    links: List[Dict[str, str]] = []
+    seen = set()
+    for anchor in root.iter("a"):
+        href = (anchor.get("href") or "").strip()
+        if urlparse(href).scheme not in ("http", "https") or href in seen:
+            continue
+        seen.add(href)
+        links.append({"url": href, "text": _SPACE.sub(" ", anchor.text_content()).strip()[:200]})
+        if len(links) >= MAX_LINKS:
+            break
+
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        keep = KEEP_ATTRIBUTES.get(element.tag, ())
+        for name in list(element.attrib):
+            if name not in keep:
+                del element.attrib[name]
+    etree.strip_tags(root, *UNWRAP_TAGS)
+    _prune_empty(root)
+
+    compact = lxml.html.tostring(root, encoding="unicode", with_tail=False)
+    compact = _SPACE.sub(" ", compact).strip()
+    return PreprocessedPage(html=compact[:max_chars], title=title, links=links, raw_chars=len(html))
+
+
+def payload_fields(page: PreprocessedPage) -> Dict[str, Any]:
+    """The raw-HTML event fields a preprocessed page contributes"""
+    return {
+        "html": page.html,
+        "links": page.links,
+        "preprocessed": True,
+        "raw_chars": page.raw_chars,
+    }
@@ -3,14 +3,18 @@ Confluent Kafka Configuration & Producer Management
 Handles event streaming to Confluent Cloud topics
 """
 import os
-import json
-from typing import Optional, Dict, Any
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Optional, Dict, Any, List
 from confluent_kafka import Producer, KafkaError, KafkaException
-from confluent_kafka.admin import AdminClient, NewTopic
+from confluent_kafka.admin import AdminClient, NewPartitions, NewTopic
 import structlog
 
 
 from app.config import settings
+from app.services import serialization
 
 logger = structlog.get_logger()
 
@@ -36,6 +40,9 @@ class KafkaConfig:
     # 6. User Notifications
     TOPIC_USER_MATCHES = "user.matches.v1"
 
+    # 7. WebSocket Delivery (multi-node mode: read by every node, each with its own group)
+    TOPIC_WS_DELIVERY = "ws.delivery.v1"
+
     def __init__(self):
         """Initialize Kafka configuration from settings"""
         self.bootstrap_servers = settings.confluent_bootstrap_servers
@@ -60,12 +67,50 @@ class KafkaConfig:
                     self.TOPIC_RAW_HTML,
                     self.TOPIC_OPPORTUNITY_ENRICHED,
                     self.TOPIC_SYSTEM_ALERTS,
-                    self.TOPIC_USER_MATCHES
+                    self.TOPIC_USER_MATCHES,
+                    self.TOPIC_WS_DELIVERY
                 ]
             )
 
+    # Topics whose throughput scales with consumers; everything else is
+    # low-volume control traffic and stays on one partition
+    PARTITIONED_TOPICS = (
+        TOPIC_RAW_HTML,
+        TOPIC_OPPORTUNITY_ENRICHED,
+        TOPIC_USER_MATCHES,
+        TOPIC_WS_DELIVERY,
+    )
+
+    def partitions_for(self, topic: str) -> int:
+        """Partition count for a topic: KAFKA_TOPIC_PARTITIONS overrides, then the default"""
+        for entry in settings.kafka_topic_partitions.split(','):
+            name, _, count = entry.strip().partition('=')
+            if name == topic and count.strip().isdigit():
+                return int(count)
+        return settings.kafka_default_partitions if topic in self.PARTITIONED_TOPICS else 1
+
+    @staticmethod
+    def opportunity_key(opportunity: Dict[str, Any]) -> str:
+        """
+        Partition key for an opportunity: its ID, else the same content hash
+        normalize_opportunity() would assign it, so every version of one
+        opportunity lands on one partition, in order.
+        """
+        if opportunity.get('id'):
+            return str(opportunity['id'])
+        id_source = (
+            opportunity.get('url') or opportunity.get('source_url')
+            or opportunity.get('name') or opportunity.get('title') or "unknown"
+        )
+        return f"gen_{hashlib.md5(str(id_source).encode()).hexdigest()}"
+
     def ensure_topics_exist(self):
-        """Create V1 topics if they don't exist"""
+        """
+        Create V1 topics if they don't exist, and grow existing ones to their
+        configured partition count (Kafka cannot shrink them). Growing remaps
+        keys to partitions, so per-key ordering is only guaranteed for
+        messages produced after the change.
+        """
         if not self.enabled:
             return
 
@@ -77,13 +122,19 @@ class KafkaConfig:
             'sasl.password': self.api_secret
         })
 
-        topics = [
-            NewTopic(self.TOPIC_USER_IDENTITY, num_partitions=1, replication_factor=3),
-            NewTopic(self.TOPIC_CORTEX_COMMANDS, num_partitions=1, replication_factor=3),
-            NewTopic(self.TOPIC_RAW_HTML, num_partitions=1, replication_factor=3),
-            NewTopic(self.TOPIC_OPPORTUNITY_ENRICHED, num_partitions=1, replication_factor=3),
-            NewTopic(self.TOPIC_SYSTEM_ALERTS, num_partitions=1, replication_factor=3)
-        ]
+        desired = {
+            topic: self.partitions_for(topic)
+            for topic in (
+                self.TOPIC_USER_IDENTITY,
+                self.TOPIC_CORTEX_COMMANDS,
+                self.TOPIC_RAW_HTML,
+                self.TOPIC_OPPORTUNITY_ENRICHED,
+                self.TOPIC_SYSTEM_ALERTS,
+                self.TOPIC_USER_MATCHES,
+                self.TOPIC_WS_DELIVERY,
+            )
+        }
+        topics = [NewTopic(topic, num_partitions=count, replication_factor=3) for topic, count in desired.items()]
 
         # Call create_topics to asynchronously create topics.
         fs = admin_client.create_topics(topics)
@@ -92,13 +143,34 @@ class KafkaConfig:
         for topic, f in fs.items():
             try:
                 f.result()  # The result itself is None
-                logger.info(f"Topic {topic} created")
+                logger.info(f"Topic {topic} created", partitions=desired[topic])
             except Exception as e:
                 # Continue if topic already exists
                 if "Topic" in str(e) and "exists" in str(e):
                     continue
                 logger.warning(f"Failed to create topic {topic}: {e}")
 
+        try:
+            existing = admin_client.list_topics(timeout=10).topics
+        except KafkaException as e:
+            logger.warning("Could not read topic metadata", error=str(e))
+            return
+
+        grow = [
+            NewPartitions(topic, count)
+            for topic, count in desired.items()
+            if topic in existing and len(existing[topic].partitions) < count
+        ]
+        if not grow:
+            return
+
+        for topic, f in admin_client.create_partitions(grow).items():
+            try:
+                f.result()
+                logger.info(f"Topic {topic} grown", partitions=desired[topic])
+            except Exception as e:
+                logger.warning(f"Failed to add partitions to {topic}: {e}")
+
     def get_producer_config(self) -> Dict[str, Any]:
         """Get Confluent Kafka producer configuration"""
         if not self.enabled:
@@ -111,6 +183,9 @@ class KafkaConfig:
             'sasl.username': self.api_key,
             'sasl.password': self.api_secret,
             'acks': 'all',
+            # Idempotence keeps retried batches in order, so per-key
+            # ordering holds with several requests in flight
+            'enable.idempotence': True,
             'retries': 3,
             'max.in.flight.requests.per.connection': 5,
             'compression.type': 'snappy',
@@ -118,8 +193,13 @@ class KafkaConfig:
             'client.id': 'scholarstream-producer',
         }
 
-    def get_consumer_config(self, group_id: str = 'scholarstream-consumers') -> Dict[str, Any]:
-        """Get Confluent Kafka consumer configuration"""
+    def get_consumer_config(self, group_id: str = 'scholarstream-consumers', auto_offset_reset: str = 'earliest') -> Dict[str, Any]:
+        """
+        Get Confluent Kafka consumer configuration
+
+        Per-node groups (which only care about live traffic) pass
+        auto_offset_reset='latest' so a new node does not replay the topic.
+        """
         if not self.enabled:
             return {}
 
@@ -130,21 +210,63 @@ class KafkaConfig:
             'sasl.username': self.api_key,
             'sasl.password': self.api_secret,
             'group.id': group_id,
-            'auto.offset.reset': 'earliest',
+            'auto.offset.reset': auto_offset_reset,
             'enable.auto.commit': False,
         }
 
 
+class InflightBudget:
+    """
+    Async semaphore over bytes: publish waits while the producer already has
+    max_bytes of undelivered messages, instead of growing its queue without
+    bound. release() must run on the event loop.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def acquire(self, size: int):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        # A message larger than the whole budget still goes through, alone
+        size = min(size, self.max_bytes)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight + size <= self.max_bytes)
+            self.in_flight += size
+
+    def release(self, size: int):
+        self.in_flight = max(0, self.in_flight - min(size, self.max_bytes))
+        if self._condition is not None:
+            asyncio.ensure_future(self._notify())
+
+    async def _notify(self):
+        async with self._condition:
+            self._condition.notify_all()
+
+
 class KafkaProducerManager:
     """
     Manages Kafka producer lifecycle and message publishing
     Thread-safe, reusable producer instance
+
+    A background thread polls the producer, so delivery callbacks fire
+    without anyone calling flush(). Async code uses publish(), which applies
+    in-flight-bytes backpressure and returns an awaitable delivery future.
+    publish_to_stream() remains for synchronous callers.
     """
 
-    def __init__(self):
+    def __init__(self, max_inflight_bytes: int = 32 * 1024 * 1024):
         self.config = KafkaConfig()
         self._producer: Optional[Producer] = None
         self._is_initialized = False
+        self._poll_thread: Optional[threading.Thread] = None
+        self._polling = False
+        self.budget = InflightBudget(max_inflight_bytes)
+
+        self.delivered = 0
+        self.failed = 0
 
     def initialize(self) -> bool:
         """
@@ -162,6 +284,7 @@ class KafkaProducerManager:
             producer_config = self.config.get_producer_config()
             self._producer = Producer(producer_config)
             self._is_initialized = True
+            self._start_polling()
             logger.info("Kafka producer initialized successfully")
             return True
 
@@ -169,21 +292,109 @@ class KafkaProducerManager:
             logger.error("Failed to initialize Kafka producer", error=str(e))
             return False
 
+    def _start_polling(self):
+        self._polling = True
+        self._poll_thread = threading.Thread(target=self._poll_loop, name="kafka-producer-poll", daemon=True)
+        self._poll_thread.start()
+
+    def _poll_loop(self):
+        """Serve delivery callbacks off the event loop"""
+        while self._polling:
+            try:
+                self._producer.poll(0.1)
+            except Exception as e:
+                logger.error("Kafka producer poll failed", error=str(e))
+
+    async def publish(
+        self,
+        topic: str,
+        key: str,
+        value: Dict[str, Any],
+        wire_format: Optional[str] = None
+    ) -> Optional[asyncio.Future]:
+        """
+        Queue a message without blocking the event loop.
+
+        Waits only while the in-flight byte budget is exhausted. Returns a
+        future that resolves to the delivered message (or raises
+        KafkaException on delivery failure), or None if Kafka is unavailable.
+        Await the future only where delivery must be confirmed, e.g. before
+        committing the consumer offsets that produced the message.
+        """
+        if not self._is_initialized:
+            if not self.initialize():
+                logger.debug("Skipping Kafka publish - producer not available")
+                return None
+
+        message_value, headers = serialization.encode_message(value, wire_format or settings.kafka_wire_format)
+        message_key = key.encode('utf-8')
+        size = len(message_value) + len(message_key)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        await self.budget.acquire(size)
+
+        def on_delivery(err, msg):
+            # Runs on the poll thread
+            loop.call_soon_threadsafe(self._complete, future, err, msg, size)
+
+        while True:
+            try:
+                self._producer.produce(
+                    topic=topic,
+                    key=message_key,
+                    value=message_value,
+                    headers=headers,
+                    callback=on_delivery
+                )
+                break
+            except BufferError:
+                # librdkafka's local queue is full; the poll thread is draining it
+                await asyncio.sleep(0.05)
+            except Exception:
+                self.budget.release(size)
+                raise
+
+        logger.debug("Message queued for Kafka", topic=topic, key=key, payload_size=len(message_value))
+        return future
+
+    def _complete(self, future: asyncio.Future, err, msg, size: int):
+        self.budget.release(size)
+        if err is not None:
+            self.failed += 1
+            logger.error("Message delivery failed", topic=msg.topic(), partition=msg.partition(), error=str(err))
+            if not future.done():
+                future.set_exception(KafkaException(err))
+        else:
+            self.delivered += 1
+            if not future.done():
+                future.set_result(msg)
+
+    async def wait_delivered(self, futures: List[Optional[asyncio.Future]]) -> int:
+        """Await a batch of publish() futures; returns how many failed"""
+        pending = [f for f in futures if f is not None]
+        results = await asyncio.gather(*pending, return_exceptions=True)
+        return sum(1 for result in results if isinstance(result, Exception)) + (len(futures) - len(pending))
+
     def publish_to_stream(
         self,
         topic: str,
         key: str,
         value: Dict[str, Any],
-        callback: Optional[callable] = None
+        callback: Optional[callable] = None,
+        wire_format: Optional[str] = None
     ) -> bool:
         """
-        Publish message to Kafka topic
+        Publish message to Kafka topic (synchronous callers; async code
+        should use publish())
 
         Args:
             topic: Kafka topic name
             key: Message key (typically source name)
             value: Message payload as dictionary
             callback: Optional delivery callback
+            wire_format: 'json' or 'msgpack' (default: KAFKA_WIRE_FORMAT);
+                declared to consumers in the content-type header
 
         Returns:
             True if message queued successfully, False otherwise
@@ -193,60 +404,51 @@ class KafkaProducerManager:
                 logger.debug("Skipping Kafka publish - producer not available")
                 return False
 
-        try:
-            message_value = json.dumps(value).encode('utf-8')
-            message_key = key.encode('utf-8')
-
-            self._producer.produce(
-                topic=topic,
-                key=message_key,
-                value=message_value,
-                callback=callback or self._default_delivery_callback
-            )
-
-            self._producer.poll(0)
-
-            logger.info(
-                "Message published to Kafka",
-                topic=topic,
-                key=key,
-                payload_size=len(message_value)
-            )
-            return True
+        message_value, headers = serialization.encode_message(value, wire_format or settings.kafka_wire_format)
+        message_key = key.encode('utf-8')
 
-        except BufferError:
-            logger.warning(
-                "Kafka buffer full - flushing and retrying",
-                topic=topic,
-                key=key
-            )
-            self._producer.flush()
+        # On a full local queue, give the poll thread a moment to drain it
+        # rather than flushing everything. Never sleep on an event loop thread:
+        # there the caller should have used publish(), so fail fast instead.
+        try:
+            asyncio.get_running_loop()
+            attempts = 1
+        except RuntimeError:
+            attempts = 3
 
+        for attempt in range(attempts):
             try:
                 self._producer.produce(
                     topic=topic,
                     key=message_key,
                     value=message_value,
+                    headers=headers,
                     callback=callback or self._default_delivery_callback
                 )
-                self._producer.poll(0)
+                logger.debug("Message queued for Kafka", topic=topic, key=key, payload_size=len(message_value))
                 return True
-            except Exception as retry_error:
-                logger.error("Failed to publish after buffer flush", error=str(retry_error))
+
+            except BufferError:
+                logger.warning("Kafka buffer full - waiting for deliveries", topic=topic, key=key, attempt=attempt + 1)
+                if attempt + 1 < attempts:
+                    time.sleep(0.1)
+
+            except KafkaException as e:
+                logger.error(
+                    "Kafka publish error",
+                    topic=topic,
+                    key=key,
+                    error=str(e)
+                )
                 return False
 
-        except KafkaException as e:
-            logger.error(
-                "Kafka publish error",
-                topic=topic,
-                key=key,
-                error=str(e)
-            )
-            return False
+        logger.error("Failed to publish - Kafka buffer still full", topic=topic, key=key)
+        return False
 
     def _default_delivery_callback(self, err, msg):
         """Default callback for message delivery confirmation"""
         if err is not None:
+            self.failed += 1
             logger.error(
                 "Message delivery failed",
                 topic=msg.topic(),
@@ -254,6 +456,7 @@ class KafkaProducerManager:
                 error=str(err)
             )
         else:
+            self.delivered += 1
             logger.debug(
                 "Message delivered successfully",
                 topic=msg.topic(),
@@ -264,7 +467,8 @@ class KafkaProducerManager:
     def flush(self, timeout: float = 10.0):
         """
         Flush pending messages
-        Blocks until all messages are delivered or timeout
+        Blocks until all messages are delivered or timeout - shutdown only;
+        on the event loop use publish() futures instead
         """
         if self._producer and self._is_initialized:
             pending = self._producer.flush(timeout)
@@ -273,12 +477,22 @@ class KafkaProducerManager:
             else:
                 logger.debug("All messages flushed successfully")
 
+    def stats(self) -> Dict[str, int]:
+        return {
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'in_flight_bytes': self.budget.in_flight,
+        }
+
     def close(self):
         """Close producer and flush remaining messages"""
         if self._producer and self._is_initialized:
             logger.info("Closing Kafka producer")
             self.flush()
+            self._polling = False
+            if self._poll_thread is not None:
+                self._poll_thread.join(timeout=1.0)
             self._is_initialized = False
 
 
-kafka_producer_manager = KafkaProducerManager()
+kafka_producer_manager = KafkaProducerManager(max_inflight_bytes=settings.kafka_producer_max_inflight_bytes)
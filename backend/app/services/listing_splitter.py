@@ -0,0 +1,227 @@
+"""
+Listing Splitter
+Turns aggregator pages (devpost.com/hackathons, bold.org/scholarships, ...)
+into one extraction unit per card, so Gemini sees each listing item whole -
+none are cut off by a per-page character cap - and cards already extracted,
+unchanged since, are not sent at all.
+
+Cards are found structurally, without per-site selectors: among the
+children of each element, the largest group of same-tag siblings that are
+built alike (similar child tags), each with a link and some text, is a
+candidate listing; the candidate covering the most card text wins. Works on
+raw and on preprocessed (attribute-free) HTML.
+"""
+import hashlib
+import statistics
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+import lxml.html
+from lxml import etree
+import structlog
+
+logger = structlog.get_logger()
+
+MIN_CARDS = 3
+MIN_CARD_TEXT = 20
+# Per-card text counted toward a listing's score; keeps a few huge page
+# sections from outscoring a long run of real cards
+CARD_TEXT_CAP = 300
+# Share of a group's members whose child tags must resemble the group's usual shape
+MIN_SHAPE_AGREEMENT = 0.6
+
+_TRACKING_PARAMS = ("utm_", "ref", "fbclid", "gclid", "mc_")
+
+
+@dataclass
+class Card:
+    html: str
+    url: Optional[str]
+    text_chars: int
+    # Hash of the card's whitespace-normalized text: changes when the card is edited
+    digest: str = ""
+
+
+def normalize_url(url: str) -> str:
+    """Comparable form of a link: no fragment, tracking params, www. or trailing slash"""
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parsed.port:
+        host = f"{host}:{parsed.port}"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    ))
+    path = parsed.path.rstrip("/") or "/"
+    return urlunparse((parsed.scheme.lower(), host, path, "", query, ""))
+
+
+def _child_shape(element) -> frozenset:
+    return frozenset(child.tag for child in element if isinstance(child.tag, str))
+
+
+def _similar(a: frozenset, b: frozenset) -> bool:
+    if not a and not b:
+        return True
+    return len(a & b) / len(a | b) >= 0.5
+
+
+def _text_chars(element) -> int:
+    return len("".join((element.text_content() or "").split()))
+
+
+def _text_digest(element) -> str:
+    text = " ".join((element.text_content() or "").split())
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _primary_link(element, base_url: Optional[str]) -> Optional[str]:
+    anchors = [element] if element.tag == "a" else []
+    anchors.extend(element.iter("a"))
+    for anchor in anchors:
+        href = (anchor.get("href") or "").strip()
+        if not href or href.startswith(("#", "javascript:", "mailto:")):
+            continue
+        href = urljoin(base_url, href) if base_url else href
+        if urlparse(href).scheme in ("http", "https"):
+            return href
+    return None
+
+
+def split_listing(html: str, base_url: Optional[str] = None, min_cards: int = MIN_CARDS) -> Optional[List[Card]]:
+    """The page's listing cards in document order, or None if it is not a listing page"""
+    if not html or not html.strip():
+        return None
+    try:
+        root = lxml.html.fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+    best_score, best = 0, None
+    for parent in root.iter():
+        if not isinstance(parent.tag, str):
+            continue
+        siblings = defaultdict(list)
+        for child in parent:
+            if isinstance(child.tag, str):
+                siblings[child.tag].append(child)
+
+        for members in siblings.values():
+            if len(members) < min_cards:
+                continue
+            cards = []
+            for member in members:
+                chars = _text_chars(member)
+                url = _primary_link(member, base_url)
+                if url and chars >= MIN_CARD_TEXT:
+                    cards.append((member, url, chars))
+            if len(cards) < min_cards:
+                continue
+
+            shapes = [_child_shape(member) for member, _, _ in cards]
+            usual = Counter(shapes).most_common(1)[0][0]
+            if sum(_similar(shape, usual) for shape in shapes) < MIN_SHAPE_AGREEMENT * len(cards):
+                continue
+
+            median_chars = statistics.median(chars for _, _, chars in cards)
+            score = len(cards) * min(median_chars, CARD_TEXT_CAP)
+            if score > best_score:
+                best_score, best = score, cards
+
+    if best is None:
+        return None
+    return [
+        Card(
+            html=lxml.html.tostring(member, encoding="unicode", with_tail=False),
+            url=url,
+            text_chars=chars,
+            digest=_text_digest(member)
+        )
+        for member, url, chars in best
+    ]
+
+
+class KnownUrlIndex:
+    """
+    Cards already extracted, keyed by normalized link, with the content digest
+    each was extracted from, to keep unchanged cards away from the LLM.
+
+    Seeded by loader() (the opportunity catalog) and replaced by it every
+    refresh_seconds, so archived opportunities drop out. Catalog URLs carry no
+    digest: the first card seen for one is taken as its baseline. record()
+    covers what this process extracts in between, and is only called once
+    the results are delivered. A card whose text changed is sent again.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Iterable[str]]], refresh_seconds: float = 900):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self._digests: Dict[str, Optional[str]] = {}
+        self._loaded_at: Optional[float] = None
+        self.skipped = 0
+        self.changed = 0
+
+    async def _ensure_fresh(self):
+        if self._loaded_at is not None and time.time() - self._loaded_at < self.refresh_seconds:
+            return
+        self._loaded_at = time.time()
+        try:
+            loaded = {normalize_url(url) for url in await self._loader() if url}
+        except Exception as e:
+            logger.warning("Known opportunity URLs unavailable, sending all cards", error=str(e))
+            return
+        # Replace, keeping the digests of cards that are still in the catalog
+        self._digests = {url: self._digests.get(url) for url in loaded}
+
+    async def filter_new(self, cards: List[Card]) -> List[Card]:
+        """Cards that are new or changed since extracted (cards without a link always pass)"""
+        await self._ensure_fresh()
+        fresh = []
+        for card in cards:
+            key = normalize_url(card.url) if card.url else None
+            if key is None or key not in self._digests:
+                fresh.append(card)
+                continue
+            known = self._digests[key]
+            if known is None:
+                self._digests[key] = card.digest
+            elif known != card.digest:
+                self.changed += 1
+                fresh.append(card)
+        self.skipped += len(cards) - len(fresh)
+        return fresh
+
+    def record(self, cards: Iterable[Card], opportunities: Iterable[Dict[str, Any]]):
+        """
+        Mark delivered results as known: each card an opportunity was extracted
+        from (matched by link) at its current digest, plus the opportunities'
+        own links. Cards that yielded nothing stay unknown and are sent again.
+        """
+        extracted = {normalize_url(opp['url']) for opp in opportunities if isinstance(opp, dict) and opp.get('url')}
+        for card in cards:
+            if card.url and normalize_url(card.url) in extracted:
+                self._digests[normalize_url(card.url)] = card.digest
+        for url in extracted:
+            self._digests.setdefault(url, None)
+
+    def add(self, urls: Iterable[Optional[str]]):
+        """Mark links as known; their next card is taken as the baseline"""
+        for url in urls:
+            if url:
+                self._digests.setdefault(normalize_url(url), None)
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+
+async def _catalog_urls() -> List[str]:
+    from app.services.opportunity_catalog import opportunity_catalog
+    return [s.source_url for s in await opportunity_catalog.get_all() if s.source_url]
+
+
+known_listing_urls = KnownUrlIndex(_catalog_urls)
@@ -4,11 +4,16 @@ The Heart of ScholarStream's Personalization.
 Implements the "70/30" Match Formula:
 Match Score = (Vector Similarity * 0.7) + (Heuristic Filters * 0.3)
 """
+import asyncio
+import hashlib
+import json
+import os
+import time
 import uuid
 import structlog
 import math
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple, Union
 
 from app.models import (
     Scholarship,
@@ -17,7 +22,9 @@ from app.models import (
     DiscoveryJobResponse
 )
 from app.services.scraper_service import scraper_service
+from app.services.embedding_index import IVFIndex
 from app.database import db
+from app.config import settings
 # from app.services.vectorization_service import vectorization_service # Circular import risk, import inside method
 
 logger = structlog.get_logger()
@@ -31,12 +38,163 @@ class MatchingEngine:
     VECTOR_WEIGHT = 0.7
     FILTER_WEIGHT = 0.3
 
-    async def calculate_match_score(self, opportunity: Scholarship, profile: DeepUserProfile) -> float:
+    def __init__(self):
+        # ANN indexes over pre-normalized float32 vectors, persisted to disk.
+        # k-means runs in a worker thread (see _maintain), never inside an upsert.
+        self.opportunity_index = self._open_index("opportunities.npz")
+        self.user_index = self._open_index("users.npz")
+        # user_id -> version of the profile its indexed vector was built from
+        self._user_versions: Dict[str, str] = {}
+        self._training: Dict[str, asyncio.Task] = {}
+
+    def _open_index(self, filename: str) -> IVFIndex:
+        path = os.path.join(settings.ann_index_dir, filename)
+        index = IVFIndex(path=path, nprobe=settings.ann_nprobe, auto_train=False)
+        if os.path.exists(path):
+            try:
+                index.load()
+                logger.info("ANN index loaded", path=path, size=len(index), trained=index.is_trained)
+            except Exception as e:
+                logger.warning("ANN index unreadable, rebuilding from scratch", path=path, error=str(e))
+                index = IVFIndex(path=path, nprobe=settings.ann_nprobe, auto_train=False)
+        return index
+
+    def _maintain(self, index: IVFIndex):
+        """Start a background retrain when the index has grown enough"""
+        if not index.needs_training:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Scripts without an event loop: train inline
+            index.train()
+            return
+        running = self._training.get(index.path)
+        if running is None or running.done():
+            self._training[index.path] = loop.create_task(self._train(index))
+
+    async def _train(self, index: IVFIndex):
+        snapshot = index.snapshot()
+        if snapshot is None:
+            index.abandon_fit()
+            return
+        rows, vectors = snapshot
+        started = time.perf_counter()
+        try:
+            centroids, assignment = await asyncio.to_thread(index.fit, vectors)
+        except Exception as e:
+            index.abandon_fit()
+            logger.warning("ANN index training failed", path=index.path, error=str(e))
+            return
+        index.install(rows, centroids, assignment)
+        logger.info(
+            "ANN index retrained",
+            path=index.path,
+            size=int(rows.size),
+            lists=int(centroids.shape[0]),
+            duration_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        try:
+            await asyncio.to_thread(index.write, index.export())
+        except Exception as e:
+            logger.warning("Failed to persist ANN index", path=index.path, error=str(e))
+
+    def save_indexes(self):
+        """Persist ANN indexes (called on shutdown; training also saves)"""
+        for index in (self.opportunity_index, self.user_index):
+            try:
+                index.save()
+            except Exception as e:
+                logger.warning("Failed to persist ANN index", path=index.path, error=str(e))
+
+    def index_opportunity(self, opp: Scholarship):
+        """Incrementally add/refresh an opportunity's embedding in the ANN index"""
+        self.opportunity_index.sync([(opp.id, opp.embedding)])
+        self._maintain(self.opportunity_index)
+
+    def index_user_vector(self, user_id: str, user_vector: Optional[List[float]]):
+        """Incrementally add/refresh a user's DNA vector in the ANN index"""
+        self.user_index.sync([(user_id, user_vector)])
+        self._maintain(self.user_index)
+
+    async def index_user(self, user_id: str, user: Union[Dict[str, Any], UserProfile]) -> bool:
+        """
+        Vectorize a saved profile into the user DNA index (called wherever a
+        profile is saved or first seen). Returns True if the user is indexed.
+        A no-op unless USER_ANN_INDEX_ENABLED, and for a profile whose vector
+        is already indexed.
+        """
+        if not settings.user_ann_index_enabled:
+            return False
+        profile = self.deep_profile_from_user(user)
+        if profile is None:
+            return False
+
+        payload = json.dumps(profile.model_dump(mode='json'), sort_keys=True, default=str)
+        version = hashlib.sha1(payload.encode()).hexdigest()
+        if self._user_versions.get(user_id) == version and user_id in self.user_index:
+            return True
+
+        from app.services.vectorization_service import vectorization_service
+        user_vector = await vectorization_service.vectorize_profile(profile)
+        self.index_user_vector(user_id, user_vector)
+        if user_vector is None:
+            self._user_versions.pop(user_id, None)
+            return False
+        self._user_versions[user_id] = version
+        return True
+
+    def deep_profile_from_user(self, user: Union[Dict[str, Any], UserProfile, DeepUserProfile, None]) -> Optional[DeepUserProfile]:
+        """
+        DeepUserProfile from a users/{id} document (its 'profile' sub-dict), a
+        bare onboarding profile dict or a UserProfile. None if there is no
+        usable profile.
+        """
+        if user is None or isinstance(user, DeepUserProfile):
+            return user
+        if isinstance(user, UserProfile):
+            profile = user.model_dump()
+        elif isinstance(user, dict):
+            profile = user.get('profile') if isinstance(user.get('profile'), dict) else user
+        else:
+            return None
+
+        interests = [str(i) for i in profile.get('interests') or []]
+        location = ", ".join(str(p) for p in (profile.get('city'), profile.get('state'), profile.get('country')) if p)
+        try:
+            return DeepUserProfile(
+                name=profile.get('name') or "Student",
+                bio=profile.get('bio') or f"{profile.get('academic_status') or 'Student'} interested in {', '.join(interests) or 'opportunities'}",
+                location=location or "Global",
+                hard_skills=list(profile.get('hard_skills') or profile.get('skills') or interests),
+                soft_skills=list(profile.get('soft_skills') or []),
+                demographics=list(profile.get('demographics') or profile.get('background') or []),
+                school=profile.get('school') or "",
+                major=profile.get('major') or "",
+                graduation_year=str(profile.get('graduation_year') or ""),
+                gpa=float(profile.get('gpa') or 0.0)
+            )
+        except Exception as e:
+            logger.warning("Profile could not be mapped to DeepUserProfile", error=str(e))
+            return None
+
+    def find_candidate_users(self, opp: Scholarship, k: Optional[int] = None) -> Dict[str, float]:
+        """
+        Nearest users to an opportunity by vector similarity.
+        Empty when the opportunity has no embedding or no users are indexed.
+        """
+        if not opp.embedding or len(self.user_index) == 0:
+            return {}
+        return dict(self.user_index.search(opp.embedding, k or settings.ann_candidate_k))
+
+    async def calculate_match_score(self, opportunity: Scholarship, profile: DeepUserProfile, vector_score: Optional[float] = None) -> float:
         """
         The "Cortex Formula" implementation.
+        Pass vector_score when the similarity is already known (e.g. from the ANN index).
         """
         # 1. Vector Score (70%)
-        vector_score = self._compute_vector_similarity(opportunity.embedding, profile.vector_id)
+        if vector_score is None:
+            vector_score = self._compute_vector_similarity(opportunity.embedding, profile.vector_id)
         # Note: profile.vector_id is a placeholder, we need the actual user vector.
         # Ideally, we fetch the user's vector from the DB or it's passed in.
         # For this implementation, let's assume we can fetch it or it's in the profile if we enhanced it.
@@ -72,6 +230,56 @@ class MatchingEngine:
         except Exception:
             return None
 
+    def _batch_vector_similarity(self, opportunities: List[Scholarship], user_vector: Optional[List[float]]) -> List[Optional[float]]:
+        """
+        Cosine similarity for every opportunity in one matrix-vector product.
+        Opportunities the matrix cannot hold (missing/odd-sized vectors) fall
+        back to the scalar path so results match _compute_vector_similarity.
+        """
+        if not user_vector:
+            return [None] * len(opportunities)
+
+        self.opportunity_index.sync((opp.id, opp.embedding) for opp in opportunities)
+        self._maintain(self.opportunity_index)
+        vectors = self.opportunity_index.vectors
+        scores = vectors.similarities(user_vector)
+
+        results: List[Optional[float]] = []
+        for opp in opportunities:
+            row = vectors.row_of(opp.id)
+            if scores is not None and row is not None and vectors.is_current(opp.id, opp.embedding):
+                results.append(float(scores[row]))
+            else:
+                results.append(self._compute_vector_similarity(opp.embedding, user_vector))
+        return results
+
+    def _ann_candidates(
+        self,
+        opportunities: List[Scholarship],
+        user_vector: List[float],
+        top_k: int
+    ) -> Tuple[List[Scholarship], List[Optional[float]]]:
+        """
+        Keep only the ANN top_k of these opportunities (plus any the index
+        cannot hold, which are scored as before) together with their vector
+        scores. The search is restricted to the batch, so the rest of the
+        persistent index cannot crowd it out.
+        """
+        self.opportunity_index.sync((opp.id, opp.embedding) for opp in opportunities)
+        self._maintain(self.opportunity_index)
+        hits = dict(self.opportunity_index.search(user_vector, top_k, ids=[opp.id for opp in opportunities]))
+
+        candidates: List[Scholarship] = []
+        vector_scores: List[Optional[float]] = []
+        for opp in opportunities:
+            if opp.id in hits and self.opportunity_index.is_current(opp.id, opp.embedding):
+                candidates.append(opp)
+                vector_scores.append(hits[opp.id])
+            elif not self.opportunity_index.is_current(opp.id, opp.embedding):
+                candidates.append(opp)
+                vector_scores.append(self._compute_vector_similarity(opp.embedding, user_vector))
+        return candidates, vector_scores
+
     def _score_heuristics(self, opp: Scholarship, profile: DeepUserProfile) -> float:
         """
         Traditional hard-logic matching (Tags, Eligibility, Keywords).
@@ -98,9 +306,17 @@ class MatchingEngine:
 
         return min(1.0, score)
 
-    async def batch_match(self, opportunities: List[Scholarship], profile: DeepUserProfile) -> List[Scholarship]:
+    async def batch_match(
+        self,
+        opportunities: List[Scholarship],
+        profile: DeepUserProfile,
+        user_id: Optional[str] = None,
+        top_k: Optional[int] = None
+    ) -> List[Scholarship]:
         """
         Process a batch of opportunities against a user profile.
+        The ANN index narrows the batch to the top_k nearest opportunities
+        (default settings.ann_candidate_k, 0 = exhaustive) before heuristics run.
         """
         scored_opportunities = []
         
@@ -109,12 +325,18 @@ class MatchingEngine:
         # Let's import the service to generate it on the fly if needed (caching needed in V2)
         from app.services.vectorization_service import vectorization_service
         user_vector = await vectorization_service.vectorize_profile(profile)
+        if user_id:
+            self.index_user_vector(user_id, user_vector)
 
-        for opp in opportunities:
+        top_k = settings.ann_candidate_k if top_k is None else top_k
+        if user_vector and top_k:
+            opportunities, vector_scores = self._ann_candidates(opportunities, user_vector, top_k)
+        else:
+            vector_scores = self._batch_vector_similarity(opportunities, user_vector)
+
+        for opp, vector_score in zip(opportunities, vector_scores):
             # Calculate Score
             try:
-                # pass user_vector explicitly to avoid re-fetching
-                vector_score = self._compute_vector_similarity(opp.embedding, user_vector)
                 filter_score = self._score_heuristics(opp, profile)
                 
                 if vector_score is not None:
@@ -4,7 +4,10 @@ Provides backward-compatible discovery job handling.
 Internally uses MatchingEngine for scoring.
 """
 import uuid
-from typing import List, Optional, Dict, Any
+import bisect
+import hashlib
+import json
+from typing import List, Optional, Dict, Any, Tuple
 import structlog
 from datetime import datetime
 
@@ -14,7 +17,8 @@ from app.models import (
     DiscoveryJobResponse
 )
 from app.services.scraper_service import scraper_service
-from app.database import db
+from app.database import db, filter_expired
+from app.services.opportunity_catalog import opportunity_catalog
 
 logger = structlog.get_logger()
 
@@ -22,6 +26,10 @@ logger = structlog.get_logger()
 class OpportunityMatchingService:
     """Orchestrates multi-opportunity discovery and matching"""
     
+    def __init__(self):
+        # Stable opportunity fingerprints, memoized by the in-process feature key
+        self._opportunity_versions: Dict[tuple, str] = {}
+    
     async def start_discovery_job(
         self,
         user_id: str,
@@ -35,13 +43,12 @@ class OpportunityMatchingService:
         
         try:
             # Step 1: Check cache (Fast path)
-            cached_opportunities = await db.get_all_scholarships()
+            cached_opportunities = await opportunity_catalog.get_all()
             
             if cached_opportunities:
                 matched = self._filter_and_rank(cached_opportunities, user_profile)
                 if matched:
-                    scholarship_ids = [s.id for s in matched]
-                    await db.save_user_matches(user_id, scholarship_ids)
+                    await self.save_scored_matches(user_id, matched, user_profile)
                     
                     logger.info("Returning cached opportunities", count=len(matched))
                     
@@ -95,15 +102,15 @@ class OpportunityMatchingService:
                 except Exception as e:
                     logger.error("Failed to convert opportunity", error=str(e))
             
-            # Step 5: Filter and rank
-            matched_opportunities = self._filter_and_rank(opportunities, user_profile)
+            # Step 5: Filter and rank (freshly scraped, so not yet expiry-filtered)
+            matched_opportunities = self._filter_and_rank(filter_expired(opportunities), user_profile)
             
             # Step 6: Store in database
             for opp in matched_opportunities:
                 await db.save_scholarship(opp)
+                opportunity_catalog.upsert(opp)
             
-            scholarship_ids = [s.id for s in matched_opportunities]
-            await db.save_user_matches(user_id, scholarship_ids)
+            await self.save_scored_matches(user_id, matched_opportunities, user_profile)
             
             # Update job status
             await db.update_job_status(
@@ -127,8 +134,34 @@ class OpportunityMatchingService:
         """Use PersonalizationEngine for proper scoring"""
         from app.services.personalization_engine import personalization_engine
         
-        # Convert Scholarship to dict for personalization engine
-        opp_dict = {
+        # Features are shared across users; only build the dict on a cache miss
+        cache_key = self._feature_key(opportunity)
+        features = personalization_engine.lookup_features(cache_key) if cache_key else None
+        if features is None:
+            features = personalization_engine.get_features(self._to_personalization_dict(opportunity), cache_key=cache_key)
+        
+        return personalization_engine.calculate_personalized_score(features, profile)
+    
+    def _feature_key(self, opportunity: Scholarship) -> Optional[tuple]:
+        """Feature cache key from the fields _to_personalization_dict reads"""
+        eligibility = opportunity.eligibility
+        try:
+            content = hash((
+                opportunity.name, opportunity.title, opportunity.description, opportunity.organization,
+                tuple(getattr(opportunity, 'tags', None) or ()),
+                getattr(eligibility, 'gpa_min', None),
+                tuple(getattr(eligibility, 'majors', None) or ()),
+                tuple(getattr(eligibility, 'backgrounds', None) or ()),
+                tuple(getattr(eligibility, 'grades_eligible', None) or ()),
+                tuple(getattr(opportunity.requirements, 'skills_needed', None) or ()),
+            ))
+        except TypeError:
+            return None
+        return ('scholarship', opportunity.id, content)
+    
+    def _to_personalization_dict(self, opportunity: Scholarship) -> Dict[str, Any]:
+        """Convert Scholarship to dict for personalization engine"""
+        return {
             'name': opportunity.name or opportunity.title or 'Unknown Opportunity',
             'description': opportunity.description or '',
             'organization': opportunity.organization or '',
@@ -136,25 +169,21 @@ class OpportunityMatchingService:
             'eligibility': opportunity.eligibility.model_dump() if hasattr(opportunity.eligibility, 'model_dump') else {},
             'requirements': opportunity.requirements.model_dump() if hasattr(opportunity.requirements, 'model_dump') else {},
         }
-        
-        return personalization_engine.calculate_personalized_score(opp_dict, profile)
     
     def _filter_and_rank(
         self,
         opportunities: List[Scholarship],
         user_profile: UserProfile
     ) -> List[Scholarship]:
-        """Filter and rank opportunities using PersonalizationEngine"""
-        from datetime import datetime
-        
+        """
+        Rank opportunities using PersonalizationEngine.
+        Callers pass unexpired opportunities (the catalog only serves live ones).
+        """
         eligible = []
-        now = datetime.now().timestamp()
         
         for opp in opportunities:
-            # Skip expired
-            if hasattr(opp, 'deadline_timestamp') and opp.deadline_timestamp:
-                if opp.deadline_timestamp < int(now):
-                    continue
+            # Catalog objects are shared across users - score a private copy
+            opp = opp.model_copy()
             
             # Calculate score using PersonalizationEngine
             opp.match_score = self.calculate_match_score(opp, user_profile)
@@ -167,6 +196,162 @@ class OpportunityMatchingService:
         
         return sorted(eligible, key=lambda x: x.match_score, reverse=True)
 
+    @property
+    def algorithm_version(self) -> str:
+        from app.services.personalization_engine import personalization_engine
+        return personalization_engine.ALGORITHM_VERSION
+    
+    def profile_version(self, profile: UserProfile) -> str:
+        """Content fingerprint of a profile, stable across processes"""
+        payload = json.dumps(profile.model_dump(mode='json'), sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+    
+    def opportunity_version(self, opportunity: Scholarship) -> str:
+        """Content fingerprint of the fields scoring reads, stable across processes"""
+        cache_key = self._feature_key(opportunity)
+        if cache_key is not None:
+            cached = self._opportunity_versions.get(cache_key)
+            if cached is not None:
+                return cached
+        
+        payload = json.dumps(self._to_personalization_dict(opportunity), sort_keys=True, default=str)
+        version = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        
+        if cache_key is not None:
+            if len(self._opportunity_versions) >= 20000:
+                self._opportunity_versions.clear()
+            self._opportunity_versions[cache_key] = version
+        return version
+    
+    def _score_entry(self, scholarship: Scholarship, score: float, opportunity_version: str) -> Dict[str, Any]:
+        """Persisted per-match record: enough to rank and total a page without the body"""
+        return {
+            'score': score,
+            'opportunity_version': opportunity_version,
+            'amount': scholarship.amount,
+            'deadline_timestamp': scholarship.deadline_timestamp,
+        }
+    
+    def build_match_state(self, matched: List[Scholarship], profile: UserProfile) -> Dict[str, Any]:
+        """user_matches fields for freshly scored matches (IDs stored in rank order)"""
+        scores = {
+            s.id: self._score_entry(s, s.match_score, self.opportunity_version(s))
+            for s in matched
+        }
+        return {
+            'scholarship_ids': self.rank_ids([s.id for s in matched], scores),
+            'scores': scores,
+            'profile_version': self.profile_version(profile),
+            'algorithm_version': self.algorithm_version,
+            'ranked': True,
+        }
+    
+    @staticmethod
+    def rank_key(score: float, scholarship_id: str) -> Tuple[float, str]:
+        """Sort key of the best-first order: score descending, ties by id"""
+        return (-score, scholarship_id)
+    
+    def rank_ids(self, scholarship_ids: List[str], scores: Dict[str, Dict[str, Any]]) -> List[str]:
+        """IDs in best-first order (unscored entries last)"""
+        return sorted(
+            scholarship_ids,
+            key=lambda sid: self.rank_key((scores.get(sid) or {}).get('score', float('-inf')), sid)
+        )
+    
+    async def save_scored_matches(self, user_id: str, matched: List[Scholarship], profile: UserProfile) -> Dict[str, Any]:
+        """Persist ranked matches with their scores and the versions they were computed against"""
+        match_state = self.build_match_state(matched, profile)
+        await db.save_user_matches(user_id, **match_state)
+        return match_state
+    
+    def scores_current(self, match_state: Dict[str, Any], profile: UserProfile) -> bool:
+        """
+        True if every stored match has a complete score entry computed for this
+        profile and algorithm, so the list can be ranked from the entries alone.
+        Opportunity-level staleness is still checked per item when bodies load.
+        """
+        stored_scores = match_state.get('scores') or {}
+        return (
+            match_state.get('profile_version') == self.profile_version(profile)
+            and match_state.get('algorithm_version') == self.algorithm_version
+            and all(
+                'amount' in stored_scores.get(sid, {}) and 'deadline_timestamp' in stored_scores[sid]
+                for sid in match_state.get('scholarship_ids', [])
+            )
+        )
+    
+    def seek_stored_matches(self, match_state: Dict[str, Any], after: Optional[Tuple[float, str]]) -> int:
+        """
+        Index in the ranked scholarship_ids of the first match after the
+        cursor key (score, id); a binary search, no sort. Requires a
+        match_state with 'ranked' set (see rank_ids).
+        """
+        if after is None:
+            return 0
+        stored_scores = match_state['scores']
+        return bisect.bisect_right(
+            match_state['scholarship_ids'],
+            self.rank_key(*after),
+            key=lambda sid: self.rank_key(stored_scores[sid]['score'], sid)
+        )
+    
+    def apply_stored_scores(
+        self,
+        scholarships: List[Scholarship],
+        match_state: Dict[str, Any],
+        profile: UserProfile
+    ) -> Tuple[List[Scholarship], Optional[Dict[str, Dict[str, Any]]]]:
+        """
+        Attach match scores to (copies of) scholarships, reusing persisted
+        scores and re-scoring only where the profile, the opportunity or the
+        algorithm changed since they were stored.
+        
+        Returns the scored list sorted by score and, if any stored entry
+        changed, the full scores map to persist (otherwise None).
+        """
+        profile_version = self.profile_version(profile)
+        stored_scores = match_state.get('scores') or {}
+        stale_all = (
+            match_state.get('profile_version') != profile_version
+            or match_state.get('algorithm_version') != self.algorithm_version
+        )
+        
+        scored = []
+        scores = {}
+        rescored = 0
+        changed = 0
+        for scholarship in scholarships:
+            opportunity_version = self.opportunity_version(scholarship)
+            entry = stored_scores.get(scholarship.id)
+            
+            if not stale_all and entry and entry.get('opportunity_version') == opportunity_version:
+                score = entry['score']
+            else:
+                score = self.calculate_match_score(scholarship, profile)
+                rescored += 1
+            
+            new_entry = self._score_entry(scholarship, score, opportunity_version)
+            if new_entry != entry:
+                changed += 1
+            scores[scholarship.id] = new_entry
+            
+            # Catalog objects are shared across users - score a private copy
+            scholarship = scholarship.model_copy()
+            scholarship.match_score = score
+            scholarship.match_tier = self.get_match_tier(score)
+            scored.append(scholarship)
+        
+        scored.sort(key=lambda x: x.match_score, reverse=True)
+        
+        if rescored:
+            logger.info("Re-scored stale matches", rescored=rescored, total=len(scholarships))
+        if stale_all:
+            return scored, scores
+        if changed:
+            # Keep entries for matches not loaded in this read (expired, other pages)
+            return scored, {**stored_scores, **scores}
+        return scored, None
+
     def get_match_tier(self, score: float) -> str:
         """Convert match score to tier"""
         if score >= 85:
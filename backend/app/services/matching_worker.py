@@ -2,6 +2,7 @@
 import asyncio
 import structlog
 import json
+from typing import Optional
 from app.services.kafka_config import KafkaConfig, kafka_producer_manager
 from app.services.matching_engine import matching_engine
 from app.database import db
@@ -32,49 +33,58 @@ class MatchingWorker:
             opp = Scholarship(**value)
             logger.info("Matching Worker processing", opp_id=opp.id, title=opp.title)
             
-            # 2. Fetch Active Users (Simulated: In prod, iterate through users or use vector search on USER index)
-            # For FAANG-scale, we'd use a Vector DB (Pinecone/Milvus) to find users CLOSE to this opportunity vector.
-            # Here, we'll fetch all users (assuming low scale for MVP) or a set of active users.
-            users = await db.get_all_users() # Assuming this exists and returns list of UserProfile/DeepUserProfile
+            # Keep the opportunity ANN index current as the refinery publishes
+            matching_engine.index_opportunity(opp)
+            
+            # 2. Candidate Users: ask the user DNA index for the users CLOSEST to this
+            # opportunity vector, so only the top-K get heuristic scoring.
+            candidates = matching_engine.find_candidate_users(opp)
+            if candidates:
+                candidate_ids = list(candidates.keys())
+                profiles = await asyncio.gather(*[db.get_user_profile(uid) for uid in candidate_ids])
+                user_entries = list(zip(candidate_ids, profiles))
+            else:
+                # No vectors to search with: fall back to scanning all users
+                users = await db.get_all_users() # Assuming this exists and returns list of UserProfile/DeepUserProfile
+                user_entries = [(user.id, user) for user in users]
             
             matched_count = 0
             
-            for user in users:
-                # Convert to DeepUserProfile if needed 
+            for user_id, user in user_entries:
+                # Build the DeepUserProfile from the stored profile; a user whose
+                # profile cannot be mapped is skipped, not the whole opportunity
                 deep_profile = self._ensure_deep_profile(user)
+                if deep_profile is None:
+                    continue
                 
-                # 3. Calculate Score
-                score = await matching_engine.calculate_match_score(opp, deep_profile)
+                # 3. Calculate Score (reuse the similarity the index already computed)
+                score = await matching_engine.calculate_match_score(
+                    opp, deep_profile, vector_score=candidates.get(user_id)
+                )
                 
                 # 4. Filter & Notify
                 if score >= 50: # Threshold
                     opp.match_score = score
-                    await db.save_user_match(user.id, opp)
+                    await db.save_user_match(user_id, opp)
                     
                     # Notify via WebSocket (Conceptually pushing to a user topic)
                     # The WebSocket service listens to user-specific channels
                     # We can publish to 'user.matches' topic which WebSocket service consumes
-                    self._notify_user(user.id, opp)
+                    await self._notify_user(user_id, opp)
                     matched_count += 1
             
-            logger.info("Matching Complete", opp_id=opp.id, matched_users=matched_count)
+            logger.info("Matching Complete", opp_id=opp.id, matched_users=matched_count, candidates=len(user_entries))
 
         except Exception as e:
             logger.error("Matching Worker failed", error=str(e), key=key)
 
-    def _ensure_deep_profile(self, user_data) -> DeepUserProfile:
-        """Helper to cast DB user to DeepUserProfile"""
-        # Logic to fill missing deep fields if necessary
-        # This is a stub for now
-        if isinstance(user_data, DeepUserProfile):
-            return user_data
-        # If it's a basic UserProfile or dict, upgrade it
-        # ... logic ...
-        return DeepUserProfile(**user_data.dict()) # Simplistic conversion
+    def _ensure_deep_profile(self, user_data) -> Optional[DeepUserProfile]:
+        """Helper to cast a DB user (document with a 'profile' sub-dict) to DeepUserProfile"""
+        return matching_engine.deep_profile_from_user(user_data)
 
-    def _notify_user(self, user_id: str, opp: Scholarship):
-        """Publish match to User Notification Stream"""
-        kafka_producer_manager.publish_to_stream(
+    async def _notify_user(self, user_id: str, opp: Scholarship):
+        """Publish match to User Notification Stream (delivery is not awaited)"""
+        await kafka_producer_manager.publish(
             topic=KafkaConfig.TOPIC_USER_MATCHES,
             key=user_id,
             value={
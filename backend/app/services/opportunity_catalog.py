@@ -0,0 +1,240 @@
+"""
+Opportunity Catalog
+Shared in-process cache of parsed Scholarship objects.
+Loads the unexpired scholarships once (indexed deadline_timestamp query),
+then stays current through upserts from the opportunity.enriched.v1 consumer
+and periodic background refreshes. A sorted deadline index answers expiry and
+urgency questions without touching expired items.
+"""
+import asyncio
+import bisect
+import time
+from typing import Dict, List, Optional, Any, Tuple
+import structlog
+
+from app.config import settings
+from app.models import Scholarship
+from app.database import db, expiry_cutoff
+
+logger = structlog.get_logger()
+
+
+class OpportunityCatalog:
+    """
+    Read-mostly opportunity cache shared by chat, discovery and /matched.
+
+    Objects handed out are shared between callers and must be treated as
+    read-only; copy (model_copy) before setting per-user fields like match_score.
+    Expired opportunities are never returned; opportunities without a
+    deadline_timestamp never expire.
+    """
+
+    def __init__(self, refresh_interval_seconds: int = 900):
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._items: Dict[str, Scholarship] = {}
+        # (deadline_timestamp, id) sorted ascending, for dated items only
+        self._deadlines: List[Tuple[int, str]] = []
+        self._loaded_at: Optional[float] = None
+        self._updated_at: Optional[float] = None
+        self._pending: Optional[Dict[str, Optional[Scholarship]]] = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    async def _ensure_loaded(self):
+        if not self.is_loaded:
+            self.misses += 1
+            async with self._load_lock:
+                # Concurrent cold callers queue on the lock; only the first one scans
+                if not self.is_loaded:
+                    await self._load()
+        else:
+            self.hits += 1
+            if self.staleness_seconds() > self.refresh_interval_seconds:
+                self._schedule_refresh()
+
+    async def get_all(self) -> List[Scholarship]:
+        """Every unexpired opportunity (undated first, then soonest deadline first)"""
+        await self._ensure_loaded()
+        return self._undated() + self._dated_between(expiry_cutoff(), None)
+
+    async def get_due_by(self, end: int, include_undated: bool = False) -> List[Scholarship]:
+        """
+        Unexpired opportunities with deadline_timestamp <= end, soonest first.
+        include_undated prepends the opportunities that have no deadline at all.
+        """
+        await self._ensure_loaded()
+        dated = self._dated_between(expiry_cutoff(), end)
+        return self._undated() + dated if include_undated else dated
+
+    def expired_count(self) -> int:
+        """Cached opportunities already past the cutoff (pending prune/sweep)"""
+        return bisect.bisect_left(self._deadlines, (expiry_cutoff(), ''))
+
+    def active_count(self) -> int:
+        """Cached opportunities that have not expired"""
+        return len(self._items) - self.expired_count()
+
+    def _undated(self) -> List[Scholarship]:
+        return [s for s in self._items.values() if s.deadline_timestamp is None]
+
+    def _dated_between(self, start: int, end: Optional[int]) -> List[Scholarship]:
+        lo = bisect.bisect_left(self._deadlines, (start, ''))
+        hi = len(self._deadlines) if end is None else bisect.bisect_right(self._deadlines, (end, '\uffff'))
+        return [self._items[sid] for _, sid in self._deadlines[lo:hi]]
+
+    def _is_live(self, scholarship: Scholarship, cutoff: int) -> bool:
+        return scholarship.deadline_timestamp is None or scholarship.deadline_timestamp >= cutoff
+
+    async def get(self, scholarship_id: str) -> Optional[Scholarship]:
+        """Return a single unexpired opportunity, falling back to Firestore on a cache miss"""
+        cached = self._items.get(scholarship_id)
+        if cached is not None:
+            self.hits += 1
+            return cached if self._is_live(cached, expiry_cutoff()) else None
+
+        self.misses += 1
+        scholarship = await db.get_scholarship(scholarship_id)
+        if scholarship and self._is_live(scholarship, expiry_cutoff()):
+            self.upsert(scholarship)
+            return scholarship
+        return None
+
+    async def get_many(self, scholarship_ids: List[str]) -> List[Scholarship]:
+        """Return opportunities in ID order; cache misses are batch-fetched in one read"""
+        found: Dict[str, Scholarship] = {}
+        missing: List[str] = []
+        for scholarship_id in scholarship_ids:
+            cached = self._items.get(scholarship_id)
+            if cached is not None:
+                found[scholarship_id] = cached
+            else:
+                missing.append(scholarship_id)
+
+        self.hits += len(found)
+        self.misses += len(missing)
+
+        cutoff = expiry_cutoff()
+        if missing:
+            for scholarship in await db.get_scholarships(missing):
+                if self._is_live(scholarship, cutoff):
+                    self.upsert(scholarship)
+                found[scholarship.id] = scholarship
+
+        return [found[sid] for sid in scholarship_ids if sid in found and self._is_live(found[sid], cutoff)]
+
+    async def reload(self):
+        """Reload every unexpired scholarship (one scan at a time)"""
+        async with self._load_lock:
+            await self._load()
+
+    async def _load(self):
+        """Full scan and swap; callers hold _load_lock"""
+        started = time.time()
+        # Capture upserts/removals that land while the scan is in flight,
+        # so the swap below cannot resurrect or drop them
+        self._pending = {}
+        try:
+            scholarships = await db.get_active_scholarships()
+            items = {s.id: s for s in scholarships}
+            for scholarship_id, scholarship in self._pending.items():
+                if scholarship is None:
+                    items.pop(scholarship_id, None)
+                else:
+                    items[scholarship_id] = scholarship
+        finally:
+            self._pending = None
+
+        self._items = items
+        self._deadlines = sorted(
+            (s.deadline_timestamp, s.id) for s in items.values() if s.deadline_timestamp is not None
+        )
+        self._loaded_at = time.time()
+        self._updated_at = self._loaded_at
+
+        self.loads += 1
+        logger.info(
+            "Opportunity catalog loaded",
+            size=len(items),
+            duration_ms=round((self._loaded_at - started) * 1000, 1)
+        )
+
+    def upsert(self, scholarship: Scholarship):
+        """Insert or replace an opportunity (called after it is persisted)"""
+        self._unindex(scholarship.id)
+        self._items[scholarship.id] = scholarship
+        if scholarship.deadline_timestamp is not None:
+            bisect.insort(self._deadlines, (scholarship.deadline_timestamp, scholarship.id))
+        if self._pending is not None:
+            self._pending[scholarship.id] = scholarship
+        self._updated_at = time.time()
+
+    def remove(self, scholarship_id: str):
+        """Evict an opportunity (e.g. archived or deleted)"""
+        self._unindex(scholarship_id)
+        self._items.pop(scholarship_id, None)
+        if self._pending is not None:
+            self._pending[scholarship_id] = None
+        self._updated_at = time.time()
+
+    def prune_expired(self) -> List[str]:
+        """Evict every cached opportunity past the expiry cutoff; returns their IDs"""
+        expired = [sid for _, sid in self._deadlines[:self.expired_count()]]
+        for scholarship_id in expired:
+            self.remove(scholarship_id)
+        return expired
+
+    def _unindex(self, scholarship_id: str):
+        existing = self._items.get(scholarship_id)
+        if existing is None or existing.deadline_timestamp is None:
+            return
+        key = (existing.deadline_timestamp, scholarship_id)
+        i = bisect.bisect_left(self._deadlines, key)
+        if i < len(self._deadlines) and self._deadlines[i] == key:
+            del self._deadlines[i]
+
+    def staleness_seconds(self) -> float:
+        """Seconds since the last full reload from Firestore"""
+        if self._loaded_at is None:
+            return float('inf')
+        return time.time() - self._loaded_at
+
+    def _schedule_refresh(self):
+        """Stale-while-revalidate: serve current data, refresh in background"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.create_task(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self.reload()
+        except Exception as e:
+            logger.warning("Opportunity catalog refresh failed, serving stale data", error=str(e))
+
+    def stats(self) -> Dict[str, Any]:
+        """Size, staleness and hit rate for health reporting"""
+        total = self.hits + self.misses
+        staleness = self.staleness_seconds()
+        return {
+            'size': len(self._items),
+            'expired_pending': self.expired_count(),
+            'loaded': self.is_loaded,
+            'staleness_seconds': round(staleness, 1) if self.is_loaded else None,
+            'last_update_age_seconds': round(time.time() - self._updated_at, 1) if self._updated_at else None,
+            'loads': self.loads,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+# Global catalog instance
+opportunity_catalog = OpportunityCatalog(
+    refresh_interval_seconds=settings.opportunity_catalog_refresh_seconds
+)
@@ -0,0 +1,216 @@
+"""
+Page Readiness
+Decides when a Hunter Drone page has finished rendering, instead of waiting
+for networkidle and then sleeping a fixed 2 s on every site.
+
+  1. Known selector: each domain's listing-item selector is learned on
+     earlier visits (the most repeated element that carries a link) and
+     stored with the domain's profile. The drone waits for it to appear.
+  2. DOM quiescence: a MutationObserver, installed as a context init
+     script, timestamps every DOM change; the page is ready once it has
+     been quiet for quiet_ms (shorter when the known selector matched).
+  3. Infinite scroll: scroll to the bottom, wait for quiescence again, and
+     repeat until neither page height nor item count grows.
+
+Profiles are kept in a small JSON file (CRAWLER_READINESS_PATH). Setting
+"pinned": true on a domain's entry keeps a hand-written selector from being
+relearned.
+"""
+import json
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+import structlog
+
+from app.services.crawl_politeness import domain_of
+
+logger = structlog.get_logger()
+
+
+# Installed with context.add_init_script, so it observes from document start
+MUTATION_OBSERVER_SCRIPT = """
+(() => {
+    if (window.__ssReadiness) return;
+    const state = window.__ssReadiness = { last: performance.now(), mutations: 0 };
+    new MutationObserver((records) => {
+        state.last = performance.now();
+        state.mutations += records.length;
+    }).observe(document, { childList: true, subtree: true, characterData: true });
+})();
+"""
+
+_QUIET_FOR = """
+(quietMs) => {
+    const state = window.__ssReadiness;
+    return !state || performance.now() - state.last >= quietMs;
+}
+"""
+
+_MEASURE = """
+(selector) => ({
+    height: document.body ? document.body.scrollHeight : 0,
+    items: selector ? document.querySelectorAll(selector).length
+                    : (document.body ? document.body.getElementsByTagName('*').length : 0)
+})
+"""
+
+# Most repeated tag.class among elements that carry a link: the listing item
+_LEARN_SELECTOR = """
+(minRepeats) => {
+    const counts = new Map();
+    for (const el of document.querySelectorAll('body *')) {
+        if (typeof el.className !== 'string' || !el.className.trim()) continue;
+        if (!el.querySelector('a[href]') && !(el.tagName === 'A' && el.hasAttribute('href'))) continue;
+        const sig = el.tagName.toLowerCase() + '.' + CSS.escape(el.className.trim().split(/\\s+/)[0]);
+        counts.set(sig, (counts.get(sig) || 0) + 1);
+    }
+    let best = null, bestCount = 0;
+    for (const [sig, n] of counts) {
+        if (n > bestCount) { best = sig; bestCount = n; }
+    }
+    return bestCount >= minRepeats ? { selector: best, count: bestCount } : null;
+}
+"""
+
+
+@dataclass
+class DomainProfile:
+    """What a domain's pages look like once rendered"""
+    selector: Optional[str] = None
+    item_count: int = 0
+    settle_ms: float = 0.0
+    scroll_rounds: float = 0.0
+    visits: int = 0
+    pinned: bool = False
+
+
+@dataclass
+class ReadinessReport:
+    strategy: str
+    elapsed_ms: float
+    scrolls: int = 0
+    items: int = 0
+    selector: Optional[str] = None
+
+
+class ReadinessStore:
+    """Per-domain profiles, persisted as JSON"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.profiles: Dict[str, DomainProfile] = {}
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    raw = json.load(f)
+                self.profiles = {domain: DomainProfile(**entry) for domain, entry in raw.items()}
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning("Readiness profiles unreadable, starting fresh", path=path, error=str(e))
+
+    def get(self, domain: str) -> DomainProfile:
+        return self.profiles.setdefault(domain, DomainProfile())
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def save(self):
+        if not self.path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({domain: asdict(p) for domain, p in self.profiles.items()}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+
+class PageReadiness:
+    """Waits until a page is rendered, using and refining its domain's profile"""
+
+    def __init__(
+        self,
+        store: ReadinessStore,
+        quiet_ms: int = 800,
+        known_quiet_ms: int = 300,
+        max_wait_ms: int = 10000,
+        max_scrolls: int = 8,
+        min_repeats: int = 5
+    ):
+        self.store = store
+        self.quiet_ms = quiet_ms
+        self.known_quiet_ms = known_quiet_ms
+        self.max_wait_ms = max_wait_ms
+        self.max_scrolls = max_scrolls
+        self.min_repeats = min_repeats
+
+    async def wait_until_ready(self, page, url: str) -> ReadinessReport:
+        started = time.monotonic()
+        domain = domain_of(url)
+        profile = self.store.get(domain)
+
+        strategy = "quiescence"
+        quiet_ms = self.quiet_ms
+        if profile.selector:
+            # Expect the items within a few times the domain's usual settle time
+            timeout = min(self.max_wait_ms, max(2000, 3 * profile.settle_ms))
+            try:
+                await page.wait_for_selector(profile.selector, state="attached", timeout=timeout)
+                strategy = "selector"
+                # Items still streaming in: keep the full quiet window
+                seen = await page.evaluate(_MEASURE, profile.selector)
+                if seen["items"] * 2 >= profile.item_count:
+                    quiet_ms = self.known_quiet_ms
+            except Exception:
+                strategy = "selector-missed"
+
+        await self._wait_quiet(page, quiet_ms, self.max_wait_ms - (time.monotonic() - started) * 1000)
+        scrolls, items = await self._scroll_until_exhausted(page, profile.selector)
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        await self._learn(page, profile, elapsed_ms, scrolls)
+        return ReadinessReport(strategy, round(elapsed_ms), scrolls, items, profile.selector)
+
+    async def _wait_quiet(self, page, quiet_ms: int, timeout_ms: float) -> bool:
+        """True once the DOM has not changed for quiet_ms; False on timeout"""
+        if timeout_ms <= 0:
+            return False
+        try:
+            await page.wait_for_function(_QUIET_FOR, arg=quiet_ms, polling=100, timeout=timeout_ms)
+            return True
+        except Exception:
+            return False
+
+    async def _scroll_until_exhausted(self, page, selector: Optional[str]):
+        """Scroll while new content keeps arriving; returns (scrolls, items)"""
+        before = await page.evaluate(_MEASURE, selector)
+        scrolls = 0
+        while scrolls < self.max_scrolls:
+            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+            scrolls += 1
+            await self._wait_quiet(page, self.known_quiet_ms, 3000)
+            after = await page.evaluate(_MEASURE, selector)
+            if after["height"] <= before["height"] and after["items"] <= before["items"]:
+                break
+            before = after
+        return scrolls, before["items"]
+
+    async def _learn(self, page, profile: DomainProfile, elapsed_ms: float, scrolls: int):
+        profile.visits += 1
+        # Exponential averages: recent visits count most, one outlier does not dominate
+        weight = 1.0 if profile.visits == 1 else 0.3
+        profile.settle_ms += weight * (elapsed_ms - profile.settle_ms)
+        profile.scroll_rounds += weight * (scrolls - profile.scroll_rounds)
+
+        if not profile.pinned:
+            try:
+                found = await page.evaluate(_LEARN_SELECTOR, self.min_repeats)
+            except Exception:
+                found = None
+            if found:
+                if found["selector"] != profile.selector:
+                    logger.info("Learned readiness selector", selector=found["selector"], items=found["count"])
+                profile.selector = found["selector"]
+                profile.item_count = found["count"]
+        self.store.mark_dirty()
@@ -2,16 +2,97 @@
 Personalization Engine - Deep matching based on user interests and passions
 Transforms ScholarStream from generic to highly personalized
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, FrozenSet, Iterable, Optional, Tuple
+from collections import OrderedDict
+import re
 import structlog
 
 logger = structlog.get_logger()
 
 
+class KeywordMatcher:
+    """
+    Multi-keyword substring matcher compiled into a single regex.
+
+    The keywords are folded into a trie-shaped pattern inside a lookahead, so
+    one C-level scan reports the longest keyword starting at every position.
+    Any other keyword starting at that position is necessarily a prefix of
+    that longest one, so a precomputed prefix table recovers the full set.
+    The result is exactly {k for k in keywords if k in text}.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: FrozenSet[str] = frozenset(k.lower() for k in keywords if k)
+        self._prefixes = {
+            kw: frozenset(other for other in self.keywords if kw.startswith(other))
+            for kw in self.keywords
+        }
+
+        trie: Dict[str, Any] = {}
+        for kw in self.keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        # Not cached here: each text is scanned once per content version, when
+        # PersonalizationEngine builds (and caches) its OpportunityFeatures
+        self._pattern = re.compile('(?=(' + self._trie_to_regex(trie) + '))') if self.keywords else None
+
+    def _trie_to_regex(self, node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + self._trie_to_regex(child) for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional: prefer the longer keyword, fall back to the one ending here
+        return '(?:' + body + ')?' if '' in node else body
+
+    def match(self, text: str) -> FrozenSet[str]:
+        """Every keyword occurring in (already lowercased) text"""
+        if self._pattern is None:
+            return frozenset()
+        longest = {m.group(1) for m in self._pattern.finditer(text)}
+        found = set()
+        for kw in longest:
+            found |= self._prefixes[kw]
+        return frozenset(found)
+
+
+class OpportunityFeatures:
+    """
+    Score-ready view of one opportunity, built once per content version.
+
+    Holds the lowercased searchable text, its keyword scan, token set and the
+    eligibility fields, so scoring many users against the same opportunity
+    never rebuilds or re-lowercases strings. Reads through to the source dict
+    via get() so it can stand in for the opportunity where one is expected.
+    """
+
+    __slots__ = ('key', 'source', 'text', 'matched_keywords', 'tokens', 'eligibility')
+
+    _TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+    def __init__(self, key: Optional[Tuple], source: Dict[str, Any], text: str,
+                 matched_keywords: FrozenSet[str], eligibility: Dict[str, Any]):
+        self.key = key
+        self.source = source
+        self.text = text
+        self.matched_keywords = matched_keywords
+        self.tokens: FrozenSet[str] = frozenset(self._TOKEN_RE.findall(text))
+        self.eligibility = eligibility
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.source.get(key, default)
+
+
 class PersonalizationEngine:
     """Advanced personalization using interests, passions, and behavior"""
     
-    def __init__(self):
+    # Bump whenever scoring weights or rules change: persisted match scores
+    # tagged with another version are recomputed on the next read
+    ALGORITHM_VERSION = "personalization-v1"
+    
+    def __init__(self, feature_cache_size: int = 10000):
         # Interest-to-keyword mapping for intelligent matching
         self.interest_keywords = {
             'artificial intelligence': ['AI', 'machine learning', 'deep learning', 'neural networks', 'NLP', 'computer vision', 'GPT', 'LLM'],
@@ -35,6 +116,96 @@ class PersonalizationEngine:
             'hackathons': ['hackathon', 'hack', 'build', 'competition'],
             'software': ['software', 'engineering', 'developer', 'SaaS'],
         }
+        
+        # Compile every table keyword once; one scan per opportunity text
+        # then answers all interest checks for every user
+        self._interest_keywords_lower = {
+            interest: [kw.lower() for kw in keywords]
+            for interest, keywords in self.interest_keywords.items()
+        }
+        self.keyword_matcher = KeywordMatcher(
+            kw for keywords in self._interest_keywords_lower.values() for kw in keywords
+        )
+
+        # Opportunity features keyed by (id, content hash); 0 disables caching
+        self.feature_cache_size = feature_cache_size
+        self._feature_cache: "OrderedDict[Tuple, OpportunityFeatures]" = OrderedDict()
+
+    def get_features(self, opp: Any, cache_key: Optional[Tuple] = None) -> OpportunityFeatures:
+        """
+        Return the precomputed features for an opportunity dict.
+
+        Call once at ingest and pass the result to calculate_personalized_score
+        for every user. Plain dicts are also looked up here on each scoring call,
+        so unchanged opportunities hit the cache either way. Callers that can
+        derive a cheaper key from their own objects may pass cache_key.
+        """
+        if isinstance(opp, OpportunityFeatures):
+            return opp
+
+        key = cache_key if cache_key is not None else self._feature_key(opp)
+        if key is not None:
+            cached = self.lookup_features(key)
+            if cached is not None:
+                return cached
+
+        text = self._get_opportunity_text(opp).lower()
+        features = OpportunityFeatures(
+            key=key,
+            source=opp,
+            text=text,
+            matched_keywords=self.keyword_matcher.match(text),
+            eligibility=self._safe_get_dict(opp, 'eligibility'),
+        )
+
+        if key is not None and self.feature_cache_size > 0:
+            self._feature_cache[key] = features
+            if len(self._feature_cache) > self.feature_cache_size:
+                self._feature_cache.popitem(last=False)
+        return features
+
+    def lookup_features(self, cache_key: Tuple) -> Optional[OpportunityFeatures]:
+        """Cached features for a caller-supplied key, or None on a miss"""
+        features = self._feature_cache.get(cache_key)
+        if features is not None:
+            self._feature_cache.move_to_end(cache_key)
+        return features
+
+    def _feature_key(self, opp: Dict[str, Any]) -> Optional[Tuple]:
+        """(id, hash of every field the scorers read); None if unhashable"""
+        eligibility = self._safe_get_dict(opp, 'eligibility')
+        requirements = self._safe_get_dict(opp, 'requirements')
+        try:
+            content = hash((
+                opp.get('name', ''),
+                opp.get('description', ''),
+                opp.get('organization', ''),
+                tuple(opp.get('tags', [])),
+                tuple(requirements.get('skills_needed', []) or ()),
+                eligibility.get('gpa_min'),
+                self._freeze(eligibility.get('majors')),
+                self._freeze(eligibility.get('backgrounds', [])),
+                self._freeze(eligibility.get('grade_levels', [])),
+                self._freeze(eligibility.get('grades_eligible', [])),
+            ))
+        except TypeError:
+            return None
+        return (opp.get('id'), content)
+
+    @staticmethod
+    def _freeze(value: Any) -> Any:
+        return tuple(value) if isinstance(value, list) else value
+
+    def _eligibility(self, opp: Any) -> Dict[str, Any]:
+        if isinstance(opp, OpportunityFeatures):
+            return opp.eligibility
+        return self._safe_get_dict(opp, 'eligibility')
+    
+    def _text_contains(self, opp_text: str, matched: FrozenSet[str], phrase: str) -> bool:
+        """Substring test that reuses the precompiled scan for table keywords"""
+        if phrase in self.keyword_matcher.keywords:
+            return phrase in matched
+        return phrase in opp_text
     
     def _get_attr(self, obj: Any, attr: str, default: Any = None) -> Any:
         """Helper to get attribute from object or key from dict"""
@@ -57,6 +228,8 @@ class PersonalizationEngine:
         """
         Calculate personalized match score (0-100)
         Considers interests, passions, skills, and demographics
+        
+        Accepts an opportunity dict or the OpportunityFeatures from get_features
         """
         score = 0.0
         max_score = 100.0
@@ -95,6 +268,26 @@ class PersonalizationEngine:
         # to avoid showing "0% Match" for new users with empty profiles.
         return max(min(score, max_score), 30.0)
     
+    def score_profiles(self, opportunity: Any, profiles: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Score one opportunity against many profiles in a single call.
+        Features are built once; profiles that fail to score are logged and
+        left out of the result.
+        """
+        features = self.get_features(opportunity)
+        scores: Dict[str, float] = {}
+        for key, profile in profiles.items():
+            try:
+                scores[key] = self.calculate_personalized_score(features, profile)
+            except Exception as e:
+                logger.error(
+                    "Match calculation failed",
+                    profile_key=key,
+                    profile_type=type(profile).__name__,
+                    error=str(e)
+                )
+        return scores
+    
     def _score_interests(self, opp: Dict[str, Any], profile: Any) -> float:
         """Score based on user interests (0-100)"""
         interests = self._get_attr(profile, 'interests') or []
@@ -103,27 +296,24 @@ class PersonalizationEngine:
             return 50.0  # Neutral score if no interests
         
         user_interests = [str(i).lower() for i in interests]
-        opp_text = self._get_opportunity_text(opp).lower()
-        
-    def _score_interests(self, opp: Dict[str, Any], profile: Any) -> float:
-        """Score based on user interests (0-100)"""
-        interests = self._get_attr(profile, 'interests') or []
-        
-        if not interests:
-            return 50.0  # Neutral score if no interests
-        
-        user_interests = [str(i).lower() for i in interests]
-        opp_text = self._get_opportunity_text(opp).lower()
+        features = self.get_features(opp)
+        opp_text = features.text
+        matched_keywords = features.matched_keywords
         
         satisfied_interests = 0
         matched_details = []
         
         for interest in user_interests:
             # Get keywords for this interest
-            keywords = self.interest_keywords.get(interest, [interest])
+            keywords = self._interest_keywords_lower.get(interest)
             
             # Check if ANY keyword matches (Interest Satisfied)
-            if any(keyword.lower() in opp_text for keyword in keywords):
+            if keywords is not None:
+                satisfied = any(keyword in matched_keywords for keyword in keywords)
+            else:
+                satisfied = interest in opp_text
+            
+            if satisfied:
                 satisfied_interests += 1
                 matched_details.append(interest)
         
@@ -154,12 +344,14 @@ class PersonalizationEngine:
         if not background:
             return 50.0
         
-        opp_text = self._get_opportunity_text(opp).lower()
+        features = self.get_features(opp)
+        opp_text = features.text
+        matched_keywords = features.matched_keywords
         
         # Check for passion matches
         passion_matches = 0
         for passion in background:
-            if isinstance(passion, str) and passion.lower() in opp_text:
+            if isinstance(passion, str) and self._text_contains(opp_text, matched_keywords, passion.lower()):
                 passion_matches += 1
         
         if len(background) == 0:
@@ -173,7 +365,7 @@ class PersonalizationEngine:
         score = 0.0
         checks = 0
         
-        eligibility = self._safe_get_dict(opp, 'eligibility')
+        eligibility = self._eligibility(opp)
         
         # GPA check
         gpa_min = eligibility.get('gpa_min')
@@ -218,7 +410,7 @@ class PersonalizationEngine:
         academic_status = self._get_attr(profile, 'academic_status')
         
         if academic_status:
-            eligibility = self._safe_get_dict(opp, 'eligibility')
+            eligibility = self._eligibility(opp)
             grade_levels = eligibility.get('grade_levels', []) or eligibility.get('grades_eligible', [])
             
             if academic_status in grade_levels:
@@ -0,0 +1,186 @@
+"""
+WebSocket Presence Registry
+Records which node (API process or pod) holds each user's WebSocket, and
+which nodes are alive, so the real-time tier can run as several replicas.
+
+PresenceRegistry keeps everything in process memory: it is the single-node
+default and a local stand-in for tests. RedisPresenceRegistry shares the same
+state across nodes through Upstash Redis.
+"""
+import os
+import socket
+import time
+from typing import Dict, Iterable, Optional
+import structlog
+
+from app.config import settings
+
+logger = structlog.get_logger()
+
+
+def default_node_id() -> str:
+    """Unique per process, so uvicorn workers on one host are distinct nodes"""
+    return settings.ws_node_id or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class PresenceRegistry:
+    """
+    user_id -> node_id, plus a heartbeat per node.
+
+    A node that stops heartbeating for ttl_seconds counts as dead, and its
+    users as offline, even if it never got to unregister them.
+    """
+
+    # Whether other nodes see this registry's state
+    shared = False
+
+    def __init__(self, ttl_seconds: int = 90):
+        self.ttl_seconds = ttl_seconds
+        self._users: Dict[str, str] = {}
+        self._nodes: Dict[str, tuple] = {}  # node_id -> (expires_at, connections)
+
+    async def register(self, user_id: str, node_id: str, connections: Optional[int] = None):
+        """
+        Record the user's node. connections, when given, is the node's new
+        connection count, so totals reflect the connect before the next heartbeat.
+        """
+        self._users[user_id] = node_id
+        if connections is not None:
+            self._nodes[node_id] = (time.time() + self.ttl_seconds, connections)
+
+    async def unregister(self, user_id: str, node_id: str):
+        """Remove the user's entry, unless another node has since taken it over"""
+        if self._users.get(user_id) == node_id:
+            del self._users[user_id]
+
+    async def heartbeat(self, node_id: str, user_ids: Iterable[str]):
+        """Mark the node alive and re-assert ownership of its users"""
+        user_ids = list(user_ids)
+        for user_id in user_ids:
+            self._users[user_id] = node_id
+        self._nodes[node_id] = (time.time() + self.ttl_seconds, len(user_ids))
+
+    async def remove_node(self, node_id: str):
+        self._nodes.pop(node_id, None)
+        for user_id in [u for u, n in self._users.items() if n == node_id]:
+            del self._users[user_id]
+
+    async def locate(self, user_id: str) -> Optional[str]:
+        """Node currently holding the user's socket, or None if offline"""
+        node_id = self._users.get(user_id)
+        if node_id is None or node_id not in await self.nodes():
+            return None
+        return node_id
+
+    async def nodes(self) -> Dict[str, int]:
+        """Live nodes and their connection counts"""
+        now = time.time()
+        for node_id in [n for n, (expires_at, _) in self._nodes.items() if expires_at <= now]:
+            del self._nodes[node_id]
+        return {node_id: connections for node_id, (_, connections) in self._nodes.items()}
+
+    async def total_connections(self) -> int:
+        return sum((await self.nodes()).values())
+
+
+class RedisPresenceRegistry(PresenceRegistry):
+    """
+    Presence shared through Redis.
+
+    Keys:
+      ws:presence:user:{user_id}  -> node_id
+      ws:presence:node:{node_id}  -> connection count, expires after ttl_seconds
+      ws:presence:nodes           set of node IDs that have heartbeated
+    """
+
+    shared = True
+
+    USER_KEY = "ws:presence:user:{}"
+    NODE_KEY = "ws:presence:node:{}"
+    NODES_KEY = "ws:presence:nodes"
+
+    # User keys outlive a crashed node only until this safety expiry;
+    # before then locate() already reports them offline via the node key
+    USER_KEY_TTL = 24 * 3600
+
+    # Commands per pipelined request when re-asserting a node's users
+    HEARTBEAT_CHUNK = 500
+
+    def __init__(self, url: str, token: str, ttl_seconds: int = 90):
+        super().__init__(ttl_seconds)
+        from upstash_redis.asyncio import Redis
+        self.redis = Redis(url=url, token=token)
+
+    async def register(self, user_id: str, node_id: str, connections: Optional[int] = None):
+        if connections is None:
+            await self.redis.set(self.USER_KEY.format(user_id), node_id, ex=self.USER_KEY_TTL)
+            return
+        pipeline = self.redis.pipeline()
+        pipeline.set(self.USER_KEY.format(user_id), node_id, ex=self.USER_KEY_TTL)
+        pipeline.sadd(self.NODES_KEY, node_id)
+        pipeline.set(self.NODE_KEY.format(node_id), str(connections), ex=self.ttl_seconds)
+        await pipeline.exec()
+
+    async def unregister(self, user_id: str, node_id: str):
+        key = self.USER_KEY.format(user_id)
+        if await self.redis.get(key) == node_id:
+            await self.redis.delete(key)
+
+    async def heartbeat(self, node_id: str, user_ids: Iterable[str]):
+        """One pipelined HTTP request per HEARTBEAT_CHUNK users, not one per user"""
+        user_ids = list(user_ids)
+        pipeline = self.redis.pipeline()
+        pipeline.sadd(self.NODES_KEY, node_id)
+        pipeline.set(self.NODE_KEY.format(node_id), str(len(user_ids)), ex=self.ttl_seconds)
+        queued = 2
+        for user_id in user_ids:
+            pipeline.set(self.USER_KEY.format(user_id), node_id, ex=self.USER_KEY_TTL)
+            queued += 1
+            if queued >= self.HEARTBEAT_CHUNK:
+                await pipeline.exec()
+                pipeline = self.redis.pipeline()
+                queued = 0
+        if queued:
+            await pipeline.exec()
+
+    async def remove_node(self, node_id: str):
+        await self.redis.delete(self.NODE_KEY.format(node_id))
+        await self.redis.srem(self.NODES_KEY, node_id)
+
+    async def locate(self, user_id: str) -> Optional[str]:
+        node_id = await self.redis.get(self.USER_KEY.format(user_id))
+        if node_id is None or await self.redis.get(self.NODE_KEY.format(node_id)) is None:
+            return None
+        return node_id
+
+    async def nodes(self) -> Dict[str, int]:
+        node_ids = sorted(await self.redis.smembers(self.NODES_KEY))
+        if not node_ids:
+            return {}
+
+        counts = await self.redis.mget(*[self.NODE_KEY.format(n) for n in node_ids])
+        live = {}
+        dead = []
+        for node_id, count in zip(node_ids, counts):
+            if count is None:
+                dead.append(node_id)
+            else:
+                live[node_id] = int(count)
+
+        if dead:
+            await self.redis.srem(self.NODES_KEY, *dead)
+        return live
+
+
+def create_presence_registry() -> PresenceRegistry:
+    """Redis-backed in cluster mode when Upstash is configured, otherwise in-process"""
+    ttl = settings.ws_presence_ttl_seconds
+    if settings.ws_cluster_mode:
+        if settings.upstash_redis_rest_url and settings.upstash_redis_rest_token:
+            try:
+                return RedisPresenceRegistry(settings.upstash_redis_rest_url, settings.upstash_redis_rest_token, ttl)
+            except Exception as e:
+                logger.error("Redis presence registry unavailable, using in-process registry", error=str(e))
+        else:
+            logger.warning("WS cluster mode without Upstash Redis - presence is per-process only")
+    return PresenceRegistry(ttl)
@@ -0,0 +1,157 @@
+"""
+Profile Index
+Live inverted index from opportunity features to connected user IDs, so a
+streamed opportunity is only scored against users it could plausibly match.
+"""
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+import structlog
+
+from app.services.personalization_engine import KeywordMatcher, PersonalizationEngine
+
+logger = structlog.get_logger()
+
+Key = Tuple[str, Hashable]
+
+
+class ProfileIndex:
+    """
+    Postings from features to user IDs, maintained on connect, disconnect and
+    profile updates.
+
+    Keys mirror what PersonalizationEngine actually compares:
+      ('kw', keyword)   interest/passion that resolves to table keywords
+      ('text', phrase)  free-text interest/passion, tested as a substring
+      ('major', major), ('grade', academic_status), ('geo', country/state/city)
+
+    Free-text phrases live in their own map; a KeywordMatcher compiled over
+    them finds every phrase in an opportunity's text in one scan. It is
+    rebuilt lazily, only after the set of distinct phrases changes.
+
+    Interests and passions carry 70% of the score, so a user sharing none of
+    them with an opportunity cannot reach the push threshold - unless their
+    interests and background are both empty, in which case neutral defaults
+    plus demographics can. Those users are kept in a small always-scored
+    baseline set so routing stays exact.
+    """
+
+    def __init__(self, engine: PersonalizationEngine):
+        self.engine = engine
+        self._postings: Dict[Key, Set[str]] = {}
+        self._phrases: Dict[str, Set[str]] = {}
+        self._phrase_matcher: Optional[KeywordMatcher] = None
+        self._user_keys: Dict[str, Set[Key]] = {}
+        self._baseline: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._user_keys)
+
+    def add(self, user_id: str, profile: Any):
+        """Index (or re-index) a user's profile"""
+        self.remove(user_id)
+
+        keys, has_signal = self._profile_keys(profile)
+        self._user_keys[user_id] = keys
+        for key in keys:
+            if key[0] == 'text':
+                if key[1] not in self._phrases:
+                    self._phrase_matcher = None
+                self._phrases.setdefault(key[1], set()).add(user_id)
+            else:
+                self._postings.setdefault(key, set()).add(user_id)
+        if not has_signal:
+            self._baseline.add(user_id)
+
+    def remove(self, user_id: str):
+        for key in self._user_keys.pop(user_id, ()):
+            postings, term = (self._phrases, key[1]) if key[0] == 'text' else (self._postings, key)
+            users = postings.get(term)
+            if users is not None:
+                users.discard(user_id)
+                if not users:
+                    del postings[term]
+                    if postings is self._phrases:
+                        self._phrase_matcher = None
+        self._baseline.discard(user_id)
+
+    def candidates(self, opportunity: Any) -> Set[str]:
+        """Users sharing at least one feature with the opportunity, plus the baseline set"""
+        features = self.engine.get_features(opportunity)
+        found = set(self._baseline)
+
+        for key in self._opportunity_keys(features):
+            users = self._postings.get(key)
+            if users:
+                found |= users
+
+        # Free-text phrases are substring tests: one scan of the text finds
+        # every phrase it contains ('' is contained in any text)
+        for phrase in self._text_matcher().match(features.text):
+            found |= self._phrases[phrase]
+        if '' in self._phrases:
+            found |= self._phrases['']
+
+        return found
+
+    def _text_matcher(self) -> KeywordMatcher:
+        if self._phrase_matcher is None:
+            self._phrase_matcher = KeywordMatcher(self._phrases)
+        return self._phrase_matcher
+
+    def _profile_keys(self, profile: Any) -> Tuple[Set[Key], bool]:
+        get = self.engine._get_attr
+        keys: Set[Key] = set()
+
+        interests = get(profile, 'interests') or []
+        for interest in interests:
+            phrase = str(interest).lower()
+            table_keywords = self.engine._interest_keywords_lower.get(phrase)
+            if table_keywords is not None:
+                keys.update(('kw', kw) for kw in table_keywords)
+            else:
+                keys.add(('text', phrase))
+
+        background = get(profile, 'background') or []
+        for passion in background:
+            if isinstance(passion, str):
+                phrase = passion.lower()
+                keys.add(('kw', phrase) if phrase in self.engine.keyword_matcher.keywords else ('text', phrase))
+
+        major = get(profile, 'major')
+        if isinstance(major, str) and major:
+            keys.add(('major', major.lower()))
+
+        academic_status = get(profile, 'academic_status')
+        if isinstance(academic_status, str) and academic_status:
+            keys.add(('grade', academic_status.lower()))
+
+        for field in ('country', 'state', 'city'):
+            value = get(profile, field)
+            if isinstance(value, str) and value:
+                keys.add(('geo', value.lower()))
+
+        return keys, bool(interests or background)
+
+    def _opportunity_keys(self, features: Any) -> Iterable[Key]:
+        for kw in features.matched_keywords:
+            yield ('kw', kw)
+
+        eligibility = features.eligibility
+        for major in eligibility.get('majors') or []:
+            if isinstance(major, str):
+                yield ('major', major.lower())
+
+        for level in eligibility.get('grade_levels', []) or eligibility.get('grades_eligible', []) or []:
+            if isinstance(level, str):
+                yield ('grade', level.lower())
+
+        for tag in features.get('geo_tags') or []:
+            if isinstance(tag, str):
+                yield ('geo', tag.lower())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'users': len(self._user_keys),
+            'keys': len(self._postings),
+            'phrases': len(self._phrases),
+            'baseline_users': len(self._baseline),
+        }
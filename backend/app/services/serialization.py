@@ -0,0 +1,199 @@
+"""
+Stream Serialization
+One JSON codec for every Kafka producer and consumer: orjson when
+installed, then msgspec, then the stdlib. All three read and write the same
+JSON, so producers and consumers can be upgraded independently.
+
+Also defines the canonical enriched-opportunity envelope. The opportunity
+always sits in 'enriched_data' as a JSON object, never as a JSON string, so
+consumers decode it in a single pass.
+
+On the wire a message is either JSON or msgpack, and says which through its
+content-type header (no header means JSON). In msgpack messages the vector
+fields registered for the message's schema travel as packed little-endian
+float32 bytes instead of number arrays.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional speedup
+    msgspec = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional binary wire format
+    msgpack = None
+
+
+if orjson is not None:
+    CODEC = "orjson"
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError
+    DecodeError = (ValueError,)
+
+elif msgspec is not None:
+    CODEC = "msgspec"
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any) -> bytes:
+        return _encoder.encode(obj)
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return _decoder.decode(data)
+
+    DecodeError = (ValueError, msgspec.DecodeError)
+
+else:
+    CODEC = "json"
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    DecodeError = (ValueError,)
+
+
+# Marks messages built by build_envelope(); consumers skip legacy unwrapping
+ENVELOPE_SCHEMA = "opportunity.enriched/1"
+
+
+def build_envelope(opportunity: Any, source: Any, **metadata) -> Dict[str, Any]:
+    """
+    Wrap an enriched opportunity for TOPIC_OPPORTUNITY_ENRICHED.
+
+    A double-encoded opportunity (a JSON string) is decoded here, once, at
+    the producer, so every consumer gets a plain object.
+    """
+    for _ in range(4):
+        if not isinstance(opportunity, (str, bytes)):
+            break
+        try:
+            opportunity = loads(opportunity)
+        except DecodeError:
+            break
+
+    return {
+        'schema': ENVELOPE_SCHEMA,
+        'source': source,
+        'enriched_data': opportunity,
+        **metadata,
+    }
+
+
+def read_envelope(message: Any) -> Optional[Dict[str, Any]]:
+    """The opportunity from a canonical envelope, or None if message is not one"""
+    if isinstance(message, dict) and message.get('schema') == ENVELOPE_SCHEMA:
+        data = message.get('enriched_data')
+        if isinstance(data, dict):
+            if isinstance(message.get('source'), dict):
+                data.setdefault('source_metadata', message['source'])
+            return data
+    return None
+
+
+# --- Wire formats -----------------------------------------------------------
+
+CONTENT_TYPE_HEADER = "content-type"
+SCHEMA_HEADER = "schema"
+
+FORMAT_JSON = "application/json"
+FORMAT_MSGPACK = "application/x-msgpack"
+
+WIRE_FORMATS = {"json": FORMAT_JSON, "msgpack": FORMAT_MSGPACK}
+
+# Local schema registry: per schema, the enriched_data fields that are
+# float vectors and travel packed in binary formats
+SCHEMA_REGISTRY: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    ENVELOPE_SCHEMA: {'vector_fields': ('embedding',)},
+}
+
+Headers = Optional[Iterable[Tuple[str, Any]]]
+
+
+def resolve_format(wire_format: Optional[str]) -> str:
+    """Content type for a configured format name; msgpack degrades to JSON if not installed"""
+    content_type = WIRE_FORMATS.get((wire_format or "json").lower(), FORMAT_JSON)
+    if content_type == FORMAT_MSGPACK and msgpack is None:
+        return FORMAT_JSON
+    return content_type
+
+
+def encode_message(value: Any, wire_format: Optional[str] = None) -> Tuple[bytes, List[Tuple[str, bytes]]]:
+    """Serialize a Kafka message value; returns (payload, headers)"""
+    content_type = resolve_format(wire_format)
+    headers = [(CONTENT_TYPE_HEADER, content_type.encode())]
+
+    schema = value.get('schema') if isinstance(value, dict) else None
+    if schema:
+        headers.append((SCHEMA_HEADER, str(schema).encode()))
+
+    if content_type == FORMAT_MSGPACK:
+        return msgpack.packb(_pack_vectors(value, schema), use_bin_type=True), headers
+    return dumps(value), headers
+
+
+def decode_message(payload: bytes, headers: Headers = None) -> Any:
+    """Deserialize a Kafka message value using its content-type header"""
+    content_type = header_value(headers, CONTENT_TYPE_HEADER)
+    if content_type == FORMAT_MSGPACK:
+        if msgpack is None:
+            raise ValueError("msgpack message received but msgpack is not installed")
+        try:
+            value = msgpack.unpackb(payload, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack payload: {e}") from e
+        return _unpack_vectors(value)
+    return loads(payload)
+
+
+def header_value(headers: Headers, name: str) -> Optional[str]:
+    for key, value in headers or ():
+        if key == name and value is not None:
+            return value.decode() if isinstance(value, bytes) else str(value)
+    return None
+
+
+def _vector_fields(schema: Optional[str]) -> Tuple[str, ...]:
+    return SCHEMA_REGISTRY.get(schema, {}).get('vector_fields', ())
+
+
+def _pack_vectors(value: Any, schema: Optional[str]) -> Any:
+    fields = _vector_fields(schema)
+    data = value.get('enriched_data') if fields else None
+    if not isinstance(data, dict) or not any(isinstance(data.get(f), list) for f in fields):
+        return value
+
+    data = dict(data)
+    for field in fields:
+        if isinstance(data.get(field), list):
+            data[field] = np.asarray(data[field], dtype='<f4').tobytes()
+    return {**value, 'enriched_data': data}
+
+
+def _unpack_vectors(value: Any) -> Any:
+    if not isinstance(value, dict):
+        return value
+    data = value.get('enriched_data')
+    if isinstance(data, dict):
+        for field in _vector_fields(value.get('schema')):
+            if isinstance(data.get(field), bytes):
+                data[field] = np.frombuffer(data[field], dtype='<f4').tolist()
+    return value
@@ -0,0 +1,411 @@
+"""
+Site Extractors
+Deterministic extraction for the regular sites most patrol traffic comes
+from (devpost, mlh.io, kaggle, codeforces), so their pages skip Gemini.
+
+Each extractor serves a set of domains (subdomains included) and turns a
+page's raw HTML into OpportunitySchema objects using XPath rules over the
+site's markup, schema.org microdata or embedded JSON-LD. The crawler runs it
+before html_preprocessor strips the classes, attributes and scripts those
+rules need; the crawl event carries the result as 'extracted' and the
+refinery publishes it as is. Unknown domains, and pages an extractor finds
+nothing on, still go to Gemini.
+
+New site: subclass SiteExtractor, set name and domains, implement
+extract_opportunities() and register() an instance.
+"""
+import hashlib
+import json
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+import lxml.html
+import structlog
+
+from app.models import OpportunitySchema
+from app.services.crawl_politeness import domain_of
+from app.services.listing_splitter import normalize_url
+
+logger = structlog.get_logger()
+
+_SPACE = re.compile(r"\s+")
+_ORDINAL = re.compile(r"(\d)(st|nd|rd|th)\b")
+_AMOUNT = re.compile(r"([$€£])\s?(\d[\d,]*(?:\.\d+)?)\s*([kKmM])?\b")
+_RELATIVE = re.compile(r"\b(\d+|an?)\s+(minute|hour|day|week|month|year)s?\s+(?:left|to go)\b", re.IGNORECASE)
+_UTC_OFFSET = re.compile(r"UTC\s*([+-]\d{1,2})(?::(\d{2}))?\s*$")
+_DATE_FORMATS = ("%Y-%m-%d", "%b %d, %Y", "%B %d, %Y", "%b %d %Y", "%d %b %Y", "%b/%d/%Y %H:%M", "%b/%d/%Y")
+_RELATIVE_UNITS = {"minute": 60, "hour": 3600, "day": 86400, "week": 7 * 86400, "month": 30 * 86400, "year": 365 * 86400}
+
+
+def has_class(name: str) -> str:
+    """XPath predicate body matching one class of a multi-class attribute"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def text_of(element) -> str:
+    if element is None:
+        return ""
+    text = element if isinstance(element, str) else element.text_content()
+    return _SPACE.sub(" ", text or "").strip()
+
+
+def first_text(element, xpath: str) -> str:
+    found = element.xpath(xpath)
+    return text_of(found[0]) if found else ""
+
+
+def parse_amount(text: str) -> Tuple[float, Optional[str]]:
+    """Largest money amount in text, and how it was written"""
+    best, display = 0.0, None
+    for match in _AMOUNT.finditer(text or ""):
+        value = float(match.group(2).replace(",", ""))
+        value *= {"k": 1e3, "m": 1e6}.get((match.group(3) or "").lower(), 1)
+        if value > best:
+            best, display = value, match.group(0).strip()
+    return best, display
+
+
+def parse_date(text: str) -> Optional[datetime]:
+    text = _ORDINAL.sub(r"\1", _SPACE.sub(" ", text or "").strip())
+    if not text:
+        return None
+    try:
+        return datetime.fromisoformat(text.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def period_end(text: str) -> Optional[datetime]:
+    """End (last day, 23:59) of a period such as 'Nov 17 - Dec 31, 2025' or 'Sep 12 - 14, 2025'"""
+    parts = [part.strip() for part in re.split(r"\s[-–]\s", text or "") if part.strip()]
+    if not parts:
+        return None
+    end = parts[-1]
+    if len(parts) > 1 and re.fullmatch(r"\d{1,2}(st|nd|rd|th)?, \d{4}", end):
+        end = f"{parts[0].split()[0]} {end}"
+    day = parse_date(end)
+    return day.replace(hour=23, minute=59) if day else None
+
+
+def relative_deadline(text: str, now: float) -> Optional[datetime]:
+    """'16 days left' / 'a month to go' as a date, counted from now"""
+    match = _RELATIVE.search(text or "")
+    if not match:
+        return None
+    count = 1 if match.group(1).lower() in ("a", "an") else int(match.group(1))
+    return datetime.fromtimestamp(now + count * _RELATIVE_UNITS[match.group(2).lower()], tz=timezone.utc)
+
+
+def json_ld(document) -> List[Dict[str, Any]]:
+    """Every JSON-LD object on the page, @graph and list containers flattened"""
+    objects: List[Dict[str, Any]] = []
+    for script in document.xpath("//script[@type='application/ld+json']"):
+        try:
+            data = json.loads(script.text or "")
+        except ValueError:
+            continue
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(reversed(item))
+            elif isinstance(item, dict):
+                if "@graph" in item:
+                    stack.extend(reversed(item["@graph"]))
+                else:
+                    objects.append(item)
+    return objects
+
+
+def _timestamp(moment: datetime) -> int:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def build_opportunity(
+    url: str,
+    title: str,
+    *,
+    organization: Optional[str] = None,
+    amount_text: str = "",
+    deadline: Optional[datetime] = None,
+    description: Optional[str] = None,
+    type_tags: Iterable[str] = (),
+    geo_tags: Iterable[str] = (),
+    tags: Iterable[str] = (),
+    eligibility_text: Optional[str] = None,
+) -> OpportunitySchema:
+    source_url = normalize_url(url)
+    amount, amount_display = parse_amount(amount_text)
+    return OpportunitySchema(
+        # Same ID normalize_opportunity() gives an LLM-extracted opportunity
+        id=f"gen_{hashlib.md5(source_url.encode()).hexdigest()}",
+        title=title,
+        name=title,
+        organization=organization or "Unknown Organization",
+        amount=amount,
+        amount_display=amount_display or (amount_text.strip() or None),
+        deadline=deadline.strftime("%Y-%m-%d") if deadline else None,
+        deadline_timestamp=_timestamp(deadline) if deadline else None,
+        geo_tags=list(geo_tags),
+        type_tags=list(type_tags),
+        tags=list(tags),
+        source_url=source_url,
+        description=description or title,
+        eligibility_text=eligibility_text,
+    )
+
+
+class SiteExtractor:
+    """Deterministic extraction for one site; subclasses fill in the rules"""
+
+    name = "site"
+    domains: Tuple[str, ...] = ()
+
+    def extract_opportunities(self, document, url: str, now: float) -> List[OpportunitySchema]:
+        raise NotImplementedError
+
+
+class DevpostExtractor(SiteExtractor):
+    """devpost.com/hackathons tiles; single hackathon pages go to Gemini"""
+
+    name = "devpost"
+    domains = ("devpost.com",)
+
+    def extract_opportunities(self, document, url, now):
+        opportunities = []
+        for tile in document.xpath(f"//div[{has_class('hackathon-tile')}]"):
+            if tile.xpath(f"self::*[{has_class('ended')}]"):
+                continue
+            link = tile.xpath(f".//a[{has_class('tile-anchor')}]/@href") or tile.xpath(".//a/@href")
+            title = first_text(tile, ".//h3")
+            if not link or not title:
+                continue
+
+            host = (tile.xpath(f".//*[{has_class('host-label')}]/@title") or [""])[0]
+            location = first_text(tile, f".//*[{has_class('main-content')}]//*[{has_class('info')}]")
+            prize = text_of(tile.xpath(f"string(.//*[{has_class('prize')}])"))
+            participants = first_text(tile, f".//*[{has_class('participants')}]")
+            period = first_text(tile, f".//*[{has_class('submission-period')}]")
+            themes = [t for t in tile.xpath(f".//*[{has_class('theme-label')}]/@title") if t]
+            online = location.lower() == "online"
+
+            summary = "Online hackathon" if online else f"Hackathon in {location}" if location else "Hackathon"
+            if host:
+                summary += f" hosted by {host}"
+            facts = [summary] + [part for part in (prize, participants) if part]
+            if period:
+                facts.append(f"submissions {period}")
+            opportunities.append(build_opportunity(
+                urljoin(url, link[0]),
+                title,
+                organization=host or None,
+                amount_text=prize,
+                deadline=period_end(period) or relative_deadline(text_of(tile), now),
+                description=", ".join(facts) + ".",
+                type_tags=["Hackathon"],
+                geo_tags=["Global"] if online else [location] if location else [],
+                tags=themes,
+            ))
+        return opportunities
+
+
+class MlhExtractor(SiteExtractor):
+    """mlh.io season event lists: schema.org Event microdata, JSON-LD Events as fallback"""
+
+    name = "mlh"
+    domains = ("mlh.io",)
+
+    def extract_opportunities(self, document, url, now):
+        opportunities = []
+        for event in document.xpath("//*[contains(@itemtype, 'schema.org/Event')]"):
+            name = first_text(event, ".//*[@itemprop='name']")
+            start = parse_date((event.xpath(".//*[@itemprop='startDate']/@content") or [""])[0])
+            link = event.xpath("ancestor-or-self::a[1]/@href") or event.xpath(".//a/@href")
+            if not name or not link:
+                continue
+            place = ", ".join(filter(None, (
+                first_text(event, ".//*[@itemprop='city']"),
+                first_text(event, ".//*[@itemprop='state']"),
+            )))
+            mode = first_text(event, f".//*[{has_class('event-hybrid-notes')}]")
+            opportunities.append(self._event(urljoin(url, link[0]), name, start, place, mode))
+
+        if opportunities:
+            return opportunities
+
+        for item in json_ld(document):
+            if "Event" not in str(item.get("@type", "")) or not item.get("name") or not item.get("url"):
+                continue
+            start = parse_date(str(item.get("startDate") or ""))
+            location = item.get("location") or {}
+            place = location.get("name", "") if isinstance(location, dict) else str(location)
+            mode = "Digital Only" if "Online" in str(item.get("eventAttendanceMode", "")) else ""
+            opportunities.append(self._event(urljoin(url, item["url"]), item["name"], start, place, mode))
+        return opportunities
+
+    def _event(self, url, name, start, place, mode) -> OpportunitySchema:
+        online = "digital" in mode.lower() or "online" in mode.lower()
+        where = "online" if online else f"in {place}" if place else ""
+        return build_opportunity(
+            url,
+            name,
+            organization="Major League Hacking",
+            deadline=start,
+            description=f"MLH member hackathon {where}".strip() + (f" ({mode})." if mode else "."),
+            type_tags=["Hackathon"],
+            geo_tags=["Global"] if online else [place] if place else [],
+        )
+
+
+class KaggleExtractor(SiteExtractor):
+    """kaggle.com/competitions listing (rendered DOM; class names are generated, so rules key on links)"""
+
+    name = "kaggle"
+    domains = ("kaggle.com",)
+    _SLUG = re.compile(r"^/competitions/[\w-]+/?$")
+    _NON_CASH_PRIZES = ("Knowledge", "Kudos", "Swag", "Jobs")
+
+    def extract_opportunities(self, document, url, now):
+        opportunities = []
+        seen = set()
+        for anchor in document.xpath("//a[@href]"):
+            path = urlparse(urljoin(url, anchor.get("href"))).path
+            if not self._SLUG.match(path) or path in seen:
+                continue
+            card = (anchor.xpath("ancestor::li[1]") or [anchor.getparent()])[0]
+            segments = [s for s in (text_of(t) for t in card.itertext()) if s]
+            title = text_of(anchor) if 0 < len(text_of(anchor)) <= 150 else (segments[0] if segments else "")
+            if not title:
+                continue
+            seen.add(path)
+            card_text = " · ".join(segments)
+            following = segments[segments.index(title) + 1:] if title in segments else segments[1:]
+            prize = next((p for p in self._NON_CASH_PRIZES if p in segments), "")
+            amount_text = parse_amount(card_text)[1] or prize
+            opportunities.append(build_opportunity(
+                urljoin(url, path),
+                title,
+                organization="Kaggle",
+                amount_text=amount_text,
+                deadline=relative_deadline(card_text, now),
+                description=following[0] if following else title,
+                type_tags=["Competition"],
+                geo_tags=["Global"],
+            ))
+        return opportunities
+
+
+class CodeforcesExtractor(SiteExtractor):
+    """codeforces.com/contests: upcoming rows of the contests tables"""
+
+    name = "codeforces"
+    domains = ("codeforces.com",)
+
+    def extract_opportunities(self, document, url, now):
+        opportunities = []
+        for row in document.xpath("//tr[@data-contestid]"):
+            cells = row.xpath("./td")
+            time_text = first_text(row, f".//*[{has_class('format-time')}]")
+            start = parse_date(time_text)
+            if not cells or not start:
+                continue
+            # Times are shown in the viewer's zone (Moscow for anonymous visitors), e.g. <sup>UTC+3</sup>
+            offset = _UTC_OFFSET.search(first_text(row, f".//*[{has_class('format-time')}]/following-sibling::sup"))
+            if offset:
+                sign = -1 if offset.group(1).startswith("-") else 1
+                minutes = sign * (abs(int(offset.group(1))) * 60 + int(offset.group(2) or 0))
+                start = start.replace(tzinfo=timezone(timedelta(minutes=minutes)))
+            name = text_of(cells[0].text) or text_of(cells[0])
+            length = text_of(cells[3]) if len(cells) > 3 else ""
+            opportunities.append(build_opportunity(
+                f"https://codeforces.com/contests/{row.get('data-contestid')}",
+                name,
+                organization="Codeforces",
+                deadline=start,
+                description=f"{name}: {length + ' ' if length else ''}competitive programming contest starting {time_text}.",
+                type_tags=["Competition"],
+                geo_tags=["Global"],
+            ))
+        return opportunities
+
+
+_registry: Dict[str, SiteExtractor] = {}
+
+
+def register(extractor: SiteExtractor) -> SiteExtractor:
+    for domain in extractor.domains:
+        _registry[domain] = extractor
+    return extractor
+
+
+for _extractor in (DevpostExtractor(), MlhExtractor(), KaggleExtractor(), CodeforcesExtractor()):
+    register(_extractor)
+
+
+def extractor_for(url: str) -> Optional[SiteExtractor]:
+    """The extractor registered for url's domain or a parent domain of it"""
+    labels = domain_of(url).split(".")
+    for i in range(len(labels) - 1):
+        extractor = _registry.get(".".join(labels[i:]))
+        if extractor:
+            return extractor
+    return None
+
+
+@dataclass
+class SiteExtraction:
+    extractor: str
+    opportunities: List[OpportunitySchema]
+    elapsed_ms: float
+
+    def keep_mentioned_in(self, html: str):
+        """Drop opportunities whose title is not in html (a crawl delta of new listing items)"""
+        try:
+            text = text_of(lxml.html.fromstring(html))
+        except Exception:
+            return
+        self.opportunities = [opp for opp in self.opportunities if opp.title and opp.title in text]
+
+
+def extract(html: str, url: str, now: Optional[float] = None) -> Optional[SiteExtraction]:
+    """Deterministic extraction of a raw page, or None if Gemini has to read it"""
+    extractor = extractor_for(url)
+    if extractor is None or not html:
+        return None
+    start = time.perf_counter()
+    try:
+        document = lxml.html.document_fromstring(html)
+        now = time.time() if now is None else now
+        opportunities = extractor.extract_opportunities(document, url, now)
+    except Exception as e:
+        # A site redesign must never cost the page: Gemini still gets it
+        logger.warning("Site extractor failed, falling back to LLM", extractor=extractor.name, url=url, error=str(e))
+        return None
+    if not opportunities:
+        return None
+    # Listings keep past events around (codeforces' past contests table);
+    # a page of only those is still handled, with nothing to publish
+    opportunities = [o for o in opportunities if not o.deadline_timestamp or o.deadline_timestamp >= now]
+    return SiteExtraction(extractor.name, opportunities, (time.perf_counter() - start) * 1000)
+
+
+def payload_fields(extraction: Optional[SiteExtraction]) -> Dict[str, Any]:
+    """The raw-HTML event fields a site extraction contributes"""
+    if extraction is None:
+        return {"extracted": None, "extractor": None}
+    return {
+        "extracted": [opp.model_dump(mode="json") for opp in extraction.opportunities],
+        "extractor": extraction.extractor,
+    }
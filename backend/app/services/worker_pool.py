@@ -0,0 +1,127 @@
+"""
+Kafka Worker Pool
+Runs N copies of a Kafka worker as separate processes in one consumer group,
+so a stage scales past one consumer (and past one core / GIL). Kafka splits
+the topic's partitions between the processes; all messages with one key sit
+on one partition and are therefore handled by one process, in order.
+
+    python -m app.services.worker_pool enrichment --processes 4
+
+Processes beyond the topic's partition count sit idle (see
+KAFKA_DEFAULT_PARTITIONS). Set ENRICHMENT_WORKER_EMBEDDED=False on the API
+when the refinery runs here. Every child gets GEMINI_QUOTA_SHARES set to the
+process count, so the Gemini RPM/TPM quota is split between them rather than
+granted to each.
+"""
+import argparse
+import asyncio
+import importlib
+import multiprocessing
+import os
+import signal
+import time
+from typing import Dict, List, Optional
+import structlog
+
+logger = structlog.get_logger()
+
+# Worker name -> "module:attribute" of an object with async start() / stop()
+WORKERS: Dict[str, str] = {
+    'enrichment': 'app.services.enrichment_worker:enrichment_worker',
+}
+
+
+def _run_worker(target: str, index: int, quota_shares: int):
+    """Child process entry point"""
+    # Before the worker (and app.config) is imported: settings read it once
+    os.environ["GEMINI_QUOTA_SHARES"] = str(quota_shares)
+    module_name, attribute = target.split(':')
+    worker = getattr(importlib.import_module(module_name), attribute)
+    # The child process exists for this worker alone, so its shared clients are the worker's to close
+    if hasattr(worker, 'owns_producer'):
+        worker.owns_producer = True
+
+    def handle_term(signum, frame):
+        worker.stop()
+
+    signal.signal(signal.SIGTERM, handle_term)
+    logger.info("Pool worker starting", target=target, index=index)
+    asyncio.run(worker.start())
+
+
+class WorkerPool:
+    """Starts N worker processes and restarts any that exit until stopped"""
+
+    def __init__(self, target: str, processes: int, restart_delay: float = 5.0):
+        self.target = target
+        self.processes = processes
+        self.restart_delay = restart_delay
+        self.running = False
+        self.restarts = 0
+        # spawn: each child builds its own Kafka clients, never inherits sockets
+        self._context = multiprocessing.get_context('spawn')
+        self._children: List[Optional[multiprocessing.Process]] = [None] * processes
+
+    def _spawn(self, index: int):
+        child = self._context.Process(
+            target=_run_worker,
+            args=(self.target, index, self.processes),
+            name=f"worker-{index}",
+            daemon=False
+        )
+        child.start()
+        self._children[index] = child
+
+    def start(self):
+        self.running = True
+        for index in range(self.processes):
+            self._spawn(index)
+        logger.info("Worker pool started", target=self.target, processes=self.processes)
+
+    def supervise(self, poll_interval: float = 1.0):
+        """Block, restarting crashed workers, until stop()"""
+        while self.running:
+            for index, child in enumerate(self._children):
+                if self.running and child is not None and not child.is_alive():
+                    logger.warning("Pool worker exited, restarting", index=index, exitcode=child.exitcode)
+                    self.restarts += 1
+                    time.sleep(self.restart_delay)
+                    if self.running:
+                        self._spawn(index)
+            time.sleep(poll_interval)
+
+    def stop(self, timeout: float = 30.0):
+        """SIGTERM every worker (they finish their batch and close), then wait"""
+        self.running = False
+        for child in self._children:
+            if child is not None and child.is_alive():
+                child.terminate()
+        for child in self._children:
+            if child is not None:
+                child.join(timeout)
+        logger.info("Worker pool stopped", target=self.target, restarts=self.restarts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a Kafka worker as a pool of processes in one consumer group")
+    parser.add_argument("worker", choices=sorted(WORKERS))
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count())
+    args = parser.parse_args()
+
+    pool = WorkerPool(WORKERS[args.worker], args.processes)
+
+    def handle_signal(signum, frame):
+        pool.running = False
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    pool.start()
+    try:
+        pool.supervise()
+    finally:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,5 @@
 import sys
 from pathlib import Path
-import json
 import structlog
 from confluent_kafka import Consumer, KafkaError
 
@@ -9,6 +8,7 @@ backend_dir = Path(__file__).parent
 sys.path.insert(0, str(backend_dir))
 
 from app.services.kafka_config import KafkaConfig
+from app.services import serialization
 
 logger = structlog.get_logger()
 
@@ -50,7 +50,7 @@ def debug_consumer():
             
             try:
                 key = msg.key().decode('utf-8') if msg.key() else None
-                value = json.loads(msg.value().decode('utf-8'))
+                value = serialization.decode_message(msg.value(), msg.headers())
                 
                 print(f"[{count+1}] Received: Key={key}, Topic={msg.topic()}")
                 print(f"    Name: {value.get('raw_data', {}).get('name', 'Unknown')}")
@@ -11,6 +11,8 @@ from confluent_kafka import Consumer, KafkaError
 from dotenv import load_dotenv
 import structlog
 
+from app.services import serialization
+
 load_dotenv()
 
 logger = structlog.get_logger()
@@ -116,8 +118,13 @@ def main():
                     logger.error(f"Kafka error: {msg.error()}")
                     continue
             
-            # Process message
-            message_value = msg.value().decode('utf-8')
+            # Process message: JSON or msgpack per its content-type header;
+            # the Cloud Function always receives JSON
+            try:
+                message_value = json.dumps(serialization.decode_message(msg.value(), msg.headers()))
+            except ValueError as e:
+                logger.error("Undecodable message skipped", error=str(e))
+                continue
             messages_processed += 1
             
             print(f"[{messages_processed}] Received message from Kafka")
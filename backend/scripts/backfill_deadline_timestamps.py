@@ -0,0 +1,68 @@
+"""
+One-off backfill: give every scholarship a deadline_timestamp.
+
+Range queries on deadline_timestamp (catalog loads, the expiry sweeper) skip
+documents that lack the field entirely, so older documents written before it
+was required must be backfilled once (the expiry sweeper reports how many
+remain at startup and in /health). Null deadlines are left alone: they are
+queried explicitly and never expire. Mirrors opportunity_converter: parse the
+ISO deadline, otherwise default to 30 days from now.
+
+    python scripts/backfill_deadline_timestamps.py [--dry-run]
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Optional
+
+# Add backend directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import db
+
+
+def deadline_to_timestamp(deadline: Optional[str]) -> int:
+    try:
+        if deadline and len(deadline) == 10:
+            return int(datetime.strptime(deadline, "%Y-%m-%d").timestamp())
+        if deadline:
+            return int(datetime.fromisoformat(deadline.replace('Z', '+00:00')).timestamp())
+    except Exception:
+        pass
+    # Default 30 days
+    return int(datetime.utcnow().timestamp()) + (30 * 24 * 3600)
+
+
+async def backfill(dry_run: bool):
+    docs = db.db.collection('scholarships').stream()
+    scanned = 0
+    updated = 0
+    batch = db.db.batch()
+
+    async for doc in docs:
+        scanned += 1
+        data = doc.to_dict()
+        if data.get('deadline_timestamp') is not None:
+            continue
+
+        timestamp = deadline_to_timestamp(data.get('deadline'))
+        print(f"   {doc.id}: deadline={data.get('deadline')!r} -> {timestamp}")
+        if not dry_run:
+            batch.update(doc.reference, {'deadline_timestamp': timestamp})
+        updated += 1
+        if not dry_run and updated % 400 == 0:
+            await batch.commit()
+            batch = db.db.batch()
+
+    if not dry_run:
+        await batch.commit()
+    print(f"Scanned {scanned} scholarships, {'would update' if dry_run else 'updated'} {updated}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(backfill(args.dry_run))
@@ -0,0 +1,71 @@
+"""
+Benchmark: IVF ANN index recall@K and latency vs brute force
+
+Builds an IVFIndex over N clustered synthetic embeddings (opportunities or
+user DNA vectors behave alike here), then sweeps nprobe and reports
+recall@K against exact search plus per-query latency.
+
+    python scripts/bench_ann_recall.py --vectors 20000 --k 50
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.embedding_index import IVFIndex
+
+
+def clustered(count, dim, clusters, rng):
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.35 * rng.normal(size=(count, dim)).astype(np.float32)
+
+
+def timed_queries(fn, queries, k):
+    results = []
+    start = time.perf_counter()
+    for q in queries:
+        results.append([item_id for item_id, _ in fn(q, k)])
+    per_query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return results, per_query_ms
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--clusters", type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    data = clustered(args.vectors, args.dim, args.clusters, rng)
+    queries = clustered(args.queries, args.dim, args.clusters, rng)
+
+    index = IVFIndex(min_train_size=1)
+    start = time.perf_counter()
+    for i, vector in enumerate(data):
+        index.vectors.upsert(str(i), vector)
+    index.train()
+    build_s = time.perf_counter() - start
+    print(f"=== IVF index: {args.vectors} x {args.dim}, {len(index.centroids)} lists, build {build_s:.2f}s ===")
+
+    exact, exact_ms = timed_queries(index.search_exact, queries, args.k)
+    print(f"{'brute force':>12}: recall@{args.k}=1.000  {exact_ms:8.3f} ms/query")
+
+    for nprobe in (1, 2, 4, 8, 16, 32, 64):
+        if nprobe > len(index.centroids):
+            break
+        index.nprobe = nprobe
+        approx, approx_ms = timed_queries(index.search, queries, args.k)
+        recall = np.mean([len(set(a) & set(e)) / len(e) for a, e in zip(approx, exact)])
+        print(f"{'nprobe=' + str(nprobe):>12}: recall@{args.k}={recall:.3f}  {approx_ms:8.3f} ms/query  ({exact_ms / approx_ms:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
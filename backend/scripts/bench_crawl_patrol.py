@@ -0,0 +1,133 @@
+"""
+Benchmark: Sentinel patrol wall-clock, sequential vs concurrent Hunter Drones
+
+Serves a patrol's worth of listing pages from a local HTTP fixture server,
+spread over several hostnames (127.0.0.x, each its own politeness domain),
+with a per-response server delay and a little client-side hydration. Then
+runs UniversalCrawlerService.crawl_and_stream over them at each requested
+concurrency and reports the wall-clock time. Payloads are counted instead of
+published, so Kafka is not needed; Playwright's Chromium is.
+
+    python scripts/bench_crawl_patrol.py --domains 10 --pages-per-domain 2 --concurrency 1,6
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.crawl_politeness import DomainLimiter
+from app.services.crawl_store import CrawlStore
+from app.services.crawler_service import UniversalCrawlerService
+
+PAGE = """<!doctype html>
+<html><head><title>Fixture listing {page}</title></head>
+<body><main id="listing">{cards}</main>
+<script>
+  setTimeout(function () {{
+    var card = document.createElement('article');
+    card.textContent = 'Hydrated opportunity';
+    document.getElementById('listing').appendChild(card);
+  }}, {hydrate_ms});
+</script></body></html>"""
+
+CARD = '<article class="card"><h3>Opportunity {i}</h3><p>Prize $1,000. Deadline 2026-12-31.</p><a href="/o/{i}">Apply</a></article>'
+
+
+def make_handler(latency: float, hydrate_ms: int):
+    body_cache = {}
+
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            if self.path not in body_cache:
+                cards = "".join(CARD.format(i=i) for i in range(25))
+                body_cache[self.path] = PAGE.format(page=self.path, cards=cards, hydrate_ms=hydrate_ms).encode()
+            body = body_cache[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+def start_fixture_server(latency: float, hydrate_ms: int) -> ThreadingHTTPServer:
+    # All of 127.0.0.0/8 is loopback on Linux, so one server answers every fixture host
+    server = ThreadingHTTPServer(("", 0), make_handler(latency, hydrate_ms))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def patrol(urls, concurrency: int, args) -> float:
+    crawler = UniversalCrawlerService()
+    crawler.politeness = DomainLimiter(concurrency=args.domain_concurrency, min_interval=args.domain_delay)
+    # Empty in-memory store: every run crawls every page in full
+    crawler.crawl_store = CrawlStore()
+    received = []
+
+    async def record(url, html_content, title, intent, delta=None):
+        received.append(len(html_content))
+        return True
+
+    crawler._process_success = record
+    try:
+        start = time.perf_counter()
+        transmitted = await crawler.crawl_and_stream(urls, intent="patrol", max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+    finally:
+        await crawler.close()
+
+    print(f"  concurrency {concurrency:>2}: {elapsed:6.1f} s   {transmitted}/{len(urls)} pages   "
+          f"{len(urls) / elapsed:5.2f} pages/s   politeness wait {crawler.politeness.waited_seconds:5.1f} s")
+    return elapsed
+
+
+async def main_async(args):
+    server = start_fixture_server(args.latency_ms / 1000, args.hydrate_ms)
+    port = server.server_address[1]
+    urls = [
+        f"http://127.0.0.{d + 1}:{port}/listing/{p}"
+        for p in range(args.pages_per_domain)
+        for d in range(args.domains)
+    ]
+    print(f"=== {len(urls)} pages on {args.domains} domains, server delay {args.latency_ms} ms, "
+          f"domain delay {args.domain_delay} s x{args.domain_concurrency} ===")
+
+    timings = {}
+    try:
+        for concurrency in args.concurrency:
+            timings[concurrency] = await patrol(urls, concurrency, args)
+    finally:
+        server.shutdown()
+
+    baseline = timings.get(1)
+    if baseline:
+        for concurrency, elapsed in timings.items():
+            if concurrency != 1:
+                print(f"  concurrency {concurrency} is {baseline / elapsed:.1f}x faster than sequential")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=10)
+    parser.add_argument("--pages-per-domain", type=int, default=2)
+    parser.add_argument("--latency-ms", type=int, default=400, help="Server delay per response")
+    parser.add_argument("--hydrate-ms", type=int, default=300, help="Client-side render delay")
+    parser.add_argument("--domain-delay", type=float, default=2.0, help="Seconds between request starts per domain")
+    parser.add_argument("--domain-concurrency", type=int, default=1)
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 6])
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
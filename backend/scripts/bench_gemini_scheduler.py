@@ -0,0 +1,166 @@
+"""
+Benchmark: refinery Gemini throughput, sequential batches vs GeminiScheduler
+
+Runs a backlog of --pages crawled pages (prompt sizes drawn from
+--min-tokens..--max-tokens) through a fake Gemini with configurable latency
+(--latency seconds per call plus --latency-per-1k per thousand prompt
+tokens) and rate-limit behaviour: --error-rate random 429s, plus 429s once
+the --rpm / --tpm quota (modelled as a per-minute token bucket) is spent.
+
+  sequential  the previous EnrichmentWorker: 2 pages per call, one call at
+              a time, 429s retried inline after 10 * 2^attempt + 30 s, the
+              batch dropped after 3 attempts
+  scheduler   pages packed into ~--batch-tokens prompts, all submitted to a
+              GeminiScheduler with the same quota and --concurrency slots
+
+Time is compressed: one minute lasts --minute seconds and every latency and
+backoff shrinks to match; results are reported in uncompressed minutes.
+
+    python scripts/bench_gemini_scheduler.py --pages 120 --error-rate 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.gemini_scheduler import GeminiScheduler, TokenBucket, estimate_tokens, is_rate_limited
+
+
+class FakeGemini:
+    """generate_content_async stand-in with latency, random 429s and an enforced quota"""
+
+    def __init__(self, args, scale: float, rng: random.Random):
+        self.args = args
+        self.scale = scale
+        self.rng = rng
+        self.requests = TokenBucket(args.rpm)
+        self.tokens = TokenBucket(args.tpm)
+        for bucket in (self.requests, self.tokens):
+            bucket.rate = bucket.capacity / args.minute
+        self.calls = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    async def generate_content_async(self, prompt: str):
+        tokens = estimate_tokens(prompt)
+        self.calls += 1
+        over_quota = self.requests.wait_time(1) > 0 or self.tokens.wait_time(tokens) > 0
+        if over_quota or self.rng.random() < self.args.error_rate:
+            self.rate_limited += 1
+            await asyncio.sleep(0.2 * self.scale)
+            raise RuntimeError("429 Resource has been exhausted (e.g. check quota).")
+        self.requests.take(1)
+        self.tokens.take(tokens)
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep((self.args.latency + tokens / 1000 * self.args.latency_per_1k) * self.scale)
+        finally:
+            self.in_flight -= 1
+        return types.SimpleNamespace(text="[]", usage_metadata=types.SimpleNamespace(total_token_count=tokens))
+
+
+def prompt_for(pages) -> str:
+    return "".join("x" * (tokens * 4) for tokens in pages)
+
+
+async def run_sequential(pages, gemini: FakeGemini, scale: float) -> int:
+    """Pages extracted; mirrors the old collect-2-then-await loop"""
+    done = 0
+    for i in range(0, len(pages), 2):
+        batch = pages[i:i + 2]
+        for attempt in range(3):
+            try:
+                await gemini.generate_content_async(prompt_for(batch))
+                done += len(batch)
+                break
+            except Exception as e:
+                if not is_rate_limited(e):
+                    break
+                await asyncio.sleep((10 * 2 ** attempt + 30) * scale)
+    return done
+
+
+async def run_scheduled(pages, gemini: FakeGemini, args, scale: float) -> int:
+    scheduler = GeminiScheduler(
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+        max_in_flight=args.concurrency,
+        backoff_seconds=5.0 * scale,
+        max_backoff_seconds=120.0 * scale
+    )
+    for bucket in (scheduler.requests, scheduler.tokens):
+        bucket.rate = bucket.capacity / args.minute
+
+    groups, size = [], 0
+    for tokens in pages:
+        if groups and size + tokens <= args.batch_tokens:
+            groups[-1].append(tokens)
+            size += tokens
+        else:
+            groups.append([tokens])
+            size = tokens
+
+    async def extract(group) -> int:
+        prompt = prompt_for(group)
+        try:
+            await scheduler.run(lambda: gemini.generate_content_async(prompt), tokens=estimate_tokens(prompt))
+            return len(group)
+        except Exception:
+            return 0
+
+    return sum(await asyncio.gather(*(extract(group) for group in groups)))
+
+
+async def main_async(args):
+    scale = args.minute / 60.0
+    rng = random.Random(args.seed)
+    pages = [rng.randint(args.min_tokens, args.max_tokens) for _ in range(args.pages)]
+    print(f"=== {args.pages} pages, {sum(pages):,} tokens; quota {args.rpm} RPM / {args.tpm:,} TPM; "
+          f"latency {args.latency}s + {args.latency_per_1k}s/1k tokens; {args.error_rate:.0%} random 429s ===")
+
+    results = {}
+    for label in ("sequential", "scheduler"):
+        gemini = FakeGemini(args, scale, random.Random(args.seed))
+        start = time.perf_counter()
+        if label == "sequential":
+            done = await run_sequential(pages, gemini, scale)
+        else:
+            done = await run_scheduled(pages, gemini, args, scale)
+        minutes = (time.perf_counter() - start) / args.minute
+        results[label] = (done, minutes)
+        print(f"  {label:<10} {minutes:7.1f} min  {done:4d}/{len(pages)} pages  {done / minutes:6.1f} pages/min  "
+              f"{gemini.calls:4d} calls  {gemini.rate_limited:3d} x 429  peak {gemini.peak_in_flight} in flight")
+
+    (old_done, old_minutes), (new_done, new_minutes) = results["sequential"], results["scheduler"]
+    print(f"  throughput {(new_done / new_minutes) / max(1e-9, old_done / old_minutes):.1f}x, "
+          f"pages lost {len(pages) - old_done} -> {len(pages) - new_done}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=120)
+    parser.add_argument("--min-tokens", type=int, default=500)
+    parser.add_argument("--max-tokens", type=int, default=6000)
+    parser.add_argument("--rpm", type=int, default=10)
+    parser.add_argument("--tpm", type=int, default=250000)
+    parser.add_argument("--latency", type=float, default=4.0)
+    parser.add_argument("--latency-per-1k", type=float, default=0.3)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--batch-tokens", type=int, default=25000)
+    parser.add_argument("--minute", type=float, default=3.0, help="seconds one simulated minute lasts")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""
+Benchmark: enriched-topic consumer throughput, per-message vs batched
+
+Runs both consumer loops against an in-process broker stand-in that charges
+a fetch round trip per poll()/consume() call and a commit round trip per
+synchronous commit, with each message's processing (Firestore write,
+routing) simulated as an awaitable delay:
+
+  (a) the previous loop: poll() one message, process it, commit(asynchronous=False)
+  (b) BatchConsumer: consume(batch_size), process the batch concurrently,
+      one commit(asynchronous=True) per batch
+
+Payloads are the captured messages in enriched_message_latest.json.
+
+    python scripts/bench_kafka_consume.py --messages 2000 --process-ms 15 --commit-ms 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.kafka_batch import BatchConsumer
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "enriched_message_latest.json")
+
+
+class LocalMessage:
+    def __init__(self, value: bytes, offset: int):
+        self._value = value
+        self._offset = offset
+
+    def error(self):
+        return None
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return None
+
+    def offset(self):
+        return self._offset
+
+
+class LocalBrokerConsumer:
+    """Single-partition stand-in with fixed fetch and commit round trips"""
+
+    def __init__(self, payloads, fetch_rtt: float, commit_rtt: float):
+        self.messages = [LocalMessage(p, i) for i, p in enumerate(payloads)]
+        self.position = 0
+        self.committed = 0
+        self.fetch_rtt = fetch_rtt
+        self.commit_rtt = commit_rtt
+        self.sync_commits = 0
+        self.async_commits = 0
+
+    def poll(self, timeout):
+        time.sleep(self.fetch_rtt)
+        if self.position >= len(self.messages):
+            return None
+        msg = self.messages[self.position]
+        self.position += 1
+        return msg
+
+    def consume(self, num_messages, timeout):
+        time.sleep(self.fetch_rtt)
+        batch = self.messages[self.position:self.position + num_messages]
+        self.position += len(batch)
+        return batch
+
+    def commit(self, asynchronous=True):
+        if asynchronous:
+            self.async_commits += 1
+        else:
+            time.sleep(self.commit_rtt)
+            self.sync_commits += 1
+        self.committed = self.position
+
+    @property
+    def drained(self):
+        return self.position >= len(self.messages)
+
+
+def load_payloads(count: int):
+    with open(SAMPLE_PATH) as f:
+        records = json.load(f)
+    payloads = []
+    for i in range(count):
+        value = dict(records[i % len(records)]['value'])
+        enriched = dict(value.get('enriched_data') or {})
+        enriched['id'] = f"bench-{i}"
+        value['enriched_data'] = enriched
+        payloads.append(json.dumps(value).encode('utf-8'))
+    return payloads
+
+
+def decode(raw: bytes, headers=None):
+    message = json.loads(raw.decode('utf-8'))
+    return message.get('enriched_data') if isinstance(message, dict) else None
+
+
+async def run_per_message(consumer: LocalBrokerConsumer, process_delay: float) -> float:
+    start = time.perf_counter()
+    while not consumer.drained:
+        msg = await asyncio.to_thread(consumer.poll, 1.0)
+        if msg is None:
+            continue
+        opportunity = decode(msg.value())
+        if opportunity is not None:
+            await asyncio.sleep(process_delay)
+        consumer.commit(asynchronous=False)
+    return time.perf_counter() - start
+
+
+async def run_batched(consumer: LocalBrokerConsumer, process_delay: float, batch_size: int, concurrency: int) -> float:
+    async def handler(opportunity):
+        await asyncio.sleep(process_delay)
+
+    batch_consumer = BatchConsumer(
+        consumer,
+        decode=decode,
+        handler=handler,
+        key=lambda opportunity: opportunity.get('id'),
+        batch_size=batch_size,
+        concurrency=concurrency,
+        name='bench'
+    )
+    start = time.perf_counter()
+    while not consumer.drained:
+        await batch_consumer.run_once()
+    return time.perf_counter() - start
+
+
+def report(label: str, elapsed: float, consumer: LocalBrokerConsumer):
+    count = len(consumer.messages)
+    print(f"{label:<13} {count / elapsed:9.0f} msg/s   {elapsed:7.2f} s   "
+          f"sync commits {consumer.sync_commits:5d}   async commits {consumer.async_commits:5d}   "
+          f"committed {consumer.committed}/{count}")
+
+
+async def main_async(args):
+    payloads = load_payloads(args.messages)
+    fetch_rtt = args.fetch_ms / 1000
+    commit_rtt = args.commit_ms / 1000
+    process_delay = args.process_ms / 1000
+
+    print(f"=== {args.messages} messages, fetch {args.fetch_ms} ms, commit {args.commit_ms} ms, "
+          f"process {args.process_ms} ms; batch {args.batch_size}, concurrency {args.concurrency} ===")
+
+    consumer = LocalBrokerConsumer(payloads, fetch_rtt, commit_rtt)
+    report("Batched:", await run_batched(consumer, process_delay, args.batch_size, args.concurrency), consumer)
+
+    if args.skip_per_message:
+        return
+    consumer = LocalBrokerConsumer(payloads, fetch_rtt, commit_rtt)
+    report("Per-message:", await run_per_message(consumer, process_delay), consumer)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--fetch-ms", type=float, default=1.0, help="Broker round trip per poll()/consume()")
+    parser.add_argument("--commit-ms", type=float, default=8.0, help="Broker round trip per synchronous commit")
+    parser.add_argument("--process-ms", type=float, default=15.0, help="Simulated per-opportunity processing")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--skip-per-message", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
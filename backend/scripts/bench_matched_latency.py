@@ -0,0 +1,95 @@
+"""
+Load benchmark for GET /api/scholarships/matched
+
+Simulates N concurrent users hammering the matched feed and reports
+latency percentiles. Run it once against a server on the old revision and
+once on the new one to compare:
+
+    python scripts/bench_matched_latency.py --base-url http://localhost:8000 \
+        --user-ids uid1,uid2,uid3 --concurrency 50 --requests 20
+
+Pass --limit to request the first cursor page instead of the full list.
+"""
+import argparse
+import asyncio
+import math
+import statistics
+import time
+import sys
+from typing import List, Optional
+
+import httpx
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile (samples must be non-empty)"""
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+async def simulate_user(client: httpx.AsyncClient, user_id: str, requests: int, limit: Optional[int],
+                        latencies: List[float], sizes: List[int], errors: List[str]):
+    """One virtual user issuing sequential requests"""
+    params = {"user_id": user_id}
+    if limit:
+        params["limit"] = limit
+    for _ in range(requests):
+        start = time.perf_counter()
+        try:
+            response = await client.get("/api/scholarships/matched", params=params)
+            if response.status_code != 200:
+                errors.append(f"{response.status_code}")
+            sizes.append(len(response.content))
+        except Exception as e:
+            errors.append(type(e).__name__)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_benchmark(base_url: str, user_ids: List[str], concurrency: int, requests: int, limit: Optional[int]):
+    latencies: List[float] = []
+    sizes: List[int] = []
+    errors: List[str] = []
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0, limits=limits) as client:
+        # Warm-up so connection setup does not skew the first percentile buckets
+        await client.get("/health")
+
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            simulate_user(client, user_ids[i % len(user_ids)], requests, limit, latencies, sizes, errors)
+            for i in range(concurrency)
+        ])
+        wall = time.perf_counter() - started
+
+    mode = f"limit={limit}" if limit else "full list"
+    print(f"=== /api/scholarships/matched ({mode}) @ {concurrency} concurrent users ===")
+    print(f"Requests:   {len(latencies)} ({len(errors)} errors)")
+    print(f"Wall time:  {wall:.2f}s  ({len(latencies) / wall:.1f} req/s)")
+    print(f"Mean:       {statistics.mean(latencies):.1f} ms")
+    print(f"p50:        {percentile(latencies, 50):.1f} ms")
+    print(f"p95:        {percentile(latencies, 95):.1f} ms")
+    print(f"p99:        {percentile(latencies, 99):.1f} ms")
+    if sizes:
+        print(f"Payload:    {statistics.mean(sizes) / 1024:.1f} KiB mean")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-ids", required=True, help="Comma-separated Firebase user IDs with stored matches")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=20, help="Requests per virtual user")
+    parser.add_argument("--limit", type=int, default=None, help="Page size (first page only); omit for the full list")
+    args = parser.parse_args()
+
+    user_ids = [u.strip() for u in args.user_ids.split(",") if u.strip()]
+    if not user_ids:
+        sys.exit("At least one user id is required")
+
+    asyncio.run(run_benchmark(args.base_url, user_ids, args.concurrency, args.requests, args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: time-to-HTML and extraction yield, fixed waits vs PageReadiness
+
+Serves four kinds of listing page from a local HTTP fixture server:
+  static     cards in the server HTML
+  hydrated   cards rendered by JS after --hydrate-ms
+  infinite   a batch of cards per scroll, --batches times
+  polling    hydrated, then keeps polling the server (networkidle never settles)
+
+Each page is visited --visits times (the first visit learns the domain's
+selector) with (a) the previous wait: networkidle up to 10 s, one scroll,
+sleep 2 s; and (b) PageReadiness. Yield is the number of cards in the HTML.
+Needs Playwright's Chromium; no Kafka.
+
+    python scripts/bench_page_readiness.py --visits 3
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from playwright.async_api import async_playwright
+
+from app.services.page_readiness import MUTATION_OBSERVER_SCRIPT, PageReadiness, ReadinessStore
+
+CARD = '<article class="card"><h3>Opportunity {i}</h3><p>Prize $1,000</p><a href="/o/{i}">Apply</a></article>'
+
+SHELL = """<!doctype html><html><head><title>{kind}</title>
+<style>article {{ display: block; height: 120px; }}</style></head>
+<body><nav><a href="/">Home</a></nav><main id="listing">{cards}</main>
+<script>
+const listing = document.getElementById('listing');
+function addCards(from, count) {{
+  for (let i = from; i < from + count; i++) {{
+    const card = document.createElement('article');
+    card.className = 'card';
+    card.innerHTML = '<h3>Opportunity ' + i + '</h3><p>Prize $1,000</p><a href="/o/' + i + '">Apply</a>';
+    listing.appendChild(card);
+  }}
+}}
+{script}
+</script></body></html>"""
+
+SCRIPTS = {
+    "static": "",
+    "hydrated": "setTimeout(() => addCards(0, 20), {hydrate_ms});",
+    "infinite": """
+let loaded = 1;
+addCards(0, 10);
+window.addEventListener('scroll', () => {{
+  if (loaded < {batches} && window.innerHeight + window.scrollY >= document.body.scrollHeight - 10) {{
+    const batch = loaded++;
+    setTimeout(() => addCards(batch * 10, 10), 300);
+  }}
+}});""",
+    "polling": """
+setTimeout(() => addCards(0, 20), {hydrate_ms});
+setInterval(() => fetch('/ping?' + Date.now()), 400);""",
+}
+
+
+def make_handler(args):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            kind = self.path.strip("/").split("?")[0]
+            if kind not in SCRIPTS:
+                body = b"ok"
+            else:
+                cards = "".join(CARD.format(i=i) for i in range(20)) if kind == "static" else ""
+                script = SCRIPTS[kind].format(hydrate_ms=args.hydrate_ms, batches=args.batches)
+                body = SHELL.format(kind=kind, cards=cards, script=script).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FixtureHandler
+
+
+async def legacy_wait(page, url, readiness):
+    try:
+        await page.wait_for_load_state("networkidle", timeout=10000)
+    except Exception:
+        pass
+    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+    await asyncio.sleep(2)
+
+
+async def adaptive_wait(page, url, readiness):
+    await readiness.wait_until_ready(page, url)
+
+
+async def visit(context, url, wait, readiness):
+    page = await context.new_page()
+    try:
+        start = time.perf_counter()
+        await page.goto(url, wait_until="domcontentloaded", timeout=45000)
+        await wait(page, url, readiness)
+        html = await page.content()
+        return (time.perf_counter() - start) * 1000, html.count('class="card"')
+    finally:
+        await page.close()
+
+
+async def main_async(args):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    playwright = await async_playwright().start()
+    browser = await playwright.chromium.launch(headless=True)
+    context = await browser.new_context()
+    await context.add_init_script(MUTATION_OBSERVER_SCRIPT)
+    print(f"=== {args.visits} visits per page, hydrate {args.hydrate_ms} ms, {args.batches} scroll batches ===")
+    print(f"  {'page':<10} {'fixed waits':>22} {'adaptive':>22}")
+    try:
+        totals = {"legacy": [], "adaptive": []}
+        for kind in SCRIPTS:
+            row = []
+            for label, wait in (("legacy", legacy_wait), ("adaptive", adaptive_wait)):
+                # Fresh profiles per kind, so every kind starts unlearned
+                readiness = PageReadiness(ReadinessStore())
+                results = [await visit(context, f"{base}/{kind}", wait, readiness) for _ in range(args.visits)]
+                times = [ms for ms, _ in results]
+                totals[label].extend(times)
+                row.append(f"{statistics.mean(times):7.0f} ms {min(c for _, c in results):3d} cards")
+            print(f"  {kind:<10} {row[0]:>22} {row[1]:>22}")
+        legacy, adaptive = statistics.mean(totals["legacy"]), statistics.mean(totals["adaptive"])
+        print(f"  mean time-to-HTML: {legacy:.0f} ms -> {adaptive:.0f} ms ({legacy / adaptive:.1f}x faster)")
+    finally:
+        await browser.close()
+        await playwright.stop()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--visits", type=int, default=3)
+    parser.add_argument("--hydrate-ms", type=int, default=600)
+    parser.add_argument("--batches", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
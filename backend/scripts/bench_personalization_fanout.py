@@ -0,0 +1,110 @@
+"""
+Benchmark: personalization scoring with and without precomputed features
+
+Scores every synthetic user against every synthetic opportunity, the way
+the WebSocket fan-out and discovery ranking do, using
+(a) raw opportunity dicts with the feature cache disabled, which rebuilds
+    and lowercases the searchable text on every (user, opportunity) pair, and
+(b) OpportunityFeatures computed once per opportunity via get_features.
+
+    python scripts/bench_personalization_fanout.py --users 1000 --opportunities 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.personalization_engine import PersonalizationEngine
+
+
+def make_opportunities(engine: PersonalizationEngine, count: int, rng: random.Random):
+    vocabulary = [kw for keywords in engine.interest_keywords.values() for kw in keywords]
+    vocabulary += ['students', 'award', 'program', 'community', 'research', 'global', 'online']
+
+    def sentence(words: int) -> str:
+        return ' '.join(rng.choice(vocabulary) for _ in range(words))
+
+    return [
+        {
+            'id': f'opp-{i}',
+            'name': sentence(5),
+            'description': sentence(60),
+            'organization': sentence(2),
+            'tags': [sentence(1) for _ in range(4)],
+            'eligibility': {
+                'gpa_min': rng.choice([None, 3.0, 3.5]),
+                'majors': rng.choice([None, ['Computer Science'], ['Biology', 'Mathematics']]),
+                'backgrounds': rng.choice([[], ['first-generation']]),
+                'grade_levels': rng.choice([[], ['Undergraduate'], ['Graduate']]),
+            },
+            'requirements': {'skills_needed': [sentence(1), sentence(1)]},
+        }
+        for i in range(count)
+    ]
+
+
+def make_users(engine: PersonalizationEngine, count: int, rng: random.Random):
+    interests = list(engine.interest_keywords)
+    return [
+        {
+            'interests': rng.sample(interests, rng.randint(1, 4)),
+            'background': rng.sample(['first-generation', 'hackathon', 'robotics', 'open source'], rng.randint(0, 2)),
+            'gpa': rng.choice([None, 3.2, 3.8]),
+            'major': rng.choice(['Computer Science', 'Biology', 'Economics']),
+            'academic_status': rng.choice(['Undergraduate', 'Graduate']),
+        }
+        for _ in range(count)
+    ]
+
+
+def score_all(engine: PersonalizationEngine, opportunities, users) -> float:
+    """Fan-out order: each opportunity is scored against every user"""
+    checksum = 0.0
+    for opp in opportunities:
+        for user in users:
+            checksum += engine.calculate_personalized_score(opp, user)
+    return checksum
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--opportunities", type=int, default=5000)
+    parser.add_argument("--skip-baseline", action="store_true", help="Only time the precomputed path")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    uncached = PersonalizationEngine(feature_cache_size=0)
+    cached = PersonalizationEngine(feature_cache_size=args.opportunities)
+    opportunities = make_opportunities(uncached, args.opportunities, rng)
+    users = make_users(uncached, args.users, rng)
+    pairs = args.users * args.opportunities
+
+    print(f"=== Personalization fan-out: {args.users} users x {args.opportunities} opportunities ===")
+
+    start = time.perf_counter()
+    features = [cached.get_features(opp) for opp in opportunities]
+    build_s = time.perf_counter() - start
+    print(f"Feature build:      {build_s * 1000:10.1f} ms (once per opportunity, at ingest)")
+
+    start = time.perf_counter()
+    fast_checksum = score_all(cached, features, users)
+    fast_s = time.perf_counter() - start
+    print(f"Precomputed:        {fast_s:10.2f} s  ({fast_s / pairs * 1e6:.2f} us / pair)")
+
+    if args.skip_baseline:
+        return
+
+    start = time.perf_counter()
+    slow_checksum = score_all(uncached, opportunities, users)
+    slow_s = time.perf_counter() - start
+    print(f"Raw dicts:          {slow_s:10.2f} s  ({slow_s / pairs * 1e6:.2f} us / pair)")
+    print(f"Speedup:            {slow_s / fast_s:10.1f}x")
+    print(f"Scores identical:   {abs(slow_checksum - fast_checksum) < 1e-6}")
+
+
+if __name__ == "__main__":
+    main()
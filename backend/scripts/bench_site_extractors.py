@@ -0,0 +1,64 @@
+"""
+Benchmark: site extractors vs the Gemini path on cortex.raw.html.v1
+
+Replays the captured Hunter Drone events in cortex-raw-html.json through
+site_extractors.extract (on the raw page, as the crawler does) and reports,
+per event, which extractor handled it, how many opportunities it produced
+and how long it took; pages no extractor handles would still go to Gemini,
+whose input tokens (chars / 4 of the preprocessed page) are counted too.
+Deadlines are judged as of each event's Kafka timestamp.
+
+    python scripts/bench_site_extractors.py --rounds 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import site_extractors
+from app.services.html_preprocessor import preprocess_html
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cortex-raw-html.json")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(SAMPLE_PATH) as f:
+        records = json.load(f)
+    events = [{**record['value'], 'captured_at': record['timestamp'] / 1000} for record in records]
+    print(f"=== {len(events)} captured crawl events, {args.rounds} rounds ===")
+    print(f"  {'url':<50} {'extractor':>10} {'opps':>5} {'ms':>7} {'LLM tokens':>11}")
+
+    handled_ms, handled, saved_tokens, llm_tokens = [], 0, 0, 0
+    for event in events:
+        now = event['captured_at']
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            extraction = site_extractors.extract(event['html'], event['url'], now=now)
+        ms = (time.perf_counter() - start) / args.rounds * 1000
+        tokens = preprocess_html(event['html'], event['url']).chars // 4
+
+        if extraction:
+            handled += 1
+            handled_ms.append(ms)
+            saved_tokens += tokens
+            name, count, shown = extraction.extractor, len(extraction.opportunities), 0
+        else:
+            llm_tokens += tokens
+            name, count, shown = "-", 0, tokens
+        print(f"  {event['url'][:50]:<50} {name:>10} {count:>5} {ms:>7.1f} {shown:>11,}")
+
+    print(f"  {handled}/{len(events)} pages extracted without Gemini, "
+          f"{statistics.mean(handled_ms) if handled_ms else 0:.1f} ms/page")
+    print(f"  Gemini input tokens {saved_tokens + llm_tokens:,} -> {llm_tokens:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Microbenchmark: enriched-opportunity encode/decode on the stream hot path
+
+Uses the captured messages in enriched_message_latest.json and compares:
+  encode  stdlib json.dumps().encode() vs each available fast codec
+  decode  the previous consumer path (utf-8 decode, json.loads, "Matryoshka"
+          unwrap; also with a double-encoded enriched_data string) vs the
+          canonical envelope through serialization.loads + read_envelope
+
+    python scripts/bench_stream_codec.py --rounds 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import serialization
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "enriched_message_latest.json")
+
+
+def load_samples():
+    with open(SAMPLE_PATH) as f:
+        return [record['value'] for record in json.load(f)]
+
+
+def available_encoders():
+    encoders = {'json': lambda obj: json.dumps(obj).encode('utf-8')}
+    try:
+        import orjson
+        encoders['orjson'] = orjson.dumps
+    except ImportError:
+        pass
+    try:
+        import msgspec
+        encoders['msgspec'] = msgspec.json.Encoder().encode
+    except ImportError:
+        pass
+    return encoders
+
+
+def legacy_decode(raw: bytes):
+    """The consumer path before the canonical envelope"""
+    raw_message = json.loads(raw.decode('utf-8'))
+    final_data = raw_message
+    if isinstance(final_data, dict) and 'enriched_data' in final_data:
+        final_data = final_data['enriched_data']
+    for _ in range(4):
+        if isinstance(final_data, str):
+            try:
+                final_data = json.loads(final_data)
+            except json.JSONDecodeError:
+                break
+        else:
+            break
+    return final_data
+
+
+def canonical_decode(raw: bytes):
+    return serialization.read_envelope(serialization.loads(raw))
+
+
+def timed(fn, items, rounds: int) -> float:
+    """Microseconds per item"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return (time.perf_counter() - start) / (rounds * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    samples = load_samples()
+    avg_size = sum(len(json.dumps(s)) for s in samples) / len(samples)
+    print(f"=== {len(samples)} captured messages, avg {avg_size:,.0f} bytes, {args.rounds} rounds; "
+          f"active codec: {serialization.CODEC} ===")
+
+    print("Encode (producer)")
+    baseline = None
+    for name, encode in available_encoders().items():
+        per_item = timed(encode, samples, args.rounds)
+        baseline = baseline or per_item
+        print(f"  {name:<9} {per_item:8.1f} us/msg   {baseline / per_item:5.1f}x")
+
+    legacy = [json.dumps(s).encode('utf-8') for s in samples]
+    double_encoded = [json.dumps({**s, 'enriched_data': json.dumps(s['enriched_data'])}).encode('utf-8') for s in samples]
+    canonical = [serialization.dumps(serialization.build_envelope(s['enriched_data'], s['source'])) for s in samples]
+
+    assert all(legacy_decode(a) == canonical_decode(b) for a, b in zip(legacy, canonical))
+
+    print("Decode (consumer)")
+    rows = [
+        ("legacy", timed(legacy_decode, legacy, args.rounds)),
+        ("legacy, double-encoded", timed(legacy_decode, double_encoded, args.rounds)),
+        ("canonical envelope", timed(canonical_decode, canonical, args.rounds)),
+    ]
+    for label, per_item in rows:
+        print(f"  {label:<24} {per_item:8.1f} us/msg   {rows[0][1] / per_item:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
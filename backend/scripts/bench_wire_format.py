@@ -0,0 +1,85 @@
+"""
+Benchmark: opportunity.enriched.v1 wire formats
+
+Encodes the captured messages in enriched_message_latest.json as canonical
+envelopes carrying a 768-dim embedding (as the Cortex refinery publishes
+them) and compares payload size and consumer decode time for:
+  json     number-array embedding (stdlib json, and the active fast codec)
+  msgpack  embedding as packed float32 bytes, format declared in a header
+
+    python scripts/bench_wire_format.py --rounds 200 --dims 768
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import serialization
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "enriched_message_latest.json")
+
+
+def load_envelopes(dims: int):
+    rng = random.Random(3)
+    with open(SAMPLE_PATH) as f:
+        records = json.load(f)
+    envelopes = []
+    for record in records:
+        opportunity = dict(record['value']['enriched_data'])
+        opportunity['embedding'] = [rng.gauss(0, 0.05) for _ in range(dims)]
+        envelopes.append(serialization.build_envelope(opportunity, record['value'].get('source')))
+    return envelopes
+
+
+def timed(fn, items, rounds: int) -> float:
+    """Microseconds per item"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for args in items:
+            fn(*args)
+    return (time.perf_counter() - start) / (rounds * len(items)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=768)
+    args = parser.parse_args()
+
+    if serialization.msgpack is None:
+        print("msgpack is not installed - pip install msgpack")
+        return
+
+    envelopes = load_envelopes(args.dims)
+    print(f"=== {len(envelopes)} captured opportunities + {args.dims}-dim embedding, {args.rounds} rounds ===")
+
+    stdlib = [(json.dumps(e).encode('utf-8'),) for e in envelopes]
+    fast_json = [serialization.encode_message(e, 'json') for e in envelopes]
+    packed = [serialization.encode_message(e, 'msgpack') for e in envelopes]
+
+    decoded = serialization.decode_message(*packed[0])['enriched_data']['embedding']
+    max_error = max(abs(a - b) for a, b in zip(decoded, envelopes[0]['enriched_data']['embedding']))
+
+    rows = [
+        ("json (stdlib)", stdlib, lambda raw: json.loads(raw.decode('utf-8'))),
+        (f"json ({serialization.CODEC})", fast_json, serialization.decode_message),
+        ("msgpack + float32", packed, serialization.decode_message),
+    ]
+    base_size = base_time = None
+    for label, items, decode in rows:
+        size = statistics.mean(len(item[0]) for item in items)
+        per_item = timed(decode, items, args.rounds)
+        base_size = base_size or size
+        base_time = base_time or per_item
+        print(f"  {label:<20} {size:9,.0f} B/msg ({base_size / size:4.1f}x smaller)   "
+              f"decode {per_item:7.1f} us/msg ({base_time / per_item:4.1f}x faster)")
+    print(f"  float32 round-trip max abs error: {max_error:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Benchmark: WebSocket opportunity fan-out to N simulated sockets
+
+Routes one opportunity to N connected users with
+(a) the previous loop: score a user, then await their send, one at a time, and
+(b) batched scoring plus per-connection ConnectionSender queues, optionally
+    restricted to ProfileIndex candidates (--index).
+
+A fraction of the sockets are slow (e.g. a stalled mobile client). The number
+that matters is how long the Kafka consumer is blocked per opportunity, and
+how long fast clients wait behind slow ones.
+
+    python scripts/bench_ws_fanout.py --sockets 5000 --slow-fraction 0.01
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.personalization_engine import PersonalizationEngine
+from app.services.fanout import ConnectionSender
+from app.services.profile_index import ProfileIndex
+
+MIN_SCORE = 60
+
+
+class SimulatedSocket:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.received_at = None
+
+    async def send_json(self, message):
+        await asyncio.sleep(self.latency)
+        self.received_at = time.perf_counter()
+
+
+def make_profiles(engine: PersonalizationEngine, count: int, rng: random.Random):
+    interests = list(engine.interest_keywords)
+    return {
+        f"user-{i}": {
+            'interests': rng.sample(interests, rng.randint(1, 3)),
+            'background': rng.sample(['hackathon', 'open source', 'research'], rng.randint(0, 2)),
+            'major': 'Computer Science',
+            'academic_status': 'Undergraduate',
+        }
+        for i in range(count)
+    }
+
+
+def make_sockets(count: int, slow_fraction: float, fast_latency: float, slow_latency: float, rng: random.Random):
+    return {
+        f"user-{i}": SimulatedSocket(slow_latency if rng.random() < slow_fraction else fast_latency)
+        for i in range(count)
+    }
+
+
+OPPORTUNITY = {
+    'id': 'bench-opp',
+    'name': 'Global AI and Web3 Hackathon',
+    'description': 'Build machine learning, web, mobile, cloud and blockchain projects for social good. '
+                   'Open to students interested in data science, cybersecurity, game development and fintech.',
+    'organization': 'Open Source Foundation',
+    'tags': ['AI', 'Hackathon', 'Web3', 'Python', 'Cloud', 'Startup'],
+    'eligibility': {},
+}
+
+
+def build_message(score: float):
+    opportunity = OPPORTUNITY.copy()
+    opportunity['match_score'] = score
+    return {'type': 'new_opportunity', 'opportunity': opportunity}
+
+
+async def run_sequential(engine, profiles, sockets):
+    start = time.perf_counter()
+    pushed = 0
+    for user_id, profile in profiles.items():
+        score = engine.calculate_personalized_score(OPPORTUNITY, profile)
+        if score >= MIN_SCORE:
+            await sockets[user_id].send_json(build_message(score))
+            pushed += 1
+    return time.perf_counter() - start, start, pushed
+
+
+async def run_queued(engine, profiles, sockets, max_queue: int, index=None):
+    senders = {user_id: ConnectionSender(socket, max_queue=max_queue) for user_id, socket in sockets.items()}
+    for sender in senders.values():
+        sender.start()
+
+    start = time.perf_counter()
+    if index is not None:
+        profiles = {user_id: profiles[user_id] for user_id in index.candidates(OPPORTUNITY)}
+    scores = engine.score_profiles(OPPORTUNITY, profiles)
+    pushed = 0
+    for user_id, score in scores.items():
+        if score >= MIN_SCORE and senders[user_id].enqueue(build_message(score), ('new_opportunity', OPPORTUNITY['id'])):
+            pushed += 1
+    blocked = time.perf_counter() - start
+
+    # Let the per-connection tasks drain before measuring delivery
+    while any(sender.queued for sender in senders.values()):
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(max(s.latency for s in sockets.values()))
+    for sender in senders.values():
+        sender.close()
+    return blocked, start, pushed
+
+
+def delivery_report(label: str, sockets, start: float, slow_latency: float):
+    fast = sorted(s.received_at - start for s in sockets.values() if s.received_at and s.latency < slow_latency)
+    if not fast:
+        print(f"{label:<12} no fast deliveries")
+        return
+    p50 = fast[len(fast) // 2]
+    print(f"{label:<12} fast-client delivery p50 {p50 * 1000:9.1f} ms   max {fast[-1] * 1000:9.1f} ms")
+
+
+async def main_async(args):
+    rng = random.Random(7)
+    engine = PersonalizationEngine()
+    profiles = make_profiles(engine, args.sockets, rng)
+
+    print(f"=== WebSocket fan-out: {args.sockets} sockets, {args.slow_fraction:.1%} slow "
+          f"({args.slow_latency * 1000:.0f} ms), fast {args.fast_latency * 1000:.1f} ms ===")
+
+    sockets = make_sockets(args.sockets, args.slow_fraction, args.fast_latency, args.slow_latency, random.Random(11))
+    index = None
+    if args.index:
+        index = ProfileIndex(engine)
+        for user_id, profile in profiles.items():
+            index.add(user_id, profile)
+        print(f"Index:       {len(index.candidates(OPPORTUNITY))} of {len(profiles)} users are candidates")
+    blocked, start, pushed = await run_queued(engine, profiles, sockets, args.max_queue, index)
+    print(f"Queued:      consumer blocked {blocked * 1000:9.1f} ms   ({pushed} pushes)")
+    delivery_report("Queued:", sockets, start, args.slow_latency)
+
+    if args.skip_sequential:
+        return
+
+    sockets = make_sockets(args.sockets, args.slow_fraction, args.fast_latency, args.slow_latency, random.Random(11))
+    blocked, start, pushed = await run_sequential(engine, profiles, sockets)
+    print(f"Sequential:  consumer blocked {blocked * 1000:9.1f} ms   ({pushed} pushes)")
+    delivery_report("Sequential:", sockets, start, args.slow_latency)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--slow-fraction", type=float, default=0.01)
+    parser.add_argument("--fast-latency", type=float, default=0.0005, help="Seconds per send for healthy clients")
+    parser.add_argument("--slow-latency", type=float, default=0.5, help="Seconds per send for slow clients")
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--skip-sequential", action="store_true", help="Only run the queued path")
+    parser.add_argument("--index", action="store_true", help="Score only ProfileIndex candidates on the queued path")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
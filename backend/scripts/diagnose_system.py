@@ -24,7 +24,7 @@ async def diagnose_system():
     print("\n[1] Checking Firestore Data...")
     try:
         docs = db.db.collection('scholarships').stream()
-        scholarships = [d.to_dict() for d in docs]
+        scholarships = [d.to_dict() async for d in docs]
         count = len(scholarships)
         print(f"   ✅ Firestore contains {count} scholarships.")
         
@@ -52,7 +52,7 @@ async def diagnose_system():
     print("\n[2] Checking User Profiles...")
     try:
         users = db.db.collection('users').stream()
-        user_count = sum(1 for _ in users)
+        user_count = len([u async for u in users])
         print(f"   ℹ️ Found {user_count} user profiles.")
     except Exception as e:
         print(f"   ❌ User DB Check Failed: {e}")
@@ -27,15 +27,15 @@ async def purge_data():
     count = 0
     batch = db.db.batch()
     
-    for doc in docs:
+    async for doc in docs:
         batch.delete(doc.reference)
         count += 1
         if count % 400 == 0:
-            batch.commit()
+            await batch.commit()
             batch = db.db.batch()
             print(f"      ... deleted {count} docs")
             
-    batch.commit()
+    await batch.commit()
     print(f"Deleted {count} total scholarships.")
     
     # 2. Purge User Matches
@@ -44,14 +44,14 @@ async def purge_data():
     count = 0
     batch = db.db.batch()
     
-    for doc in docs:
+    async for doc in docs:
         batch.delete(doc.reference)
         count += 1
         if count % 400 == 0:
-            batch.commit()
+            await batch.commit()
             batch = db.db.batch()
     
-    batch.commit()
+    await batch.commit()
     print(f"Deleted {count} user match records.")
     
     print("PURGE COMPLETE. The system is clean.")
@@ -20,8 +20,8 @@ async def test_bounty_extraction():
     # 1. Crawl (Simulate Hunter Drone)
     print("Deploying Hunter Drone...")
     # Manually use Playwright to get content to avoid full Kafka pipeline for test
-    await crawler_service._init_browser()
-    context = await crawler_service._create_stealth_context()
+    browser = await crawler_service._launch_browser()
+    context = await crawler_service._create_stealth_context(browser)
     page = await context.new_page()
     
     try:
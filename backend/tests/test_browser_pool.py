@@ -0,0 +1,112 @@
+"""
+Unit Tests for BrowserPool
+Contexts are reused; browsers are recycled by page budget and relaunched after crashes
+"""
+import asyncio
+import pytest
+
+from app.services.browser_pool import BrowserPool
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.handlers = []
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def is_connected(self):
+        return self.connected
+
+    def crash(self):
+        self.connected = False
+        for handler in self.handlers:
+            handler(self)
+
+    async def close(self):
+        self.connected = False
+
+
+def make_pool(**kwargs):
+    launched = []
+    prepared = []
+
+    async def launch():
+        launched.append(FakeBrowser())
+        return launched[-1]
+
+    async def prepare_context(browser):
+        prepared.append(FakeContext(browser))
+        return prepared[-1]
+
+    return BrowserPool(launch, prepare_context, max_rss_mb=0, **kwargs), launched, prepared
+
+
+class TestBrowserPool:
+    """Test suite for the recycling browser pool"""
+
+    @pytest.mark.asyncio
+    async def test_reuses_warm_contexts(self):
+        pool, launched, prepared = make_pool(contexts_per_browser=2)
+
+        for _ in range(6):
+            async with pool.lease() as context:
+                assert context.browser is launched[0]
+
+        assert len(launched) == 1
+        assert len(prepared) == 2
+        assert pool.stats()["pages_total"] == 6
+
+    @pytest.mark.asyncio
+    async def test_recycles_after_page_budget(self):
+        pool, launched, prepared = make_pool(contexts_per_browser=1, max_pages=3)
+
+        for _ in range(4):
+            async with pool.lease():
+                pass
+
+        assert len(launched) == 2
+        assert pool.recycles == 1
+        assert prepared[0].closed and not launched[0].connected
+
+    @pytest.mark.asyncio
+    async def test_waits_for_open_pages_before_recycling(self):
+        pool, launched, _ = make_pool(contexts_per_browser=1, max_pages=1)
+        release = asyncio.Event()
+
+        async def long_page():
+            async with pool.lease():
+                await release.wait()
+
+        first = asyncio.create_task(long_page())
+        second = asyncio.create_task(long_page())
+        await asyncio.sleep(0.01)
+        release.set()
+        await asyncio.gather(first, second)
+
+        # Both pages ran on the first browser; it was relaunched only once they closed
+        assert len(launched) == 2
+        assert pool.slots[0].browser is launched[1]
+
+    @pytest.mark.asyncio
+    async def test_relaunches_crashed_browser(self):
+        pool, launched, _ = make_pool()
+
+        async with pool.lease():
+            pass
+        launched[0].crash()
+        async with pool.lease() as context:
+            assert context.browser is launched[1]
+
+        assert pool.crashes == 1
+        assert pool.stats()["browsers"][0]["running"]
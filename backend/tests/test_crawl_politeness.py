@@ -0,0 +1,61 @@
+"""
+Unit Tests for DomainLimiter
+One domain is crawled slowly; different domains never wait for each other
+"""
+import asyncio
+import pytest
+
+from app.services.crawl_politeness import DomainLimiter, domain_of
+
+
+async def crawl(limiter, url, starts, hold=0.0):
+    async with limiter.slot(url):
+        starts.append((url, asyncio.get_running_loop().time()))
+        await asyncio.sleep(hold)
+
+
+class TestDomainLimiter:
+    """Test suite for per-domain politeness"""
+
+    def test_domain_key_ignores_www_and_port(self):
+        assert domain_of("https://www.Devpost.com/hackathons") == "devpost.com"
+        assert domain_of("http://127.0.0.1:8080/page") == "127.0.0.1"
+
+    @pytest.mark.asyncio
+    async def test_spaces_requests_to_one_domain(self):
+        limiter = DomainLimiter(concurrency=4, min_interval=0.05, jitter=0.0)
+        starts = []
+
+        await asyncio.gather(*(crawl(limiter, f"https://a.example/{i}", starts) for i in range(3)))
+
+        times = sorted(t for _, t in starts)
+        assert times[1] - times[0] >= 0.045
+        assert times[2] - times[1] >= 0.045
+
+    @pytest.mark.asyncio
+    async def test_other_domains_do_not_wait(self):
+        limiter = DomainLimiter(concurrency=1, min_interval=0.5, jitter=0.0)
+        starts = []
+        loop_start = asyncio.get_running_loop().time()
+
+        await asyncio.gather(*(crawl(limiter, f"https://site{i}.example/", starts) for i in range(5)))
+
+        assert all(t - loop_start < 0.1 for _, t in starts)
+        assert limiter.stats()["domains"] == 5
+
+    @pytest.mark.asyncio
+    async def test_caps_open_pages_per_domain(self):
+        limiter = DomainLimiter(concurrency=2, min_interval=0.0, jitter=0.0)
+        open_now = []
+        peak = []
+
+        async def visit(i):
+            async with limiter.slot(f"https://a.example/{i}"):
+                open_now.append(i)
+                peak.append(len(open_now))
+                await asyncio.sleep(0.01)
+                open_now.remove(i)
+
+        await asyncio.gather(*(visit(i) for i in range(6)))
+
+        assert max(peak) == 2
@@ -0,0 +1,71 @@
+"""
+Unit Tests for CrawlStore
+Unchanged pages are skipped; changed listing pages yield only their new items
+"""
+from app.services.crawl_store import CrawlStore, content_hash, split_items
+
+
+def listing(titles, script="var build = 1;"):
+    cards = "".join(
+        f'<article class="card featured"><h3>{t}</h3><a href="/o/{t}">Apply</a></article>' for t in titles
+    )
+    return f"<html><body><nav><a href='/'>Home</a></nav><main>{cards}</main><script>{script}</script></body></html>"
+
+
+class TestCrawlStore:
+    """Test suite for crawl change detection"""
+
+    def test_hash_ignores_scripts_and_whitespace(self):
+        page = listing(["a", "b", "c"])
+        noisy = listing(["a", "b", "c"], script="var build = 2;").replace("<h3>", "\n  <h3>")
+
+        assert content_hash(page) == content_hash(noisy)
+        assert content_hash(page) != content_hash(listing(["a", "b", "d"]))
+
+    def test_splits_items_by_learned_selector(self):
+        items = split_items(listing(["a", "b", "c", "d"]), "article.card")
+
+        assert len(items) == 4
+        assert items[0].startswith('<article class="card featured">') and items[0].endswith("</article>")
+
+    def test_first_crawl_publishes_whole_page(self):
+        store = CrawlStore()
+        page = listing(["a", "b", "c"])
+
+        delta = store.observe("https://x.example/list", page, {"ETag": '"v1"'}, "article.card")
+
+        assert delta.kind == "new" and delta.html == page
+        assert store.conditional_headers("https://x.example/list") == {}
+        store.commit("https://x.example/list", delta)
+        assert store.conditional_headers("https://x.example/list") == {"If-None-Match": '"v1"'}
+
+    def test_unchanged_page_is_not_published(self):
+        store = CrawlStore()
+        url = "https://x.example/list"
+        store.commit(url, store.observe(url, listing(["a", "b", "c"]), selector="article.card"))
+
+        delta = store.observe(url, listing(["a", "b", "c"], script="var build = 9;"), selector="article.card")
+
+        assert delta.kind == "unchanged" and not delta.publish
+
+    def test_changed_page_publishes_only_new_items(self, tmp_path):
+        path = str(tmp_path / "store.json")
+        store = CrawlStore(path)
+        url = "https://x.example/list"
+        store.commit(url, store.observe(url, listing(["a", "b", "c"]), selector="article.card"))
+        store.save()
+
+        delta = CrawlStore(path).observe(url, listing(["a", "c", "d", "e"]), selector="article.card")
+
+        assert delta.kind == "items"
+        assert (delta.new_items, delta.removed_items, delta.total_items) == (2, 1, 4)
+        assert "/o/d" in delta.html and "/o/e" in delta.html and "/o/a" not in delta.html
+
+    def test_removals_alone_are_not_published(self):
+        store = CrawlStore()
+        url = "https://x.example/list"
+        store.commit(url, store.observe(url, listing(["a", "b", "c", "d"]), selector="article.card"))
+
+        delta = store.observe(url, listing(["a", "b", "c"]), selector="article.card")
+
+        assert delta.kind == "no_new_items" and not delta.publish
@@ -0,0 +1,189 @@
+"""
+Unit Tests for EmbeddingMatrix and IVFIndex
+Vectorized cosine scores must agree with the scalar MatchingEngine formula
+"""
+import math
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from app.services.embedding_index import EmbeddingMatrix, IVFIndex
+
+
+def scalar_cosine(a, b):
+    """Reference: MatchingEngine._compute_vector_similarity"""
+    dot_product = sum(x * y for x, y in zip(a, b))
+    magnitude_a = math.sqrt(sum(x * x for x in a))
+    magnitude_b = math.sqrt(sum(y * y for y in b))
+    if magnitude_a == 0 or magnitude_b == 0:
+        return 0.0
+    return dot_product / (magnitude_a * magnitude_b)
+
+
+def random_vector(dim=32):
+    return [random.uniform(-1, 1) for _ in range(dim)]
+
+
+class TestEmbeddingMatrix:
+    """Test suite for the embedding matrix"""
+
+    def test_similarities_match_scalar_formula(self):
+        random.seed(7)
+        matrix = EmbeddingMatrix(initial_capacity=4)  # forces growth
+        vectors = {f"opp-{i}": random_vector() for i in range(50)}
+        for opp_id, vector in vectors.items():
+            assert matrix.upsert(opp_id, vector)
+
+        query = random_vector()
+        scores = matrix.similarities(query)
+
+        for opp_id, vector in vectors.items():
+            expected = scalar_cosine(vector, query)
+            assert scores[matrix.row_of(opp_id)] == pytest.approx(expected, abs=1e-5)
+
+    def test_zero_vectors_score_zero(self):
+        matrix = EmbeddingMatrix()
+        matrix.upsert("zero", [0.0] * 8)
+        matrix.upsert("one", [1.0] * 8)
+
+        assert matrix.similarities([1.0] * 8)[matrix.row_of("zero")] == 0.0
+        assert not matrix.similarities([0.0] * 8).any()
+
+    def test_rejects_mismatched_dimensions(self):
+        matrix = EmbeddingMatrix()
+        assert matrix.upsert("a", [1.0, 2.0, 3.0])
+        assert not matrix.upsert("b", [1.0, 2.0])
+        assert matrix.similarities([1.0, 2.0]) is None
+
+    def test_remove_recycles_rows(self):
+        matrix = EmbeddingMatrix()
+        matrix.upsert("a", [1.0, 0.0])
+        matrix.upsert("b", [0.0, 1.0])
+        row_a = matrix.row_of("a")
+
+        matrix.remove("a")
+        assert "a" not in matrix
+        assert matrix.similarities([1.0, 0.0])[row_a] == 0.0
+
+        matrix.upsert("c", [1.0, 1.0])
+        assert matrix.row_of("c") == row_a
+
+    def test_sync_skips_unchanged_and_drops_missing(self):
+        matrix = EmbeddingMatrix()
+        vector = [1.0, 0.0]
+        matrix.sync([("a", vector), ("b", [0.0, 1.0])])
+        assert matrix.is_current("a", vector)
+
+        matrix.sync([("a", vector), ("b", None)])
+        assert "a" in matrix
+        assert "b" not in matrix
+
+        replacement = [0.0, 1.0]
+        matrix.sync([("a", replacement)])
+        assert matrix.is_current("a", replacement)
+        assert matrix.similarities([0.0, 1.0])[matrix.row_of("a")] == pytest.approx(1.0)
+
+
+def clustered_vectors(count, dim=16, clusters=8, seed=3):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.1 * rng.normal(size=(count, dim))
+
+
+class TestIVFIndex:
+    """Test suite for the IVF approximate nearest-neighbour index"""
+
+    def test_exact_below_training_threshold(self):
+        index = IVFIndex(min_train_size=100)
+        for i, vector in enumerate(clustered_vectors(50)):
+            index.upsert(f"opp-{i}", vector)
+
+        assert not index.is_trained
+        query = clustered_vectors(1, seed=9)[0]
+        assert index.search(query, 5) == index.search_exact(query, 5)
+
+    def test_full_probe_matches_brute_force(self):
+        index = IVFIndex(min_train_size=64)
+        for i, vector in enumerate(clustered_vectors(400)):
+            index.upsert(f"opp-{i}", vector)
+
+        assert index.is_trained
+        index.nprobe = len(index.centroids)
+        query = clustered_vectors(1, seed=11)[0]
+        approx = [item_id for item_id, _ in index.search(query, 10)]
+        exact = [item_id for item_id, _ in index.search_exact(query, 10)]
+        assert approx == exact
+
+    def test_incremental_upsert_and_remove(self):
+        index = IVFIndex(min_train_size=64)
+        for i, vector in enumerate(clustered_vectors(200)):
+            index.upsert(f"opp-{i}", vector)
+
+        probe = np.ones(16)
+        index.upsert("fresh", probe)
+        assert index.search(probe, 1)[0][0] == "fresh"
+
+        index.remove("fresh")
+        assert "fresh" not in [item_id for item_id, _ in index.search(probe, 10)]
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        path = str(tmp_path / "ann" / "opportunities.npz")
+        index = IVFIndex(path=path, min_train_size=64)
+        for i, vector in enumerate(clustered_vectors(200)):
+            index.upsert(f"opp-{i}", vector)
+        index.save()
+
+        restored = IVFIndex(path=path, min_train_size=64)
+        restored.load()
+
+        assert len(restored) == len(index)
+        assert restored.is_trained
+        query = clustered_vectors(1, seed=5)[0]
+        original_hits = index.search(query, 5)
+        restored_hits = restored.search(query, 5)
+        assert [i for i, _ in restored_hits] == [i for i, _ in original_hits]
+        assert [s for _, s in restored_hits] == pytest.approx([s for _, s in original_hits], abs=1e-5)
+
+    def test_search_restricted_to_ids_is_not_crowded_out(self):
+        index = IVFIndex(min_train_size=64)
+        vectors = clustered_vectors(550)
+        for i, vector in enumerate(vectors[:500]):
+            index.upsert(f"old-{i}", vector)
+        batch = [f"new-{i}" for i in range(50)]
+        for item_id, vector in zip(batch, vectors[500:]):
+            index.upsert(item_id, vector)
+
+        query = clustered_vectors(1, seed=13)[0]
+        hits = index.search(query, 200, ids=batch)
+
+        assert sorted(item_id for item_id, _ in hits) == sorted(batch)
+        batch_only = IVFIndex()
+        for item_id, vector in zip(batch, vectors[500:]):
+            batch_only.upsert(item_id, vector)
+        assert [i for i, _ in hits[:10]] == [i for i, _ in batch_only.search_exact(query, 10)]
+
+        # Fewer probed rows than batch items: probed lists intersected with the batch
+        index.nprobe = 1
+        assert {i for i, _ in index.search(query, 200, ids=batch)} <= set(batch)
+
+    def test_background_fit_keeps_rows_changed_meanwhile(self):
+        index = IVFIndex(min_train_size=64, auto_train=False)
+        for i, vector in enumerate(clustered_vectors(200)):
+            index.upsert(f"opp-{i}", vector)
+        assert not index.is_trained
+        assert index.needs_training
+
+        rows, vectors = index.snapshot()
+        assert not index.needs_training  # one fit at a time
+        probe = np.ones(16)
+        index.upsert("fresh", probe)
+        index.remove("opp-0")
+        index.install(rows, *index.fit(vectors))
+
+        assert index.is_trained
+        assert index.search(probe, 1)[0][0] == "fresh"
+        index.nprobe = len(index.centroids)
+        assert "opp-0" not in [item_id for item_id, _ in index.search(probe, 300)]
+        assert len(index.search(probe, 300)) == len(index) == 200
@@ -0,0 +1,189 @@
+"""
+Unit Tests for the expiry sweeper and deadline queries
+Only deadlines before today's cutoff are archived; undated opportunities stay live
+"""
+import pytest
+
+from app.database import FirebaseDB, expiry_cutoff
+from app.services import expiry_sweeper as sweeper_module
+from app.services import opportunity_catalog as catalog_module
+from app.services.expiry_sweeper import ExpirySweeper
+from app.services.opportunity_catalog import OpportunityCatalog
+
+DAY = 86400
+MISSING = object()
+
+
+class FakeDoc:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+        self.reference = self
+
+    def to_dict(self):
+        return dict(self.collection.docs[self.id])
+
+
+class FakeAggregate:
+    def __init__(self, query):
+        self.query = query
+
+    async def get(self):
+        class Result:
+            value = len(self.query.matches())
+        return [[Result()]]
+
+
+class FakeQuery:
+    """Firestore filter semantics: a missing field never matches, null only matches == None"""
+    OPS = {
+        '<': lambda a, b: a < b,
+        '<=': lambda a, b: a <= b,
+        '>=': lambda a, b: a >= b,
+        '==': lambda a, b: a == b,
+    }
+
+    def __init__(self, collection, filters=(), order=None, limit_to=None):
+        self.collection = collection
+        self.filters = list(filters)
+        self.order = order
+        self.limit_to = limit_to
+
+    def where(self, field, op, value):
+        return FakeQuery(self.collection, self.filters + [(field, op, value)], self.order, self.limit_to)
+
+    def order_by(self, field):
+        return FakeQuery(self.collection, self.filters, field, self.limit_to)
+
+    def limit(self, count):
+        return FakeQuery(self.collection, self.filters, self.order, count)
+
+    def count(self):
+        return FakeAggregate(self)
+
+    def _match(self, data, field, op, value):
+        actual = data.get(field, MISSING)
+        if actual is MISSING:
+            return False
+        if actual is None or value is None:
+            return op == '==' and actual is value
+        return self.OPS[op](actual, value)
+
+    def matches(self):
+        ids = [
+            doc_id for doc_id, data in self.collection.docs.items()
+            if all(self._match(data, *f) for f in self.filters)
+        ]
+        if self.order:
+            ids.sort(key=lambda doc_id: self.collection.docs[doc_id][self.order])
+        return ids[:self.limit_to] if self.limit_to else ids
+
+    async def stream(self):
+        for doc_id in self.matches():
+            yield FakeDoc(self.collection, doc_id)
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self):
+        self.docs = {}
+        super().__init__(self)
+
+    def document(self, doc_id):
+        return FakeDoc(self, doc_id)
+
+
+class FakeBatch:
+    def __init__(self):
+        self.ops = []
+
+    def set(self, ref, data):
+        self.ops.append(lambda: ref.collection.docs.__setitem__(ref.id, data))
+
+    def delete(self, ref):
+        self.ops.append(lambda: ref.collection.docs.pop(ref.id, None))
+
+    async def commit(self):
+        for op in self.ops:
+            op()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections = {}
+
+    def collection(self, name):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def batch(self):
+        return FakeBatch()
+
+
+def fake_db(deadlines) -> FirebaseDB:
+    """A FirebaseDB over an in-memory store; MISSING leaves the field out"""
+    database = FirebaseDB.__new__(FirebaseDB)
+    database.db = FakeFirestore()
+    for sid, deadline_timestamp in deadlines.items():
+        doc = {'id': sid, 'name': sid, 'source_url': f"https://example.org/{sid}"}
+        if deadline_timestamp is not MISSING:
+            doc['deadline_timestamp'] = deadline_timestamp
+        database.db.collection('scholarships').docs[sid] = doc
+    return database
+
+
+class TestDeadlineQueries:
+    """Test suite for the deadline_timestamp queries"""
+
+    @pytest.mark.asyncio
+    async def test_active_query_keeps_undated_opportunities(self):
+        cutoff = expiry_cutoff()
+        database = fake_db({"old": cutoff - 1, "later": cutoff + 2 * DAY, "today": cutoff, "undated": None})
+
+        active = await database.get_active_scholarships()
+        bounded = await database.get_active_scholarships(max_deadline=cutoff + DAY)
+
+        assert [s.id for s in active] == ["undated", "today", "later"]
+        assert [s.id for s in bounded] == ["today"]
+
+    @pytest.mark.asyncio
+    async def test_documents_missing_the_field_are_counted(self):
+        database = fake_db({"dated": expiry_cutoff(), "undated": None, "legacy": MISSING})
+
+        assert await database.count_scholarships_missing_deadline() == 1
+        assert [s.id for s in await database.get_active_scholarships()] == ["undated", "dated"]
+
+
+class TestExpirySweeper:
+    """Test suite for the expiry sweep"""
+
+    @pytest.mark.asyncio
+    async def test_sweep_archives_only_deadlines_before_todays_cutoff(self, monkeypatch):
+        cutoff = expiry_cutoff()
+        database = fake_db({
+            "last-week": cutoff - 7 * DAY,
+            "yesterday": cutoff - 1,
+            "today": cutoff,
+            "undated": None,
+        })
+        catalog = OpportunityCatalog()
+        monkeypatch.setattr(catalog_module, "db", database)
+        monkeypatch.setattr(sweeper_module, "db", database)
+        monkeypatch.setattr(sweeper_module, "opportunity_catalog", catalog)
+        await catalog.reload()
+        sweeper = ExpirySweeper()
+
+        assert await sweeper.sweep() == 2
+
+        store = database.db.collections
+        assert set(store['scholarships'].docs) == {"today", "undated"}
+        assert set(store['scholarships_archive'].docs) == {"last-week", "yesterday"}
+        assert sorted(s.id for s in await catalog.get_all()) == ["today", "undated"]
+        assert sweeper.stats()['archived_total'] == 2
+
+    @pytest.mark.asyncio
+    async def test_startup_check_reports_missing_deadlines(self, monkeypatch):
+        database = fake_db({"dated": expiry_cutoff(), "legacy-a": MISSING, "legacy-b": MISSING})
+        monkeypatch.setattr(sweeper_module, "db", database)
+        sweeper = ExpirySweeper()
+
+        assert await sweeper.check_deadline_backfill() == 2
+        assert sweeper.stats()['missing_deadline_timestamp'] == 2
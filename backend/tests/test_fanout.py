@@ -0,0 +1,95 @@
+"""
+Unit Tests for ConnectionSender
+Bounded per-connection queues must isolate slow clients without blocking enqueue
+"""
+import asyncio
+import pytest
+
+from app.services.fanout import ConnectionSender
+
+
+class FakeSocket:
+    """Records sent messages; optionally blocks until released"""
+
+    def __init__(self, fail: bool = False):
+        self.sent = []
+        self.fail = fail
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def send_json(self, message):
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("socket closed")
+        self.sent.append(message)
+
+
+class TestConnectionSender:
+    """Test suite for the per-connection send queue"""
+
+    @pytest.mark.asyncio
+    async def test_delivers_in_order(self):
+        socket = FakeSocket()
+        sender = ConnectionSender(socket)
+        sender.start()
+
+        for i in range(5):
+            assert sender.enqueue({'n': i})
+        await asyncio.sleep(0.01)
+
+        assert [m['n'] for m in socket.sent] == [0, 1, 2, 3, 4]
+        assert sender.sent == 5
+        sender.close()
+
+    @pytest.mark.asyncio
+    async def test_full_queue_drops_oldest(self):
+        """A stalled client keeps only its newest max_queue messages"""
+        socket = FakeSocket()
+        socket.gate.clear()
+        sender = ConnectionSender(socket, max_queue=3)
+        sender.start()
+        sender.enqueue({'n': 0})
+        await asyncio.sleep(0)
+
+        # First message is already in flight; the next five contend for 3 slots
+        for i in range(1, 6):
+            sender.enqueue({'n': i})
+        socket.gate.set()
+        await asyncio.sleep(0.01)
+
+        assert [m['n'] for m in socket.sent] == [0, 3, 4, 5]
+        assert sender.dropped == 2
+        sender.close()
+
+    @pytest.mark.asyncio
+    async def test_coalesces_by_key(self):
+        """A queued message is replaced in place by a newer one with the same key"""
+        socket = FakeSocket()
+        socket.gate.clear()
+        sender = ConnectionSender(socket)
+        sender.start()
+        sender.enqueue({'n': 'first'})
+        await asyncio.sleep(0)
+
+        sender.enqueue({'v': 1}, coalesce_key='opp-1')
+        sender.enqueue({'n': 'other'})
+        sender.enqueue({'v': 2}, coalesce_key='opp-1')
+        socket.gate.set()
+        await asyncio.sleep(0.01)
+
+        assert socket.sent == [{'n': 'first'}, {'v': 2}, {'n': 'other'}]
+        assert sender.coalesced == 1
+        sender.close()
+
+    @pytest.mark.asyncio
+    async def test_failed_send_closes_and_reports(self):
+        failures = []
+        sender = ConnectionSender(FakeSocket(fail=True), on_failure=failures.append)
+        sender.start()
+
+        sender.enqueue({'n': 1})
+        await asyncio.sleep(0.01)
+
+        assert failures == [sender]
+        assert sender.closed
+        assert not sender.enqueue({'n': 2})
@@ -0,0 +1,178 @@
+"""
+Unit Tests for GeminiScheduler
+Calls run concurrently within the RPM/TPM budget; a rate-limited call is
+retried later without holding up the others
+"""
+import asyncio
+import types
+
+import pytest
+
+from app.services.gemini_scheduler import GeminiScheduler, TokenBucket, estimate_tokens
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimited(Exception):
+    def __init__(self):
+        super().__init__("429 Resource has been exhausted (e.g. check quota).")
+
+
+def make_scheduler(**kwargs) -> GeminiScheduler:
+    options = dict(requests_per_minute=6000, tokens_per_minute=10_000_000, max_in_flight=4, backoff_seconds=0.05)
+    options.update(kwargs)
+    return GeminiScheduler(**options)
+
+
+class TestTokenBucket:
+    """Test suite for budget accounting"""
+
+    def test_refills_continuously_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock)
+
+        bucket.take(60)
+        assert bucket.wait_time(1) == pytest.approx(1.0)
+
+        clock.now = 30
+        assert bucket.wait_time(30) == 0
+        clock.now = 600
+        bucket.take(0)
+        assert bucket.level == 60
+
+    def test_oversized_request_waits_for_a_full_bucket_not_forever(self):
+        clock = FakeClock()
+        bucket = TokenBucket(1000, clock)
+        bucket.take(500)
+
+        assert bucket.wait_time(5000) == pytest.approx(30.0)
+
+    def test_drain_and_credit(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock)
+
+        bucket.drain()
+        assert bucket.level == 0
+        bucket.credit(-50)
+        assert bucket.level == -50
+        bucket.credit(500)
+        assert bucket.level == 100
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("x" * 4000) == 1001
+
+
+class TestGeminiScheduler:
+    """Test suite for the concurrent, quota-governed runner"""
+
+    @pytest.mark.asyncio
+    async def test_runs_calls_concurrently_up_to_max_in_flight(self):
+        scheduler = make_scheduler(max_in_flight=3)
+        active, peak = 0, 0
+
+        async def call():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.05)
+            active -= 1
+            return "ok"
+
+        results = await asyncio.gather(*(scheduler.run(call, tokens=10) for _ in range(9)))
+
+        assert results == ["ok"] * 9
+        assert peak == 3
+        assert scheduler.completed == 9
+
+    @pytest.mark.asyncio
+    async def test_requests_per_minute_spaces_calls(self):
+        # 1200 RPM: a burst of 1200, then one call every 50 ms
+        scheduler = make_scheduler(requests_per_minute=1200)
+        scheduler.requests.take(1200)
+        loop = asyncio.get_running_loop()
+        started = []
+
+        async def call():
+            started.append(loop.time())
+
+        await asyncio.gather(*(scheduler.run(call, tokens=1) for _ in range(3)))
+
+        assert started[1] - started[0] >= 0.04
+        assert started[2] - started[1] >= 0.04
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_call_does_not_block_others(self):
+        scheduler = make_scheduler(backoff_seconds=0.2)
+        order = []
+        attempts = {"limited": 0}
+
+        async def limited_once():
+            attempts["limited"] += 1
+            if attempts["limited"] == 1:
+                raise RateLimited()
+            order.append("limited")
+            return "late"
+
+        async def quick(name):
+            await asyncio.sleep(0.01)
+            order.append(name)
+            return name
+
+        # The 429 drains the buckets; keep them generous so only the backoff matters
+        scheduler.requests.rate = scheduler.tokens.rate = 1e9
+        results = await asyncio.gather(
+            scheduler.run(limited_once, tokens=10),
+            scheduler.run(lambda: quick("a"), tokens=10),
+            scheduler.run(lambda: quick("b"), tokens=10),
+        )
+
+        assert results == ["late", "a", "b"]
+        assert order[-1] == "limited"
+        assert scheduler.rate_limited == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self):
+        scheduler = make_scheduler(max_attempts=2, backoff_seconds=0.01)
+        scheduler.requests.rate = scheduler.tokens.rate = 1e9
+        calls = []
+
+        async def always_limited():
+            calls.append(1)
+            raise RateLimited()
+
+        with pytest.raises(RateLimited):
+            await scheduler.run(always_limited, tokens=10)
+        assert len(calls) == 2
+        assert scheduler.failed == 1
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_retried(self):
+        scheduler = make_scheduler()
+        calls = []
+
+        async def broken():
+            calls.append(1)
+            raise ValueError("bad request")
+
+        with pytest.raises(ValueError):
+            await scheduler.run(broken, tokens=10)
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_token_budget_is_corrected_from_usage_metadata(self):
+        scheduler = make_scheduler(tokens_per_minute=100_000)
+
+        async def call():
+            return types.SimpleNamespace(usage_metadata=types.SimpleNamespace(total_token_count=3000))
+
+        level = scheduler.tokens.level
+        await scheduler.run(call, tokens=1000)
+
+        assert scheduler.tokens.level == pytest.approx(level - 3000, abs=50)
+        assert scheduler.tokens_used == 3000
@@ -0,0 +1,61 @@
+"""
+Unit Tests for the crawler's HTML preprocessing stage
+Boilerplate goes, listing content and links stay
+"""
+from app.services.html_preprocessor import payload_fields, preprocess_html
+
+PAGE = """<!doctype html><html><head><title> Open Hackathons </title>
+<style>.card { color: red }</style><script>window.__STATE__ = {"big": "blob"}</script></head>
+<body><nav class="top"><a href="/login">Log in</a></nav>
+<div role="banner">Cookie banner</div>
+<main class="container" data-reactroot="">
+  <article class="card" data-id="1"><h3><span class="t">AI Hackathon</span></h3>
+    <p>Prize <strong>$10,000</strong></p><a class="btn" href="/h/ai">Details</a>
+    <button>Share</button><div class="spacer"></div></article>
+  <article class="card" data-id="2"><h3>Climate Jam</h3><time datetime="2026-03-01">Mar 1</time>
+    <a href="https://other.example/jam">Apply</a></article>
+</main>
+<footer>© Example</footer><!-- tracking --></body></html>"""
+
+
+class TestPreprocessHtml:
+    """Test suite for boilerplate stripping and link extraction"""
+
+    def test_keeps_content_and_drops_boilerplate(self):
+        page = preprocess_html(PAGE, "https://hack.example/list")
+
+        assert "AI Hackathon" in page.html and "$10,000" in page.html and "Climate Jam" in page.html
+        for noise in ("__STATE__", "color: red", "Log in", "Cookie banner", "Share", "©", "tracking", "class=", "data-id"):
+            assert noise not in page.html
+        assert page.title == "Open Hackathons"
+        assert page.chars < page.raw_chars
+
+    def test_links_are_absolute_and_attributes_minimal(self):
+        page = preprocess_html(PAGE, "https://hack.example/list")
+
+        assert [link["url"] for link in page.links] == ["https://hack.example/h/ai", "https://other.example/jam"]
+        assert page.links[0]["text"] == "Details"
+        assert '<a href="https://hack.example/h/ai">' in page.html
+        assert '<time datetime="2026-03-01">' in page.html
+        assert "<span" not in page.html and "<div></div>" not in page.html
+
+    def test_small_main_falls_back_to_body(self):
+        html = "<html><body><main><p>Menu</p></main><section>" + "<p>Scholarship text</p>" * 20 + "</section></body></html>"
+
+        page = preprocess_html(html)
+
+        assert page.html.count("Scholarship text") == 20
+
+    def test_fragment_and_empty_input(self):
+        fragment = '<div data-crawl-delta="items"><article class="card"><a href="/o/9">New grant</a></article></div>'
+
+        page = preprocess_html(fragment, "https://x.example/")
+
+        assert "New grant" in page.html and page.links[0]["url"] == "https://x.example/o/9"
+        assert preprocess_html("").html == ""
+
+    def test_payload_fields_mark_preprocessed(self):
+        fields = payload_fields(preprocess_html(PAGE, "https://hack.example/"))
+
+        assert fields["preprocessed"] is True
+        assert set(fields) == {"html", "links", "preprocessed", "raw_chars"}
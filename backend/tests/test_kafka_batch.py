@@ -0,0 +1,141 @@
+"""
+Unit Tests for BatchConsumer and OffsetTracker
+Offsets must only be committed after every message in the batch was handled
+"""
+import asyncio
+import json
+import pytest
+
+from app.services.kafka_batch import BatchConsumer, OffsetTracker
+
+
+class FakeMessage:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def error(self):
+        return None
+
+    def value(self):
+        return self.payload
+
+    def headers(self):
+        return None
+
+
+class FakeConsumer:
+    def __init__(self, payloads):
+        self.messages = [FakeMessage(p) for p in payloads]
+        self.commits = []
+        self.events = []
+
+    def consume(self, num_messages, timeout):
+        batch, self.messages = self.messages[:num_messages], self.messages[num_messages:]
+        return batch
+
+    def commit(self, asynchronous=True):
+        self.commits.append(asynchronous)
+        self.events.append('commit')
+
+
+def encode(item):
+    return json.dumps(item).encode('utf-8')
+
+
+def decode(raw, headers):
+    return json.loads(raw) if raw != b'not json' else None
+
+
+class TestBatchConsumer:
+    """Test suite for the batched at-least-once consumer"""
+
+    @pytest.mark.asyncio
+    async def test_commits_once_after_whole_batch(self):
+        consumer = FakeConsumer([encode({'id': i}) for i in range(5)] + [b'not json'])
+
+        async def handler(item):
+            await asyncio.sleep(0.001 * (5 - item['id']))
+            consumer.events.append(item['id'])
+
+        batch_consumer = BatchConsumer(consumer, decode=decode, handler=handler, batch_size=10)
+        assert await batch_consumer.run_once() == 6
+
+        assert consumer.commits == [True]
+        assert consumer.events[-1] == 'commit'
+        assert sorted(consumer.events[:-1]) == [0, 1, 2, 3, 4]
+        assert batch_consumer.stats()['skipped'] == 1
+
+    @pytest.mark.asyncio
+    async def test_same_key_keeps_order(self):
+        consumer = FakeConsumer([encode({'id': 'a', 'v': v}) for v in range(4)])
+        seen = []
+
+        async def handler(item):
+            await asyncio.sleep(0.001 * (4 - item['v']))
+            seen.append(item['v'])
+
+        batch_consumer = BatchConsumer(consumer, decode=decode, handler=handler, key=lambda item: item['id'])
+        await batch_consumer.run_once()
+
+        assert seen == [0, 1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_handler_failure_is_counted_not_fatal(self):
+        consumer = FakeConsumer([encode({'id': 1}), encode({'id': 2})])
+
+        async def handler(item):
+            if item['id'] == 1:
+                raise RuntimeError("boom")
+
+        batch_consumer = BatchConsumer(consumer, decode=decode, handler=handler)
+        await batch_consumer.run_once()
+
+        assert batch_consumer.failed == 1
+        assert consumer.commits == [True]
+
+
+class TestOffsetTracker:
+    """Test suite for out-of-order completion"""
+
+    def positions(self, tracker):
+        return [(tp.topic, tp.partition, tp.offset) for tp in tracker.ready()]
+
+    def test_commit_waits_for_the_oldest_unfinished_message(self):
+        tracker = OffsetTracker()
+        for offset in (10, 11, 12):
+            tracker.track("raw", 0, offset)
+
+        tracker.done("raw", 0, 11)
+        tracker.done("raw", 0, 12)
+        assert self.positions(tracker) == [("raw", 0, 10)]
+
+        tracker.done("raw", 0, 10)
+        assert self.positions(tracker) == [("raw", 0, 13)]
+        assert tracker.pending() == 0
+
+    def test_partitions_advance_independently_and_only_when_moved(self):
+        tracker = OffsetTracker()
+        tracker.track("raw", 0, 5)
+        tracker.track("raw", 1, 7)
+        tracker.done("raw", 1, 7)
+
+        assert sorted(self.positions(tracker)) == [("raw", 0, 5), ("raw", 1, 8)]
+        assert self.positions(tracker) == []
+
+    def test_reset_forgets_in_flight_messages(self):
+        tracker = OffsetTracker()
+        tracker.track("raw", 0, 3)
+        tracker.reset()
+
+        assert tracker.pending() == 0
+        assert self.positions(tracker) == []
+
+    def test_resume_positions_start_at_the_oldest_unfinished_message(self):
+        tracker = OffsetTracker()
+        for offset in (4, 5, 6):
+            tracker.track("raw", 0, offset)
+        tracker.track("raw", 1, 9)
+        tracker.done("raw", 0, 4)
+        tracker.done("raw", 1, 9)
+
+        assert tracker.resume_positions() == {("raw", 0): 5, ("raw", 1): 10}
@@ -0,0 +1,31 @@
+"""
+Unit Tests for KafkaConfig partitioning
+Keys must be stable per opportunity; partition counts follow settings
+"""
+from app.config import settings
+from app.services.kafka_config import KafkaConfig
+
+
+class TestPartitioning:
+    """Test suite for topic partition counts and message keys"""
+
+    def test_opportunity_key_prefers_id(self):
+        assert KafkaConfig.opportunity_key({'id': 'opp-1', 'url': 'https://a.example'}) == 'opp-1'
+
+    def test_opportunity_key_is_content_hash(self):
+        first = KafkaConfig.opportunity_key({'url': 'https://a.example/grant', 'name': 'Grant'})
+        again = KafkaConfig.opportunity_key({'url': 'https://a.example/grant', 'name': 'Renamed'})
+        other = KafkaConfig.opportunity_key({'url': 'https://b.example/grant', 'name': 'Grant'})
+
+        assert first == again
+        assert first != other
+        assert first.startswith('gen_')
+
+    def test_partitions_for(self, monkeypatch):
+        monkeypatch.setattr(settings, 'kafka_default_partitions', 6)
+        monkeypatch.setattr(settings, 'kafka_topic_partitions', f"{KafkaConfig.TOPIC_RAW_HTML}=12")
+        config = KafkaConfig()
+
+        assert config.partitions_for(KafkaConfig.TOPIC_RAW_HTML) == 12
+        assert config.partitions_for(KafkaConfig.TOPIC_OPPORTUNITY_ENRICHED) == 6
+        assert config.partitions_for(KafkaConfig.TOPIC_CORTEX_COMMANDS) == 1
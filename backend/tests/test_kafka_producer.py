@@ -0,0 +1,124 @@
+"""
+Unit Tests for the async Kafka producer path
+publish() must never block the loop on delivery, only on the byte budget
+"""
+import asyncio
+import threading
+import pytest
+
+from app.services.kafka_config import KafkaProducerManager
+
+
+class FakeMessage:
+    def __init__(self, topic):
+        self._topic = topic
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return 0
+
+
+class FakeProducer:
+    """Holds deliveries until released; poll() fires released callbacks"""
+
+    def __init__(self, hold=False):
+        self.pending = []
+        self.released = threading.Event()
+        if not hold:
+            self.released.set()
+        self.lock = threading.Lock()
+
+    def produce(self, topic, key, value, headers, callback):
+        with self.lock:
+            self.pending.append((topic, callback))
+
+    def poll(self, timeout):
+        if not self.released.wait(timeout):
+            return 0
+        with self.lock:
+            pending, self.pending = self.pending, []
+        for topic, callback in pending:
+            callback(None, FakeMessage(topic))
+        return len(pending)
+
+    def flush(self, timeout):
+        return 0
+
+
+def make_manager(max_inflight_bytes, hold=False):
+    manager = KafkaProducerManager(max_inflight_bytes=max_inflight_bytes)
+    manager._producer = FakeProducer(hold)
+    manager._is_initialized = True
+    manager._start_polling()
+    return manager
+
+
+class TestAsyncPublish:
+    """Test suite for delivery futures and in-flight backpressure"""
+
+    @pytest.mark.asyncio
+    async def test_future_resolves_on_delivery(self):
+        manager = make_manager(1024 * 1024)
+        future = await manager.publish('topic-a', 'k', {'n': 1}, wire_format='json')
+
+        message = await asyncio.wait_for(future, timeout=2)
+
+        assert message.topic() == 'topic-a'
+        assert manager.stats()['delivered'] == 1
+        assert manager.budget.in_flight == 0
+        manager.close()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_budget(self):
+        manager = make_manager(max_inflight_bytes=40, hold=True)
+
+        first = await manager.publish('t', 'k', {'payload': 'x' * 20}, wire_format='json')
+        second = asyncio.create_task(manager.publish('t', 'k', {'payload': 'y' * 20}, wire_format='json'))
+        await asyncio.sleep(0.05)
+
+        # The first message still holds the budget, so the second waits
+        assert not second.done()
+
+        manager._producer.released.set()
+        await asyncio.wait_for(first, timeout=2)
+        await asyncio.wait_for(await asyncio.wait_for(second, timeout=2), timeout=2)
+        assert await manager.wait_delivered([first]) == 0
+        manager.close()
+
+
+class FullProducer(FakeProducer):
+    """librdkafka's local queue never drains"""
+
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    def produce(self, topic, key, value, headers, callback):
+        self.attempts += 1
+        raise BufferError()
+
+
+class TestSyncPublish:
+    """Test suite for publish_to_stream on a full queue"""
+
+    def test_sync_caller_retries(self):
+        manager = KafkaProducerManager()
+        manager._producer = FullProducer()
+        manager._is_initialized = True
+
+        assert manager.publish_to_stream('t', 'k', {'n': 1}, wire_format='json') is False
+        assert manager._producer.attempts == 3
+
+    @pytest.mark.asyncio
+    async def test_event_loop_caller_is_not_put_to_sleep(self):
+        manager = KafkaProducerManager()
+        manager._producer = FullProducer()
+        manager._is_initialized = True
+
+        assert manager.publish_to_stream('t', 'k', {'n': 1}, wire_format='json') is False
+        assert manager._producer.attempts == 1
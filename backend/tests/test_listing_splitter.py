@@ -0,0 +1,163 @@
+"""
+Unit Tests for the Listing Splitter
+Aggregator pages split into whole cards; known cards never reach Gemini
+"""
+import pytest
+
+from app.services.listing_splitter import KnownUrlIndex, normalize_url, split_listing
+
+
+def card(i: int) -> str:
+    return (
+        f'<div class="tile"><h3>Hackathon {i}</h3><p>Prize pool $1{i},000 - ends in {i} days</p>'
+        f'<a href="/h/{i}?utm_source=list">View</a></div>'
+    )
+
+
+def listing_page(count: int) -> str:
+    nav = "".join(f'<li><a href="/{name}">{name}</a></li>' for name in ("home", "about", "login", "help"))
+    return (
+        f"<html><body><ul class='menu'>{nav}</ul>"
+        f"<section><h1>Open hackathons</h1>{''.join(card(i) for i in range(count))}</section>"
+        "<p>Questions? <a href='/contact'>Contact us</a> any time.</p></body></html>"
+    )
+
+
+class TestSplitListing:
+    """Test suite for card detection"""
+
+    def test_splits_every_card_past_the_old_truncation_point(self):
+        html = listing_page(2000)
+        assert len(html) > 50000
+
+        cards = split_listing(html, "https://devpost.com/hackathons")
+
+        assert len(cards) == 2000
+        assert "Hackathon 1999" in cards[-1].html
+        assert cards[0].url == "https://devpost.com/h/0?utm_source=list"
+
+    def test_prefers_cards_over_navigation(self):
+        cards = split_listing(listing_page(5), "https://devpost.com/hackathons")
+
+        assert [c.url.split("?")[0] for c in cards] == [f"https://devpost.com/h/{i}" for i in range(5)]
+
+    def test_detail_page_is_not_a_listing(self):
+        html = (
+            "<html><body><h1>Equitable Excellence Scholarship</h1>"
+            "<p>Awards $25,000 to students who demonstrate ambition and self-awareness.</p>"
+            "<p>Deadline: 2026-12-01. <a href='/apply'>Apply now</a></p></body></html>"
+        )
+
+        assert split_listing(html, "https://example.org/s/1") is None
+
+    def test_dissimilar_siblings_are_not_cards(self):
+        blocks = [
+            '<div><h2>About the programme and its long history</h2><a href="/a">a</a></div>',
+            '<div><table><tr><td>Rules for entrants worldwide</td></tr></table><a href="/b">b</a></div>',
+            '<div><form>Newsletter signup for weekly updates</form><a href="/c">c</a></div>',
+        ]
+
+        assert split_listing("<html><body>" + "".join(blocks) + "</body></html>") is None
+
+
+class TestNormalizeUrl:
+    """Test suite for URL comparison"""
+
+    def test_ignores_tracking_params_fragment_www_and_trailing_slash(self):
+        a = normalize_url("https://www.Bold.org/scholarships/kevin-rhodes/?utm_source=feed&ref_feature=x#apply")
+        assert a == normalize_url("https://bold.org/scholarships/kevin-rhodes")
+
+    def test_keeps_meaningful_query(self):
+        assert normalize_url("https://a.example/s?id=1") != normalize_url("https://a.example/s?id=2")
+
+
+class TestKnownUrlIndex:
+    """Test suite for known-card dedupe"""
+
+    @pytest.mark.asyncio
+    async def test_only_new_cards_pass(self):
+        async def loader():
+            return ["https://devpost.com/h/0", "https://devpost.com/h/2/"]
+
+        index = KnownUrlIndex(loader)
+        cards = split_listing(listing_page(4), "https://devpost.com/hackathons")
+
+        fresh = await index.filter_new(cards)
+
+        assert [c.url.split("?")[0] for c in fresh] == ["https://devpost.com/h/1", "https://devpost.com/h/3"]
+        assert index.skipped == 2
+
+        index.add(c.url for c in fresh)
+        assert await index.filter_new(cards) == []
+
+    @pytest.mark.asyncio
+    async def test_loader_failure_sends_everything(self):
+        async def loader():
+            raise RuntimeError("catalog down")
+
+        index = KnownUrlIndex(loader)
+        cards = split_listing(listing_page(3), "https://devpost.com/hackathons")
+
+        assert await index.filter_new(cards) == cards
+
+    @pytest.mark.asyncio
+    async def test_reloads_after_refresh_interval(self):
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            return []
+
+        index = KnownUrlIndex(loader, refresh_seconds=0)
+        await index.filter_new([])
+        await index.filter_new([])
+
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_only_delivered_extractions_are_recorded(self):
+        async def loader():
+            return []
+
+        index = KnownUrlIndex(loader)
+        cards = split_listing(listing_page(3), "https://devpost.com/hackathons")
+        assert len(await index.filter_new(cards)) == 3
+
+        # Gemini found an opportunity in the first card only
+        index.record(cards, [{'url': "https://devpost.com/h/0", 'title': "Hackathon 0"}])
+
+        assert [c.url.split("?")[0] for c in await index.filter_new(cards)] == [
+            "https://devpost.com/h/1", "https://devpost.com/h/2"
+        ]
+
+    @pytest.mark.asyncio
+    async def test_edited_card_is_sent_again(self):
+        async def loader():
+            return [f"https://devpost.com/h/{i}" for i in range(3)]
+
+        index = KnownUrlIndex(loader)
+        before = split_listing(listing_page(3), "https://devpost.com/hackathons")
+        # First sighting of a catalog URL is its baseline
+        assert await index.filter_new(before) == []
+
+        edited = split_listing(
+            listing_page(3).replace("Prize pool $11,000", "Prize pool $50,000"), "https://devpost.com/hackathons"
+        )
+        assert [c.url.split("?")[0] for c in await index.filter_new(edited)] == ["https://devpost.com/h/1"]
+        assert index.changed == 1
+
+    @pytest.mark.asyncio
+    async def test_reload_replaces_known_urls(self):
+        known = ["https://devpost.com/h/0", "https://devpost.com/h/1", "https://devpost.com/h/2"]
+        catalog = [known, known[1:]]
+
+        async def loader():
+            return catalog.pop(0)
+
+        index = KnownUrlIndex(loader, refresh_seconds=0)
+        cards = split_listing(listing_page(3), "https://devpost.com/hackathons")
+        assert await index.filter_new(cards) == []
+
+        # h/0 was archived: the next load forgets it, h/1 and h/2 keep their baselines
+        assert [c.url.split("?")[0] for c in await index.filter_new(cards)] == ["https://devpost.com/h/0"]
+        assert len(index) == 2
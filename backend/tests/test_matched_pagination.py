@@ -0,0 +1,191 @@
+"""
+Unit Tests for /matched cursor pagination
+Pages walk the stored rank order (score desc, id) exactly once; cursors are
+opaque, validated, and still land correctly after a re-score
+"""
+import base64
+import json
+import pytest
+from fastapi import HTTPException
+
+from app.database import expiry_cutoff, is_expired
+from app.models import Scholarship, UserProfile
+from app.routes import scholarships as routes
+from app.services.matching_service import matching_service
+
+DAY = 86400
+
+PROFILE = UserProfile(name="Ada", major="Computer Science", interests=["ai"])
+
+
+def scholarship(sid: str, score: float, deadline_timestamp=None) -> Scholarship:
+    opp = Scholarship(
+        id=sid,
+        name=f"Opportunity {sid}",
+        source_url=f"https://example.org/{sid}",
+        amount=100.0,
+        deadline_timestamp=deadline_timestamp if deadline_timestamp is not None else expiry_cutoff() + 30 * DAY
+    )
+    opp.match_score = score
+    return opp
+
+
+class FakeCatalog:
+    def __init__(self, scholarships):
+        self.items = {s.id: s for s in scholarships}
+        self.requested = []
+
+    async def get_many(self, ids):
+        """Like the real catalog: archived IDs are missing, expired ones hidden"""
+        self.requested.append(list(ids))
+        return [self.items[sid] for sid in ids if sid in self.items and not is_expired(self.items[sid].deadline_timestamp)]
+
+
+class FakeDB:
+    def __init__(self):
+        self.saved = []
+
+    async def save_user_matches(self, user_id, scholarship_ids, **kwargs):
+        self.saved.append((list(scholarship_ids), kwargs))
+        return True
+
+
+def install(monkeypatch, scholarships):
+    """Serve scholarships from a fake catalog; returns (match_state, catalog, db)"""
+    catalog = FakeCatalog(scholarships)
+    fake_db = FakeDB()
+    monkeypatch.setattr(routes, "opportunity_catalog", catalog)
+    monkeypatch.setattr(routes, "db", fake_db)
+    return matching_service.build_match_state(scholarships, PROFILE), catalog, fake_db
+
+
+async def walk(match_state, limit):
+    pages, cursor = [], None
+    while True:
+        page = await routes._get_matched_page("u1", match_state, PROFILE, limit, cursor)
+        pages.append([s.id for s in page.scholarships])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages, page
+
+
+class TestCursorPaging:
+    """Test suite for page boundaries and tie order"""
+
+    @pytest.mark.asyncio
+    async def test_pages_cover_every_match_once_in_rank_order(self, monkeypatch):
+        opps = [scholarship(f"s{i:02d}", score) for i, score in enumerate([90, 70, 70, 70, 50, 95, 70, 60])]
+        match_state, catalog, _ = install(monkeypatch, opps)
+
+        pages, last = await walk(match_state, limit=3)
+
+        assert [len(p) for p in pages] == [3, 3, 2]
+        flat = [sid for page in pages for sid in page]
+        assert flat == ["s05", "s00", "s01", "s02", "s03", "s06", "s07", "s04"]
+        assert last.total_count == 8
+        # Only each page's bodies are loaded
+        assert all(len(ids) <= 3 for ids in catalog.requested)
+
+    @pytest.mark.asyncio
+    async def test_ties_split_across_a_page_boundary(self, monkeypatch):
+        opps = [scholarship(f"t{i}", 80) for i in range(5)]
+        match_state, _, _ = install(monkeypatch, opps)
+
+        pages, _ = await walk(match_state, limit=2)
+
+        assert pages == [["t0", "t1"], ["t2", "t3"], ["t4"]]
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_skipped_and_not_counted(self, monkeypatch):
+        opps = [
+            scholarship("live-a", 90),
+            scholarship("gone", 85, deadline_timestamp=expiry_cutoff() - DAY),
+            scholarship("live-b", 80),
+        ]
+        match_state, _, _ = install(monkeypatch, opps)
+
+        pages, last = await walk(match_state, limit=1)
+
+        assert [sid for page in pages for sid in page] == ["live-a", "live-b"]
+        assert last.total_count == 2
+
+    @pytest.mark.asyncio
+    async def test_legacy_unranked_state_is_ranked_and_persisted_once(self, monkeypatch):
+        opps = [scholarship("a", 10), scholarship("b", 30), scholarship("c", 20)]
+        match_state, _, fake_db = install(monkeypatch, opps)
+        match_state = {**match_state, 'scholarship_ids': ["a", "b", "c"], 'ranked': False}
+
+        page = await routes._get_matched_page("u1", match_state, PROFILE, 2, None)
+
+        assert [s.id for s in page.scholarships] == ["b", "c"]
+        assert fake_db.saved[0][0] == ["b", "c", "a"]
+        assert fake_db.saved[0][1]["ranked"] is True
+
+
+    @pytest.mark.asyncio
+    async def test_dead_matches_are_pruned_so_the_next_read_is_fast(self, monkeypatch):
+        opps = [scholarship(f"s{i}", 90 - i) for i in range(6)]
+        match_state, catalog, fake_db = install(monkeypatch, opps)
+        # Since the last save: s1 expired, s4 was archived, and the profile changed
+        catalog.items["s1"].deadline_timestamp = expiry_cutoff() - DAY
+        del catalog.items["s4"]
+        profile = UserProfile(name="Ada", major="Physics", interests=["ai"])
+
+        await routes._get_matched_page("u1", match_state, profile, 2, None)
+
+        saved_ids, saved = fake_db.saved[-1]
+        assert sorted(saved_ids) == ["s0", "s2", "s3", "s5"]
+        persisted = {'scholarship_ids': saved_ids, **saved}
+        assert matching_service.scores_current(persisted, profile)
+
+        catalog.requested.clear()
+        page = await routes._get_matched_page("u1", persisted, profile, 2, None)
+
+        assert len(page.scholarships) == 2
+        assert page.total_count == 4
+        assert catalog.requested == [saved_ids[:2]]
+
+
+class TestCursors:
+    """Test suite for cursor validation and stale cursors"""
+
+    def test_invalid_or_forged_cursors_are_rejected(self):
+        forged = [b'["high", "s1"]', b'[NaN, "s1"]', b'[true, "s1"]', b'[50, 7]', b'{"score": 50}', b'[1, 2, 3]']
+        cursors = ["not base64 !!", "A" * 1000] + [base64.urlsafe_b64encode(raw).decode() for raw in forged]
+
+        for cursor in cursors:
+            with pytest.raises(HTTPException) as error:
+                routes._decode_cursor(cursor)
+            assert error.value.status_code == 400
+
+    def test_cursor_round_trip(self):
+        assert routes._decode_cursor(routes._encode_cursor(72.5, "s1")) == (72.5, "s1")
+
+    @pytest.mark.asyncio
+    async def test_forged_position_seeks_to_its_key(self, monkeypatch):
+        opps = [scholarship(f"s{i}", 100 - i * 10) for i in range(5)]
+        match_state, _, _ = install(monkeypatch, opps)
+        forged = base64.urlsafe_b64encode(json.dumps([75, "zzz"]).encode()).decode()
+
+        page = await routes._get_matched_page("u1", match_state, PROFILE, 10, forged)
+
+        # Everything ranked after (75, "zzz"): scores 70, 60
+        assert [s.id for s in page.scholarships] == ["s3", "s4"]
+
+    @pytest.mark.asyncio
+    async def test_stale_cursor_after_rescore_continues_from_its_key(self, monkeypatch):
+        opps = [scholarship(f"s{i}", 100 - i * 10) for i in range(6)]
+        match_state, _, _ = install(monkeypatch, opps)
+        first = await routes._get_matched_page("u1", match_state, PROFILE, 2, None)
+        assert [s.id for s in first.scholarships] == ["s0", "s1"]
+
+        # Re-score between requests: s5 jumps to the top, s1 drops to the bottom
+        opps[5].match_score, opps[1].match_score = 99, 5
+        rescored = matching_service.build_match_state(opps, PROFILE)
+
+        second = await routes._get_matched_page("u1", rescored, PROFILE, 10, first.next_cursor)
+
+        # The cursor key was (90, "s1"): the new order from that key on. s5, now
+        # above the key, is not served; s1, re-scored below it, is served again.
+        assert [s.id for s in second.scholarships] == ["s2", "s3", "s4", "s1"]
+        assert second.next_cursor is None
@@ -0,0 +1,64 @@
+"""
+Unit Tests for MatchingEngine user indexing
+Profiles are vectorized only when the user index is enabled, and only once per version
+"""
+import sys
+import types
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.config import settings
+from app.services.matching_engine import MatchingEngine
+
+
+class FakeVectorizer:
+    def __init__(self):
+        self.calls = 0
+
+    async def vectorize_profile(self, profile):
+        self.calls += 1
+        return [1.0, 0.0, float(self.calls)]
+
+
+def install_vectorizer(monkeypatch) -> FakeVectorizer:
+    """Stand in for the embedding service (index_user imports it at call time)"""
+    vectorizer = FakeVectorizer()
+    module = types.ModuleType("app.services.vectorization_service")
+    module.vectorization_service = vectorizer
+    monkeypatch.setitem(sys.modules, "app.services.vectorization_service", module)
+    return vectorizer
+
+
+def profile(major: str) -> dict:
+    return {'profile': {'name': 'Ada', 'major': major, 'interests': ['ai']}}
+
+
+class TestUserIndexing:
+    """Test suite for user DNA indexing"""
+
+    @pytest.mark.asyncio
+    async def test_disabled_by_default_makes_no_calls(self, monkeypatch, tmp_path):
+        vectorizer = install_vectorizer(monkeypatch)
+        monkeypatch.setattr(settings, "ann_index_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "user_ann_index_enabled", False)
+        engine = MatchingEngine()
+
+        assert not await engine.index_user("u1", profile("Physics"))
+        assert vectorizer.calls == 0
+        assert "u1" not in engine.user_index
+
+    @pytest.mark.asyncio
+    async def test_unchanged_profile_is_not_vectorized_again(self, monkeypatch, tmp_path):
+        vectorizer = install_vectorizer(monkeypatch)
+        monkeypatch.setattr(settings, "ann_index_dir", str(tmp_path))
+        monkeypatch.setattr(settings, "user_ann_index_enabled", True)
+        engine = MatchingEngine()
+
+        assert await engine.index_user("u1", profile("Physics"))
+        assert await engine.index_user("u1", profile("Physics"))
+        assert vectorizer.calls == 1
+
+        assert await engine.index_user("u1", profile("Biology"))
+        assert vectorizer.calls == 2
+        assert "u1" in engine.user_index
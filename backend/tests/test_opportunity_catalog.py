@@ -0,0 +1,90 @@
+"""
+Unit Tests for OpportunityCatalog
+One Firestore scan serves every cold caller
+"""
+import asyncio
+import pytest
+
+from app.database import expiry_cutoff
+from app.models import Scholarship
+from app.services import opportunity_catalog as catalog_module
+from app.services.opportunity_catalog import OpportunityCatalog
+
+DAY = 86400
+
+
+def scholarship(sid: str, deadline_timestamp=None) -> Scholarship:
+    return Scholarship(id=sid, name=sid, source_url=f"https://example.org/{sid}", deadline_timestamp=deadline_timestamp)
+
+
+class FakeDB:
+    def __init__(self, scholarships):
+        self.scholarships = scholarships
+        self.scans = 0
+
+    async def get_active_scholarships(self):
+        self.scans += 1
+        await asyncio.sleep(0.05)
+        return list(self.scholarships)
+
+
+class TestLoading:
+    """Test suite for the cold-start load"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_cold_callers_share_one_scan(self, monkeypatch):
+        fake = FakeDB([scholarship("a"), scholarship("b", expiry_cutoff() + DAY)])
+        monkeypatch.setattr(catalog_module, "db", fake)
+        catalog = OpportunityCatalog()
+
+        results = await asyncio.gather(*(catalog.get_all() for _ in range(20)))
+
+        assert fake.scans == 1
+        assert catalog.loads == 1
+        assert all([s.id for s in r] == ["a", "b"] for r in results)
+
+    @pytest.mark.asyncio
+    async def test_explicit_reload_still_rescans(self, monkeypatch):
+        fake = FakeDB([scholarship("a")])
+        monkeypatch.setattr(catalog_module, "db", fake)
+        catalog = OpportunityCatalog()
+
+        await catalog.get_all()
+        await catalog.reload()
+
+        assert fake.scans == 2
+
+class TestDeadlines:
+    """Test suite for expiry and urgency answers"""
+
+    @pytest.mark.asyncio
+    async def test_expired_items_are_hidden_and_pruned(self, monkeypatch):
+        cutoff = expiry_cutoff()
+        fake = FakeDB([
+            scholarship("old", cutoff - DAY),
+            scholarship("today", cutoff),
+            scholarship("undated"),
+        ])
+        monkeypatch.setattr(catalog_module, "db", fake)
+        catalog = OpportunityCatalog()
+
+        assert [s.id for s in await catalog.get_all()] == ["undated", "today"]
+        assert catalog.expired_count() == 1
+
+        assert catalog.prune_expired() == ["old"]
+        assert catalog.expired_count() == 0
+        assert catalog.active_count() == 2
+
+    @pytest.mark.asyncio
+    async def test_due_by_can_keep_undated_items(self, monkeypatch):
+        cutoff = expiry_cutoff()
+        fake = FakeDB([
+            scholarship("soon", cutoff + DAY),
+            scholarship("later", cutoff + 40 * DAY),
+            scholarship("undated"),
+        ])
+        monkeypatch.setattr(catalog_module, "db", fake)
+        catalog = OpportunityCatalog()
+
+        assert [s.id for s in await catalog.get_due_by(cutoff + 7 * DAY)] == ["soon"]
+        assert [s.id for s in await catalog.get_due_by(cutoff + 7 * DAY, include_undated=True)] == ["undated", "soon"]
@@ -0,0 +1,82 @@
+"""
+Unit Tests for PageReadiness
+Scrolls until content stops growing; learns and reuses per-domain selectors
+"""
+import pytest
+
+from app.services.page_readiness import PageReadiness, ReadinessStore
+
+
+class FakePage:
+    """Grows by one batch of items per scroll until batches run out"""
+
+    def __init__(self, batches=1, selectors=()):
+        self.batches = batches
+        self.loaded = 1
+        self.selectors = set(selectors)
+        self.waited_for = []
+
+    async def wait_for_selector(self, selector, state, timeout):
+        self.waited_for.append(selector)
+        if selector not in self.selectors:
+            raise TimeoutError(selector)
+
+    async def wait_for_function(self, expression, arg, polling, timeout):
+        return True
+
+    async def evaluate(self, script, arg=None):
+        if script.startswith("window.scrollTo"):
+            self.loaded = min(self.batches, self.loaded + 1)
+            return None
+        if "minRepeats" in script:
+            return {"selector": "article.card", "count": 10 * self.loaded}
+        return {"height": 1000 * self.loaded, "items": 10 * self.loaded}
+
+
+class TestPageReadiness:
+    """Test suite for adaptive readiness detection"""
+
+    @pytest.mark.asyncio
+    async def test_scrolls_until_no_new_content(self):
+        readiness = PageReadiness(ReadinessStore())
+        page = FakePage(batches=3)
+
+        report = await readiness.wait_until_ready(page, "https://feed.example/list")
+
+        # Two scrolls bring new batches, the third finds nothing new
+        assert report.scrolls == 3
+        assert report.items == 30
+
+    @pytest.mark.asyncio
+    async def test_scroll_is_capped(self):
+        readiness = PageReadiness(ReadinessStore(), max_scrolls=4)
+
+        report = await readiness.wait_until_ready(FakePage(batches=100), "https://feed.example/")
+
+        assert report.scrolls == 4
+
+    @pytest.mark.asyncio
+    async def test_learned_selector_is_stored_and_reused(self, tmp_path):
+        path = str(tmp_path / "readiness.json")
+        store = ReadinessStore(path)
+        first = await PageReadiness(store).wait_until_ready(FakePage(), "https://www.devpost.com/hackathons")
+        store.save()
+
+        assert first.strategy == "quiescence"
+
+        reloaded = ReadinessStore(path)
+        page = FakePage(selectors={"article.card"})
+        second = await PageReadiness(reloaded).wait_until_ready(page, "https://devpost.com/hackathons")
+
+        assert page.waited_for == ["article.card"]
+        assert second.strategy == "selector"
+        assert reloaded.get("devpost.com").visits == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_selector_falls_back_to_quiescence(self):
+        store = ReadinessStore()
+        store.get("site.example").selector = "div.gone"
+
+        report = await PageReadiness(store).wait_until_ready(FakePage(), "https://site.example/")
+
+        assert report.strategy == "selector-missed"
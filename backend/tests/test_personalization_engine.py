@@ -212,6 +212,76 @@ class TestPersonalizationEngine:
         assert 'artificial intelligence' in explanation.lower() or 'interests' in explanation.lower()
 
 
+class TestKeywordMatcher:
+    """The compiled matcher must agree with naive substring checks"""
+    
+    def test_matches_naive_substring_checks(self):
+        """Every table keyword is found exactly when `keyword in text`"""
+        matcher = personalization_engine.keyword_matcher
+        texts = [
+            'build machine learning models with deep learning and neural networks',
+            'data analysis and data science for healthcare analytics',
+            'react native, node.js and next.js fullstack web hackathon',
+            'defi smart contracts on ethereum - web3 bounty',
+            'nothing relevant here',
+            '',
+        ]
+        
+        for text in texts:
+            expected = {kw for kw in matcher.keywords if kw in text}
+            assert matcher.match(text) == expected, text
+    
+    def test_overlapping_keywords_share_a_start(self):
+        """Keywords that are prefixes of each other are all reported"""
+        matcher = personalization_engine.keyword_matcher
+        found = matcher.match('data analysis')
+        
+        assert {'data', 'data analysis'} <= found
+
+
+class TestOpportunityFeatures:
+    """Precomputed features must score exactly like the raw opportunity"""
+    
+    def _opportunity(self, **overrides):
+        opp = {
+            'id': 'feat-1',
+            'name': 'AI for Social Good Hackathon',
+            'description': 'Build machine learning tools for nonprofits',
+            'organization': 'Impact Labs',
+            'tags': ['AI', 'Hackathon'],
+            'eligibility': {'gpa_min': 3.0, 'majors': ['Computer Science'], 'grade_levels': ['Undergraduate']},
+        }
+        opp.update(overrides)
+        return opp
+    
+    def test_features_score_like_raw_dict(self):
+        """Scoring through get_features gives the same result as the dict"""
+        opp = self._opportunity()
+        profile = {
+            'interests': ['artificial intelligence', 'social impact'],
+            'background': ['hackathon'],
+            'gpa': 3.4,
+            'major': 'Computer Science',
+            'academic_status': 'Undergraduate',
+        }
+        features = personalization_engine.get_features(opp)
+        
+        assert features.text == personalization_engine._get_opportunity_text(opp).lower()
+        assert 'machine' in features.tokens
+        assert personalization_engine.calculate_personalized_score(features, profile) == \
+            personalization_engine.calculate_personalized_score(opp, profile)
+    
+    def test_cache_keyed_by_id_and_content(self):
+        """Same content reuses features; edited content gets fresh ones"""
+        first = personalization_engine.get_features(self._opportunity())
+        again = personalization_engine.get_features(self._opportunity())
+        edited = personalization_engine.get_features(self._opportunity(description='Blockchain grants'))
+        
+        assert again is first
+        assert edited is not first
+        assert 'blockchain' in edited.matched_keywords
+
+
 # Run tests
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
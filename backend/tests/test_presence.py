@@ -0,0 +1,130 @@
+"""
+Unit Tests for PresenceRegistry
+The in-process registry is the reference behaviour for the Redis one
+"""
+import pytest
+
+from app.services.presence import PresenceRegistry, RedisPresenceRegistry
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append(('set', key, value))
+        return self
+
+    def sadd(self, key, *members):
+        self.commands.append(('sadd', key, members))
+        return self
+
+    async def exec(self):
+        self.redis.requests += 1
+        for command in self.commands:
+            if command[0] == 'set':
+                self.redis.values[command[1]] = command[2]
+            else:
+                self.redis.sets.setdefault(command[1], set()).update(command[2])
+        return [True] * len(self.commands)
+
+
+class FakeRedis:
+    """Counts HTTP round trips; each exec() is one request"""
+
+    def __init__(self):
+        self.values = {}
+        self.sets = {}
+        self.requests = 0
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+    async def smembers(self, key):
+        self.requests += 1
+        return list(self.sets.get(key, ()))
+
+    async def mget(self, *keys):
+        self.requests += 1
+        return [self.values.get(key) for key in keys]
+
+
+def redis_registry() -> RedisPresenceRegistry:
+    registry = RedisPresenceRegistry.__new__(RedisPresenceRegistry)
+    PresenceRegistry.__init__(registry, ttl_seconds=60)
+    registry.redis = FakeRedis()
+    return registry
+
+
+class TestPresenceRegistry:
+    """Test suite for user -> node presence"""
+
+    @pytest.mark.asyncio
+    async def test_locate_requires_live_node(self):
+        registry = PresenceRegistry(ttl_seconds=60)
+        await registry.register('u1', 'node-a')
+
+        # Registered, but node-a has not heartbeated yet
+        assert await registry.locate('u1') is None
+
+        await registry.heartbeat('node-a', ['u1'])
+        assert await registry.locate('u1') == 'node-a'
+        assert await registry.nodes() == {'node-a': 1}
+
+    @pytest.mark.asyncio
+    async def test_unregister_does_not_clobber_takeover(self):
+        """A user who reconnected on another node stays registered there"""
+        registry = PresenceRegistry(ttl_seconds=60)
+        await registry.heartbeat('node-a', [])
+        await registry.heartbeat('node-b', [])
+
+        await registry.register('u1', 'node-a')
+        await registry.register('u1', 'node-b')
+        await registry.unregister('u1', 'node-a')
+
+        assert await registry.locate('u1') == 'node-b'
+
+    @pytest.mark.asyncio
+    async def test_dead_nodes_drop_out(self):
+        registry = PresenceRegistry(ttl_seconds=0)
+        await registry.heartbeat('node-a', ['u1', 'u2'])
+
+        assert await registry.nodes() == {}
+        assert await registry.total_connections() == 0
+        assert await registry.locate('u1') is None
+
+    @pytest.mark.asyncio
+    async def test_register_with_count_is_visible_before_heartbeat(self):
+        registry = PresenceRegistry(ttl_seconds=60)
+        assert await registry.total_connections() == 0
+
+        await registry.register('u1', 'node-a', connections=1)
+
+        assert await registry.total_connections() == 1
+        assert await registry.locate('u1') == 'node-a'
+
+
+class TestRedisPresenceRegistry:
+    """Test suite for the Redis round trips"""
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_pipelines_every_user(self):
+        registry = redis_registry()
+        users = [f'u{i}' for i in range(1200)]
+
+        await registry.heartbeat('node-a', users)
+
+        # 1202 commands in chunks of 500, not 1202 requests
+        assert registry.redis.requests == 3
+        assert registry.redis.values['ws:presence:user:u1199'] == 'node-a'
+        assert await registry.nodes() == {'node-a': 1200}
+
+    @pytest.mark.asyncio
+    async def test_register_updates_node_count_in_one_request(self):
+        registry = redis_registry()
+
+        await registry.register('u1', 'node-a', connections=1)
+
+        assert registry.redis.requests == 1
+        assert await registry.total_connections() == 1
@@ -0,0 +1,87 @@
+"""
+Unit Tests for ProfileIndex
+Candidates must include every user the full scan would push to
+"""
+import random
+
+from app.services.personalization_engine import PersonalizationEngine
+from app.services.profile_index import ProfileIndex
+
+
+class TestProfileIndex:
+    """Test suite for the feature -> user inverted index"""
+
+    def setup_method(self):
+        self.engine = PersonalizationEngine()
+        self.index = ProfileIndex(self.engine)
+
+    def test_only_users_sharing_a_feature_are_candidates(self):
+        self.index.add('ai', {'interests': ['artificial intelligence']})
+        self.index.add('chain', {'interests': ['blockchain']})
+        self.index.add('quantum', {'interests': ['quantum optics']})
+
+        opp = {'id': 'o1', 'name': 'Deep Learning Fellowship', 'description': 'For machine learning researchers'}
+
+        assert self.index.candidates(opp) == {'ai'}
+
+    def test_free_text_interests_match_as_substrings(self):
+        self.index.add('quantum', {'interests': ['quantum']})
+
+        opp = {'id': 'o2', 'name': 'Quantum Computing Grant', 'description': ''}
+
+        assert 'quantum' in self.index.candidates(opp)
+
+    def test_free_text_phrases_are_kept_apart_from_postings(self):
+        self.index.add('u1', {'interests': ['quantum']})
+        self.index.add('u2', {'interests': ['quantum'], 'background': ['ocean']})
+        assert self.index.stats()['phrases'] == 2
+        assert self.index.stats()['keys'] == 0
+
+        opp = {'id': 'o4', 'name': 'Oceanography and Quantum Sensing', 'description': ''}
+        assert self.index.candidates(opp) == {'u1', 'u2'}
+
+        self.index.remove('u2')
+        assert self.index.stats()['phrases'] == 1
+        assert self.index.candidates({'id': 'o5', 'name': 'Ocean Award', 'description': ''}) == set()
+
+    def test_remove_and_update(self):
+        self.index.add('u1', {'interests': ['blockchain']})
+        opp = {'id': 'o3', 'name': 'Ethereum Hackathon', 'description': 'smart contracts'}
+        assert 'u1' in self.index.candidates(opp)
+
+        self.index.add('u1', {'interests': ['robotics']})
+        assert 'u1' not in self.index.candidates(opp)
+
+        self.index.remove('u1')
+        assert len(self.index) == 0
+        assert self.index.stats()['keys'] == 0
+
+    def test_never_misses_a_push(self):
+        """Every user scoring >= 60 on a full scan is a candidate"""
+        rng = random.Random(5)
+        interests = list(self.engine.interest_keywords) + ['research', 'art']
+        words = [kw for kws in self.engine.interest_keywords.values() for kw in kws] + ['students', 'research']
+
+        profiles = {}
+        for i in range(300):
+            profile = {
+                'interests': rng.sample(interests, rng.choice([0, 1, 2])),
+                'background': rng.sample(['research', 'hackathon', 'women'], rng.choice([0, 1])),
+                'major': rng.choice([None, 'Computer Science']),
+                'academic_status': rng.choice([None, 'Undergraduate']),
+                'gpa': rng.choice([None, 3.8]),
+            }
+            profiles[f'u{i}'] = profile
+            self.index.add(f'u{i}', profile)
+
+        for j in range(40):
+            opp = {
+                'id': f'o{j}',
+                'name': ' '.join(rng.choice(words) for _ in range(3)),
+                'description': ' '.join(rng.choice(words) for _ in range(rng.randint(0, 10))),
+                'eligibility': rng.choice([{}, {'majors': ['Computer Science'], 'grade_levels': ['Undergraduate']}]),
+            }
+            scores = self.engine.score_profiles(opp, profiles)
+            pushed = {user_id for user_id, score in scores.items() if score >= 60}
+
+            assert pushed <= self.index.candidates(opp)
@@ -0,0 +1,56 @@
+"""
+Unit Tests for stream serialization
+Canonical envelopes must decode to the same opportunity as legacy messages
+"""
+import json
+import pytest
+
+from app.services import serialization
+
+
+class TestEnvelope:
+    """Test suite for the enriched-opportunity envelope"""
+
+    def test_round_trip(self):
+        opportunity = {'id': 'opp-1', 'name': 'Grant', 'tags': ['AI']}
+        raw = serialization.dumps(serialization.build_envelope(opportunity, 'multi-batch', ai_model='gemini'))
+
+        message = json.loads(raw)
+        assert message['schema'] == serialization.ENVELOPE_SCHEMA
+        assert serialization.read_envelope(serialization.loads(raw)) == opportunity
+
+    def test_double_encoded_opportunity_is_decoded_at_producer(self):
+        opportunity = {'id': 'opp-2', 'name': 'Hackathon'}
+        envelope = serialization.build_envelope(json.dumps(json.dumps(opportunity)), 'multi-batch')
+
+        assert envelope['enriched_data'] == opportunity
+
+    def test_legacy_messages_are_not_envelopes(self):
+        legacy = {'source': 'multi-batch', 'enriched_data': {'id': 'opp-3'}}
+
+        assert serialization.read_envelope(legacy) is None
+        assert serialization.read_envelope({'id': 'opp-3', 'name': 'Bare'}) is None
+
+
+class TestWireFormat:
+    """Test suite for header-negotiated JSON/msgpack payloads"""
+
+    def test_json_is_default_and_headerless_reads_as_json(self):
+        envelope = serialization.build_envelope({'id': 'opp-4'}, 'src')
+        payload, headers = serialization.encode_message(envelope, 'json')
+
+        assert dict(headers)[serialization.CONTENT_TYPE_HEADER] == b'application/json'
+        assert serialization.decode_message(payload, None) == envelope
+
+    def test_msgpack_packs_embeddings_as_float32(self):
+        pytest.importorskip("msgpack")
+        embedding = [0.1 * i for i in range(768)]
+        envelope = serialization.build_envelope({'id': 'opp-5', 'embedding': embedding}, 'src')
+
+        payload, headers = serialization.encode_message(envelope, 'msgpack')
+        decoded = serialization.decode_message(payload, headers)
+
+        assert len(payload) < 768 * 5
+        assert decoded['enriched_data']['embedding'] == pytest.approx(embedding, rel=1e-6)
+        # The producer's envelope is left untouched
+        assert envelope['enriched_data']['embedding'] is embedding
@@ -0,0 +1,202 @@
+"""
+Unit Tests for Site Extractors
+Known listing pages parse to OpportunitySchema without Gemini; anything
+unrecognised falls back to the LLM
+"""
+from datetime import datetime, timezone
+
+from app.services import site_extractors
+from app.services.site_extractors import SiteExtractor, extract, extractor_for, period_end
+
+# 2025-10-01 00:00 UTC
+NOW = datetime(2025, 10, 1, tzinfo=timezone.utc).timestamp()
+
+DEVPOST_TILE = """
+<div class="hackathon-tile clearfix {status} mb-5">
+  <a href="https://{slug}.devpost.com/?ref_feature=challenge&amp;ref_medium=discover" class="flex-row tile-anchor">
+    <div class="main-content"><div class="content">
+      <h3 class="mb-4">{title}</h3>
+      <div class="round label status-label">16 days left</div>
+      <div class="info-with-icon"><i class="fas fa-globe"></i><div class="info"><span>Online</span></div></div>
+      <div class="prize mr-4 mb-3"><span class="prize-amount">$<span data-currency-value="">75,000</span></span> in prizes </div>
+      <div class="participants mr-4 mb-3"><strong>4488</strong> participants</div>
+    </div></div>
+    <div class="side-info">
+      <span class="label round host-label" title="Google"> Google</span>
+      <div class="submission-period">{period}</div>
+      <span class="label theme-label" title="Machine Learning/AI">Machine Learning/AI</span>
+    </div>
+  </a>
+</div>
+"""
+
+MLH_PAGE = """
+<html><body><div class="row">
+  <div class="event-wrapper"><a class="event-link" href="https://hackmit.org/" title="HackMIT">
+    <div class="event" itemscope itemtype="http://schema.org/Event">
+      <meta content="2025-10-11" itemprop="startDate"><meta content="2025-10-12" itemprop="endDate">
+      <h3 class="event-name" itemprop="name">HackMIT</h3>
+      <p class="event-date">Oct 11th - 12th</p>
+      <div class="event-location" itemprop="location" itemscope itemtype="http://schema.org/Place">
+        <span itemprop="city">Cambridge</span><span itemprop="state">MA</span>
+      </div>
+      <div class="event-hybrid-notes"><span>In-Person Only</span></div>
+    </div>
+  </a></div>
+</div></body></html>
+"""
+
+CODEFORCES_PAGE = """
+<html><body><div class="datatable"><table>
+  <tr><th>Name</th><th>Writers</th><th>Start</th><th>Length</th></tr>
+  <tr data-contestid="2150">
+    <td>Codeforces Round 1054 (Div. 3)<br/><a href="/contestRegistration/2150">Register &raquo;</a></td>
+    <td><a href="/profile/tourist">tourist</a></td>
+    <td><a href="https://www.timeanddate.com/"><span class="format-time">Oct/18/2025 17:35</span><sup>UTC+3</sup></a></td>
+    <td>02:00</td>
+  </tr>
+  <tr data-contestid="2100">
+    <td>Codeforces Round 1000 (Div. 2)</td><td></td>
+    <td><span class="format-time">Sep/01/2025 17:35</span><sup>UTC+3</sup></td><td>02:00</td>
+  </tr>
+</table></div></body></html>
+"""
+
+KAGGLE_PAGE = """
+<html><body><ul>
+  <li><div><a href="/competitions/arc-prize-2025">ARC Prize 2025</a></div>
+      <span>Create an AI capable of novel reasoning</span>
+      <span>Featured · Code Competition · 1,403 Teams</span><span>$1,000,000</span><span>2 months to go</span></li>
+  <li><div><a href="/competitions/titanic">Titanic - Machine Learning from Disaster</a></div>
+      <span>Start here! Predict survival on the Titanic</span><span>Knowledge</span></li>
+</ul></body></html>
+"""
+
+
+def devpost_page(*tiles) -> str:
+    return "<html><body><div class='hackathons-container'>" + "".join(tiles) + "</div></body></html>"
+
+
+class TestRegistry:
+    """Test suite for domain lookup"""
+
+    def test_subdomains_use_the_parent_domain_extractor(self):
+        assert extractor_for("https://www.kaggle.com/competitions").name == "kaggle"
+        assert extractor_for("https://hackmit.devpost.com/").name == "devpost"
+
+    def test_unknown_domain_has_no_extractor(self):
+        assert extractor_for("https://bold.org/scholarships/") is None
+        assert extract("<html><body>$5,000</body></html>", "https://bold.org/scholarships/") is None
+
+    def test_extractor_errors_fall_back_to_llm(self, monkeypatch):
+        class Broken(SiteExtractor):
+            name = "broken"
+            domains = ("broken.example",)
+
+            def extract_opportunities(self, document, url, now):
+                raise KeyError("layout changed")
+
+        monkeypatch.setattr(site_extractors, "_registry", dict(site_extractors._registry))
+        site_extractors.register(Broken())
+
+        assert extract("<html><body>x</body></html>", "https://broken.example/list", now=NOW) is None
+
+
+class TestDevpost:
+    """Test suite for devpost listing tiles"""
+
+    def test_tiles_become_opportunities(self):
+        html = devpost_page(
+            DEVPOST_TILE.format(status="open", slug="ai-partner", title="AI Partner Catalyst", period="Nov 17 - Dec 31, 2025"),
+            DEVPOST_TILE.format(status="upcoming", slug="tableau", title="Tableau Hackathon", period="Nov 12, 2025 - Jan 12, 2026"),
+        )
+
+        result = extract(html, "https://devpost.com/hackathons", now=NOW)
+
+        assert result.extractor == "devpost"
+        first, second = result.opportunities
+        assert first.title == first.name == "AI Partner Catalyst"
+        assert first.source_url == "https://ai-partner.devpost.com/"
+        assert first.organization == "Google"
+        assert first.amount == 75000
+        assert first.deadline == "2025-12-31"
+        assert first.geo_tags == ["Global"]
+        assert first.type_tags == ["Hackathon"]
+        assert first.tags == ["Machine Learning/AI"]
+        assert first.id.startswith("gen_")
+        assert second.deadline == "2026-01-12"
+
+    def test_ended_tiles_are_skipped(self):
+        html = devpost_page(
+            DEVPOST_TILE.format(status="ended", slug="old", title="Old Jam", period="Jan 01 - 05, 2024"),
+            DEVPOST_TILE.format(status="open", slug="new", title="New Jam", period="Oct 01 - 31, 2025"),
+        )
+
+        result = extract(html, "https://devpost.com/hackathons", now=NOW)
+
+        assert [o.title for o in result.opportunities] == ["New Jam"]
+
+    def test_single_hackathon_page_goes_to_llm(self):
+        html = "<html><body><h1>AI Partner Catalyst</h1><p>$75,000 in prizes</p></body></html>"
+
+        assert extract(html, "https://ai-partner.devpost.com/", now=NOW) is None
+
+    def test_keep_mentioned_in_limits_to_a_delta(self):
+        html = devpost_page(
+            DEVPOST_TILE.format(status="open", slug="a", title="Alpha Hack", period="Oct 01 - 31, 2025"),
+            DEVPOST_TILE.format(status="open", slug="b", title="Beta Hack", period="Oct 01 - 31, 2025"),
+        )
+        result = extract(html, "https://devpost.com/hackathons", now=NOW)
+
+        result.keep_mentioned_in('<div data-crawl-delta="items"><h3>Beta Hack</h3></div>')
+
+        assert [o.title for o in result.opportunities] == ["Beta Hack"]
+
+
+class TestOtherSites:
+    """Test suite for mlh.io, codeforces and kaggle rules"""
+
+    def test_mlh_microdata_events(self):
+        (event,) = extract(MLH_PAGE, "https://mlh.io/seasons/2025/events", now=NOW).opportunities
+
+        assert event.title == "HackMIT"
+        assert event.source_url == "https://hackmit.org/"
+        assert event.deadline == "2025-10-11"
+        assert event.geo_tags == ["Cambridge, MA"]
+        assert "In-Person Only" in event.description
+
+    def test_codeforces_upcoming_contests_only(self):
+        result = extract(CODEFORCES_PAGE, "https://codeforces.com/contests", now=NOW)
+
+        (contest,) = result.opportunities
+        assert contest.title == "Codeforces Round 1054 (Div. 3)"
+        assert contest.source_url == "https://codeforces.com/contests/2150"
+        # 17:35 Moscow time is 14:35 UTC
+        assert contest.deadline_timestamp == int(datetime(2025, 10, 18, 14, 35, tzinfo=timezone.utc).timestamp())
+
+    def test_codeforces_page_of_past_contests_is_handled_with_nothing_to_publish(self):
+        past_only = CODEFORCES_PAGE.replace("Oct/18/2025", "Sep/18/2025")
+
+        result = extract(past_only, "https://codeforces.com/contests", now=NOW)
+
+        assert result is not None and result.opportunities == []
+
+    def test_kaggle_competition_cards(self):
+        arc, titanic = extract(KAGGLE_PAGE, "https://www.kaggle.com/competitions", now=NOW).opportunities
+
+        assert arc.title == "ARC Prize 2025"
+        assert arc.source_url == "https://kaggle.com/competitions/arc-prize-2025"
+        assert arc.amount == 1000000
+        assert arc.description == "Create an AI capable of novel reasoning"
+        assert arc.deadline == "2025-11-30"
+        assert titanic.amount == 0
+        assert titanic.amount_display == "Knowledge"
+
+
+class TestParsing:
+    """Test suite for date helpers"""
+
+    def test_period_end_borrows_month_when_omitted(self):
+        assert period_end("Sep 12 - 14, 2025") == datetime(2025, 9, 14, 23, 59)
+        assert period_end("Nov 17 - Dec 31, 2025") == datetime(2025, 12, 31, 23, 59)
+        assert period_end("") is None
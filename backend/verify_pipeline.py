@@ -1,11 +1,11 @@
 
 import asyncio
-import json
 import structlog
 from confluent_kafka import Consumer, KafkaException
 
 from app.config import settings
 from app.services.kafka_config import KafkaConfig
+from app.services import serialization
 
 # Configure simple logger
 structlog.configure(
@@ -49,7 +49,7 @@ async def verify_stream():
 
             # Process Message
             try:
-                data = json.loads(msg.value().decode('utf-8'))
+                data = serialization.decode_message(msg.value(), msg.headers())
                 url = data.get('url', 'Unknown')
                 source = data.get('source', 'Unknown')
                 size = len(data.get('html', ''))